@@ -4,73 +4,181 @@ Este agente pode interagir com Google Calendar, Microsoft Teams e sistemas inter
 """
 
 import os
-import json
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from langchain.chains import LLMChain
 from dotenv import load_dotenv
 
 from integracao.google_calendar import GoogleCalendarIntegration
 from integracao.teams import TeamsIntegration
 from integracao.api_interna import APIInterna
+from componentes.consolidacao_json import extrair_json
+from componentes.consumo_tokens import Orcamento, OrcamentoExcedido, invocar_com_orcamento, pedido
+from componentes.memoria_conversa import GerenciadorSessoes, MemoriaConversa, criar_resumidor
+from componentes.rastreamento import configurar_rastreamento, criar_callback_llm, rastrear
+from componentes.roteamento_modelos import RoteadorModelos, validar_json
 
 load_dotenv()
 
+# Para onde vão os spans de cada pedido: nenhum, console, json ou console,json
+configurar_rastreamento(
+    os.getenv("RASTREAMENTO_EXPORTADOR", "nenhum"),
+    os.getenv("RASTREAMENTO_ARQUIVO", "rastreamento.jsonl"),
+    os.getenv("RASTREAMENTO_OPENTELEMETRY", "false").lower() == "true"
+)
+
+def criar_sessoes(llm):
+    """
+    Cria o gerenciador das conversas de cada usuário, com os limites do .env.
+    
+    Args:
+        llm: Modelo usado para resumir as mensagens antigas
+        
+    Returns:
+        GerenciadorSessoes: Sessões vazias
+    """
+    max_tokens = int(os.getenv("MEMORIA_MAX_TOKENS", "1200"))
+    resumir = criar_resumidor(llm)
+    return GerenciadorSessoes(
+        lambda: MemoriaConversa(max_tokens, resumir=resumir),
+        max_sessoes=int(os.getenv("MEMORIA_MAX_SESSOES", "1000")),
+        ttl_segundos=float(os.getenv("MEMORIA_TTL_MINUTOS", "60")) * 60
+    )
+
+def criar_orcamento():
+    """
+    Cria o orçamento de cada solicitação com os limites do .env (0 = sem limite).
+    
+    Returns:
+        Orcamento ou None: Limites da solicitação, ou None se nenhum estiver configurado
+    """
+    max_tokens = int(os.getenv("ORCAMENTO_TOKENS_PEDIDO", "0"))
+    max_custo = float(os.getenv("ORCAMENTO_CUSTO_PEDIDO", "0"))
+    max_tokens_entrada = int(os.getenv("ORCAMENTO_TOKENS_CHAMADA", "0"))
+    if not (max_tokens or max_custo or max_tokens_entrada):
+        return None
+    return Orcamento(
+        max_tokens=max_tokens or None,
+        max_custo=max_custo or None,
+        max_tokens_entrada=max_tokens_entrada or None,
+        modelo_economico=os.getenv("ORCAMENTO_MODELO_ECONOMICO") or None
+    )
+
+def criar_roteador(llm=None):
+    """
+    Cria o roteador de modelos com os níveis do .env (MODELO_NIVEL_* e MODELO_TAREFA_*).
+    
+    Args:
+        llm (opcional): Modelo do nível "padrao" (padrão: MODELO_NIVEL_PADRAO ou gpt-3.5-turbo)
+        
+    Returns:
+        RoteadorModelos: Roteador com o modelo de cada tarefa
+    """
+    return RoteadorModelos.de_variaveis(os.environ, llm_padrao=llm, temperatura=0.2,
+                                        api_key=os.getenv("OPENAI_API_KEY"))
+
+# Abaixo desta confiança (informada pelo modelo), a interpretação da solicitação
+# é refeita pelo próximo nível de MODELO_TAREFA_ROTEAMENTO, se houver
+ROTEAMENTO_CONFIANCA_MINIMA = float(os.getenv("ROTEAMENTO_CONFIANCA_MINIMA", "0.6"))
+
 class AgenteIntegrado:
     """
     Agente que integra múltiplos serviços para fornecer assistência completa.
     """
     
-    def __init__(self):
-        """Inicializa o agente integrado."""
-        # Inicializar o modelo de linguagem
-        self.llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo", 
+    def __init__(self, llm=None, calendar=None, teams=None, api=None, sessoes=None, orcamento=None,
+                 llm_economico=None, roteador=None):
+        """
+        Inicializa o agente integrado.
+        
+        Os clientes podem ser recebidos prontos, para que vários agentes (ex.: no
+        servidor) compartilhem o mesmo modelo e as mesmas sessões em vez de
+        criar os seus.
+        
+        Args:
+            llm (opcional): Modelo de linguagem do nível "padrao" (padrão: o do roteador)
+            calendar (GoogleCalendarIntegration, opcional): Cliente do Google Calendar
+            teams (TeamsIntegration, opcional): Cliente do Microsoft Teams
+            api (APIInterna, opcional): Cliente da API interna
+            sessoes (GerenciadorSessoes, opcional): Memória das conversas de cada usuário
+            orcamento (Orcamento, opcional): Limites de tokens e custo de cada solicitação
+                (padrão: os do .env, ver criar_orcamento)
+            llm_economico (opcional): Modelo mais barato usado quando o orçamento aperta
+                (padrão: ORCAMENTO_MODELO_ECONOMICO, se definido)
+            roteador (RoteadorModelos, opcional): Modelo de cada tarefa, com os níveis
+                tentados quando a resposta não serve (padrão: os do .env, ver criar_roteador)
+        """
+        # Modelo de cada tarefa; sem configuração, tudo vai para o modelo padrão
+        self.roteador = roteador or criar_roteador(llm)
+        self.llm = self.roteador.llm()
+        
+        # Limites de cada solicitação e o modelo usado quando eles apertam
+        self.orcamento = orcamento or criar_orcamento()
+        modelo_economico = self.orcamento.modelo_economico if self.orcamento else None
+        self.llm_economico = llm_economico or (ChatOpenAI(
+            model_name=modelo_economico,
             temperature=0.2,
             openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        ) if modelo_economico else None)
         
         # Inicializar integrações
         try:
-            self.calendar = GoogleCalendarIntegration()
-            self.teams = TeamsIntegration()
-            self.api = APIInterna()
+            self.calendar = calendar or GoogleCalendarIntegration()
+            self.teams = teams or TeamsIntegration()
+            self.api = api or APIInterna()
             
             self.servicos_disponiveis = ["calendar", "teams", "api_interna"]
         except Exception as e:
             print(f"Aviso: Nem todas as integrações estão disponíveis - {str(e)}")
             self.servicos_disponiveis = []
         
-        # Configurar o chain para processamento de linguagem natural
-        self.chain = LLMChain(
-            llm=self.llm,
-            prompt=ChatPromptTemplate.from_template(
-                """
-                Você é um assistente que ajuda a entender solicitações e determinar quais ações tomar.
-                
-                Baseado na solicitação abaixo, identifique:
-                1. Qual serviço deve ser utilizado (calendar, teams, api_interna)
-                2. Qual ação deve ser realizada
-                3. Quais parâmetros são necessários
-                
-                Formate sua resposta como um JSON com os campos:
-                - servico: o nome do serviço a ser usado
-                - acao: a ação a ser realizada
-                - parametros: um objeto com os parâmetros necessários
-                
-                Solicitação: {solicitacao}
-                
-                Resposta:
-                """
-            )
+        # Histórico de cada usuário, limitado a MEMORIA_MAX_TOKENS no prompt
+        self.sessoes = sessoes or criar_sessoes(self.llm)
+        
+        # Resposta aceitável para o roteamento: JSON com um serviço conhecido
+        self.validar_roteamento = validar_json(
+            ("servico", "acao"),
+            valores={"servico": {"calendar", "teams", "api_interna"}},
+            confianca_minima=ROTEAMENTO_CONFIANCA_MINIMA
+        )
+        
+        # Mede cada chamada ao LLM (latência e tokens)
+        self.callback_llm = criar_callback_llm()
+        
+        # Prompt que transforma a solicitação em serviço, ação e parâmetros
+        self.prompt = ChatPromptTemplate.from_template(
+            """
+            Você é um assistente que ajuda a entender solicitações e determinar quais ações tomar.
+            
+            Baseado na solicitação abaixo, identifique:
+            1. Qual serviço deve ser utilizado (calendar, teams, api_interna)
+            2. Qual ação deve ser realizada
+            3. Quais parâmetros são necessários
+            
+            Formate sua resposta como um JSON com os campos:
+            - servico: o nome do serviço a ser usado
+            - acao: a ação a ser realizada
+            - parametros: um objeto com os parâmetros necessários
+            - confianca: um número de 0 a 1 indicando o quanto você tem certeza da interpretação
+            
+            Use o histórico para resolver referências como "essa reunião" ou "o mesmo canal".
+            
+            Histórico da conversa:
+            {historico}
+            
+            Solicitação: {solicitacao}
+            
+            Resposta:
+            """
         )
     
-    def processar_solicitacao(self, solicitacao):
+    @rastrear("agente.processar_solicitacao", etapa="solicitacao")
+    def processar_solicitacao(self, solicitacao, id_usuario="padrao"):
         """
         Processa uma solicitação em linguagem natural e executa a ação apropriada.
         
         Args:
             solicitacao (str): Solicitação em linguagem natural
+            id_usuario (str): Identifica a sessão (cada usuário tem seu próprio histórico)
             
         Returns:
             dict: Resultados da ação
@@ -82,12 +190,42 @@ class AgenteIntegrado:
                 "mensagem": "Nenhuma integração está configurada. Verifique as credenciais."
             }
         
-        # Usar o LLM para entender a solicitação
-        resposta = self.chain.run(solicitacao=solicitacao)
+        # Usar o LLM para entender a solicitação (o começo do histórico é cortado se passar do orçamento).
+        # Uma resposta fora do formato ou com confiança baixa é refeita pelo próximo nível.
+        memoria = self.sessoes.obter(id_usuario)
+        variaveis = {"solicitacao": solicitacao, "historico": memoria.texto() or "(início da conversa)"}
+        try:
+            with pedido(usuario=id_usuario, agente="integrado", orcamento=self.orcamento):
+                resposta = self.roteador.executar(
+                    "roteamento",
+                    lambda llm: invocar_com_orcamento(
+                        llm,
+                        self.prompt,
+                        variaveis,
+                        campo_contexto="historico",
+                        cortar_do_inicio=True,  # As mensagens mais recentes ficam no final
+                        llm_economico=self.llm_economico,
+                        config={"callbacks": [self.callback_llm]}
+                    ),
+                    validar=self.validar_roteamento
+                ).content
+                # Dentro do pedido: o resumo que o turno disparar fica registrado para o mesmo usuário
+                memoria.adicionar_turno(solicitacao, resposta)
+        except OrcamentoExcedido as e:
+            return {
+                "sucesso": False,
+                "mensagem": f"Solicitação recusada pelo orçamento de tokens: {str(e)}"
+            }
         
         try:
-            # Converter a resposta do LLM para um objeto
-            instrucoes = json.loads(resposta)
+            # Converter a resposta do LLM para um objeto (o mesmo leitor usado na
+            # validação do roteamento: aceita JSON dentro de blocos ```json)
+            instrucoes = extrair_json(resposta)
+            if not isinstance(instrucoes, dict):
+                return {
+                    "sucesso": False,
+                    "mensagem": "Erro ao processar a resposta do modelo"
+                }
             
             servico = instrucoes.get("servico")
             acao = instrucoes.get("acao")
@@ -106,12 +244,6 @@ class AgenteIntegrado:
                     "mensagem": f"Serviço desconhecido: {servico}"
                 }
         
-        except json.JSONDecodeError:
-            return {
-                "sucesso": False,
-                "mensagem": "Erro ao processar a resposta do modelo"
-            }
-        
         except Exception as e:
             return {
                 "sucesso": False,
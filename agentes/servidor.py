@@ -0,0 +1,324 @@
+"""
+Servidor HTTP (ASGI) para o agente integrado.
+Em vez de cada usuário rodar seu próprio loop de input() (e criar seu próprio
+modelo e clientes das integrações), um único processo mantém um conjunto de
+agentes já inicializados, que compartilham o cliente do modelo e as sessões
+de conversa, e atende vários usuários ao mesmo tempo.
+
+Para rodar localmente (na raiz do projeto):
+    uvicorn agentes.servidor:app --port 8000
+ou
+    python -m agentes.servidor
+
+Rotas:
+    POST   /solicitacoes      {"solicitacao": "...", "id_usuario": "..."}
+    DELETE /sessoes/{id}      Encerra a conversa de um usuário
+    GET    /saude             200 quando o servidor está aceitando pedidos
+    GET    /metricas          Contadores, latência, pedidos por segundo, tempo por etapa e por modelo
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from componentes.consumo_tokens import medidor
+from componentes.rastreamento import rastreador
+
+load_dotenv()
+
+# Agentes prontos no conjunto: é o número de pedidos atendidos ao mesmo tempo
+SERVIDOR_TAMANHO_POOL = int(os.getenv("SERVIDOR_TAMANHO_POOL", "8"))
+# Pedidos que podem esperar por um agente livre; acima disso a resposta é 503
+SERVIDOR_MAX_FILA = int(os.getenv("SERVIDOR_MAX_FILA", "32"))
+# Tempo máximo para terminar os pedidos em andamento ao desligar
+SERVIDOR_TEMPO_ENCERRAMENTO = float(os.getenv("SERVIDOR_TEMPO_ENCERRAMENTO", "30"))
+SERVIDOR_HOST = os.getenv("SERVIDOR_HOST", "127.0.0.1")
+SERVIDOR_PORTA = int(os.getenv("SERVIDOR_PORTA", "8000"))
+
+# Tamanho máximo do corpo de um pedido
+MAX_BYTES_CORPO = 64 * 1024
+
+
+def criar_agentes_integrados(quantidade):
+    """
+    Cria os agentes do conjunto, todos com os mesmos modelos e as mesmas sessões.
+
+    Cada agente tem seus próprios clientes das integrações, porque o cliente
+    do Google Calendar não pode ser usado por duas threads ao mesmo tempo.
+
+    Args:
+        quantidade (int): Número de agentes
+
+    Returns:
+        list: Agentes prontos
+    """
+    from agentes.agente_integrado import AgenteIntegrado, criar_roteador, criar_sessoes
+
+    roteador = criar_roteador()
+    sessoes = criar_sessoes(roteador.llm())
+    return [AgenteIntegrado(roteador=roteador, sessoes=sessoes) for _ in range(quantidade)]
+
+
+class MetricasServidor:
+    """Contadores e latências dos pedidos atendidos."""
+
+    def __init__(self, janela=2000):
+        """
+        Args:
+            janela (int): Quantos pedidos recentes entram no cálculo da latência
+        """
+        self.inicio = time.monotonic()
+        self.por_status = {}
+        self.latencias = deque(maxlen=janela)
+
+    def registrar(self, status, segundos=None):
+        """Registra um pedido finalizado (e sua latência, se foi atendido)."""
+        self.por_status[status] = self.por_status.get(status, 0) + 1
+        if segundos is not None:
+            self.latencias.append(segundos)
+
+    def resumo(self):
+        """
+        Resumo das métricas.
+
+        Returns:
+            dict: Pedidos por status, pedidos atendidos por segundo e latências (ms)
+        """
+        atendidos = self.por_status.get(200, 0)
+        latencias = sorted(self.latencias)
+        resumo = {
+            "pedidos_por_status": {str(status): total for status, total in sorted(self.por_status.items())},
+            "atendidos_por_segundo": round(atendidos / max(time.monotonic() - self.inicio, 1e-9), 2)
+        }
+        if latencias:
+            resumo["latencia_ms"] = {
+                "p50": round(statistics.median(latencias) * 1000, 1),
+                "p95": round(latencias[int(0.95 * (len(latencias) - 1))] * 1000, 1),
+                "max": round(latencias[-1] * 1000, 1)
+            }
+        return resumo
+
+
+class ServidorAgentes:
+    """Aplicação ASGI que distribui os pedidos entre um conjunto de agentes prontos."""
+
+    def __init__(self, criar_agentes=criar_agentes_integrados, tamanho_pool=SERVIDOR_TAMANHO_POOL,
+                 max_fila=SERVIDOR_MAX_FILA, tempo_encerramento=SERVIDOR_TEMPO_ENCERRAMENTO):
+        """
+        Args:
+            criar_agentes (callable): criar_agentes(quantidade) -> lista de agentes com
+                processar_solicitacao(solicitacao, id_usuario)
+            tamanho_pool (int): Número de agentes (pedidos atendidos ao mesmo tempo)
+            max_fila (int): Pedidos que podem esperar por um agente livre
+            tempo_encerramento (float): Espera máxima pelos pedidos em andamento ao desligar
+        """
+        self.criar_agentes = criar_agentes
+        self.tamanho_pool = tamanho_pool
+        self.max_fila = max_fila
+        self.tempo_encerramento = tempo_encerramento
+
+        self.agentes = []
+        self._livres = None  # asyncio.Queue com os agentes disponíveis
+        self._executor = None
+        self._travas_sessao = {}  # id_usuario -> [trava, pedidos usando a trava]
+        self.pendentes = 0  # Pedidos aceitos e ainda não respondidos (em andamento + na fila)
+        self.aceitando = False
+        self.metricas = MetricasServidor()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._ciclo_de_vida(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    # ----------------------------------------------------------------
+    # Ciclo de vida
+    # ----------------------------------------------------------------
+
+    async def iniciar(self):
+        """Cria os agentes (fora do loop de eventos) e começa a aceitar pedidos."""
+        self._executor = ThreadPoolExecutor(max_workers=self.tamanho_pool, thread_name_prefix="agente")
+        loop = asyncio.get_running_loop()
+        self.agentes = await loop.run_in_executor(self._executor, self.criar_agentes, self.tamanho_pool)
+        self._livres = asyncio.Queue()
+        for agente in self.agentes:
+            self._livres.put_nowait(agente)
+        self.metricas = MetricasServidor()
+        self.aceitando = True
+
+    async def encerrar(self):
+        """Para de aceitar pedidos e espera os que estão em andamento (até tempo_encerramento)."""
+        self.aceitando = False
+        limite = time.monotonic() + self.tempo_encerramento
+        while self.pendentes and time.monotonic() < limite:
+            await asyncio.sleep(0.05)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _ciclo_de_vida(self, receive, send):
+        """Trata as mensagens de inicialização e desligamento do servidor ASGI."""
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                try:
+                    await self.iniciar()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                await self.encerrar()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ----------------------------------------------------------------
+    # Rotas
+    # ----------------------------------------------------------------
+
+    async def _http(self, scope, receive, send):
+        """Encaminha o pedido para a rota correspondente."""
+        metodo, caminho = scope["method"], scope["path"].rstrip("/")
+        if caminho == "/solicitacoes" and metodo == "POST":
+            await self._solicitacao(receive, send)
+        elif caminho.startswith("/sessoes/") and metodo == "DELETE":
+            await self._encerrar_sessao(caminho[len("/sessoes/"):], send)
+        elif caminho == "/saude" and metodo == "GET":
+            status = 200 if self.aceitando else 503
+            await _responder(send, status, {"status": "ok" if self.aceitando else "indisponivel"})
+        elif caminho == "/metricas" and metodo == "GET":
+            await _responder(send, 200, self.resumo_metricas())
+        else:
+            await _responder(send, 404, {"erro": "Rota não encontrada"})
+
+    async def _solicitacao(self, receive, send):
+        """Atende uma solicitação em linguagem natural com um agente livre."""
+        # Controle de admissão: com todos os agentes ocupados e a fila cheia,
+        # recusar logo é melhor do que deixar o pedido esperar sem limite
+        if not self.aceitando or self.pendentes >= self.tamanho_pool + self.max_fila:
+            self.metricas.registrar(503)
+            await _responder(send, 503, {"erro": "Servidor ocupado, tente novamente em instantes"},
+                             [(b"retry-after", b"1")])
+            return
+
+        self.pendentes += 1
+        inicio = time.monotonic()
+        try:
+            try:
+                corpo = json.loads(await _ler_corpo(receive) or b"{}")
+                solicitacao = corpo["solicitacao"]
+                id_usuario = str(corpo.get("id_usuario", "padrao"))
+            except (ValueError, KeyError, TypeError):
+                self.metricas.registrar(400)
+                await _responder(send, 400, {"erro": "Envie um JSON com o campo 'solicitacao'"})
+                return
+
+            try:
+                resultado = await self._processar(solicitacao, id_usuario)
+            except Exception as e:
+                self.metricas.registrar(500)
+                await _responder(send, 500, {"sucesso": False, "mensagem": f"Erro ao processar: {str(e)}"})
+                return
+
+            self.metricas.registrar(200, time.monotonic() - inicio)
+            await _responder(send, 200, resultado)
+        finally:
+            self.pendentes -= 1
+
+    async def _processar(self, solicitacao, id_usuario):
+        """Espera um agente livre e executa a solicitação em uma thread."""
+        # Pedidos do mesmo usuário são atendidos em ordem, para o histórico não se misturar
+        trava = self._travas_sessao.setdefault(id_usuario, [asyncio.Lock(), 0])
+        trava[1] += 1
+        try:
+            async with trava[0]:
+                agente = await self._livres.get()
+                try:
+                    loop = asyncio.get_running_loop()
+                    return await loop.run_in_executor(self._executor, agente.processar_solicitacao,
+                                                      solicitacao, id_usuario)
+                finally:
+                    self._livres.put_nowait(agente)
+        finally:
+            trava[1] -= 1
+            if trava[1] == 0:
+                del self._travas_sessao[id_usuario]
+
+    async def _encerrar_sessao(self, id_usuario, send):
+        """Descarta o histórico de um usuário."""
+        sessoes = self._sessoes()
+        if sessoes is not None:
+            sessoes.encerrar(id_usuario)
+        await _responder(send, 200, {"encerrada": id_usuario})
+
+    def _sessoes(self):
+        """Sessões compartilhadas pelos agentes (se o agente tiver)."""
+        return getattr(self.agentes[0], "sessoes", None) if self.agentes else None
+
+    def _roteador(self):
+        """Roteador de modelos compartilhado pelos agentes (se o agente tiver)."""
+        return getattr(self.agentes[0], "roteador", None) if self.agentes else None
+
+    def resumo_metricas(self):
+        """
+        Métricas do servidor.
+
+        Returns:
+            dict: Métricas dos pedidos, agentes livres, pedidos pendentes, sessões abertas
+                latência de cada etapa (LLM, integrações...), usuários que mais gastaram tokens
+                e chamadas de cada tarefa em cada nível de modelo
+        """
+        sessoes, roteador = self._sessoes(), self._roteador()
+        return {
+            **self.metricas.resumo(),
+            "agentes": len(self.agentes),
+            "agentes_livres": self._livres.qsize() if self._livres else 0,
+            "pendentes": self.pendentes,
+            "sessoes": len(sessoes) if sessoes is not None else None,
+            "etapas": rastreador.resumo()["etapas"],
+            "maiores_consumidores": dict(medidor.maiores_consumidores("usuario", 10)),
+            "modelos": roteador.estatisticas() if roteador is not None else None
+        }
+
+
+async def _ler_corpo(receive):
+    """Lê o corpo do pedido (recusando corpos grandes demais)."""
+    partes, tamanho = [], 0
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "http.disconnect":
+            break
+        parte = mensagem.get("body", b"")
+        tamanho += len(parte)
+        if tamanho > MAX_BYTES_CORPO:
+            raise ValueError("Corpo do pedido grande demais")
+        partes.append(parte)
+        if not mensagem.get("more_body", False):
+            break
+    return b"".join(partes)
+
+
+async def _responder(send, status, conteudo, cabecalhos=()):
+    """Envia uma resposta JSON."""
+    corpo = json.dumps(conteudo, ensure_ascii=False, default=str).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                    (b"content-length", str(len(corpo)).encode()), *cabecalhos]
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+
+# Aplicação usada pelo uvicorn: os agentes só são criados quando o servidor inicia
+app = ServidorAgentes()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=SERVIDOR_HOST, port=SERVIDOR_PORTA)
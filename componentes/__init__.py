@@ -0,0 +1,2 @@
+# Pacote de componentes reutilizáveis pelos agentes SMN
+# Este pacote contém blocos de busca, cache e processamento compartilhados pelos exemplos
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Índice invertido com pontuação BM25.
+Encontra documentos que contêm exatamente os termos da consulta, algo que a
+busca vetorial costuma perder (códigos de política, nomes de formulários, etc.).
+"""
+
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from componentes.texto import tokenizar
+
+
+class IndiceBM25:
+    """Índice invertido simples com ranqueamento BM25."""
+
+    def __init__(self, k1=1.5, b=0.75, tokenizador=tokenizar):
+        """
+        Inicializa um índice vazio.
+
+        Args:
+            k1 (float): Controla a saturação da frequência do termo
+            b (float): Controla a normalização pelo tamanho do documento
+            tokenizador (callable): Função que converte texto em lista de termos
+        """
+        self.k1 = k1
+        self.b = b
+        self.tokenizador = tokenizador
+
+        # termo -> {id_documento: frequência do termo no documento}
+        self.postings = defaultdict(dict)
+        self.tamanhos = []
+        self.total_termos = 0
+
+    def __len__(self):
+        return len(self.tamanhos)
+
+    def adicionar(self, texto):
+        """
+        Adiciona um documento ao índice.
+
+        Args:
+            texto (str): Conteúdo do documento
+
+        Returns:
+            int: ID do documento (posição de inserção)
+        """
+        id_documento = len(self.tamanhos)
+        termos = self.tokenizador(texto)
+
+        for termo, frequencia in Counter(termos).items():
+            self.postings[termo][id_documento] = frequencia
+
+        self.tamanhos.append(len(termos))
+        self.total_termos += len(termos)
+        return id_documento
+
+    def adicionar_varios(self, textos):
+        """Adiciona uma lista de documentos ao índice."""
+        return [self.adicionar(texto) for texto in textos]
+
+    def _idf(self, termo):
+        """Calcula o IDF de um termo (quão raro ele é na coleção)."""
+        n = len(self.postings.get(termo, ()))
+        return math.log(1 + (len(self.tamanhos) - n + 0.5) / (n + 0.5))
+
+    def buscar(self, consulta, k=10):
+        """
+        Busca os documentos mais relevantes para a consulta.
+
+        Args:
+            consulta (str): Texto da consulta
+            k (int): Número máximo de resultados
+
+        Returns:
+            list: Lista de tuplas (id_documento, pontuação), da maior para a menor
+        """
+        if not self.tamanhos:
+            return []
+
+        tamanho_medio = self.total_termos / len(self.tamanhos) or 1
+        pontuacoes = defaultdict(float)
+
+        # Percorremos apenas os documentos que contêm algum termo da consulta
+        for termo in set(self.tokenizador(consulta)):
+            documentos = self.postings.get(termo)
+            if not documentos:
+                continue
+
+            idf = self._idf(termo)
+            for id_documento, frequencia in documentos.items():
+                normalizacao = 1 - self.b + self.b * self.tamanhos[id_documento] / tamanho_medio
+                pontuacoes[id_documento] += idf * frequencia * (self.k1 + 1) / (frequencia + self.k1 * normalizacao)
+
+        return heapq.nlargest(k, pontuacoes.items(), key=lambda item: item[1])
+
+    def para_dict(self):
+        """Estado do índice em formato serializável (JSON)."""
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "postings": {termo: [list(documentos), list(documentos.values())]
+                         for termo, documentos in self.postings.items()},
+            "tamanhos": self.tamanhos
+        }
+
+    @classmethod
+    def de_dict(cls, estado, tokenizador=tokenizar):
+        """
+        Recria um índice salvo com para_dict.
+
+        Args:
+            estado (dict): Estado salvo
+            tokenizador (callable): O mesmo tokenizador usado para construir o índice
+        """
+        indice = cls(estado["k1"], estado["b"], tokenizador)
+        for termo, (ids, frequencias) in estado["postings"].items():
+            indice.postings[termo] = dict(zip(ids, frequencias))
+        indice.tamanhos = list(estado["tamanhos"])
+        indice.total_termos = sum(indice.tamanhos)
+        return indice
@@ -0,0 +1,259 @@
+"""
+Busca em documentos internos.
+Indexa uma pasta de arquivos de texto em um índice invertido BM25 (termos sem
+acentos, sem palavras comuns e reduzidos ao radical), salva o índice
+compactado em disco e devolve, para cada documento encontrado, o trecho mais
+relevante com os termos da consulta destacados.
+"""
+
+import gzip
+import json
+import os
+import re
+
+from componentes.bm25 import IndiceBM25
+from componentes.fragmentacao import FragmentadorTokens
+from componentes.texto import hash_conteudo, normalizar, radical, tokenizar
+
+# Tipos de arquivo indexados ao carregar uma pasta
+EXTENSOES_TEXTO = (".txt", ".md")
+
+# Mudar este número invalida os índices salvos (ex.: quando a tokenização mudar)
+VERSAO_INDICE = 1
+
+# Palavras no texto original (com acentos e maiúsculas), para montar os trechos
+PADRAO_PALAVRA = re.compile(r"[^\W_]+(?:[-_][^\W_]+)*")
+
+
+def tokenizar_busca(texto):
+    """Tokenizador do índice: termos sem acentos, sem palavras comuns e reduzidos ao radical."""
+    return tokenizar(texto, radicais=True)
+
+
+def trecho_destacado(texto, consulta, tamanho=300, marcador="**"):
+    """
+    Escolhe o trecho do texto com mais termos da consulta e destaca esses termos.
+
+    Args:
+        texto (str): Conteúdo do documento
+        consulta (str): Texto da consulta
+        tamanho (int): Tamanho aproximado do trecho, em caracteres
+        marcador (str): Marcação colocada antes e depois de cada termo encontrado
+
+    Returns:
+        str: Trecho com os termos destacados (com "..." onde o texto foi cortado)
+    """
+    termos = set(tokenizar_busca(consulta))
+    ocorrencias = [(palavra.start(), palavra.end()) for palavra in PADRAO_PALAVRA.finditer(texto)
+                   if radical(normalizar(palavra.group())) in termos]
+    if not ocorrencias:
+        return texto[:tamanho].strip() + ("..." if len(texto) > tamanho else "")
+
+    # Janela de até `tamanho` caracteres com mais ocorrências (duas pontas)
+    melhor_inicio, melhor_quantidade, fim = 0, 0, 0
+    for inicio in range(len(ocorrencias)):
+        while fim < len(ocorrencias) and ocorrencias[fim][1] - ocorrencias[inicio][0] <= tamanho:
+            fim += 1
+        if fim - inicio > melhor_quantidade:
+            melhor_inicio, melhor_quantidade = inicio, fim - inicio
+    escolhidas = ocorrencias[melhor_inicio:melhor_inicio + melhor_quantidade]
+
+    # Centralizar a janela nas ocorrências e ajustar aos limites das palavras
+    # (textos curtos são mostrados inteiros)
+    folga = max(0, tamanho - (escolhidas[-1][1] - escolhidas[0][0])) // 2
+    inicio = max(0, escolhidas[0][0] - folga) if len(texto) > tamanho else 0
+    fim = min(len(texto), escolhidas[-1][1] + folga) if len(texto) > tamanho else len(texto)
+    if inicio > 0:
+        espaco = texto.find(" ", inicio, escolhidas[0][0])
+        inicio = espaco + 1 if espaco >= 0 else inicio
+    if fim < len(texto):
+        espaco = texto.rfind(" ", escolhidas[-1][1], fim)
+        fim = espaco if espaco >= 0 else fim
+
+    partes, posicao = [], inicio
+    for comeco, final in escolhidas:
+        partes.extend([texto[posicao:comeco], marcador, texto[comeco:final], marcador])
+        posicao = final
+    partes.append(texto[posicao:fim])
+
+    trecho = " ".join("".join(partes).split())
+    return ("..." if inicio > 0 else "") + trecho + ("..." if fim < len(texto) else "")
+
+
+def assinatura_diretorio(diretorio, extensoes=EXTENSOES_TEXTO):
+    """
+    Identifica o conteúdo de uma pasta pelos nomes, tamanhos e datas dos arquivos.
+
+    Args:
+        diretorio (str): Pasta com os documentos
+        extensoes (tuple): Extensões consideradas
+
+    Returns:
+        str: Hash que muda quando algum arquivo é criado, alterado ou removido
+    """
+    partes = []
+    for caminho in _listar_arquivos(diretorio, extensoes):
+        informacoes = os.stat(caminho)
+        partes.append(f"{os.path.relpath(caminho, diretorio)}:{informacoes.st_size}:{informacoes.st_mtime_ns}")
+    return hash_conteudo(VERSAO_INDICE, *partes)
+
+
+def _listar_arquivos(diretorio, extensoes):
+    """Arquivos da pasta (e subpastas) com as extensões desejadas, em ordem."""
+    arquivos = []
+    for raiz, _, nomes in os.walk(diretorio):
+        arquivos.extend(os.path.join(raiz, nome) for nome in nomes if nome.lower().endswith(extensoes))
+    return sorted(arquivos)
+
+
+class BuscaDocumentos:
+    """Índice de busca sobre documentos internos, com trechos destacados."""
+
+    def __init__(self, max_tokens_trecho=400):
+        """
+        Inicializa um índice vazio.
+
+        Args:
+            max_tokens_trecho (int): Documentos longos são divididos em trechos deste
+                tamanho, e cada trecho é indexado separadamente
+        """
+        self.max_tokens_trecho = max_tokens_trecho
+        self._fragmentador = FragmentadorTokens(max_tokens=max_tokens_trecho)
+        self.indice = IndiceBM25(tokenizador=tokenizar_busca)
+        self.documentos = []  # Um dicionário (titulo, caminho, texto) por trecho indexado
+        self.assinatura = None
+
+    def __len__(self):
+        return len(self.documentos)
+
+    def adicionar(self, titulo, texto, caminho=None):
+        """
+        Adiciona um documento ao índice (dividido em trechos, se for longo).
+
+        Args:
+            titulo (str): Título do documento (também é pesquisável)
+            texto (str): Conteúdo do documento
+            caminho (str, opcional): Arquivo de origem
+        """
+        for trecho in self._fragmentador.split_text(texto) or [texto]:
+            self.indice.adicionar(f"{titulo}\n{trecho}")
+            self.documentos.append({"titulo": titulo, "caminho": caminho, "texto": trecho})
+
+    def adicionar_diretorio(self, diretorio, extensoes=EXTENSOES_TEXTO):
+        """
+        Indexa todos os arquivos de texto de uma pasta (e subpastas).
+
+        Args:
+            diretorio (str): Pasta com os documentos
+            extensoes (tuple): Extensões dos arquivos indexados
+
+        Returns:
+            int: Número de arquivos indexados
+        """
+        arquivos = _listar_arquivos(diretorio, extensoes)
+        for caminho in arquivos:
+            with open(caminho, encoding="utf-8", errors="replace") as f:
+                texto = f.read()
+            titulo = os.path.splitext(os.path.relpath(caminho, diretorio))[0]
+            self.adicionar(titulo, texto, caminho)
+        self.assinatura = assinatura_diretorio(diretorio, extensoes)
+        return len(arquivos)
+
+    def buscar(self, consulta, k=5, tamanho_trecho=300):
+        """
+        Busca os documentos mais relevantes para a consulta.
+
+        Args:
+            consulta (str): Texto da consulta
+            k (int): Número máximo de documentos
+            tamanho_trecho (int): Tamanho aproximado de cada trecho devolvido
+
+        Returns:
+            list: Dicionários com titulo, caminho, pontuacao e trecho (com os termos destacados),
+                do mais relevante para o menos, no máximo um por documento
+        """
+        resultados, vistos = [], set()
+        # Buscamos mais candidatos porque vários trechos podem ser do mesmo documento
+        for id_trecho, pontuacao in self.indice.buscar(consulta, k=k * 3):
+            documento = self.documentos[id_trecho]
+            chave = documento["caminho"] or documento["titulo"]
+            if chave in vistos:
+                continue
+            vistos.add(chave)
+            resultados.append({
+                "titulo": documento["titulo"],
+                "caminho": documento["caminho"],
+                "pontuacao": pontuacao,
+                "trecho": trecho_destacado(documento["texto"], consulta, tamanho_trecho)
+            })
+            if len(resultados) == k:
+                break
+        return resultados
+
+    def salvar(self, caminho_indice):
+        """
+        Salva o índice e os documentos em um arquivo JSON compactado (gzip).
+
+        Args:
+            caminho_indice (str): Arquivo de destino (ex.: "indice.json.gz")
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(caminho_indice)), exist_ok=True)
+        estado = {
+            "versao": VERSAO_INDICE,
+            "max_tokens_trecho": self.max_tokens_trecho,
+            "assinatura": self.assinatura,
+            "documentos": self.documentos,
+            "indice": self.indice.para_dict()
+        }
+        # Gravar em um arquivo temporário e trocar: um índice pela metade nunca é lido.
+        # O nível 6 de compressão é bem mais rápido que o 9, com arquivo quase do mesmo tamanho.
+        temporario = caminho_indice + ".tmp"
+        with gzip.open(temporario, "wb", compresslevel=6) as f:
+            f.write(json.dumps(estado, ensure_ascii=False).encode("utf-8"))
+        os.replace(temporario, caminho_indice)
+
+    @classmethod
+    def carregar(cls, caminho_indice):
+        """
+        Carrega um índice salvo com salvar.
+
+        Args:
+            caminho_indice (str): Arquivo do índice
+
+        Returns:
+            BuscaDocumentos: Índice carregado, ou None se o arquivo for de outra versão
+        """
+        with gzip.open(caminho_indice, "rt", encoding="utf-8") as f:
+            estado = json.load(f)
+        if estado.get("versao") != VERSAO_INDICE:
+            return None
+
+        busca = cls(estado["max_tokens_trecho"])
+        busca.indice = IndiceBM25.de_dict(estado["indice"], tokenizar_busca)
+        busca.documentos = estado["documentos"]
+        busca.assinatura = estado["assinatura"]
+        return busca
+
+    @classmethod
+    def abrir(cls, diretorio, caminho_indice, extensoes=EXTENSOES_TEXTO):
+        """
+        Abre o índice de uma pasta: reaproveita o salvo se a pasta não mudou,
+        senão indexa os arquivos de novo e salva.
+
+        Args:
+            diretorio (str): Pasta com os documentos
+            caminho_indice (str): Arquivo onde o índice fica salvo
+            extensoes (tuple): Extensões dos arquivos indexados
+
+        Returns:
+            BuscaDocumentos: Índice pronto para buscas
+        """
+        if os.path.exists(caminho_indice):
+            busca = cls.carregar(caminho_indice)
+            if busca is not None and busca.assinatura == assinatura_diretorio(diretorio, extensoes):
+                return busca
+
+        busca = cls()
+        busca.adicionar_diretorio(diretorio, extensoes)
+        busca.salvar(caminho_indice)
+        return busca
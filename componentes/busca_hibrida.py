@@ -0,0 +1,143 @@
+"""
+Busca híbrida: combina busca vetorial (FAISS) com busca por palavras (BM25).
+Os resultados das duas buscas são unidos por Reciprocal Rank Fusion (RRF) e,
+opcionalmente, reordenados por um cross-encoder local. O corte por relevância usa
+a nota do reranker ou, sem ele, a pontuação da fusão.
+"""
+
+from componentes.bm25 import IndiceBM25
+from componentes.rastreamento import rastrear, span
+
+# Modelo cross-encoder multilíngue pequeno, roda bem em CPU
+RERANKER_PADRAO = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+def fusao_rrf(rankings, k=60):
+    """
+    Une várias listas ranqueadas usando Reciprocal Rank Fusion.
+
+    Cada documento recebe a soma de 1 / (k + posição) em cada lista onde aparece,
+    então documentos bem posicionados em mais de uma busca sobem no ranking.
+
+    Args:
+        rankings (list): Lista de listas de IDs, cada uma ordenada da mais relevante para a menos
+        k (int): Constante de suavização do RRF (60 é o valor usual)
+
+    Returns:
+        list: Lista de tuplas (id, pontuação) ordenada pela pontuação combinada
+    """
+    pontuacoes = {}
+    for ranking in rankings:
+        for posicao, identificador in enumerate(ranking, start=1):
+            pontuacoes[identificador] = pontuacoes.get(identificador, 0.0) + 1.0 / (k + posicao)
+
+    return sorted(pontuacoes.items(), key=lambda item: item[1], reverse=True)
+
+
+def carregar_reranker(nome_modelo=RERANKER_PADRAO):
+    """
+    Carrega um cross-encoder local para reordenar os resultados.
+
+    Requer o pacote opcional sentence-transformers (pip install sentence-transformers).
+
+    Args:
+        nome_modelo (str): Nome do modelo no Hugging Face
+
+    Returns:
+        CrossEncoder ou None: O reranker, ou None se o pacote não estiver instalado
+    """
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError:
+        print("Aviso: sentence-transformers não instalado - reranking desativado")
+        return None
+
+    return CrossEncoder(nome_modelo)
+
+
+class BuscadorHibrido:
+    """Buscador que combina FAISS, BM25 e um reranker opcional."""
+
+    def __init__(self, documentos, base_vetorial, k_candidatos=10, reranker=None,
+                 limiar_relevancia=None, limiar_fusao=None):
+        """
+        Inicializa o buscador.
+
+        Args:
+            documentos (list): Documentos (langchain Document) indexados na base vetorial
+            base_vetorial (FAISS): Base vetorial construída a partir dos mesmos documentos
+            k_candidatos (int): Quantos candidatos cada busca contribui para a fusão
+            reranker (CrossEncoder, opcional): Modelo que pontua pares (pergunta, trecho)
+            limiar_relevancia (float, opcional): Nota mínima do reranker para manter um trecho
+            limiar_fusao (float, opcional): Pontuação RRF mínima para manter um trecho quando
+                não há reranker. A busca vetorial sempre devolve candidatos, mesmo para
+                perguntas sem relação com a base; com k=60, um trecho achado por uma só
+                busca soma no máximo 1/61 ≈ 0,0164, então 0,02 exige que ele apareça nas
+                duas buscas (entre as 40 primeiras posições). Sem limiar, não há corte
+        """
+        self.documentos = documentos
+        self.base_vetorial = base_vetorial
+        self.k_candidatos = k_candidatos
+        self.reranker = reranker
+        self.limiar_relevancia = limiar_relevancia
+        self.limiar_fusao = limiar_fusao
+
+        # O FAISS devolve cópias dos documentos, então mapeamos pelo conteúdo
+        self._id_por_conteudo = {}
+        for id_documento, documento in enumerate(documentos):
+            self._id_por_conteudo.setdefault(documento.page_content, id_documento)
+
+        # Índice de palavras sobre os mesmos trechos
+        self.indice_bm25 = IndiceBM25()
+        self.indice_bm25.adicionar_varios([documento.page_content for documento in documentos])
+
+    @rastrear("busca.vetorial", etapa="busca_vetorial")
+    def _buscar_vetorial(self, pergunta, vetor=None):
+        """Retorna os IDs dos trechos mais próximos na base vetorial."""
+        if vetor is not None:
+            resultados = self.base_vetorial.similarity_search_by_vector(vetor, k=self.k_candidatos)
+        else:
+            resultados = self.base_vetorial.similarity_search(pergunta, k=self.k_candidatos)
+
+        ids = []
+        for documento in resultados:
+            id_documento = self._id_por_conteudo.get(documento.page_content)
+            if id_documento is not None:
+                ids.append(id_documento)
+        return ids
+
+    def buscar(self, pergunta, k=3, vetor=None):
+        """
+        Busca os trechos mais relevantes para uma pergunta.
+
+        Args:
+            pergunta (str): Pergunta do usuário
+            k (int): Número máximo de trechos retornados
+            vetor (list, opcional): Embedding da pergunta, se já tiver sido calculado
+
+        Returns:
+            list: Documentos relevantes, do mais para o menos relevante
+        """
+        ids_vetoriais = self._buscar_vetorial(pergunta, vetor)
+        ids_bm25 = [id_documento for id_documento, _ in self.indice_bm25.buscar(pergunta, k=self.k_candidatos)]
+
+        fundidos = fusao_rrf([ids_vetoriais, ids_bm25])
+
+        if self.reranker is None:
+            # Sem reranker, o corte por relevância usa a pontuação da fusão
+            if self.limiar_fusao is not None:
+                fundidos = [(i, pontuacao) for i, pontuacao in fundidos if pontuacao >= self.limiar_fusao]
+            return [self.documentos[id_documento] for id_documento, _ in fundidos[:k]]
+
+        candidatos = [id_documento for id_documento, _ in fundidos]
+
+        # Reordenar com o cross-encoder e descartar trechos pouco relevantes
+        pares = [(pergunta, self.documentos[id_documento].page_content) for id_documento in candidatos]
+        with span("busca.reranker", "reranker", candidatos=len(pares)):
+            notas = self.reranker.predict(pares)
+        reordenados = sorted(zip(candidatos, notas), key=lambda item: item[1], reverse=True)
+
+        if self.limiar_relevancia is not None:
+            reordenados = [(i, nota) for i, nota in reordenados if nota >= self.limiar_relevancia]
+
+        return [self.documentos[id_documento] for id_documento, _ in reordenados[:k]]
@@ -0,0 +1,125 @@
+"""
+Cache em disco endereçado por conteúdo.
+Cada valor é salvo em um arquivo cujo nome é a própria chave (um hash do
+conteúdo que gerou o valor). Quando o cache passa do tamanho máximo, os
+arquivos usados há mais tempo são removidos primeiro.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+
+class CacheDisco:
+    """Cache persistente em disco com limite de tamanho (remoção dos menos usados)."""
+
+    def __init__(self, diretorio, max_bytes=200 * 1024 * 1024):
+        """
+        Inicializa o cache, criando o diretório se necessário.
+
+        Args:
+            diretorio (str): Pasta onde os arquivos do cache são guardados
+            max_bytes (int): Tamanho máximo total do cache em bytes
+        """
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self._trava = threading.Lock()
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._tamanho_total = sum(tamanho for _, tamanho, _ in self._listar_arquivos())
+
+        self.acertos = 0
+        self.falhas = 0
+
+    def _caminho(self, chave):
+        """Caminho do arquivo de uma chave (subpastas pelos 2 primeiros caracteres)."""
+        return os.path.join(self.diretorio, chave[:2], chave)
+
+    def _listar_arquivos(self):
+        """Lista (caminho, tamanho, último uso) de todos os arquivos do cache."""
+        arquivos = []
+        for pasta, _, nomes in os.walk(self.diretorio):
+            for nome in nomes:
+                if nome.endswith(".tmp"):
+                    continue
+                caminho = os.path.join(pasta, nome)
+                try:
+                    info = os.stat(caminho)
+                except FileNotFoundError:
+                    continue
+                arquivos.append((caminho, info.st_size, info.st_mtime))
+        return arquivos
+
+    def obter_bytes(self, chave):
+        """
+        Lê um valor do cache.
+
+        Args:
+            chave (str): Chave do valor
+
+        Returns:
+            bytes ou None: Conteúdo guardado, ou None se não existir
+        """
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "rb") as f:
+                conteudo = f.read()
+            os.utime(caminho)  # Marcar como usado recentemente
+        except FileNotFoundError:
+            self.falhas += 1
+            return None
+
+        self.acertos += 1
+        return conteudo
+
+    def guardar_bytes(self, chave, conteudo):
+        """
+        Grava um valor no cache (de forma atômica) e remove os mais antigos se necessário.
+
+        Args:
+            chave (str): Chave do valor
+            conteudo (bytes): Conteúdo a guardar
+        """
+        caminho = self._caminho(chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+        try:
+            tamanho_anterior = os.path.getsize(caminho)
+        except FileNotFoundError:
+            tamanho_anterior = 0
+
+        # Escrever em um arquivo temporário e renomear evita arquivos pela metade
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+        with os.fdopen(descritor, "wb") as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+
+        with self._trava:
+            self._tamanho_total += len(conteudo) - tamanho_anterior
+            if self._tamanho_total > self.max_bytes:
+                self._remover_antigos()
+
+    def _remover_antigos(self):
+        """Remove os arquivos usados há mais tempo até ficar abaixo de 90% do limite."""
+        arquivos = sorted(self._listar_arquivos(), key=lambda arquivo: arquivo[2])
+        self._tamanho_total = sum(tamanho for _, tamanho, _ in arquivos)
+        limite = self.max_bytes * 0.9
+
+        for caminho, tamanho, _ in arquivos:
+            if self._tamanho_total <= limite:
+                break
+            try:
+                os.remove(caminho)
+                self._tamanho_total -= tamanho
+            except FileNotFoundError:
+                pass
+
+    def obter(self, chave):
+        """Lê um valor JSON do cache (ou None se não existir)."""
+        conteudo = self.obter_bytes(chave)
+        return None if conteudo is None else json.loads(conteudo.decode("utf-8"))
+
+    def guardar(self, chave, valor):
+        """Grava um valor serializável em JSON no cache."""
+        self.guardar_bytes(chave, json.dumps(valor, ensure_ascii=False).encode("utf-8"))
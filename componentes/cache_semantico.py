@@ -0,0 +1,166 @@
+"""
+Cache semântico de respostas.
+Guarda respostas já geradas e as reutiliza para perguntas iguais ou muito
+parecidas (pela similaridade dos embeddings), evitando a busca e a chamada ao LLM.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from componentes.texto import normalizar
+
+
+def normalizar_pergunta(pergunta):
+    """Normaliza uma pergunta para comparação exata ("Como solicitar férias?" == "como solicitar ferias")."""
+    return " ".join(re.sub(r"[^\w\s]", " ", normalizar(pergunta)).split())
+
+
+class CacheSemantico:
+    """
+    Cache de respostas indexado pelo embedding da pergunta.
+
+    Cada resposta guarda os hashes dos trechos da base de conhecimento usados para
+    gerá-la. Quando algum desses trechos muda ou é removido, a resposta é invalidada.
+    """
+
+    def __init__(self, limiar_similaridade=0.95, max_entradas=1000):
+        """
+        Inicializa o cache.
+
+        Args:
+            limiar_similaridade (float): Similaridade de cosseno mínima para reutilizar uma resposta
+            max_entradas (int): Número máximo de respostas guardadas (as menos usadas saem primeiro)
+        """
+        self.limiar_similaridade = limiar_similaridade
+        self.max_entradas = max_entradas
+
+        # pergunta normalizada -> {"vetor", "resposta", "fontes"}, em ordem de uso (LRU)
+        self._entradas = OrderedDict()
+        self._matriz = None  # Vetores empilhados para comparar com todas as entradas de uma vez
+        self._chaves_matriz = []
+        self._fontes_validas = None
+        self._trava = threading.Lock()
+
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _tocar(self, chave):
+        """Marca uma entrada como usada recentemente e devolve a resposta."""
+        self._entradas.move_to_end(chave)
+        self.acertos += 1
+        return self._entradas[chave]["resposta"]
+
+    def _montar_matriz(self):
+        """Reconstrói a matriz de vetores após inserções ou remoções."""
+        self._chaves_matriz = list(self._entradas.keys())
+        if self._chaves_matriz:
+            self._matriz = np.vstack([self._entradas[chave]["vetor"] for chave in self._chaves_matriz])
+        else:
+            self._matriz = None
+
+    def buscar_exata(self, pergunta):
+        """
+        Procura uma resposta para a mesma pergunta (após normalização), sem precisar de embedding.
+
+        Args:
+            pergunta (str): Pergunta do usuário
+
+        Returns:
+            str ou None: Resposta guardada, se houver
+        """
+        chave = normalizar_pergunta(pergunta)
+        with self._trava:
+            if chave in self._entradas:
+                return self._tocar(chave)
+        return None
+
+    def buscar(self, vetor):
+        """
+        Procura uma resposta para uma pergunta semelhante.
+
+        Args:
+            vetor (list): Embedding da pergunta
+
+        Returns:
+            str ou None: Resposta da pergunta mais parecida, se passar do limiar
+        """
+        with self._trava:
+            if self._matriz is None or len(self._chaves_matriz) != len(self._entradas):
+                self._montar_matriz()
+            if self._matriz is None:
+                self.falhas += 1
+                return None
+
+            similaridades = self._matriz @ _normalizar_vetor(vetor)
+            melhor = int(np.argmax(similaridades))
+
+            if similaridades[melhor] >= self.limiar_similaridade:
+                return self._tocar(self._chaves_matriz[melhor])
+
+            self.falhas += 1
+            return None
+
+    def guardar(self, pergunta, vetor, resposta, fontes):
+        """
+        Guarda uma resposta no cache.
+
+        Args:
+            pergunta (str): Pergunta original
+            vetor (list): Embedding da pergunta
+            resposta (str): Resposta gerada
+            fontes (list): Hashes dos trechos usados para gerar a resposta
+        """
+        chave = normalizar_pergunta(pergunta)
+        with self._trava:
+            # Não guardar respostas baseadas em trechos que já não existem
+            if self._fontes_validas is not None and not set(fontes) <= self._fontes_validas:
+                return
+
+            self._entradas[chave] = {
+                "vetor": _normalizar_vetor(vetor),
+                "resposta": resposta,
+                "fontes": frozenset(fontes)
+            }
+            self._entradas.move_to_end(chave)
+
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+            self._matriz = None
+
+    def sincronizar(self, fontes_atuais):
+        """
+        Informa ao cache quais trechos existem hoje na base de conhecimento.
+
+        Respostas que dependem de trechos alterados ou removidos são descartadas.
+
+        Args:
+            fontes_atuais (iterable): Hashes de todos os trechos atuais da base
+
+        Returns:
+            int: Número de respostas invalidadas
+        """
+        with self._trava:
+            self._fontes_validas = set(fontes_atuais)
+            invalidas = [chave for chave, entrada in self._entradas.items()
+                         if not entrada["fontes"] <= self._fontes_validas]
+
+            for chave in invalidas:
+                del self._entradas[chave]
+
+            if invalidas:
+                self._matriz = None
+            return len(invalidas)
+
+
+def _normalizar_vetor(vetor):
+    """Converte o vetor para numpy com norma 1 (assim o produto escalar é o cosseno)."""
+    vetor = np.asarray(vetor, dtype=np.float32)
+    norma = np.linalg.norm(vetor)
+    return vetor / norma if norma else vetor
@@ -0,0 +1,129 @@
+"""
+Leitura e mesclagem determinística de resultados em JSON.
+Permite juntar as extrações de vários segmentos de um documento localmente,
+sem precisar pedir ao modelo de linguagem para fazer isso.
+"""
+
+import json
+import re
+from functools import reduce
+
+# Valores que o modelo usa para dizer "não achei" - não devem sobrescrever dados reais
+VALORES_VAZIOS = {"", "não encontrado", "nao encontrado", "n/a", "none", "null", "desconhecido"}
+
+# Blocos de código markdown que o modelo às vezes coloca em volta do JSON
+PADRAO_BLOCO_CODIGO = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+def extrair_json(texto):
+    """
+    Tenta ler o JSON contido na resposta de um modelo.
+
+    Aceita respostas com texto antes/depois ou dentro de blocos ```json```.
+
+    Args:
+        texto (str): Resposta do modelo
+
+    Returns:
+        dict ou list ou None: O JSON lido, ou None se não houver JSON válido
+    """
+    if not isinstance(texto, str):
+        return None
+
+    bloco = PADRAO_BLOCO_CODIGO.search(texto)
+    if bloco:
+        texto = bloco.group(1)
+
+    # Recortar do primeiro "{" ou "[" até o último "}" ou "]"
+    inicios = [posicao for posicao in (texto.find("{"), texto.find("[")) if posicao != -1]
+    fim = max(texto.rfind("}"), texto.rfind("]"))
+    if not inicios or fim == -1:
+        return None
+
+    try:
+        return json.loads(texto[min(inicios):fim + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def eh_vazio(valor):
+    """Indica se um valor não traz informação ("não encontrado", listas vazias, etc.)."""
+    if valor is None:
+        return True
+    if isinstance(valor, str):
+        return valor.strip().lower() in VALORES_VAZIOS
+    if isinstance(valor, (list, dict)):
+        return len(valor) == 0
+    return False
+
+
+def _chave(valor):
+    """Representação estável de um valor, usada para remover duplicatas."""
+    if isinstance(valor, str):
+        return valor.strip().lower()
+    return json.dumps(valor, sort_keys=True, ensure_ascii=False)
+
+
+def _unir_listas(a, b):
+    """Concatena duas listas sem repetir itens, preservando a ordem."""
+    resultado = []
+    vistos = set()
+    for item in list(a) + list(b):
+        if eh_vazio(item):
+            continue
+        chave = _chave(item)
+        if chave not in vistos:
+            vistos.add(chave)
+            resultado.append(item)
+    return resultado
+
+
+def mesclar_json(a, b):
+    """
+    Mescla dois valores JSON de forma determinística.
+
+    - Dicionários são mesclados chave a chave (recursivamente)
+    - Listas são unidas sem itens repetidos
+    - Valores vazios ("não encontrado", [], {}) dão lugar ao outro valor
+    - Valores diferentes para o mesmo campo viram uma lista com os dois
+
+    Args:
+        a: Primeiro valor
+        b: Segundo valor
+
+    Returns:
+        O valor mesclado
+    """
+    if eh_vazio(a):
+        return b
+    if eh_vazio(b):
+        return a
+
+    if isinstance(a, dict) and isinstance(b, dict):
+        resultado = dict(a)
+        for chave, valor in b.items():
+            resultado[chave] = mesclar_json(resultado[chave], valor) if chave in resultado else valor
+        return resultado
+
+    if isinstance(a, list) or isinstance(b, list):
+        lista_a = a if isinstance(a, list) else [a]
+        lista_b = b if isinstance(b, list) else [b]
+        return _unir_listas(lista_a, lista_b)
+
+    if _chave(a) == _chave(b):
+        return a
+
+    return [a, b]
+
+
+def mesclar_varios(valores):
+    """
+    Mescla uma lista de valores JSON na ordem em que aparecem.
+
+    Args:
+        valores (list): Valores a mesclar
+
+    Returns:
+        O valor mesclado (ou None se a lista estiver vazia)
+    """
+    return reduce(mesclar_json, valores, None)
@@ -0,0 +1,506 @@
+"""
+Medição do consumo de tokens (e do custo) das chamadas ao LLM, com orçamentos.
+Cada chamada registra os tokens de entrada e de saída no pedido em
+andamento, que diz de qual usuário e de qual agente ela é. O medidor soma
+o consumo por usuário, agente, pedido e modelo e mostra quem mais gasta.
+
+Um pedido pode ter um orçamento. Antes de cada chamada, o tamanho do
+prompt é estimado e, se a chamada não couber no que resta, o contexto é
+cortado, o modelo é trocado por um mais barato ou a chamada é recusada
+(OrcamentoExcedido), sem gastar nada.
+"""
+
+import contextvars
+import threading
+import uuid
+from collections import OrderedDict
+
+from componentes.tokens import contar_tokens
+
+# Preço em dólares por mil tokens (entrada, saída). Modelos fora da tabela
+# (ex.: modelos locais) não têm custo; os tokens continuam sendo contados.
+PRECOS_POR_MIL_TOKENS = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06)
+}
+
+# Dimensões em que o consumo é somado
+DIMENSOES = ("usuario", "agente", "pedido", "modelo")
+
+# Abaixo disso, cortar o contexto deixaria a chamada sem sentido: melhor recusar
+MINIMO_TOKENS_CONTEXTO = 50
+
+# Pedido em andamento no contexto atual (thread ou tarefa do asyncio)
+_pedido_atual = contextvars.ContextVar("pedido_consumo", default=None)
+
+
+class OrcamentoExcedido(Exception):
+    """A chamada ao LLM não cabe no orçamento do pedido e foi recusada antes de ser feita."""
+
+
+def preco_modelo(modelo):
+    """
+    Preço por mil tokens de um modelo (também para versões datadas, ex.: gpt-4o-2024-08-06).
+
+    Args:
+        modelo (str): Nome do modelo
+
+    Returns:
+        tuple: (preço da entrada, preço da saída) em dólares, ou (0, 0) se desconhecido
+    """
+    modelo = (modelo or "").lower()
+    for nome in sorted(PRECOS_POR_MIL_TOKENS, key=len, reverse=True):
+        if modelo.startswith(nome):
+            return PRECOS_POR_MIL_TOKENS[nome]
+    return (0.0, 0.0)
+
+
+def calcular_custo(modelo, tokens_entrada, tokens_saida):
+    """Custo em dólares de uma chamada."""
+    preco_entrada, preco_saida = preco_modelo(modelo)
+    return (tokens_entrada * preco_entrada + tokens_saida * preco_saida) / 1000
+
+
+def nome_do_modelo(llm):
+    """Nome do modelo de um cliente do LangChain (ex.: ChatOpenAI.model_name)."""
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+class Orcamento:
+    """Limites de um pedido e o que fazer quando uma chamada não cabe neles."""
+
+    def __init__(self, max_tokens=None, max_custo=None, max_tokens_entrada=None, reserva_saida=256,
+                 modelo_economico=None, fracao_rebaixar=0.8):
+        """
+        Args:
+            max_tokens (int, opcional): Tokens (entrada + saída) que o pedido pode gastar
+            max_custo (float, opcional): Dólares que o pedido pode gastar
+            max_tokens_entrada (int, opcional): Tamanho máximo do prompt de cada chamada
+            reserva_saida (int): Tokens de resposta previstos para cada chamada
+            modelo_economico (str, opcional): Nome do modelo mais barato (o cliente é
+                passado em invocar_com_orcamento)
+            fracao_rebaixar (float): Depois de gastar esta fração do orçamento, as
+                chamadas passam a usar o modelo econômico
+        """
+        self.max_tokens = max_tokens
+        self.max_custo = max_custo
+        self.max_tokens_entrada = max_tokens_entrada
+        self.reserva_saida = reserva_saida
+        self.modelo_economico = modelo_economico
+        self.fracao_rebaixar = fracao_rebaixar
+
+
+class Pedido:
+    """Consumo de um pedido: quem pediu, quanto já gastou e quanto ainda pode gastar."""
+
+    def __init__(self, usuario=None, agente=None, id_pedido=None, orcamento=None):
+        """
+        Args:
+            usuario (str, opcional): Quem fez o pedido
+            agente (str, opcional): Agente ou fluxo que atende o pedido
+            id_pedido (str, opcional): Identificador do pedido (padrão: gerado a partir do agente)
+            orcamento (Orcamento, opcional): Limites do pedido
+        """
+        self.usuario = usuario
+        self.agente = agente
+        self.id_pedido = id_pedido or f"{agente or 'pedido'}-{uuid.uuid4().hex[:8]}"
+        self.orcamento = orcamento
+        self.tokens_entrada = 0
+        self.tokens_saida = 0
+        self.custo = 0.0
+        self.chamadas = 0
+        self.rebaixadas = 0
+        self.cortadas = 0
+        self.recusadas = 0
+        # Chamadas em andamento: o que elas devem gastar já sai do orçamento,
+        # para chamadas em paralelo não passarem juntas do limite
+        self._tokens_reservados = 0
+        self._custo_reservado = 0.0
+        self._trava = threading.Lock()
+
+    @property
+    def tokens(self):
+        """Tokens gastos (entrada + saída)."""
+        return self.tokens_entrada + self.tokens_saida
+
+    def restante_tokens(self):
+        """Tokens que ainda podem ser gastos (None se não houver limite)."""
+        if self.orcamento is None or self.orcamento.max_tokens is None:
+            return None
+        return self.orcamento.max_tokens - self.tokens - self._tokens_reservados
+
+    def restante_custo(self):
+        """Dólares que ainda podem ser gastos (None se não houver limite)."""
+        if self.orcamento is None or self.orcamento.max_custo is None:
+            return None
+        return self.orcamento.max_custo - self.custo - self._custo_reservado
+
+    def fracao_gasta(self):
+        """Maior fração já gasta entre os limites de tokens e de custo (0 se não houver limites)."""
+        fracoes = [0.0]
+        if self.orcamento and self.orcamento.max_tokens:
+            fracoes.append(self.tokens / self.orcamento.max_tokens)
+        if self.orcamento and self.orcamento.max_custo:
+            fracoes.append(self.custo / self.orcamento.max_custo)
+        return max(fracoes)
+
+    def como_dict(self):
+        """
+        Consumo do pedido em formato serializável.
+
+        Returns:
+            dict: Identificação, tokens, custo e decisões do orçamento
+        """
+        return {
+            "usuario": self.usuario,
+            "agente": self.agente,
+            "pedido": self.id_pedido,
+            "chamadas": self.chamadas,
+            "tokens_entrada": self.tokens_entrada,
+            "tokens_saida": self.tokens_saida,
+            "custo": round(self.custo, 6),
+            "rebaixadas": self.rebaixadas,
+            "cortadas": self.cortadas,
+            "recusadas": self.recusadas
+        }
+
+
+class MedidorConsumo:
+    """Soma o consumo de tokens por usuário, agente, pedido e modelo."""
+
+    def __init__(self, max_pedidos=1000):
+        """
+        Args:
+            max_pedidos (int): Quantos pedidos recentes são guardados individualmente
+        """
+        self.max_pedidos = max_pedidos
+        self._totais = {dimensao: {} for dimensao in DIMENSOES}
+        self._totais["pedido"] = OrderedDict()
+        self._trava = threading.Lock()
+
+    def pedido(self, usuario=None, agente=None, id_pedido=None, orcamento=None):
+        """
+        Abre um pedido: as chamadas feitas dentro dele são atribuídas a ele.
+
+            with medidor.pedido(usuario="ana", agente="integrado", orcamento=Orcamento(max_tokens=4000)):
+                resposta = invocar_com_orcamento(llm, prompt, {"solicitacao": texto})
+
+        Campos não informados são herdados do pedido de fora (se houver).
+
+        Args:
+            usuario (str, opcional): Quem fez o pedido
+            agente (str, opcional): Agente que atende
+            id_pedido (str, opcional): Identificador do pedido
+            orcamento (Orcamento, opcional): Limites do pedido
+
+        Returns:
+            Gerenciador de contexto que entrega o Pedido
+        """
+        return _PedidoAberto(usuario, agente, id_pedido, orcamento)
+
+    def registrar(self, modelo, tokens_entrada, tokens_saida, pedido=None):
+        """
+        Registra o consumo de uma chamada ao LLM.
+
+        Args:
+            modelo (str): Modelo usado
+            tokens_entrada (int): Tokens do prompt
+            tokens_saida (int): Tokens da resposta
+            pedido (Pedido, opcional): Pedido da chamada (padrão: o pedido em andamento)
+
+        Returns:
+            float: Custo da chamada em dólares
+        """
+        pedido = pedido or _pedido_atual.get()
+        custo = calcular_custo(modelo, tokens_entrada, tokens_saida)
+        if pedido is not None:
+            with pedido._trava:
+                pedido.tokens_entrada += tokens_entrada
+                pedido.tokens_saida += tokens_saida
+                pedido.custo += custo
+                pedido.chamadas += 1
+
+        chaves = {
+            "usuario": pedido.usuario if pedido else None,
+            "agente": pedido.agente if pedido else None,
+            "pedido": pedido.id_pedido if pedido else None,
+            "modelo": modelo
+        }
+        with self._trava:
+            for dimensao, chave in chaves.items():
+                totais = self._totais[dimensao]
+                total = totais.get(chave or "(sem identificação)")
+                if total is None:
+                    total = totais[chave or "(sem identificação)"] = {"chamadas": 0, "tokens_entrada": 0,
+                                                                      "tokens_saida": 0, "custo": 0.0}
+                total["chamadas"] += 1
+                total["tokens_entrada"] += tokens_entrada
+                total["tokens_saida"] += tokens_saida
+                total["custo"] += custo
+            pedidos = self._totais["pedido"]
+            pedidos.move_to_end(chaves["pedido"] or "(sem identificação)")
+            while len(pedidos) > self.max_pedidos:
+                pedidos.popitem(last=False)
+        return custo
+
+    def maiores_consumidores(self, por="usuario", top=5):
+        """
+        Quem mais gastou tokens em uma dimensão.
+
+        Args:
+            por (str): "usuario", "agente", "pedido" ou "modelo"
+            top (int): Quantos consumidores mostrar
+
+        Returns:
+            list: Tuplas (nome, totais) da que mais gastou à que menos gastou
+        """
+        if por not in DIMENSOES:
+            raise ValueError(f"Dimensão desconhecida: {por} (use uma de {', '.join(DIMENSOES)})")
+        with self._trava:
+            itens = [(nome, dict(total)) for nome, total in self._totais[por].items()]
+        itens.sort(key=lambda item: item[1]["tokens_entrada"] + item[1]["tokens_saida"], reverse=True)
+        return itens[:top]
+
+    def relatorio(self, top=5):
+        """
+        Relatório dos maiores consumidores de tokens em cada dimensão.
+
+        Args:
+            top (int): Quantos consumidores mostrar por dimensão
+
+        Returns:
+            str: Relatório pronto para imprimir
+        """
+        linhas = []
+        for dimensao in DIMENSOES:
+            consumidores = self.maiores_consumidores(dimensao, top)
+            if not consumidores:
+                continue
+            linhas.append(f"Maiores consumidores por {dimensao}:")
+            for nome, total in consumidores:
+                linhas.append(f"  {str(nome)[:40]:<40} {total['chamadas']:>6} chamadas "
+                              f"{total['tokens_entrada']:>9} entrada {total['tokens_saida']:>8} saída "
+                              f"US$ {total['custo']:.4f}")
+        return "\n".join(linhas) or "Nenhuma chamada registrada"
+
+    def limpar(self):
+        """Zera os totais."""
+        with self._trava:
+            for totais in self._totais.values():
+                totais.clear()
+
+
+class _PedidoAberto:
+    """Gerenciador de contexto usado por MedidorConsumo.pedido."""
+
+    def __init__(self, usuario, agente, id_pedido, orcamento):
+        self.argumentos = (usuario, agente, id_pedido, orcamento)
+        self._token = None
+
+    def __enter__(self):
+        usuario, agente, id_pedido, orcamento = self.argumentos
+        externo = _pedido_atual.get()
+        if externo is not None:
+            usuario = usuario or externo.usuario
+            agente = agente or externo.agente
+        pedido = Pedido(usuario, agente, id_pedido, orcamento)
+        self._token = _pedido_atual.set(pedido)
+        return pedido
+
+    def __exit__(self, tipo, erro, traceback):
+        _pedido_atual.reset(self._token)
+        return False
+
+
+def pedido_atual():
+    """Pedido em andamento no contexto atual (ou None)."""
+    return _pedido_atual.get()
+
+
+# ----------------------------------------------------------------
+# Medidor do processo
+# ----------------------------------------------------------------
+
+medidor = MedidorConsumo()
+
+
+def pedido(usuario=None, agente=None, id_pedido=None, orcamento=None):
+    """Atalho para medidor.pedido no medidor do processo."""
+    return medidor.pedido(usuario, agente, id_pedido, orcamento)
+
+
+def _tokens_mensagens(mensagens, modelo):
+    """Tokens estimados de uma lista de mensagens do LangChain."""
+    return sum(contar_tokens(str(mensagem.content), modelo) for mensagem in mensagens)
+
+
+def _cortar_texto(texto, max_tokens, modelo, do_inicio=False):
+    """Corta o fim (ou, com do_inicio, o começo) do texto até caber em max_tokens."""
+    while texto and contar_tokens(texto, modelo) > max_tokens:
+        corte = int(len(texto) * 0.9)
+        texto = texto[len(texto) - corte:] if do_inicio else texto[:corte]
+    return texto
+
+
+def _tokens_da_resposta(resposta, entrada_estimada, modelo):
+    """Tokens informados pela API na resposta (ou estimados, se ela não informar)."""
+    uso = getattr(resposta, "usage_metadata", None) or {}
+    if uso.get("input_tokens"):
+        return uso["input_tokens"], uso.get("output_tokens", 0)
+    uso = (getattr(resposta, "response_metadata", None) or {}).get("token_usage") or {}
+    if uso.get("prompt_tokens"):
+        return uso["prompt_tokens"], uso.get("completion_tokens", 0)
+    return entrada_estimada, contar_tokens(str(getattr(resposta, "content", resposta)), modelo)
+
+
+def invocar_com_orcamento(llm, prompt, variaveis, campo_contexto=None, llm_economico=None, config=None,
+                          medidor_consumo=None, cortar_do_inicio=False):
+    """
+    Chama o LLM respeitando o orçamento do pedido em andamento e registra o consumo.
+
+    Antes da chamada, o prompt é medido. Se não couber no que resta do orçamento:
+    1. o campo de contexto (ex.: o texto do documento) é cortado até caber;
+    2. se o custo não couber, ou o pedido já tiver gasto boa parte do orçamento,
+       o modelo econômico é usado;
+    3. se nada disso resolver, OrcamentoExcedido é lançada, sem chamar o modelo.
+
+    Args:
+        llm: Modelo de chat do LangChain
+        prompt (ChatPromptTemplate): Template do prompt
+        variaveis (dict): Valores das variáveis do template
+        campo_contexto (str, opcional): Variável que pode ser cortada para caber no orçamento
+        llm_economico (opcional): Modelo mais barato para quando o orçamento estiver apertado
+        config (dict, opcional): Configuração repassada a llm.invoke (ex.: callbacks)
+        medidor_consumo (MedidorConsumo, opcional): Onde registrar (padrão: medidor do processo)
+        cortar_do_inicio (bool): Cortar o começo do campo de contexto, e não o fim (ex.: um
+            histórico de conversa, em que as mensagens mais recentes ficam no final)
+
+    Returns:
+        AIMessage: Resposta do modelo. Com orçamento, response_metadata["orcamento"] diz
+            qual modelo respondeu e se o contexto foi cortado
+
+    Raises:
+        OrcamentoExcedido: Se a chamada não couber no orçamento do pedido
+    """
+    destino = medidor_consumo or medidor
+    pedido_em_andamento = _pedido_atual.get()
+    orcamento = pedido_em_andamento.orcamento if pedido_em_andamento else None
+    modelo = nome_do_modelo(llm)
+    mensagens = prompt.format_messages(**variaveis)
+    entrada = _tokens_mensagens(mensagens, modelo)
+
+    if orcamento is None:
+        resposta = llm.invoke(mensagens, config=config)
+        destino.registrar(modelo, *_tokens_da_resposta(resposta, entrada, modelo))
+        return resposta
+
+    cortado = False
+    with pedido_em_andamento._trava:
+        # 1. Prompt maior que o permitido para uma chamada ou que o restante do pedido: cortar o contexto
+        limites = [orcamento.max_tokens_entrada]
+        restante = pedido_em_andamento.restante_tokens()
+        if restante is not None:
+            limites.append(restante - orcamento.reserva_saida)
+        limite_entrada = min([limite for limite in limites if limite is not None], default=None)
+        if limite_entrada is not None and entrada > limite_entrada:
+            contexto = str(variaveis.get(campo_contexto, "")) if campo_contexto else ""
+            fixo = entrada - contar_tokens(contexto, modelo)
+            if not contexto or limite_entrada - fixo < MINIMO_TOKENS_CONTEXTO:
+                pedido_em_andamento.recusadas += 1
+                raise OrcamentoExcedido(
+                    f"Prompt de {entrada} tokens não cabe no orçamento ({max(limite_entrada, 0)} tokens disponíveis)")
+            contexto = _cortar_texto(contexto, limite_entrada - fixo, modelo, do_inicio=cortar_do_inicio)
+            variaveis = {**variaveis, campo_contexto: contexto}
+            mensagens = prompt.format_messages(**variaveis)
+            entrada = _tokens_mensagens(mensagens, modelo)
+            pedido_em_andamento.cortadas += 1
+            cortado = True
+
+        # 2. Custo acima do restante, ou orçamento quase no fim: usar o modelo econômico
+        restante_custo = pedido_em_andamento.restante_custo()
+        custo_previsto = calcular_custo(modelo, entrada, orcamento.reserva_saida)
+        apertado = pedido_em_andamento.fracao_gasta() >= orcamento.fracao_rebaixar
+        if llm_economico is not None and (apertado or (restante_custo is not None and custo_previsto > restante_custo)):
+            llm, modelo = llm_economico, orcamento.modelo_economico or nome_do_modelo(llm_economico)
+            custo_previsto = calcular_custo(modelo, entrada, orcamento.reserva_saida)
+            pedido_em_andamento.rebaixadas += 1
+
+        # 3. Ainda não cabe: recusar antes de gastar
+        if restante_custo is not None and custo_previsto > restante_custo:
+            pedido_em_andamento.recusadas += 1
+            raise OrcamentoExcedido(
+                f"Chamada de US$ {custo_previsto:.4f} não cabe no orçamento (restam US$ {max(restante_custo, 0):.4f})")
+
+        pedido_em_andamento._tokens_reservados += entrada + orcamento.reserva_saida
+        pedido_em_andamento._custo_reservado += custo_previsto
+
+    try:
+        resposta = llm.invoke(mensagens, config=config)
+    finally:
+        with pedido_em_andamento._trava:
+            pedido_em_andamento._tokens_reservados -= entrada + orcamento.reserva_saida
+            pedido_em_andamento._custo_reservado -= custo_previsto
+    destino.registrar(modelo, *_tokens_da_resposta(resposta, entrada, modelo), pedido=pedido_em_andamento)
+    if isinstance(getattr(resposta, "response_metadata", None), dict):
+        resposta.response_metadata["orcamento"] = {"modelo": modelo, "contexto_cortado": cortado}
+    return resposta
+
+
+def criar_callback_consumo(medidor_consumo=None, modelo="gpt-3.5-turbo"):
+    """
+    Cria um callback do LangChain que registra o consumo de cada chamada ao LLM.
+
+    Para chains e agentes que chamam o modelo por conta própria (ex.: agentes
+    com ferramentas). Só registra: os orçamentos são aplicados por
+    invocar_com_orcamento, antes da chamada.
+
+    Args:
+        medidor_consumo (MedidorConsumo, opcional): Onde registrar (padrão: medidor do processo)
+        modelo (str): Modelo usado para contar os tokens quando a API não informa
+
+    Returns:
+        BaseCallbackHandler: Callback para passar em callbacks=[...]
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    destino = medidor_consumo or medidor
+
+    class CallbackConsumo(BaseCallbackHandler):
+        """Registra os tokens de entrada e saída de cada chamada ao LLM."""
+
+        def __init__(self):
+            self._abertas = {}  # run_id -> (modelo, tokens de entrada estimados, pedido)
+            self._trava = threading.Lock()
+
+        def _abrir(self, run_id, textos, kwargs):
+            parametros = kwargs.get("invocation_params") or {}
+            nome = parametros.get("model_name") or parametros.get("model") or modelo
+            with self._trava:
+                self._abertas[run_id] = (nome, sum(contar_tokens(texto, modelo) for texto in textos),
+                                         _pedido_atual.get())
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._abrir(run_id, prompts, kwargs)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._abrir(run_id, [str(mensagem.content) for conversa in messages for mensagem in conversa], kwargs)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            with self._trava:
+                aberta = self._abertas.pop(run_id, None)
+            if aberta is None:
+                return
+            nome, entrada, pedido_da_chamada = aberta
+            uso = (response.llm_output or {}).get("token_usage") or {}
+            saida = sum(contar_tokens(geracao.text, modelo) for geracoes in response.generations for geracao in geracoes)
+            destino.registrar(nome, uso.get("prompt_tokens") or entrada, uso.get("completion_tokens") or saida,
+                              pedido=pedido_da_chamada)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            with self._trava:
+                self._abertas.pop(run_id, None)
+
+    return CallbackConsumo()
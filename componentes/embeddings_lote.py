@@ -0,0 +1,174 @@
+"""
+Pipeline de embeddings em lotes.
+Agrupa os trechos em lotes limitados por número de tokens, envia vários lotes
+em paralelo (respeitando um limite de chamadas por minuto) e tenta novamente
+os lotes que falharem. Também inclui um gerador de embeddings falso, local e
+determinístico, para testes sem internet.
+"""
+
+import hashlib
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from componentes.texto import tokenizar
+from componentes.tokens import contar_tokens
+from integracao.utils import LimitadorTaxa, backoff_retry
+
+# O FAISS do LangChain exige objetos do tipo Embeddings
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    Embeddings = object
+
+MODELO_EMBEDDINGS = "text-embedding-ada-002"
+
+
+def empacotar_por_tokens(textos, max_tokens_lote=8000, max_itens_lote=256, modelo=MODELO_EMBEDDINGS):
+    """
+    Agrupa textos em lotes sem ultrapassar um número de tokens por lote.
+
+    Args:
+        textos (list): Textos a serem agrupados
+        max_tokens_lote (int): Soma máxima de tokens em um lote
+        max_itens_lote (int): Número máximo de textos em um lote
+        modelo (str): Modelo usado para contar os tokens
+
+    Returns:
+        list: Lista de lotes; cada lote é uma lista de tuplas (posição, texto, tokens)
+    """
+    lotes = []
+    lote_atual = []
+    tokens_lote = 0
+
+    for posicao, texto in enumerate(textos):
+        tokens = contar_tokens(texto, modelo)
+
+        # Fechar o lote atual se este texto não couber nele
+        if lote_atual and (tokens_lote + tokens > max_tokens_lote or len(lote_atual) >= max_itens_lote):
+            lotes.append(lote_atual)
+            lote_atual = []
+            tokens_lote = 0
+
+        # Um texto maior que o limite vai sozinho em seu próprio lote
+        lote_atual.append((posicao, texto, tokens))
+        tokens_lote += tokens
+
+    if lote_atual:
+        lotes.append(lote_atual)
+
+    return lotes
+
+
+class PipelineEmbeddings(Embeddings):
+    """
+    Envolve um gerador de embeddings (ex.: OpenAIEmbeddings) com envio em lotes paralelos.
+
+    Pode ser usado diretamente no lugar do gerador original, por exemplo em
+    FAISS.from_documents(textos, PipelineEmbeddings(OpenAIEmbeddings())).
+    """
+
+    def __init__(self, embeddings, max_tokens_lote=8000, max_itens_lote=256, concorrencia=4,
+                 chamadas_por_minuto=None, max_tentativas=3, modelo=MODELO_EMBEDDINGS):
+        """
+        Inicializa o pipeline.
+
+        Args:
+            embeddings (Embeddings): Gerador de embeddings original
+            max_tokens_lote (int): Soma máxima de tokens por requisição
+            max_itens_lote (int): Número máximo de textos por requisição
+            concorrencia (int): Quantos lotes são enviados ao mesmo tempo
+            chamadas_por_minuto (int, opcional): Limite de requisições por minuto
+            max_tentativas (int): Tentativas por lote antes de desistir
+            modelo (str): Modelo usado para contar os tokens
+        """
+        self.embeddings = embeddings
+        self.max_tokens_lote = max_tokens_lote
+        self.max_itens_lote = max_itens_lote
+        self.concorrencia = concorrencia
+        self.limitador = LimitadorTaxa(chamadas_por_minuto) if chamadas_por_minuto else None
+        self.max_tentativas = max_tentativas
+        self.modelo = modelo
+
+        # Estatísticas da última execução (trechos/s, tokens/s, etc.)
+        self.ultimas_estatisticas = {}
+
+    def _processar_lote(self, lote):
+        """Gera os embeddings de um lote, com novas tentativas em caso de falha."""
+        textos = [texto for _, texto, _ in lote]
+
+        def chamar():
+            if self.limitador:
+                self.limitador.aguardar()
+            return self.embeddings.embed_documents(textos)
+
+        return backoff_retry(chamar, max_retries=self.max_tentativas)
+
+    def embed_documents(self, texts):
+        """
+        Gera embeddings para uma lista de textos, mantendo a ordem original.
+
+        Args:
+            texts (list): Textos a serem convertidos
+
+        Returns:
+            list: Um vetor para cada texto
+        """
+        inicio = time.perf_counter()
+        lotes = empacotar_por_tokens(texts, self.max_tokens_lote, self.max_itens_lote, self.modelo)
+
+        vetores = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=max(1, self.concorrencia)) as executor:
+            for lote, resultado in zip(lotes, executor.map(self._processar_lote, lotes)):
+                for (posicao, _, _), vetor in zip(lote, resultado):
+                    vetores[posicao] = vetor
+
+        segundos = max(time.perf_counter() - inicio, 1e-9)
+        total_tokens = sum(tokens for lote in lotes for _, _, tokens in lote)
+        self.ultimas_estatisticas = {
+            "trechos": len(texts),
+            "tokens": total_tokens,
+            "lotes": len(lotes),
+            "segundos": segundos,
+            "trechos_por_segundo": len(texts) / segundos,
+            "tokens_por_segundo": total_tokens / segundos
+        }
+
+        return vetores
+
+    def embed_query(self, text):
+        """Gera o embedding de uma consulta (uma única chamada, sem lotes)."""
+        return self.embeddings.embed_query(text)
+
+
+class EmbeddingsFalsos(Embeddings):
+    """
+    Gerador de embeddings local e determinístico, para testes.
+
+    Cada palavra é mapeada para uma posição do vetor por hash, então textos com
+    palavras em comum ficam próximos - o suficiente para testar buscas e caches.
+    """
+
+    def __init__(self, dimensao=256):
+        """
+        Args:
+            dimensao (int): Tamanho dos vetores gerados
+        """
+        self.dimensao = dimensao
+
+    def _vetorizar(self, texto):
+        vetor = [0.0] * self.dimensao
+        for termo in tokenizar(texto) or ["<vazio>"]:
+            resumo = hashlib.md5(termo.encode("utf-8")).digest()
+            posicao = int.from_bytes(resumo[:4], "little") % self.dimensao
+            sinal = 1.0 if resumo[4] % 2 == 0 else -1.0
+            vetor[posicao] += sinal
+
+        norma = math.sqrt(sum(valor * valor for valor in vetor)) or 1.0
+        return [valor / norma for valor in vetor]
+
+    def embed_documents(self, texts):
+        return [self._vetorizar(texto) for texto in texts]
+
+    def embed_query(self, text):
+        return self._vetorizar(text)
@@ -0,0 +1,426 @@
+"""
+Estatísticas calculadas bloco a bloco.
+Permite resumir arquivos maiores que a memória: cada bloco de linhas atualiza
+contagem, média, variância, mínimo, máximo, um esboço de quantis e somas por
+categoria, e os estados de dois processamentos podem ser mesclados ou salvos
+em JSON.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Ordem das linhas do resumo (a mesma do DataFrame.describe do pandas)
+LINHAS_RESUMO = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+class EsbocoQuantis:
+    """
+    Esboço de quantis mesclável (inspirado no t-digest).
+
+    Os valores são agrupados em centróides (média e peso). Os centróides são
+    menores nas caudas, onde a precisão importa mais, e o número deles fica
+    limitado pela compressão, qualquer que seja a quantidade de valores.
+    Enquanto houver poucos valores, eles são guardados sem agrupamento e os
+    quantis são exatos.
+    """
+
+    def __init__(self, compressao=200):
+        """
+        Inicializa o esboço vazio.
+
+        Args:
+            compressao (int): Número aproximado de centróides mantidos
+        """
+        self.compressao = compressao
+        self.medias = np.empty(0)
+        self.pesos = np.empty(0)
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    @property
+    def total(self):
+        """Quantidade de valores já adicionados."""
+        return float(self.pesos.sum())
+
+    def adicionar(self, valores):
+        """
+        Adiciona valores ao esboço (valores ausentes são ignorados).
+
+        Args:
+            valores (array): Valores numéricos
+        """
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[~np.isnan(valores)]
+        if not valores.size:
+            return
+
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        self._juntar(valores, np.ones(valores.size))
+
+    def mesclar(self, outro):
+        """Incorpora os valores de outro esboço."""
+        if not outro.pesos.size:
+            return
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        self._juntar(outro.medias, outro.pesos)
+
+    def _juntar(self, medias, pesos):
+        """Junta novos centróides aos existentes e comprime se necessário."""
+        medias = np.concatenate([self.medias, medias])
+        pesos = np.concatenate([self.pesos, pesos])
+        ordem = np.argsort(medias, kind="stable")
+        medias, pesos = medias[ordem], pesos[ordem]
+
+        # Comprimir só quando acumular bem mais que o limite (evita comprimir a cada bloco)
+        if medias.size > 5 * self.compressao:
+            total = pesos.sum()
+            q = (np.cumsum(pesos) - pesos / 2) / total
+            # Escala do t-digest: faixas estreitas perto de 0 e 1, largas no meio
+            faixas = np.floor(self.compressao * (np.arcsin(2 * q - 1) / np.pi + 0.5))
+            inicios = np.flatnonzero(np.r_[True, faixas[1:] != faixas[:-1]])
+            novos_pesos = np.add.reduceat(pesos, inicios)
+            medias = np.add.reduceat(medias * pesos, inicios) / novos_pesos
+            pesos = novos_pesos
+
+        self.medias, self.pesos = medias, pesos
+
+    def quantil(self, q):
+        """
+        Estima um quantil.
+
+        Args:
+            q (float): Quantil desejado, entre 0 e 1
+
+        Returns:
+            float: Valor estimado (NaN se o esboço estiver vazio)
+        """
+        if not self.pesos.size:
+            return math.nan
+        if self.pesos.max() == 1:
+            return float(np.quantile(self.medias, q))
+
+        # Interpolar entre os centros dos centróides (e os extremos exatos)
+        total = self.pesos.sum()
+        centros = np.cumsum(self.pesos) - self.pesos / 2
+        return float(np.interp(q * total,
+                               np.r_[0.0, centros, total],
+                               np.r_[self.minimo, self.medias, self.maximo]))
+
+    def proporcao_abaixo(self, valor):
+        """
+        Estima a fração dos valores menores que um valor (o inverso de quantil).
+
+        Args:
+            valor (float): Valor de referência
+
+        Returns:
+            float: Fração entre 0 e 1 (0 se o esboço estiver vazio)
+        """
+        if not self.pesos.size:
+            return 0.0
+        if self.pesos.max() == 1:
+            return float(np.searchsorted(self.medias, valor) / self.medias.size)
+
+        total = self.pesos.sum()
+        centros = np.cumsum(self.pesos) - self.pesos / 2
+        return float(np.interp(valor,
+                               np.r_[self.minimo, self.medias, self.maximo],
+                               np.r_[0.0, centros, total]) / total)
+
+    def para_dict(self):
+        """Estado do esboço em formato serializável (JSON)."""
+        return {"compressao": self.compressao, "medias": self.medias.tolist(), "pesos": self.pesos.tolist(),
+                "minimo": self.minimo, "maximo": self.maximo}
+
+    @classmethod
+    def de_dict(cls, estado):
+        """Recria um esboço salvo com para_dict."""
+        esboco = cls(estado["compressao"])
+        esboco.medias = np.asarray(estado["medias"], dtype=float)
+        esboco.pesos = np.asarray(estado["pesos"], dtype=float)
+        esboco.minimo, esboco.maximo = estado["minimo"], estado["maximo"]
+        return esboco
+
+
+class EstatisticasColuna:
+    """Contagem, média, variância (Welford/Chan), extremos e quantis de uma coluna."""
+
+    def __init__(self, compressao=200):
+        self.contagem = 0
+        self.media = 0.0
+        self.m2 = 0.0  # Soma dos quadrados dos desvios em relação à média
+        self.nulos = 0
+        self.esboco = EsbocoQuantis(compressao)
+
+    def atualizar(self, valores):
+        """
+        Atualiza as estatísticas com um bloco de valores (de forma vetorizada).
+
+        Args:
+            valores (array): Valores numéricos do bloco (NaN conta como nulo)
+        """
+        valores = np.asarray(valores, dtype=float)
+        ausentes = np.isnan(valores)
+        self.nulos += int(ausentes.sum())
+        valores = valores[~ausentes]
+        if not valores.size:
+            return
+
+        media_bloco = float(valores.mean())
+        m2_bloco = float(((valores - media_bloco) ** 2).sum())
+        self._combinar(valores.size, media_bloco, m2_bloco)
+        self.esboco.adicionar(valores)
+
+    def _combinar(self, contagem, media, m2):
+        """Combina com as estatísticas de outro conjunto (fórmula de Chan)."""
+        total = self.contagem + contagem
+        delta = media - self.media
+        self.media += delta * contagem / total
+        self.m2 += m2 + delta ** 2 * self.contagem * contagem / total
+        self.contagem = total
+
+    def mesclar(self, outra):
+        """Incorpora as estatísticas de outra coluna (ex.: de outro arquivo ou processo)."""
+        self.nulos += outra.nulos
+        if outra.contagem:
+            self._combinar(outra.contagem, outra.media, outra.m2)
+            self.esboco.mesclar(outra.esboco)
+
+    @property
+    def desvio_padrao(self):
+        """Desvio padrão amostral (como no pandas)."""
+        return math.sqrt(self.m2 / (self.contagem - 1)) if self.contagem > 1 else math.nan
+
+    def resumo(self):
+        """
+        Resumo da coluna.
+
+        Returns:
+            dict: count, mean, std, min, 25%, 50%, 75% e max
+        """
+        vazio = self.contagem == 0
+        return {
+            "count": float(self.contagem),
+            "mean": math.nan if vazio else self.media,
+            "std": self.desvio_padrao,
+            "min": math.nan if vazio else self.esboco.minimo,
+            "25%": self.esboco.quantil(0.25),
+            "50%": self.esboco.quantil(0.5),
+            "75%": self.esboco.quantil(0.75),
+            "max": math.nan if vazio else self.esboco.maximo
+        }
+
+    def para_dict(self):
+        """Estado da coluna em formato serializável (JSON)."""
+        return {"contagem": self.contagem, "media": self.media, "m2": self.m2, "nulos": self.nulos,
+                "esboco": self.esboco.para_dict()}
+
+    @classmethod
+    def de_dict(cls, estado):
+        """Recria as estatísticas salvas com para_dict."""
+        coluna = cls()
+        coluna.contagem, coluna.media, coluna.m2 = estado["contagem"], estado["media"], estado["m2"]
+        coluna.nulos = estado["nulos"]
+        coluna.esboco = EsbocoQuantis.de_dict(estado["esboco"])
+        return coluna
+
+
+class EstatisticasIncrementais:
+    """Estatísticas de todas as colunas numéricas de uma tabela lida em blocos."""
+
+    def __init__(self, compressao=200):
+        """
+        Args:
+            compressao (int): Compressão dos esboços de quantis (mais = mais preciso)
+        """
+        self.compressao = compressao
+        self.colunas = {}
+        self.linhas = 0
+
+    def atualizar(self, bloco):
+        """
+        Atualiza as estatísticas com um bloco de linhas.
+
+        Args:
+            bloco (DataFrame): Bloco de linhas da tabela
+        """
+        self.linhas += len(bloco)
+        for coluna in bloco.select_dtypes(include="number").columns:
+            if coluna not in self.colunas:
+                self.colunas[coluna] = EstatisticasColuna(self.compressao)
+            self.colunas[coluna].atualizar(bloco[coluna].to_numpy(dtype=float, na_value=np.nan))
+
+    def mesclar(self, outras):
+        """Incorpora as estatísticas de outro processamento."""
+        self.linhas += outras.linhas
+        for coluna, estatisticas in outras.colunas.items():
+            if coluna not in self.colunas:
+                self.colunas[coluna] = EstatisticasColuna(self.compressao)
+            self.colunas[coluna].mesclar(estatisticas)
+
+    def resumo(self):
+        """
+        Resumo no mesmo formato do DataFrame.describe().
+
+        Returns:
+            DataFrame: Uma coluna por coluna numérica e as linhas count, mean, std, min, quartis e max
+        """
+        return pd.DataFrame({coluna: estatisticas.resumo() for coluna, estatisticas in self.colunas.items()},
+                            index=LINHAS_RESUMO)
+
+    def para_dict(self):
+        """Estado completo em formato serializável (JSON)."""
+        return {"compressao": self.compressao, "linhas": self.linhas,
+                "colunas": {coluna: estatisticas.para_dict() for coluna, estatisticas in self.colunas.items()}}
+
+    @classmethod
+    def de_dict(cls, estado):
+        """Recria as estatísticas salvas com para_dict."""
+        incrementais = cls(estado["compressao"])
+        incrementais.linhas = estado["linhas"]
+        incrementais.colunas = {coluna: EstatisticasColuna.de_dict(dados)
+                                for coluna, dados in estado["colunas"].items()}
+        return incrementais
+
+
+class AgregadosPorCategoria:
+    """
+    Soma e contagem de cada coluna numérica por valor de cada coluna categórica.
+
+    Todos os pares categoria x valor são agregados na mesma leitura de cada
+    bloco, e com eles é possível desenhar totais e médias por categoria sem
+    manter a tabela em memória. As categorias ficam na ordem em que apareceram.
+    """
+
+    def __init__(self, max_categorias=1000):
+        """
+        Args:
+            max_categorias (int): Colunas com mais valores distintos que isso deixam
+                de ser agregadas (ex.: identificadores), para limitar o estado
+        """
+        self.max_categorias = max_categorias
+        self.numericas = []
+        self.categorias = {}  # coluna categórica -> {valor: linha nas matrizes}
+        self._somas = {}  # coluna categórica -> matriz (valor x coluna numérica)
+        self._contagens = {}
+        self.descartadas = set()
+
+    @property
+    def colunas_categoricas(self):
+        """Colunas categóricas agregadas, na ordem da tabela."""
+        return list(self.categorias)
+
+    def atualizar(self, bloco):
+        """
+        Atualiza os agregados de todos os pares categoria x valor com um bloco de linhas.
+
+        Args:
+            bloco (DataFrame): Bloco de linhas da tabela
+        """
+        numericas = bloco.select_dtypes(include="number").columns
+        if not len(numericas):
+            return
+
+        # Os valores numéricos são convertidos uma única vez por bloco (ausentes somam 0 e não contam)
+        valores = bloco[numericas].to_numpy(dtype=float, na_value=np.nan)
+        validos = ~np.isnan(valores)
+        valores = np.where(validos, valores, 0.0)
+
+        for coluna in bloco.select_dtypes(include=["object", "category"]).columns:
+            if coluna in self.descartadas:
+                continue
+
+            # Código inteiro de cada linha (na ordem de aparição; -1 para ausentes)
+            codigos, categorias = pd.factorize(bloco[coluna], sort=False)
+            presentes = codigos >= 0
+            if not presentes.all():
+                codigos, valores_coluna, validos_coluna = codigos[presentes], valores[presentes], validos[presentes]
+            else:
+                valores_coluna, validos_coluna = valores, validos
+
+            total = len(categorias)
+            somas = np.column_stack([np.bincount(codigos, weights=valores_coluna[:, i], minlength=total)
+                                     for i in range(len(numericas))])
+            contagens = np.column_stack([np.bincount(codigos, weights=validos_coluna[:, i], minlength=total)
+                                         for i in range(len(numericas))])
+            self._juntar(coluna, list(categorias), list(numericas), somas, contagens)
+
+    def _juntar(self, coluna, categorias, numericas, somas, contagens):
+        """Soma os agregados de um bloco aos acumulados, mantendo a ordem das categorias."""
+        for numerica in numericas:
+            if numerica not in self.numericas:
+                self.numericas.append(numerica)
+
+        posicoes = self.categorias.setdefault(coluna, {})
+        linhas = np.array([posicoes.setdefault(valor, len(posicoes)) for valor in categorias], dtype=np.int64)
+        if len(posicoes) > self.max_categorias:
+            self.descartadas.add(coluna)
+            for atributo in (self.categorias, self._somas, self._contagens):
+                atributo.pop(coluna, None)
+            return
+
+        colunas = np.array([self.numericas.index(numerica) for numerica in numericas], dtype=np.int64)
+        formato = (len(posicoes), len(self.numericas))
+        for acumulados, novos in ((self._somas, somas), (self._contagens, contagens)):
+            matriz = acumulados.get(coluna)
+            if matriz is None or matriz.shape != formato:
+                # Novas categorias ou colunas: ampliar a matriz com zeros
+                ampliada = np.zeros(formato)
+                if matriz is not None:
+                    ampliada[:matriz.shape[0], :matriz.shape[1]] = matriz
+                matriz = acumulados[coluna] = ampliada
+            matriz[linhas[:, None], colunas] += novos
+
+    def mesclar(self, outros):
+        """Incorpora os agregados de outro processamento."""
+        for coluna in outros.descartadas:
+            self.descartadas.add(coluna)
+            for atributo in (self.categorias, self._somas, self._contagens):
+                atributo.pop(coluna, None)
+        for coluna in outros.colunas_categoricas:
+            if coluna not in self.descartadas:
+                self._juntar(coluna, list(outros.categorias[coluna]), outros.numericas,
+                             outros._somas[coluna], outros._contagens[coluna])
+
+    def _serie(self, matrizes, coluna_categoria, coluna_valor):
+        indice = pd.Index(list(self.categorias[coluna_categoria]), dtype=object)
+        return pd.Series(matrizes[coluna_categoria][:, self.numericas.index(coluna_valor)],
+                         index=indice, name=coluna_valor)
+
+    def total(self, coluna_categoria, coluna_valor):
+        """Soma da coluna numérica por categoria (Series)."""
+        return self._serie(self._somas, coluna_categoria, coluna_valor)
+
+    def media(self, coluna_categoria, coluna_valor):
+        """Média da coluna numérica por categoria (Series; NaN onde não há valores)."""
+        contagens = self._serie(self._contagens, coluna_categoria, coluna_valor)
+        return self.total(coluna_categoria, coluna_valor) / contagens.where(contagens > 0)
+
+    def para_dict(self):
+        """Estado dos agregados em formato serializável (JSON)."""
+        return {
+            "max_categorias": self.max_categorias,
+            "descartadas": sorted(self.descartadas),
+            "numericas": self.numericas,
+            "colunas": {coluna: {"categorias": list(self.categorias[coluna]),
+                                 "somas": self._somas[coluna].tolist(),
+                                 "contagens": self._contagens[coluna].tolist()}
+                        for coluna in self.categorias}
+        }
+
+    @classmethod
+    def de_dict(cls, estado):
+        """Recria os agregados salvos com para_dict."""
+        agregados = cls(estado["max_categorias"])
+        agregados.descartadas = set(estado["descartadas"])
+        agregados.numericas = list(estado["numericas"])
+        for coluna, dados in estado["colunas"].items():
+            agregados.categorias[coluna] = {valor: linha for linha, valor in enumerate(dados["categorias"])}
+            formato = (len(dados["categorias"]), len(agregados.numericas))
+            agregados._somas[coluna] = np.asarray(dados["somas"], dtype=float).reshape(formato)
+            agregados._contagens[coluna] = np.asarray(dados["contagens"], dtype=float).reshape(formato)
+        return agregados
@@ -0,0 +1,75 @@
+"""
+Extração local de campos estruturados com expressões regulares.
+E-mails, telefones, CNPJ/CPF, valores em reais e datas seguem formatos fixos,
+então podem ser encontrados em microssegundos, sem chamar o modelo de linguagem.
+"""
+
+import re
+
+from componentes.texto import STOPWORDS, normalizar
+
+# Expressões compiladas uma única vez (reutilizadas em todos os segmentos)
+PADROES = {
+    "emails": re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b"),
+    "telefones": re.compile(r"(?:\+55\s?)?(?:\(\d{2}\)\s?|\b\d{2}\s)9?\d{4}-?\d{4}\b"),
+    "cnpjs": re.compile(r"\b\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}\b"),
+    "cpfs": re.compile(r"\b\d{3}\.\d{3}\.\d{3}-\d{2}\b"),
+    # Com ou sem separador de milhar ("R$ 1.234,56" ou "R$ 1234,56"); nunca cortado no meio do número
+    "valores": re.compile(r"R\$\s?(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d{2})?(?![\d.,]*\d)"),
+    "datas": re.compile(r"\b\d{1,2}/\d{1,2}/\d{4}\b")
+}
+
+# Palavras que começam com maiúscula (possíveis nomes de pessoas ou empresas)
+PADRAO_NOME_PROPRIO = re.compile(r"\b[A-ZÁÉÍÓÚÂÊÔÃÕÇ][a-záéíóúâêôãõç]+")
+
+# Indícios de endereço físico
+PADRAO_ENDERECO = re.compile(r"\b(?:rua|r\.|av\.|avenida|alameda|travessa|rodovia|praca|cep)\b|\b\d{5}-\d{3}\b",
+                             re.IGNORECASE)
+
+
+def extrair_campos_locais(texto, campos=None):
+    """
+    Extrai campos de formato fixo de um texto.
+
+    Args:
+        texto (str): Texto a ser analisado
+        campos (list, opcional): Campos desejados (padrão: todos os de PADROES)
+
+    Returns:
+        dict: Campo -> lista de valores encontrados (sem repetição, na ordem do texto)
+    """
+    resultado = {}
+    for campo in campos or PADROES:
+        valores = []
+        for valor in PADROES[campo].findall(texto):
+            valor = valor.strip()
+            if valor not in valores:
+                valores.append(valor)
+        resultado[campo] = valores
+    return resultado
+
+
+def remover_campos_locais(texto, campos=None):
+    """Remove do texto os trechos já reconhecidos pelas expressões regulares."""
+    for campo in campos or PADROES:
+        texto = PADROES[campo].sub(" ", texto)
+    return texto
+
+
+def pode_ter_nomes_ou_enderecos(texto):
+    """
+    Indica se ainda pode haver nomes, empresas ou endereços no texto.
+
+    Se não houver nenhuma palavra com inicial maiúscula (fora as palavras comuns)
+    nem indício de endereço, não há o que pedir ao modelo.
+
+    Args:
+        texto (str): Texto (de preferência já sem os campos extraídos localmente)
+
+    Returns:
+        bool: True se o modelo ainda deve ser consultado
+    """
+    if PADRAO_ENDERECO.search(texto):
+        return True
+
+    return any(normalizar(palavra) not in STOPWORDS for palavra in PADRAO_NOME_PROPRIO.findall(texto))
@@ -0,0 +1,149 @@
+"""
+Fila de trabalho persistente em SQLite.
+Guarda o estado de cada item (pendente, em andamento, concluído ou com falha)
+em um arquivo, para que um processamento em lote interrompido possa ser
+retomado de onde parou, sem repetir o que já foi concluído.
+"""
+
+import sqlite3
+import threading
+import time
+
+PENDENTE = "pendente"
+EM_ANDAMENTO = "em_andamento"
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+
+
+class FilaTrabalho:
+    """Fila de itens (identificados por texto) com checkpoint em SQLite."""
+
+    def __init__(self, caminho_banco, max_tentativas=3):
+        """
+        Abre (ou cria) a fila.
+
+        Args:
+            caminho_banco (str): Arquivo SQLite da fila (":memory:" para uma fila temporária)
+            max_tentativas (int): Tentativas de cada item antes de marcá-lo como falho
+        """
+        self.caminho_banco = caminho_banco
+        self.max_tentativas = max_tentativas
+        self._trava = threading.Lock()
+
+        self._conexao = sqlite3.connect(caminho_banco, check_same_thread=False)
+        with self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS itens (
+                    item TEXT PRIMARY KEY,
+                    estado TEXT NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    erro TEXT,
+                    atualizado_em REAL NOT NULL
+                )
+            """)
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_estado ON itens (estado)")
+
+    def adicionar(self, itens):
+        """
+        Adiciona itens à fila (itens já existentes são ignorados).
+
+        Args:
+            itens (iterable): Identificadores dos itens (ex.: caminhos de arquivos)
+
+        Returns:
+            int: Quantidade de itens novos
+        """
+        agora = time.time()
+        with self._trava, self._conexao:
+            antes = self._conexao.total_changes
+            self._conexao.executemany(
+                "INSERT OR IGNORE INTO itens (item, estado, atualizado_em) VALUES (?, ?, ?)",
+                ((item, PENDENTE, agora) for item in itens)
+            )
+            return self._conexao.total_changes - antes
+
+    def retomar(self):
+        """
+        Devolve à fila os itens que estavam em andamento (ex.: após uma interrupção).
+
+        Returns:
+            int: Quantidade de itens devolvidos
+        """
+        with self._trava, self._conexao:
+            cursor = self._conexao.execute(
+                "UPDATE itens SET estado = ?, atualizado_em = ? WHERE estado = ?",
+                (PENDENTE, time.time(), EM_ANDAMENTO)
+            )
+            return cursor.rowcount
+
+    def reservar(self):
+        """
+        Reserva o próximo item pendente.
+
+        Returns:
+            str ou None: Item reservado, ou None se não houver pendentes
+        """
+        with self._trava, self._conexao:
+            linha = self._conexao.execute(
+                "SELECT item FROM itens WHERE estado = ? ORDER BY rowid LIMIT 1", (PENDENTE,)
+            ).fetchone()
+            if linha is None:
+                return None
+            self._conexao.execute(
+                "UPDATE itens SET estado = ?, tentativas = tentativas + 1, atualizado_em = ? WHERE item = ?",
+                (EM_ANDAMENTO, time.time(), linha[0])
+            )
+            return linha[0]
+
+    def concluir(self, item):
+        """Marca um item como concluído."""
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "UPDATE itens SET estado = ?, erro = NULL, atualizado_em = ? WHERE item = ?",
+                (CONCLUIDO, time.time(), item)
+            )
+
+    def falhar(self, item, erro):
+        """
+        Registra uma falha. O item volta para a fila até atingir max_tentativas.
+
+        Args:
+            item (str): Item que falhou
+            erro (str): Descrição do erro
+
+        Returns:
+            bool: True se o item ainda será tentado novamente
+        """
+        with self._trava, self._conexao:
+            tentativas = self._conexao.execute(
+                "SELECT tentativas FROM itens WHERE item = ?", (item,)
+            ).fetchone()[0]
+            novo_estado = PENDENTE if tentativas < self.max_tentativas else FALHOU
+            self._conexao.execute(
+                "UPDATE itens SET estado = ?, erro = ?, atualizado_em = ? WHERE item = ?",
+                (novo_estado, str(erro), time.time(), item)
+            )
+            return novo_estado == PENDENTE
+
+    def contagem(self):
+        """
+        Conta os itens em cada estado.
+
+        Returns:
+            dict: Estado -> quantidade (todos os estados aparecem, mesmo com zero)
+        """
+        with self._trava:
+            linhas = self._conexao.execute("SELECT estado, COUNT(*) FROM itens GROUP BY estado").fetchall()
+        contagem = {PENDENTE: 0, EM_ANDAMENTO: 0, CONCLUIDO: 0, FALHOU: 0}
+        contagem.update(dict(linhas))
+        return contagem
+
+    def falhas(self):
+        """Lista os itens que falharam definitivamente, com o último erro."""
+        with self._trava:
+            return self._conexao.execute("SELECT item, erro FROM itens WHERE estado = ?", (FALHOU,)).fetchall()
+
+    def fechar(self):
+        """Fecha a conexão com o banco."""
+        self._conexao.close()
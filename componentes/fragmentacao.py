@@ -0,0 +1,271 @@
+"""
+Divisão de textos em trechos medidos em tokens.
+Os trechos respeitam as seções do documento (títulos em maiúsculas ou de
+Markdown) e são cortados, nesta ordem de preferência, entre parágrafos,
+linhas, frases e palavras. A sobreposição entre trechos é adaptativa:
+nenhuma entre seções, pouca entre linhas e maior quando o corte cai no
+meio de um parágrafo.
+"""
+
+import bisect
+import re
+
+from componentes.tokens import CARACTERES_POR_TOKEN, obter_codificador
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    Document = None
+
+# Separadores em ordem de preferência: parágrafo, linha, frase, palavra
+SEPARADORES = [
+    re.compile(r"\n[ \t]*\n\s*"),
+    re.compile(r"\n"),
+    re.compile(r"(?<=[.!?;])\s+"),
+    re.compile(r"\s+")
+]
+
+# Níveis dos trechos (quanto maior, mais "no meio" do texto foi o corte)
+NIVEL_SECAO, NIVEL_PARAGRAFO, NIVEL_LINHA = 0, 1, 2
+
+PADRAO_LINHA = re.compile(r"[^\n]*\n?")
+PADRAO_TITULO_MARKDOWN = re.compile(r"#{1,6}\s+\S")
+
+
+def eh_titulo(linha):
+    """
+    Indica se uma linha é um título de seção.
+
+    São títulos as linhas de Markdown ("# Título") e as linhas curtas
+    escritas inteiramente em maiúsculas (ex.: "SUMÁRIO EXECUTIVO").
+
+    Args:
+        linha (str): Linha do texto
+
+    Returns:
+        bool: True se a linha for um título
+    """
+    linha = linha.strip()
+    if not linha or len(linha) > 100:
+        return False
+    if PADRAO_TITULO_MARKDOWN.match(linha):
+        return True
+
+    letras = [caractere for caractere in linha if caractere.isalpha()]
+    return len(letras) >= 4 and all(letra.isupper() for letra in letras)
+
+
+class _ContadorTokens:
+    """
+    Conta os tokens de qualquer trecho de um texto codificando o texto uma única vez.
+
+    Guarda a posição (em caracteres) de início de cada token: os tokens de um
+    trecho são os que começam dentro dele, encontrados por busca binária.
+    """
+
+    def __init__(self, texto, modelo):
+        self._inicios = None
+        codificador = obter_codificador(modelo)
+        if codificador is not None and texto:
+            tokens = codificador.encode_ordinary(texto)
+            _, self._inicios = codificador.decode_with_offsets(tokens)
+
+    def contar(self, inicio, fim):
+        if fim <= inicio:
+            return 0
+        if self._inicios is None:
+            # Arredondar para cima: a soma das partes nunca fica abaixo da estimativa do todo
+            return -(-(fim - inicio) // CARACTERES_POR_TOKEN)
+        return bisect.bisect_left(self._inicios, fim) - bisect.bisect_left(self._inicios, inicio)
+
+
+class FragmentadorTokens:
+    """Divide textos em trechos de até max_tokens tokens, respeitando as seções."""
+
+    def __init__(self, max_tokens=500, sobreposicao_max=None, repetir_titulo=True, modelo="gpt-3.5-turbo"):
+        """
+        Inicializa o fragmentador.
+
+        Args:
+            max_tokens (int): Tamanho máximo de cada trecho, em tokens
+            sobreposicao_max (int, opcional): Sobreposição máxima em tokens (padrão: 15% de max_tokens)
+            repetir_titulo (bool): Repetir o título da seção nos trechos seguintes da mesma seção
+            modelo (str): Modelo usado para contar os tokens
+        """
+        self.max_tokens = max_tokens
+        self.sobreposicao_max = int(0.15 * max_tokens) if sobreposicao_max is None else sobreposicao_max
+        self.repetir_titulo = repetir_titulo
+        self.modelo = modelo
+
+    def _secoes(self, texto):
+        """Lista as seções do texto como (início, fim, fim da linha de título ou None)."""
+        secoes = []
+        inicio, fim_titulo = 0, None
+
+        for linha in PADRAO_LINHA.finditer(texto):
+            if linha.start() == linha.end():
+                break
+            if eh_titulo(linha.group()):
+                if texto[inicio:linha.start()].strip():
+                    secoes.append((inicio, linha.start(), fim_titulo))
+                inicio, fim_titulo = linha.start(), linha.end()
+
+        if texto[inicio:].strip():
+            secoes.append((inicio, len(texto), fim_titulo))
+        return secoes
+
+    def _atomos(self, texto, inicio, fim, nivel, contador, saida):
+        """Quebra um trecho nos maiores pedaços (átomos) que cabem em max_tokens."""
+        tokens = contador.contar(inicio, fim)
+        if tokens <= self.max_tokens:
+            saida.append((inicio, fim, tokens, nivel))
+            return
+
+        if nivel == len(SEPARADORES):
+            # Nem uma palavra coube (ex.: uma sequência enorme sem espaços): cortar por caracteres
+            passo = max(1, (fim - inicio) * self.max_tokens // tokens)
+            for posicao in range(inicio, fim, passo):
+                final = min(posicao + passo, fim)
+                saida.append((posicao, final, contador.contar(posicao, final), nivel + 1))
+            return
+
+        posicao = inicio
+        for separador in SEPARADORES[nivel].finditer(texto, inicio, fim):
+            if separador.end() > posicao and separador.end() < fim:
+                self._atomos(texto, posicao, separador.end(), nivel + 1, contador, saida)
+                posicao = separador.end()
+        self._atomos(texto, posicao, fim, nivel + 1, contador, saida)
+
+    def _orcamento_sobreposicao(self, nivel):
+        """Sobreposição permitida conforme onde o corte caiu."""
+        if nivel <= NIVEL_PARAGRAFO:
+            return 0
+        if nivel == NIVEL_LINHA:
+            return self.sobreposicao_max // 2
+        return self.sobreposicao_max
+
+    def _trechos(self, texto):
+        """Lista os trechos como (título repetido, início, fim), com as posições no texto original."""
+        contador = _ContadorTokens(texto, self.modelo)
+
+        # Caminho rápido: o texto inteiro cabe em um trecho
+        if contador.contar(0, len(texto)) <= self.max_tokens:
+            return [("", 0, len(texto))] if texto.strip() else []
+
+        trechos = []
+        atual, tokens_atual, titulo_atual = [], 0, ""
+
+        def fechar():
+            if atual and texto[atual[0][0]:atual[-1][1]].strip():
+                trechos.append((titulo_atual, atual[0][0], atual[-1][1]))
+
+        for inicio, fim, fim_titulo in self._secoes(texto):
+            atomos = []
+            self._atomos(texto, inicio, fim, NIVEL_SECAO, contador, atomos)
+            tokens_secao = sum(atomo[2] for atomo in atomos)
+
+            # Seções pequenas podem ficar juntas no mesmo trecho
+            if atual and tokens_atual + tokens_secao <= self.max_tokens:
+                atual.extend(atomos)
+                tokens_atual += tokens_secao
+                continue
+
+            # Uma seção nova nunca começa no meio de um trecho (e não tem sobreposição)
+            fechar()
+            atual, tokens_atual, titulo_atual = [], 0, ""
+
+            titulo = texto[inicio:fim_titulo].strip() + "\n" if fim_titulo and self.repetir_titulo else ""
+            tokens_titulo = contador.contar(inicio, fim_titulo) if titulo else 0
+
+            for atomo in atomos:
+                if atual and tokens_atual + atomo[2] > self.max_tokens:
+                    fechar()
+
+                    # Repetir o título e o final do trecho anterior, quando couberem
+                    titulo_atual = titulo if tokens_titulo + atomo[2] <= self.max_tokens else ""
+                    tokens_atual = tokens_titulo if titulo_atual else 0
+                    orcamento = min(self._orcamento_sobreposicao(atual[-1][3]),
+                                    self.max_tokens - atomo[2] - tokens_atual)
+                    sobreposicao, tokens_sobreposicao = [], 0
+                    for anterior in reversed(atual):
+                        if tokens_sobreposicao + anterior[2] > orcamento:
+                            break
+                        sobreposicao.insert(0, anterior)
+                        tokens_sobreposicao += anterior[2]
+
+                    # O começo da seção já traz o título
+                    if sobreposicao and sobreposicao[0][0] == inicio:
+                        titulo_atual, tokens_atual = "", 0
+                    atual = sobreposicao
+                    tokens_atual += tokens_sobreposicao
+
+                atual.append(atomo)
+                tokens_atual += atomo[2]
+
+        fechar()
+        return trechos
+
+    def split_text(self, texto):
+        """
+        Divide um texto em trechos.
+
+        Args:
+            texto (str): Texto a ser dividido
+
+        Returns:
+            list: Trechos de texto, na ordem do documento
+        """
+        return [titulo + texto[inicio:fim].strip() for titulo, inicio, fim in self._trechos(texto)]
+
+    def dividir_em_fluxo(self, partes, caracteres_minimos=None):
+        """
+        Divide um texto que chega em partes (páginas ou blocos), à medida que é lido.
+
+        As partes são acumuladas e divididas sempre que passam de alguns trechos.
+        Todos os trechos são entregues, menos o último, que pode continuar na
+        próxima parte: dele fica guardado o texto original, com os separadores
+        do final (quebra de página, espaço), e não o trecho já aparado, para
+        que o fim de uma parte não grude no começo da seguinte.
+
+        Args:
+            partes (iterable): Partes do texto, em ordem
+            caracteres_minimos (int, opcional): Texto acumulado antes de dividir
+                (padrão: o suficiente para 4 trechos)
+
+        Yields:
+            str: Trechos de texto, na ordem do documento
+        """
+        if caracteres_minimos is None:
+            caracteres_minimos = 4 * self.max_tokens * CARACTERES_POR_TOKEN
+
+        acumulado = ""
+        for parte in partes:
+            acumulado += parte
+            if len(acumulado) < caracteres_minimos:
+                continue
+
+            trechos = self._trechos(acumulado)
+            for titulo, inicio, fim in trechos[:-1]:
+                yield titulo + acumulado[inicio:fim].strip()
+            if trechos:
+                titulo, inicio, _ = trechos[-1]
+                acumulado = titulo + acumulado[inicio:]
+            else:
+                acumulado = ""
+
+        # Dividir o que sobrou no final do texto
+        yield from self.split_text(acumulado)
+
+    def split_documents(self, documentos):
+        """
+        Divide documentos do LangChain, mantendo os metadados de cada um.
+
+        Args:
+            documentos (list): Lista de Document
+
+        Returns:
+            list: Lista de Document, um por trecho
+        """
+        return [Document(page_content=trecho, metadata=dict(documento.metadata))
+                for documento in documentos
+                for trecho in self.split_text(documento.page_content)]
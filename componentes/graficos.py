@@ -0,0 +1,132 @@
+"""
+Desenho de gráficos sem interface gráfica, em paralelo e com cache.
+Cada gráfico é descrito por uma especificação (tipo, rótulos, valores já
+agregados e título) e desenhado com a API orientada a objetos do matplotlib
+(Figure + backend Agg), que não depende do estado global do pyplot e pode
+rodar em vários processos ao mesmo tempo. Gráficos cuja especificação não
+mudou são lidos do cache em vez de redesenhados.
+"""
+
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from componentes.rastreamento import rastrear, span
+from componentes.texto import hash_conteudo
+
+# Mudar este número invalida o cache quando o visual dos gráficos mudar
+VERSAO_GRAFICOS = 1
+
+# Abaixo disso, abrir processos custa mais do que desenhar no processo atual
+MINIMO_PARA_PARALELIZAR = 3
+
+sns.set_theme(style="whitegrid")
+
+
+def desenhar_grafico(especificacao):
+    """
+    Desenha um gráfico e retorna a imagem PNG.
+
+    Args:
+        especificacao (dict): Chaves 'tipo' ('tendencia', 'barras' ou 'pizza'),
+            'x', 'y', 'titulo', 'categorias' e 'valores'
+
+    Returns:
+        bytes: Imagem PNG
+    """
+    figura = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figura)
+    eixo = figura.subplots()
+    tipo = especificacao["tipo"]
+    categorias, valores = especificacao["categorias"], especificacao["valores"]
+
+    if tipo == "tendencia":
+        sns.lineplot(x=categorias, y=valores, marker='o', linewidth=2, sort=False, ax=eixo)
+    elif tipo == "barras":
+        sns.barplot(x=categorias, y=valores, ax=eixo)
+    elif tipo == "pizza":
+        eixo.pie(valores, labels=categorias, autopct='%1.1f%%', startangle=90)
+        eixo.axis('equal')  # Para garantir que o gráfico seja circular
+    else:
+        raise ValueError(f"Tipo de gráfico desconhecido: {tipo}")
+
+    eixo.set_title(especificacao["titulo"], fontsize=16)
+    if tipo != "pizza":
+        eixo.set_xlabel(especificacao["x"], fontsize=12)
+        eixo.set_ylabel(especificacao["y"], fontsize=12)
+    figura.tight_layout()
+
+    saida = io.BytesIO()
+    figura.savefig(saida, format="png")
+    return saida.getvalue()
+
+
+def chave_grafico(especificacao):
+    """Chave de cache: hash dos dados desenhados e da especificação (exceto o nome do arquivo)."""
+    conteudo = {chave: valor for chave, valor in especificacao.items() if chave != "nome_arquivo"}
+    return hash_conteudo("grafico", VERSAO_GRAFICOS, json.dumps(conteudo, sort_keys=True, default=str))
+
+
+class RenderizadorGraficos:
+    """Desenha vários gráficos em paralelo, reaproveitando os que estão no cache."""
+
+    def __init__(self, cache=None, max_workers=None):
+        """
+        Args:
+            cache (CacheDisco, opcional): Cache das imagens já desenhadas
+            max_workers (int, opcional): Processos para desenhar (padrão: número de CPUs)
+        """
+        self.cache = cache
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @rastrear("graficos.renderizar", etapa="grafico")
+    def renderizar(self, especificacoes, diretorio="."):
+        """
+        Desenha os gráficos e salva cada um em seu arquivo.
+
+        Args:
+            especificacoes (list): Especificações com a chave extra 'nome_arquivo'
+            diretorio (str): Pasta onde as imagens são salvas
+
+        Returns:
+            list: Tuplas (caminho do arquivo, veio_do_cache), na ordem das especificações
+        """
+        imagens, pendentes = {}, []
+        for posicao, especificacao in enumerate(especificacoes):
+            imagem = self.cache.obter_bytes(chave_grafico(especificacao)) if self.cache else None
+            if imagem is None:
+                pendentes.append(posicao)
+            else:
+                imagens[posicao] = imagem
+
+        para_desenhar = [especificacoes[posicao] for posicao in pendentes]
+        with span("graficos.desenhar", "grafico", graficos=len(para_desenhar),
+                  do_cache=len(especificacoes) - len(para_desenhar)):
+            if len(para_desenhar) < MINIMO_PARA_PARALELIZAR or self.max_workers == 1:
+                novas = [desenhar_grafico(especificacao) for especificacao in para_desenhar]
+            else:
+                # "spawn" cria processos limpos, sem herdar threads do processo atual
+                contexto = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(para_desenhar)),
+                                         mp_context=contexto) as processos:
+                    novas = list(processos.map(desenhar_grafico, para_desenhar))
+
+        for posicao, imagem in zip(pendentes, novas):
+            imagens[posicao] = imagem
+            if self.cache:
+                self.cache.guardar_bytes(chave_grafico(especificacoes[posicao]), imagem)
+
+        desenhados = set(pendentes)
+        resultados = []
+        for posicao, especificacao in enumerate(especificacoes):
+            caminho = os.path.join(diretorio, especificacao["nome_arquivo"])
+            with open(caminho, "wb") as f:
+                f.write(imagens[posicao])
+            resultados.append((caminho, posicao not in desenhados))
+        return resultados
@@ -0,0 +1,299 @@
+"""
+Memória de conversa com orçamento de tokens.
+As mensagens mais recentes são mantidas na íntegra; quando passam do
+orçamento, as mais antigas saem do histórico e são incorporadas, em segundo
+plano, a um resumo acumulado. Assim o prompt não cresce com o tamanho da
+conversa. GerenciadorSessoes guarda uma memória por usuário e descarta as
+sessões inativas ou usadas há mais tempo.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from componentes.consumo_tokens import invocar_com_orcamento, pedido
+from componentes.tokens import contar_tokens
+
+logger = logging.getLogger(__name__)
+
+# Resumos são chamadas curtas ao LLM: poucas threads atendem todas as sessões
+_executor_resumos = ThreadPoolExecutor(max_workers=2, thread_name_prefix="resumo-conversa")
+
+# Papéis no formato aceito pelos prompts do LangChain (tuplas (papel, texto))
+NOMES_PAPEIS = {"human": "Usuário", "ai": "Assistente"}
+
+# Como o resumo aparece no prompt (conta dentro do orçamento do resumo)
+PREFIXO_RESUMO = "Resumo da conversa até aqui: "
+
+TEMPLATE_RESUMO = """Atualize o resumo de uma conversa entre um usuário e um assistente.
+Mantenha nomes, datas, decisões e pedidos em aberto; descarte cumprimentos e repetições.
+Use no máximo {max_palavras} palavras.
+
+Resumo atual:
+{resumo}
+
+Novas mensagens:
+{mensagens}
+
+Resumo atualizado:"""
+
+
+def criar_resumidor(llm, max_tokens_resumo=250):
+    """
+    Cria a função que incorpora mensagens antigas ao resumo usando um LLM.
+
+    O consumo de cada resumo é registrado em um pedido próprio, do agente
+    "resumo_conversa" e do usuário da solicitação que o disparou. O resumo roda
+    em segundo plano, depois da solicitação, e não conta no orçamento dela.
+
+    Args:
+        llm: Modelo de chat do LangChain (ex.: ChatOpenAI)
+        max_tokens_resumo (int): Tamanho desejado do resumo, em tokens
+
+    Returns:
+        callable: Função resumir(resumo, mensagens) -> novo resumo
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+
+    prompt = ChatPromptTemplate.from_template(TEMPLATE_RESUMO)
+
+    def resumir(resumo, mensagens):
+        variaveis = {
+            "max_palavras": max(20, int(max_tokens_resumo * 0.7)),
+            "resumo": resumo or "(vazio)",
+            "mensagens": formatar_mensagens(mensagens)
+        }
+        with pedido(agente="resumo_conversa"):
+            resposta = invocar_com_orcamento(llm, prompt, variaveis, campo_contexto="mensagens")
+        return resposta.content.strip()
+    return resumir
+
+
+def formatar_mensagens(mensagens):
+    """Converte tuplas (papel, texto) em linhas "Usuário: ..." / "Assistente: ..."."""
+    return "\n".join(f"{NOMES_PAPEIS.get(papel, papel)}: {texto}" for papel, texto in mensagens)
+
+
+class MemoriaConversa:
+    """Histórico de uma conversa com tamanho máximo em tokens e resumo das mensagens antigas."""
+
+    def __init__(self, max_tokens=1200, max_tokens_resumo=None, resumir=None, modelo="gpt-3.5-turbo",
+                 executor=None):
+        """
+        Args:
+            max_tokens (int): Orçamento total da memória no prompt (resumo + mensagens recentes)
+            max_tokens_resumo (int, opcional): Parte do orçamento reservada ao resumo (padrão: 1/4)
+            resumir (callable, opcional): resumir(resumo, mensagens) -> novo resumo (ver criar_resumidor).
+                Sem ela, as mensagens que saem do orçamento são descartadas
+            modelo (str): Modelo usado na contagem de tokens
+            executor (Executor, opcional): Onde os resumos são gerados (padrão: threads compartilhadas)
+        """
+        self.max_tokens = max_tokens
+        self.max_tokens_resumo = max_tokens // 4 if max_tokens_resumo is None else max_tokens_resumo
+        self.resumir = resumir
+        self.modelo = modelo
+        self.executor = executor or _executor_resumos
+
+        self.resumo = ""
+        self._recentes = deque()  # (papel, texto, tokens)
+        self._tokens_recentes = 0
+        self._pendentes = []  # Mensagens que saíram do orçamento e ainda não entraram no resumo
+        self._tarefa = None
+        self._trava = threading.Lock()
+        self.mensagens_resumidas = 0
+
+    def __len__(self):
+        return len(self._recentes)
+
+    def adicionar(self, papel, texto):
+        """
+        Acrescenta uma mensagem ao histórico.
+
+        Args:
+            papel (str): "human" (usuário) ou "ai" (assistente)
+            texto (str): Conteúdo da mensagem
+        """
+        # Medido já formatado, como a mensagem entra no prompt
+        tokens = contar_tokens(formatar_mensagens([(papel, texto)]), self.modelo)
+        with self._trava:
+            self._recentes.append((papel, texto, tokens))
+            self._tokens_recentes += tokens
+            self._compactar()
+
+    def adicionar_turno(self, pergunta, resposta):
+        """Acrescenta uma pergunta do usuário e a resposta do assistente."""
+        self.adicionar("human", pergunta)
+        self.adicionar("ai", resposta)
+
+    def _compactar(self):
+        """Tira as mensagens antigas do orçamento e agenda o resumo (chamado com a trava)."""
+        limite = self.max_tokens - self.max_tokens_resumo
+        # A última mensagem sempre fica, mesmo que sozinha passe do limite
+        while self._tokens_recentes > limite and len(self._recentes) > 1:
+            papel, texto, tokens = self._recentes.popleft()
+            self._tokens_recentes -= tokens
+            self._pendentes.append((papel, texto))
+
+        if not self._pendentes:
+            return
+        if self.resumir is None:
+            self._pendentes.clear()
+        elif self._tarefa is None:
+            # Com o contexto de quem adicionou a mensagem (ex.: o pedido do usuário)
+            self._tarefa = self.executor.submit(contextvars.copy_context().run, self._resumir_pendentes)
+
+    def _resumir_pendentes(self):
+        """Incorpora as mensagens pendentes ao resumo, em lotes, até não sobrar nenhuma."""
+        while True:
+            with self._trava:
+                if not self._pendentes:
+                    self._tarefa = None
+                    return
+                lote, self._pendentes = self._pendentes, []
+                resumo = self.resumo
+
+            try:
+                novo_resumo = self._limitar(self.resumir(resumo, lote))
+            except Exception as e:
+                # Sem resumo novo, as mensagens do lote se perdem, mas a conversa continua
+                logger.warning(f"Falha ao resumir a conversa: {str(e)}")
+                novo_resumo = resumo
+
+            with self._trava:
+                self.resumo = novo_resumo
+                self.mensagens_resumidas += len(lote)
+
+    def _limitar(self, resumo):
+        """Corta o fim do resumo que passar da sua parte do orçamento."""
+        resumo = resumo.strip()
+        while resumo and contar_tokens(PREFIXO_RESUMO + resumo, self.modelo) > self.max_tokens_resumo:
+            resumo = resumo[:int(len(resumo) * 0.9)].rsplit(" ", 1)[0]
+        return resumo
+
+    def aguardar(self, timeout=None):
+        """
+        Espera o resumo em andamento terminar.
+
+        Args:
+            timeout (float, opcional): Tempo máximo de espera, em segundos
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._trava:
+                tarefa = self._tarefa
+            if tarefa is None:
+                return
+            tarefa.result(None if limite is None else max(0, limite - time.monotonic()))
+
+    def mensagens(self):
+        """
+        Histórico para o prompt: o resumo (se houver) e as mensagens recentes.
+
+        Mensagens que acabaram de sair do orçamento só voltam ao prompt quando
+        o resumo que as incorpora termina.
+
+        Returns:
+            list: Tuplas (papel, texto), aceitas por ChatPromptTemplate e MessagesPlaceholder
+        """
+        with self._trava:
+            mensagens = [(papel, texto) for papel, texto, _ in self._recentes]
+            resumo = self.resumo
+        if resumo:
+            mensagens.insert(0, ("system", PREFIXO_RESUMO + resumo))
+        return mensagens
+
+    def texto(self):
+        """
+        Histórico como texto, para prompts de um único campo.
+
+        Returns:
+            str: Resumo e mensagens recentes, uma por linha ("" se a conversa estiver vazia)
+        """
+        with self._trava:
+            mensagens = [(papel, texto) for papel, texto, _ in self._recentes]
+            resumo = self.resumo
+        linhas = [PREFIXO_RESUMO + resumo] if resumo else []
+        if mensagens:
+            linhas.append(formatar_mensagens(mensagens))
+        return "\n".join(linhas)
+
+    def tokens(self):
+        """Tokens que a memória ocupa no prompt agora (resumo + mensagens recentes)."""
+        with self._trava:
+            return self._tokens_recentes + (contar_tokens(PREFIXO_RESUMO + self.resumo, self.modelo) if self.resumo else 0)
+
+    def limpar(self):
+        """Apaga o histórico e o resumo."""
+        with self._trava:
+            self._recentes.clear()
+            self._tokens_recentes = 0
+            self._pendentes.clear()
+            self.resumo = ""
+
+
+class GerenciadorSessoes:
+    """Uma memória de conversa por usuário, com limite de sessões e expiração por inatividade."""
+
+    def __init__(self, criar_memoria=MemoriaConversa, max_sessoes=1000, ttl_segundos=3600):
+        """
+        Args:
+            criar_memoria (callable): Cria a memória de uma sessão nova
+            max_sessoes (int): Número máximo de sessões (as usadas há mais tempo saem primeiro)
+            ttl_segundos (float): Sessões sem uso por mais tempo que isso são descartadas
+        """
+        self.criar_memoria = criar_memoria
+        self.max_sessoes = max_sessoes
+        self.ttl_segundos = ttl_segundos
+
+        # id da sessão -> (memória, último uso), em ordem de uso (LRU)
+        self._sessoes = OrderedDict()
+        self._trava = threading.Lock()
+        self.descartadas = 0
+
+    def __len__(self):
+        return len(self._sessoes)
+
+    def __contains__(self, id_sessao):
+        return id_sessao in self._sessoes
+
+    def obter(self, id_sessao):
+        """
+        Retorna a memória da sessão, criando uma nova se não existir (ou tiver expirado).
+
+        Args:
+            id_sessao (str): Identificador da sessão (ex.: o usuário)
+
+        Returns:
+            MemoriaConversa: Memória da sessão
+        """
+        agora = time.monotonic()
+        with self._trava:
+            self._remover_expiradas(agora)
+            if id_sessao in self._sessoes:
+                memoria, _ = self._sessoes.pop(id_sessao)
+            else:
+                memoria = self.criar_memoria()
+            self._sessoes[id_sessao] = (memoria, agora)
+
+            while len(self._sessoes) > self.max_sessoes:
+                self._sessoes.popitem(last=False)
+                self.descartadas += 1
+            return memoria
+
+    def _remover_expiradas(self, agora):
+        """Remove as sessões inativas há mais de ttl_segundos (chamado com a trava)."""
+        # Em ordem de uso: basta olhar o início até achar uma sessão ainda válida
+        while self._sessoes:
+            id_sessao, (_, ultimo_uso) = next(iter(self._sessoes.items()))
+            if agora - ultimo_uso <= self.ttl_segundos:
+                break
+            del self._sessoes[id_sessao]
+            self.descartadas += 1
+
+    def encerrar(self, id_sessao):
+        """Descarta a sessão (ex.: quando o usuário sai)."""
+        with self._trava:
+            self._sessoes.pop(id_sessao, None)
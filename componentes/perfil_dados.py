@@ -0,0 +1,422 @@
+"""
+Perfil compacto de uma tabela de dados.
+Resume uma tabela de qualquer tamanho em um texto de tamanho limitado:
+estatísticas por coluna, categorias mais frequentes, tendências, valores
+atípicos e uma amostra estratificada de linhas. O perfil é calculado bloco a
+bloco, com operações vetorizadas do NumPy/pandas, e o estado guardado também
+tem tamanho limitado (inclusive nas colunas categóricas com muitos valores).
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from componentes.estatisticas_incrementais import EstatisticasIncrementais
+
+# Hashes guardados por coluna para estimar os valores distintos (erro típico de 1/sqrt(256) ≈ 6%)
+HASHES_DISTINTOS = 256
+
+
+def _formatar_numero(valor):
+    """Número curto para o prompt (inteiros com separador de milhar, demais com 4 algarismos)."""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return "-"
+    if abs(valor) >= 1000:
+        return f"{valor:,.0f}".replace(",", ".")
+    return f"{valor:.4g}"
+
+
+class _Tendencia:
+    """Inclinação da reta valor x posição da linha, acumulada de forma estável (co-momentos)."""
+
+    def __init__(self):
+        self.contagem = 0
+        self.media_x = 0.0
+        self.media_y = 0.0
+        self.c_xy = 0.0
+        self.m2_x = 0.0
+
+    def atualizar(self, x, y):
+        validos = ~np.isnan(y)
+        x, y = x[validos], y[validos]
+        if not x.size:
+            return
+
+        media_x, media_y = x.mean(), y.mean()
+        c_xy = float(((x - media_x) * (y - media_y)).sum())
+        m2_x = float(((x - media_x) ** 2).sum())
+
+        total = self.contagem + x.size
+        delta_x, delta_y = media_x - self.media_x, media_y - self.media_y
+        self.c_xy += c_xy + delta_x * delta_y * self.contagem * x.size / total
+        self.m2_x += m2_x + delta_x ** 2 * self.contagem * x.size / total
+        self.media_x += delta_x * x.size / total
+        self.media_y += delta_y * x.size / total
+        self.contagem = total
+
+    @property
+    def inclinacao(self):
+        return self.c_xy / self.m2_x if self.m2_x else 0.0
+
+    def para_dict(self):
+        return {"contagem": self.contagem, "media_x": self.media_x, "media_y": self.media_y,
+                "c_xy": self.c_xy, "m2_x": self.m2_x}
+
+    @classmethod
+    def de_dict(cls, estado):
+        tendencia = cls()
+        tendencia.__dict__.update(estado)
+        return tendencia
+
+
+class _Extremos:
+    """Os k maiores e k menores valores de uma coluna, com a posição da linha."""
+
+    def __init__(self, k):
+        self.k = k
+        self.maiores = (np.empty(0), np.empty(0, dtype=np.int64))
+        self.menores = (np.empty(0), np.empty(0, dtype=np.int64))
+
+    @staticmethod
+    def _manter(valores, posicoes, k, maiores):
+        if valores.size > k:
+            escolhidos = np.argpartition(-valores if maiores else valores, k)[:k]
+            valores, posicoes = valores[escolhidos], posicoes[escolhidos]
+        ordem = np.argsort(-valores if maiores else valores)
+        return valores[ordem], posicoes[ordem]
+
+    def atualizar(self, posicoes, valores):
+        validos = ~np.isnan(valores)
+        posicoes, valores = posicoes[validos], valores[validos]
+        for atributo, maiores in (("maiores", True), ("menores", False)):
+            atuais_valores, atuais_posicoes = getattr(self, atributo)
+            setattr(self, atributo, self._manter(np.concatenate([atuais_valores, valores]),
+                                                 np.concatenate([atuais_posicoes, posicoes]),
+                                                 self.k, maiores))
+
+    def para_dict(self):
+        return {"k": self.k,
+                "maiores": [self.maiores[0].tolist(), self.maiores[1].tolist()],
+                "menores": [self.menores[0].tolist(), self.menores[1].tolist()]}
+
+    @classmethod
+    def de_dict(cls, estado):
+        extremos = cls(estado["k"])
+        for atributo in ("maiores", "menores"):
+            valores, posicoes = estado[atributo]
+            setattr(extremos, atributo, (np.asarray(valores, dtype=float), np.asarray(posicoes, dtype=np.int64)))
+        return extremos
+
+
+class _CategoriasFrequentes:
+    """
+    Categorias mais frequentes de uma coluna, com memória limitada.
+
+    As contagens seguem o resumo de Misra-Gries (mesclável bloco a bloco): com até
+    max_categorias valores distintos elas são exatas; acima disso, só os valores
+    mais frequentes ficam, e cada contagem fica abaixo da real em no máximo
+    nao_nulos / (max_categorias + 1). Os valores distintos são estimados pelos
+    HASHES_DISTINTOS menores hashes dos valores (exatos abaixo desse número).
+    """
+
+    def __init__(self, max_categorias):
+        self.max_categorias = max_categorias
+        self.contagens = pd.Series(dtype=float)  # valor -> contagem (limite inferior)
+        self.nao_nulos = 0
+        self.hashes = np.empty(0, dtype=np.uint64)  # Os menores hashes dos valores vistos
+        self.fracao_distintos = None  # Preenchida quando a coluna é dada como quase única
+
+    @property
+    def quase_unica(self):
+        return self.fracao_distintos is not None
+
+    @property
+    def distintos(self):
+        """Valores distintos (estimados quando passam de HASHES_DISTINTOS)."""
+        if self.quase_unica:
+            return round(self.fracao_distintos * self.nao_nulos)
+        if self.hashes.size < HASHES_DISTINTOS:
+            return int(self.hashes.size)
+        return round((HASHES_DISTINTOS - 1) / (float(self.hashes[-1]) / 2.0 ** 64))
+
+    def atualizar(self, valores, fracao_unicos):
+        """Conta os valores de um bloco; colunas quase únicas (ex.: identificadores) deixam de ser contadas."""
+        if self.quase_unica:
+            self.nao_nulos += int(valores.notna().sum())
+            return
+
+        contagem = valores.value_counts(sort=False)
+        contagem = contagem[contagem > 0]
+        self.nao_nulos += int(contagem.sum())
+
+        # Só os valores distintos do bloco são convertidos e passados pelo hash
+        hashes = pd.util.hash_array(contagem.index.astype(str).to_numpy(dtype=object))
+        self.hashes = np.unique(np.concatenate([self.hashes, hashes]))[:HASHES_DISTINTOS]
+
+        if self.nao_nulos >= HASHES_DISTINTOS and self.distintos >= fracao_unicos * self.nao_nulos:
+            self.fracao_distintos = min(1.0, self.distintos / self.nao_nulos)
+            self.contagens = pd.Series(dtype=float)
+            return
+
+        # Misra-Gries: passando do limite, desconta de todos a contagem do primeiro que não cabe
+        soma = contagem.astype(float) if self.contagens.empty else self.contagens.add(contagem, fill_value=0)
+        if len(soma) > self.max_categorias:
+            corte = soma.nlargest(self.max_categorias + 1).iloc[-1]
+            soma = soma[soma > corte] - corte
+        self.contagens = soma
+
+    def para_dict(self):
+        return {"max_categorias": self.max_categorias, "valores": self.contagens.index.tolist(),
+                "contagens": self.contagens.tolist(), "nao_nulos": self.nao_nulos,
+                "hashes": [int(h) for h in self.hashes], "fracao_distintos": self.fracao_distintos}
+
+    @classmethod
+    def de_dict(cls, estado):
+        categorias = cls(estado["max_categorias"])
+        categorias.contagens = pd.Series(estado["contagens"], index=pd.Index(estado["valores"], dtype=object),
+                                         dtype=float)
+        categorias.nao_nulos = estado["nao_nulos"]
+        categorias.hashes = np.asarray(estado["hashes"], dtype=np.uint64)
+        categorias.fracao_distintos = estado["fracao_distintos"]
+        return categorias
+
+
+class PerfilDados:
+    """Perfil de uma tabela, atualizado bloco a bloco e com tamanho limitado."""
+
+    def __init__(self, top_categorias=5, max_outliers=3, amostra_por_grupo=3, max_amostra=20,
+                 max_colunas=30, max_grupos=50, max_categorias=100, fracao_unicos=0.9, semente=0):
+        """
+        Inicializa o perfil vazio.
+
+        Args:
+            top_categorias (int): Categorias mais frequentes listadas por coluna
+            max_outliers (int): Valores atípicos de exemplo por coluna (em cada extremo)
+            amostra_por_grupo (int): Linhas de amostra por valor da coluna de estratificação
+            max_amostra (int): Linhas de amostra no total
+            max_colunas (int): Colunas descritas de cada tipo (numéricas e categóricas)
+            max_grupos (int): Máximo de valores distintos da coluna de estratificação
+            max_categorias (int): Contagens guardadas por coluna categórica (as mais frequentes)
+            fracao_unicos (float): Colunas categóricas com pelo menos esta fração de valores
+                distintos (ex.: identificadores) deixam de ter as categorias contadas
+            semente (int): Semente da amostragem (a mesma semente gera a mesma amostra)
+        """
+        self.top_categorias = top_categorias
+        self.max_outliers = max_outliers
+        self.amostra_por_grupo = amostra_por_grupo
+        self.max_amostra = max_amostra
+        self.max_colunas = max_colunas
+        self.max_grupos = max_grupos
+        self.max_categorias = max_categorias
+        self.fracao_unicos = fracao_unicos
+        self._aleatorio = np.random.default_rng(semente)
+
+        self.linhas = 0
+        self.colunas = []
+        self.estatisticas = EstatisticasIncrementais()
+        self.categorias = {}  # coluna categórica -> _CategoriasFrequentes
+        self.tendencias = {}
+        self.extremos = {}
+        self.coluna_estratos = None
+        self.amostra = None
+
+    def atualizar(self, bloco):
+        """
+        Atualiza o perfil com um bloco de linhas.
+
+        Args:
+            bloco (DataFrame): Bloco de linhas da tabela
+        """
+        if not self.colunas:
+            self.colunas = list(bloco.columns)
+            self.coluna_estratos = self._escolher_coluna_estratos(bloco)
+
+        posicoes = np.arange(self.linhas, self.linhas + len(bloco), dtype=np.int64)
+        self.estatisticas.atualizar(bloco)
+
+        for coluna in bloco.select_dtypes(include="number").columns[:self.max_colunas]:
+            valores = bloco[coluna].to_numpy(dtype=float, na_value=np.nan)
+            self.tendencias.setdefault(coluna, _Tendencia()).atualizar(posicoes.astype(float), valores)
+            self.extremos.setdefault(coluna, _Extremos(self.max_outliers)).atualizar(posicoes, valores)
+
+        for coluna in bloco.select_dtypes(include=["object", "category"]).columns[:self.max_colunas]:
+            categorias = self.categorias.setdefault(coluna, _CategoriasFrequentes(self.max_categorias))
+            categorias.atualizar(bloco[coluna], self.fracao_unicos)
+
+        self._atualizar_amostra(bloco)
+        self.linhas += len(bloco)
+
+    def _escolher_coluna_estratos(self, bloco):
+        """Coluna categórica com menos valores distintos (ex.: região), se houver uma adequada."""
+        candidatas = [(bloco[coluna].nunique(), coluna)
+                      for coluna in bloco.select_dtypes(include=["object", "category"]).columns]
+        candidatas = [(distintos, coluna) for distintos, coluna in candidatas if 1 < distintos <= self.max_grupos]
+        return min(candidatas)[1] if candidatas else None
+
+    def _atualizar_amostra(self, bloco):
+        """
+        Amostra estratificada mesclável: cada linha recebe uma chave aleatória e
+        ficam as linhas de menor chave em cada grupo (amostra uniforme sem reposição).
+        """
+        bloco = bloco.assign(_chave=self._aleatorio.random(len(bloco)))
+        if self.coluna_estratos is not None:
+            bloco[self.coluna_estratos] = bloco[self.coluna_estratos].astype(object)
+        candidatos = bloco if self.amostra is None else pd.concat([self.amostra, bloco], ignore_index=True)
+        candidatos = candidatos.sort_values("_chave")
+
+        if self.coluna_estratos is None:
+            self.amostra = candidatos.head(self.max_amostra)
+        else:
+            self.amostra = candidatos.groupby(self.coluna_estratos, dropna=False, sort=False).head(
+                self.amostra_por_grupo)
+
+    def resumo(self):
+        """
+        Perfil em formato de dicionário (tamanho limitado, independente do número de linhas).
+
+        Returns:
+            dict: Linhas, colunas numéricas, colunas categóricas e amostra
+        """
+        numericas = {}
+        for coluna, estatisticas in list(self.estatisticas.colunas.items())[:self.max_colunas]:
+            resumo = estatisticas.resumo()
+            esboco = estatisticas.esboco
+
+            # Atípicos: fora de 1,5 intervalo interquartil (os exemplos vêm dos extremos guardados)
+            iqr = resumo["75%"] - resumo["25%"]
+            limite_inferior, limite_superior = resumo["25%"] - 1.5 * iqr, resumo["75%"] + 1.5 * iqr
+            maiores, _ = self.extremos[coluna].maiores
+            menores, _ = self.extremos[coluna].menores
+            exemplos = [float(v) for v in menores if v < limite_inferior] + \
+                       [float(v) for v in maiores if v > limite_superior]
+
+            tendencia = self.tendencias[coluna]
+            variacao = (tendencia.inclinacao * max(estatisticas.contagem - 1, 0) / abs(resumo["mean"])
+                        if resumo["mean"] else 0.0)
+
+            numericas[coluna] = {
+                "media": resumo["mean"], "desvio": resumo["std"], "minimo": resumo["min"],
+                "p25": resumo["25%"], "mediana": resumo["50%"], "p75": resumo["75%"], "maximo": resumo["max"],
+                "nulos": estatisticas.nulos,
+                "variacao_tendencia": variacao,
+                "outliers_estimados": round(esboco.total * (esboco.proporcao_abaixo(limite_inferior)
+                                                            + 1 - esboco.proporcao_abaixo(limite_superior))),
+                "exemplos_outliers": exemplos
+            }
+
+        categoricas = {}
+        for coluna, categorias in self.categorias.items():
+            mais_frequentes = categorias.contagens.sort_values(ascending=False).head(self.top_categorias)
+            categoricas[coluna] = {
+                "distintos": categorias.distintos,
+                "quase_unica": categorias.quase_unica,
+                "mais_frequentes": [(str(valor), int(n), float(n / categorias.nao_nulos))
+                                    for valor, n in mais_frequentes.items()]
+            }
+
+        amostra = self.amostra
+        if amostra is not None:
+            if self.coluna_estratos is not None:
+                # Uma linha de cada grupo por rodada (a amostra já está em ordem de chave):
+                # ao cortar em max_amostra, nenhum grupo fica de fora enquanto couber
+                rodada = amostra.groupby(self.coluna_estratos, dropna=False, sort=False).cumcount()
+                amostra = amostra.assign(_rodada=rodada).sort_values(["_rodada", "_chave"]).drop(columns="_rodada")
+            amostra = amostra.drop(columns="_chave").head(self.max_amostra)
+        return {
+            "linhas": self.linhas,
+            "colunas": len(self.colunas),
+            "numericas": numericas,
+            "categoricas": categoricas,
+            "coluna_estratos": self.coluna_estratos,
+            "amostra": amostra
+        }
+
+    def para_dict(self):
+        """
+        Estado completo do perfil em formato serializável (JSON), para continuar
+        a atualização depois (ex.: só com as linhas acrescentadas a um arquivo).
+
+        Returns:
+            dict: Parâmetros, estatísticas, categorias, tendências, extremos e amostra
+        """
+        amostra = None
+        if self.amostra is not None:
+            amostra = json.loads(self.amostra.to_json(orient="split", index=False))
+        return {
+            "parametros": {"top_categorias": self.top_categorias, "max_outliers": self.max_outliers,
+                           "amostra_por_grupo": self.amostra_por_grupo, "max_amostra": self.max_amostra,
+                           "max_colunas": self.max_colunas, "max_grupos": self.max_grupos,
+                           "max_categorias": self.max_categorias, "fracao_unicos": self.fracao_unicos},
+            "aleatorio": self._aleatorio.bit_generator.state,
+            "linhas": self.linhas,
+            "colunas": self.colunas,
+            "estatisticas": self.estatisticas.para_dict(),
+            "categorias": {coluna: categorias.para_dict() for coluna, categorias in self.categorias.items()},
+            "tendencias": {coluna: tendencia.para_dict() for coluna, tendencia in self.tendencias.items()},
+            "extremos": {coluna: extremos.para_dict() for coluna, extremos in self.extremos.items()},
+            "coluna_estratos": self.coluna_estratos,
+            "amostra": amostra
+        }
+
+    @classmethod
+    def de_dict(cls, estado):
+        """Recria um perfil salvo com para_dict."""
+        perfil = cls(**estado["parametros"])
+        perfil._aleatorio.bit_generator.state = estado["aleatorio"]
+        perfil.linhas = estado["linhas"]
+        perfil.colunas = estado["colunas"]
+        perfil.estatisticas = EstatisticasIncrementais.de_dict(estado["estatisticas"])
+        perfil.categorias = {coluna: _CategoriasFrequentes.de_dict(dados)
+                             for coluna, dados in estado["categorias"].items()}
+        perfil.tendencias = {coluna: _Tendencia.de_dict(dados) for coluna, dados in estado["tendencias"].items()}
+        perfil.extremos = {coluna: _Extremos.de_dict(dados) for coluna, dados in estado["extremos"].items()}
+        perfil.coluna_estratos = estado["coluna_estratos"]
+        if estado["amostra"] is not None:
+            perfil.amostra = pd.DataFrame(estado["amostra"]["data"], columns=estado["amostra"]["columns"])
+        return perfil
+
+    def texto(self):
+        """
+        Perfil em texto compacto, próprio para enviar ao modelo.
+
+        Returns:
+            str: Descrição do perfil
+        """
+        resumo = self.resumo()
+        linhas = [f"Linhas: {resumo['linhas']} | Colunas: {resumo['colunas']}"]
+
+        if resumo["numericas"]:
+            linhas.append("\nColunas numéricas:")
+        for coluna, info in resumo["numericas"].items():
+            descricao = (f"- {coluna}: média {_formatar_numero(info['media'])}, "
+                         f"desvio {_formatar_numero(info['desvio'])}, "
+                         f"mín {_formatar_numero(info['minimo'])}, p25 {_formatar_numero(info['p25'])}, "
+                         f"mediana {_formatar_numero(info['mediana'])}, p75 {_formatar_numero(info['p75'])}, "
+                         f"máx {_formatar_numero(info['maximo'])}; "
+                         f"tendência {info['variacao_tendencia']:+.1%} do início ao fim das linhas")
+            if info["nulos"]:
+                descricao += f"; {info['nulos']} nulos"
+            if info["outliers_estimados"]:
+                exemplos = ", ".join(_formatar_numero(valor) for valor in info["exemplos_outliers"])
+                descricao += f"; ~{info['outliers_estimados']} valores atípicos" + (f" (ex.: {exemplos})" if exemplos else "")
+            linhas.append(descricao)
+
+        if resumo["categoricas"]:
+            linhas.append("\nColunas categóricas:")
+        for coluna, info in resumo["categoricas"].items():
+            if info["quase_unica"]:
+                linhas.append(f"- {coluna} (~{info['distintos']} valores distintos: quase todos únicos, "
+                              "como um identificador)")
+                continue
+            frequentes = ", ".join(f"{valor} {proporcao:.0%}" for valor, _, proporcao in info["mais_frequentes"])
+            aproximado = "~" if info["distintos"] >= HASHES_DISTINTOS else ""
+            linhas.append(f"- {coluna} ({aproximado}{info['distintos']} valores distintos): {frequentes}")
+
+        if resumo["amostra"] is not None and len(resumo["amostra"]):
+            estratos = f" por {resumo['coluna_estratos']}" if resumo["coluna_estratos"] else ""
+            linhas.append(f"\nAmostra de linhas{estratos}:")
+            linhas.append(resumo["amostra"].to_string(index=False, float_format=_formatar_numero))
+
+        return "\n".join(linhas)
@@ -0,0 +1,541 @@
+"""
+Rastreamento de ponta a ponta e latência por etapa.
+Cada trecho medido (uma chamada ao LLM, a uma integração, uma busca
+vetorial, o carregamento de um documento, o desenho de gráficos) vira um
+span com nome, etapa, duração e atributos. Spans abertos dentro de outro
+ficam ligados a ele, então é possível ver onde foi o tempo de cada pedido.
+
+As durações alimentam histogramas por etapa (latência e vazão), sempre
+ativos e baratos. Os spans podem ser exportados para o terminal ou para um
+arquivo JSON (uma linha por span) e, se o pacote opcional opentelemetry-api
+estiver instalado, também são repassados ao OpenTelemetry, que os envia
+para o coletor configurado no SDK.
+"""
+
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+
+from componentes.tokens import contar_tokens
+
+# Limites dos baldes dos histogramas, em milissegundos (os mesmos do OpenTelemetry)
+LIMITES_MS = (5, 10, 25, 50, 75, 100, 250, 500, 750, 1000, 2500, 5000, 7500, 10000)
+
+# Span aberto no contexto atual (thread ou tarefa do asyncio)
+_span_atual = contextvars.ContextVar("span_atual", default=None)
+
+
+class Span:
+    """Um trecho medido: nome, etapa, início, duração, atributos e erro (se houver)."""
+
+    def __init__(self, nome, etapa, atributos=None, pai=None):
+        """
+        Args:
+            nome (str): Nome do trecho (ex.: "teams.listar_times")
+            etapa (str): Agrupamento dos histogramas (ex.: "llm", "integracao")
+            atributos (dict, opcional): Informações extras (modelo, tokens, endpoint...)
+            pai (Span, opcional): Span dentro do qual este foi aberto
+        """
+        self.nome = nome
+        self.etapa = etapa
+        self.atributos = dict(atributos or {})
+        self.id_rastreio = pai.id_rastreio if pai else uuid.uuid4().hex
+        self.id_span = uuid.uuid4().hex[:16]
+        self.id_pai = pai.id_span if pai else None
+        self.profundidade = pai.profundidade + 1 if pai else 0
+        self.inicio = time.time()
+        self._inicio_monotonico = time.perf_counter()
+        self.duracao = None
+        self.erro = None
+
+    def definir(self, **atributos):
+        """Acrescenta atributos ao span (ex.: número de resultados)."""
+        self.atributos.update(atributos)
+
+    def finalizar(self, erro=None):
+        """Registra a duração (e o erro, se a operação falhou)."""
+        self.duracao = time.perf_counter() - self._inicio_monotonico
+        if erro is not None:
+            self.erro = f"{type(erro).__name__}: {erro}"
+
+    def como_dict(self):
+        """
+        Span em formato serializável.
+
+        Returns:
+            dict: Campos do span, com a duração em milissegundos
+        """
+        return {
+            "nome": self.nome,
+            "etapa": self.etapa,
+            "id_rastreio": self.id_rastreio,
+            "id_span": self.id_span,
+            "id_pai": self.id_pai,
+            "inicio": self.inicio,
+            "duracao_ms": round(self.duracao * 1000, 3) if self.duracao is not None else None,
+            "status": "erro" if self.erro else "ok",
+            "erro": self.erro,
+            "atributos": self.atributos
+        }
+
+
+class Histograma:
+    """Histograma de latências com baldes fixos (como os do OpenTelemetry)."""
+
+    def __init__(self, limites_ms=LIMITES_MS):
+        """
+        Args:
+            limites_ms (tuple): Limites superiores dos baldes, em milissegundos
+        """
+        self.limites_ms = tuple(limites_ms)
+        self.baldes = [0] * (len(self.limites_ms) + 1)  # O último recebe o que passar do maior limite
+        self.quantidade = 0
+        self.erros = 0
+        self.soma_ms = 0.0
+        self.max_ms = 0.0
+        self.primeiro = None
+        self.ultimo = None
+
+    def registrar(self, duracao_ms, erro=False, momento=None):
+        """Acrescenta uma medida ao histograma."""
+        momento = time.monotonic() if momento is None else momento
+        self.baldes[bisect.bisect_left(self.limites_ms, duracao_ms)] += 1
+        self.quantidade += 1
+        self.erros += bool(erro)
+        self.soma_ms += duracao_ms
+        self.max_ms = max(self.max_ms, duracao_ms)
+        self.primeiro = momento if self.primeiro is None else self.primeiro
+        self.ultimo = momento
+
+    def percentil(self, p):
+        """
+        Estima um percentil interpolando dentro do balde onde ele cai.
+
+        Args:
+            p (float): Percentil entre 0 e 100
+
+        Returns:
+            float: Latência estimada em milissegundos (0 se não houver medidas)
+        """
+        if not self.quantidade:
+            return 0.0
+        alvo = self.quantidade * p / 100
+        acumulado = 0
+        for posicao, quantidade in enumerate(self.baldes):
+            if quantidade and acumulado + quantidade >= alvo:
+                inicio = self.limites_ms[posicao - 1] if posicao else 0.0
+                fim = self.limites_ms[posicao] if posicao < len(self.limites_ms) else self.max_ms
+                return min(inicio + (fim - inicio) * (alvo - acumulado) / quantidade, self.max_ms)
+            acumulado += quantidade
+        return self.max_ms
+
+    def resumo(self):
+        """
+        Resumo do histograma.
+
+        Returns:
+            dict: Quantidade, erros, média, p50, p95, p99, máximo, total (ms) e vazão (por segundo)
+        """
+        intervalo = (self.ultimo - self.primeiro) if self.quantidade > 1 else 0
+        return {
+            "quantidade": self.quantidade,
+            "erros": self.erros,
+            "media_ms": round(self.soma_ms / self.quantidade, 2) if self.quantidade else 0.0,
+            "p50_ms": round(self.percentil(50), 2),
+            "p95_ms": round(self.percentil(95), 2),
+            "p99_ms": round(self.percentil(99), 2),
+            "max_ms": round(self.max_ms, 2),
+            "total_ms": round(self.soma_ms, 2),
+            "por_segundo": round((self.quantidade - 1) / intervalo, 2) if intervalo > 0 else None
+        }
+
+
+class ExportadorConsole:
+    """Escreve cada span no terminal, indentado conforme o span pai."""
+
+    def exportar(self, span):
+        status = f" ❌ {span.erro}" if span.erro else ""
+        atributos = " ".join(f"{chave}={valor}" for chave, valor in span.atributos.items())
+        print(f"[rastreamento] {'  ' * span.profundidade}{span.nome} ({span.etapa}) "
+              f"{span.duracao * 1000:.1f} ms {atributos}{status}".rstrip())
+
+
+class ExportadorJSON:
+    """Acrescenta cada span a um arquivo JSON Lines (um objeto por linha)."""
+
+    def __init__(self, caminho):
+        """
+        Args:
+            caminho (str): Arquivo de saída (criado se não existir)
+        """
+        self.caminho = caminho
+        self._trava = threading.Lock()
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+    def exportar(self, span):
+        linha = json.dumps(span.como_dict(), ensure_ascii=False, default=str)
+        with self._trava:
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(linha + "\n")
+
+
+def obter_tracer_opentelemetry():
+    """
+    Obtém o tracer do OpenTelemetry, se o pacote opcional estiver instalado.
+
+    Requer opentelemetry-api (e o SDK com um exportador, para os spans saírem do processo).
+
+    Returns:
+        Tracer ou None: Tracer do OpenTelemetry, ou None se o pacote não estiver instalado
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace.get_tracer("smn.agentes")
+
+
+class Rastreador:
+    """Abre spans, mantém os histogramas por etapa e envia os spans aos exportadores."""
+
+    def __init__(self, exportadores=None, opentelemetry=False):
+        """
+        Args:
+            exportadores (list, opcional): Objetos com exportar(span) (ex.: ExportadorJSON)
+            opentelemetry (bool): Repassar os spans ao OpenTelemetry (se instalado)
+        """
+        self.exportadores = list(exportadores or [])
+        self.tracer_otel = obter_tracer_opentelemetry() if opentelemetry else None
+        self.histogramas = {}  # (etapa, nome) -> Histograma
+        self.tokens = {}  # etapa -> {"entrada": ..., "saida": ...}
+        self._trava = threading.Lock()
+
+    def iniciar(self, nome, etapa="geral", **atributos):
+        """
+        Abre um span filho do span atual, sem torná-lo o atual.
+
+        Útil quando o início e o fim acontecem em funções diferentes (ex.: callbacks).
+
+        Args:
+            nome (str): Nome do trecho
+            etapa (str): Etapa usada nos histogramas
+            **atributos: Informações extras do span
+
+        Returns:
+            Span: Span aberto (feche com finalizar)
+        """
+        return Span(nome, etapa, atributos, pai=_span_atual.get())
+
+    def finalizar(self, span, erro=None):
+        """Fecha o span, registra a duração no histograma e exporta."""
+        span.finalizar(erro)
+        duracao_ms = span.duracao * 1000
+        with self._trava:
+            histograma = self.histogramas.get((span.etapa, span.nome))
+            if histograma is None:
+                histograma = self.histogramas[(span.etapa, span.nome)] = Histograma()
+            histograma.registrar(duracao_ms, erro=span.erro is not None)
+            for tipo in ("entrada", "saida"):
+                quantidade = span.atributos.get(f"tokens_{tipo}")
+                if quantidade:
+                    por_etapa = self.tokens.setdefault(span.etapa, {"entrada": 0, "saida": 0})
+                    por_etapa[tipo] += quantidade
+
+        for exportador in self.exportadores:
+            try:
+                exportador.exportar(span)
+            except Exception as e:
+                # Um exportador com problema não pode derrubar o pedido
+                print(f"Aviso: falha ao exportar o span {span.nome}: {str(e)}")
+
+        if self.tracer_otel is not None:
+            self._repassar_opentelemetry(span)
+
+    def _repassar_opentelemetry(self, span):
+        """Registra o span já finalizado no OpenTelemetry, com os mesmos horários e atributos."""
+        inicio_ns = int(span.inicio * 1e9)
+        span_otel = self.tracer_otel.start_span(span.nome, start_time=inicio_ns)
+        span_otel.set_attribute("etapa", span.etapa)
+        for chave, valor in span.atributos.items():
+            if isinstance(valor, (str, bool, int, float)):
+                span_otel.set_attribute(chave, valor)
+        if span.erro:
+            from opentelemetry.trace import Status, StatusCode
+            span_otel.set_status(Status(StatusCode.ERROR, span.erro))
+        span_otel.end(end_time=inicio_ns + int(span.duracao * 1e9))
+
+    def span(self, nome, etapa="geral", **atributos):
+        """
+        Mede um trecho de código; spans abertos dentro dele ficam como filhos.
+
+            with rastreador.span("calendar.listar_eventos", "integracao", max_results=10) as span:
+                eventos = ...
+                span.definir(eventos=len(eventos))
+
+        Args:
+            nome (str): Nome do trecho
+            etapa (str): Etapa usada nos histogramas
+            **atributos: Informações extras do span
+
+        Returns:
+            Gerenciador de contexto que entrega o Span
+        """
+        return _TrechoMedido(self, nome, etapa, atributos)
+
+    def rastrear(self, nome=None, etapa="geral"):
+        """
+        Decorador que mede cada chamada da função (síncrona ou assíncrona).
+
+        Args:
+            nome (str, opcional): Nome do span (padrão: nome qualificado da função)
+            etapa (str): Etapa usada nos histogramas
+
+        Returns:
+            callable: Decorador
+        """
+        def decorador(funcao):
+            nome_span = nome or funcao.__qualname__
+
+            if inspect.iscoroutinefunction(funcao):
+                @functools.wraps(funcao)
+                async def envolvida_async(*args, **kwargs):
+                    with self.span(nome_span, etapa):
+                        return await funcao(*args, **kwargs)
+                return envolvida_async
+
+            @functools.wraps(funcao)
+            def envolvida(*args, **kwargs):
+                with self.span(nome_span, etapa):
+                    return funcao(*args, **kwargs)
+            return envolvida
+
+        return decorador
+
+    def resumo(self):
+        """
+        Latência e vazão de cada etapa e de cada trecho.
+
+        Returns:
+            dict: {"etapas": {etapa: resumo}, "trechos": {"etapa/nome": resumo}, "tokens": {etapa: {...}}}
+        """
+        with self._trava:
+            por_etapa = {}
+            trechos = {}
+            for (etapa, nome), histograma in sorted(self.histogramas.items()):
+                trechos[f"{etapa}/{nome}"] = histograma.resumo()
+                combinado = por_etapa.setdefault(etapa, Histograma(histograma.limites_ms))
+                _combinar(combinado, histograma)
+            tokens = {etapa: dict(valores) for etapa, valores in self.tokens.items()}
+        return {
+            "etapas": {etapa: histograma.resumo() for etapa, histograma in por_etapa.items()},
+            "trechos": trechos,
+            "tokens": tokens
+        }
+
+    def relatorio(self):
+        """
+        Tabela de texto com a latência de cada etapa, da que mais consumiu tempo à que menos consumiu.
+
+        Returns:
+            str: Relatório pronto para imprimir
+        """
+        resumo = self.resumo()
+        etapas = sorted(resumo["etapas"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        linhas = [f"{'etapa':<14} {'chamadas':>8} {'erros':>5} {'média':>9} {'p50':>9} {'p95':>9} "
+                  f"{'p99':>9} {'total':>10}"]
+        for etapa, dados in etapas:
+            linhas.append(f"{etapa:<14} {dados['quantidade']:>8} {dados['erros']:>5} {dados['media_ms']:>7.1f}ms "
+                          f"{dados['p50_ms']:>7.1f}ms {dados['p95_ms']:>7.1f}ms {dados['p99_ms']:>7.1f}ms "
+                          f"{dados['total_ms'] / 1000:>9.2f}s")
+        for etapa, tokens in resumo["tokens"].items():
+            linhas.append(f"tokens ({etapa}): {tokens['entrada']} de entrada, {tokens['saida']} de saída")
+        return "\n".join(linhas)
+
+    def limpar(self):
+        """Zera os histogramas e a contagem de tokens."""
+        with self._trava:
+            self.histogramas.clear()
+            self.tokens.clear()
+
+
+class _TrechoMedido:
+    """Gerenciador de contexto usado por Rastreador.span."""
+
+    def __init__(self, rastreador, nome, etapa, atributos):
+        self.rastreador = rastreador
+        self.nome = nome
+        self.etapa = etapa
+        self.atributos = atributos
+        self._span = None
+        self._token = None
+
+    def __enter__(self):
+        self._span = self.rastreador.iniciar(self.nome, self.etapa, **self.atributos)
+        self._token = _span_atual.set(self._span)
+        return self._span
+
+    def __exit__(self, tipo, erro, traceback):
+        _span_atual.reset(self._token)
+        self.rastreador.finalizar(self._span, erro)
+        return False
+
+
+def _combinar(destino, origem):
+    """Soma o histograma origem no destino (mesmos limites)."""
+    destino.baldes = [a + b for a, b in zip(destino.baldes, origem.baldes)]
+    destino.quantidade += origem.quantidade
+    destino.erros += origem.erros
+    destino.soma_ms += origem.soma_ms
+    destino.max_ms = max(destino.max_ms, origem.max_ms)
+    if origem.primeiro is not None:
+        destino.primeiro = origem.primeiro if destino.primeiro is None else min(destino.primeiro, origem.primeiro)
+        destino.ultimo = origem.ultimo if destino.ultimo is None else max(destino.ultimo, origem.ultimo)
+
+
+def medir_iteracao(iteravel, nome, etapa="geral", **atributos):
+    """
+    Mede cada item de um iterador (ex.: páginas lidas de um PDF) em um span próprio.
+
+    Só o tempo gasto para produzir cada item é medido, não o tempo de quem consome.
+
+    Args:
+        iteravel (iterable): Itens a medir
+        nome (str): Nome dos spans
+        etapa (str): Etapa usada nos histogramas
+        **atributos: Informações extras dos spans
+
+    Yields:
+        Os mesmos itens de iteravel
+    """
+    iterador = iter(iteravel)
+    posicao = 0
+    while True:
+        with rastreador.span(nome, etapa, posicao=posicao, **atributos):
+            item = next(iterador, _FIM)
+        if item is _FIM:
+            return
+        posicao += 1
+        yield item
+
+
+_FIM = object()
+
+
+def span_atual():
+    """Span aberto no contexto atual (ou None)."""
+    return _span_atual.get()
+
+
+# ----------------------------------------------------------------
+# Rastreador do processo
+# ----------------------------------------------------------------
+
+# Usado pelas integrações e pelos componentes; os agentes escolhem os exportadores
+rastreador = Rastreador()
+
+
+def configurar_rastreamento(exportador="nenhum", arquivo="rastreamento.jsonl", opentelemetry=False):
+    """
+    Define para onde vão os spans do rastreador do processo.
+
+    Args:
+        exportador (str): "nenhum", "console", "json" ou "console,json"
+        arquivo (str): Arquivo usado pelo exportador "json"
+        opentelemetry (bool): Repassar também ao OpenTelemetry (se instalado)
+
+    Returns:
+        Rastreador: O rastreador do processo
+    """
+    exportadores = []
+    for nome in [parte.strip() for parte in exportador.split(",") if parte.strip()]:
+        if nome == "console":
+            exportadores.append(ExportadorConsole())
+        elif nome == "json":
+            exportadores.append(ExportadorJSON(arquivo))
+        elif nome != "nenhum":
+            raise ValueError(f"Exportador de rastreamento desconhecido: {nome}")
+    rastreador.exportadores = exportadores
+    rastreador.tracer_otel = obter_tracer_opentelemetry() if opentelemetry else None
+    if opentelemetry and rastreador.tracer_otel is None:
+        print("Aviso: opentelemetry-api não instalado - spans não serão repassados ao OpenTelemetry")
+    return rastreador
+
+
+def span(nome, etapa="geral", **atributos):
+    """Atalho para rastreador.span no rastreador do processo."""
+    return rastreador.span(nome, etapa, **atributos)
+
+
+def rastrear(nome=None, etapa="geral"):
+    """Atalho para rastreador.rastrear no rastreador do processo."""
+    return rastreador.rastrear(nome, etapa)
+
+
+def criar_callback_llm(rastreador_llm=None, modelo="gpt-3.5-turbo"):
+    """
+    Cria um callback do LangChain que abre um span para cada chamada ao LLM.
+
+    Os tokens vêm da resposta da API (token_usage); quando ela não informa
+    (ex.: modelos locais), são contados com componentes.tokens.
+
+    Args:
+        rastreador_llm (Rastreador, opcional): Onde registrar (padrão: rastreador do processo)
+        modelo (str): Modelo usado para contar os tokens quando a API não informa
+
+    Returns:
+        BaseCallbackHandler: Callback para passar em callbacks=[...] do modelo ou do chain
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    destino = rastreador_llm or rastreador
+
+    class CallbackRastreamento(BaseCallbackHandler):
+        """Mede as chamadas ao LLM (latência e tokens de entrada e saída)."""
+
+        def __init__(self):
+            self._abertos = {}  # run_id -> (span, tokens de entrada estimados)
+            self._trava = threading.Lock()
+
+        def _abrir(self, run_id, serializado, textos, kwargs):
+            parametros = kwargs.get("invocation_params") or {}
+            nome_modelo = parametros.get("model_name") or parametros.get("model") or \
+                (serializado or {}).get("name") or "llm"
+            span_llm = destino.iniciar(f"llm.{nome_modelo}", "llm", modelo=nome_modelo)
+            with self._trava:
+                self._abertos[run_id] = (span_llm, sum(contar_tokens(texto, modelo) for texto in textos))
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._abrir(run_id, serialized, prompts, kwargs)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            textos = [str(mensagem.content) for conversa in messages for mensagem in conversa]
+            self._abrir(run_id, serialized, textos, kwargs)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            with self._trava:
+                aberto = self._abertos.pop(run_id, None)
+            if aberto is None:
+                return
+            span_llm, entrada_estimada = aberto
+            uso = (response.llm_output or {}).get("token_usage") or {}
+            saida_estimada = sum(contar_tokens(geracao.text, modelo)
+                                 for geracoes in response.generations for geracao in geracoes)
+            span_llm.definir(tokens_entrada=uso.get("prompt_tokens") or entrada_estimada,
+                             tokens_saida=uso.get("completion_tokens") or saida_estimada)
+            destino.finalizar(span_llm)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            with self._trava:
+                aberto = self._abertos.pop(run_id, None)
+            if aberto is not None:
+                destino.finalizar(aberto[0], error)
+
+    return CallbackRastreamento()
@@ -0,0 +1,336 @@
+"""
+Escolha do modelo de cada tipo de tarefa (roteamento, extração, síntese, insights).
+Cada tarefa tem uma lista de níveis, do mais barato ao mais capaz: a chamada
+vai primeiro para o primeiro nível e só sobe para o seguinte se a resposta
+não passar na validação (ex.: JSON fora do formato ou confiança baixa) ou
+se o modelo falhar. Um nível pode ser um modelo local servido por um
+endpoint compatível com a API da OpenAI (Ollama, vLLM, llama.cpp...).
+
+Configuração (lida de um dicionário, normalmente os.environ):
+    MODELO_NIVEL_<NOME>=modelo[@base_url]     ex.: MODELO_NIVEL_LOCAL=llama3.1:8b@http://localhost:11434/v1
+    MODELO_TAREFA_<TAREFA>=nivel1,nivel2      ex.: MODELO_TAREFA_EXTRACAO=local,padrao
+Sem configuração, todas as tarefas usam só o nível "padrao".
+"""
+
+import threading
+import time
+
+from componentes.consolidacao_json import extrair_json
+from componentes.consumo_tokens import OrcamentoExcedido, nome_do_modelo
+from componentes.rastreamento import Histograma
+
+# Tipos de tarefa conhecidos pelos agentes
+TAREFAS = ("roteamento", "extracao", "sintese", "insights")
+
+# Nível usado pelas tarefas sem configuração própria
+NIVEL_PADRAO = "padrao"
+MODELO_PADRAO = "gpt-3.5-turbo"
+
+
+class NivelModelo:
+    """Um nível de modelo: nome do modelo e, para modelos locais, o endpoint."""
+
+    def __init__(self, nome, modelo, base_url=None, api_key=None, temperatura=0.0):
+        """
+        Args:
+            nome (str): Nome do nível (ex.: "local", "pequeno", "padrao")
+            modelo (str): Nome do modelo no provedor (ex.: "gpt-4o-mini", "llama3.1:8b")
+            base_url (str, opcional): Endpoint compatível com a OpenAI (padrão: API da OpenAI)
+            api_key (str, opcional): Chave do endpoint (padrão: OPENAI_API_KEY, ou
+                "local" para endpoints próprios, que normalmente não pedem chave)
+            temperatura (float): Temperatura das chamadas
+        """
+        self.nome = nome
+        self.modelo = modelo
+        self.base_url = base_url
+        self.api_key = api_key
+        self.temperatura = temperatura
+
+    @classmethod
+    def de_texto(cls, nome, texto, **kwargs):
+        """
+        Cria o nível a partir de "modelo" ou "modelo@base_url".
+
+        Args:
+            nome (str): Nome do nível
+            texto (str): Modelo e, opcionalmente, o endpoint
+
+        Returns:
+            NivelModelo: Nível configurado
+        """
+        modelo, _, base_url = texto.strip().partition("@")
+        return cls(nome, modelo.strip(), base_url.strip() or None, **kwargs)
+
+    @property
+    def local(self):
+        """Se o modelo é servido por um endpoint próprio (e não pela OpenAI)."""
+        return self.base_url is not None
+
+    def __repr__(self):
+        return f"NivelModelo({self.nome!r}, {self.modelo!r}" + (f", {self.base_url!r})" if self.local else ")")
+
+
+def criar_chat_openai(nivel):
+    """
+    Cria o cliente de um nível (ChatOpenAI serve também para endpoints compatíveis).
+
+    Args:
+        nivel (NivelModelo): Nível a ser usado
+
+    Returns:
+        ChatOpenAI: Cliente do modelo
+    """
+    from langchain_openai import ChatOpenAI
+
+    argumentos = {"model_name": nivel.modelo, "temperature": nivel.temperatura}
+    if nivel.local:
+        argumentos.update(base_url=nivel.base_url, api_key=nivel.api_key or "local")
+    elif nivel.api_key:
+        argumentos["api_key"] = nivel.api_key
+    return ChatOpenAI(**argumentos)
+
+
+def validar_json(campos=(), valores=None, confianca_minima=None, campo_confianca="confianca"):
+    """
+    Cria um validador para respostas que devem ser um objeto JSON.
+
+    Args:
+        campos (iterable): Campos obrigatórios
+        valores (dict, opcional): Valores aceitos de alguns campos (campo -> conjunto)
+        confianca_minima (float, opcional): Confiança mínima informada pelo modelo
+            (respostas sem o campo de confiança são aceitas)
+        campo_confianca (str): Nome do campo com a confiança (de 0 a 1)
+
+    Returns:
+        function: Recebe a resposta (texto ou mensagem) e retorna True se ela for válida
+    """
+    def validar(resposta):
+        dados = extrair_json(getattr(resposta, "content", resposta))
+        if not isinstance(dados, dict) or any(campo not in dados for campo in campos):
+            return False
+        if any(dados.get(campo) not in aceitos for campo, aceitos in (valores or {}).items()):
+            return False
+        if confianca_minima is not None and campo_confianca in dados:
+            try:
+                return float(dados[campo_confianca]) >= confianca_minima
+            except (TypeError, ValueError):
+                return False
+        return True
+
+    return validar
+
+
+def validar_texto(minimo_caracteres=1):
+    """
+    Cria um validador para respostas em texto livre (ex.: sínteses e insights).
+
+    Args:
+        minimo_caracteres (int): Tamanho mínimo da resposta, sem espaços nas pontas
+
+    Returns:
+        function: Recebe a resposta (texto ou mensagem) e retorna True se ela for válida
+    """
+    def validar(resposta):
+        return len(str(getattr(resposta, "content", resposta)).strip()) >= minimo_caracteres
+
+    return validar
+
+
+class _EstatisticasNivel:
+    """Chamadas, falhas e latência de uma tarefa em um nível."""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.aceitas = 0
+        self.invalidas = 0
+        self.erros = 0
+        self.latencia = Histograma()
+
+    def como_dict(self):
+        resumo = self.latencia.resumo()
+        return {
+            "chamadas": self.chamadas,
+            "aceitas": self.aceitas,
+            "invalidas": self.invalidas,
+            "erros": self.erros,
+            "taxa_aceitas": round(self.aceitas / self.chamadas, 3) if self.chamadas else None,
+            "p50_ms": resumo["p50_ms"],
+            "p95_ms": resumo["p95_ms"],
+            "media_ms": resumo["media_ms"]
+        }
+
+
+class RoteadorModelos:
+    """
+    Escolhe o modelo de cada tarefa e sobe de nível quando a resposta não serve.
+
+    Os clientes de cada nível são criados uma vez e compartilhados entre as
+    tarefas (e entre threads: os clientes do LangChain podem ser usados em paralelo).
+    """
+
+    def __init__(self, niveis, tarefas=None, criar_llm=criar_chat_openai):
+        """
+        Args:
+            niveis (dict): Nome do nível -> NivelModelo ou um cliente já criado
+                (ex.: um modelo simulado nos testes)
+            tarefas (dict, opcional): Tarefa -> lista de níveis, na ordem em que são
+                tentados (tarefas sem configuração usam só o nível "padrao")
+            criar_llm (function): Cria o cliente de um NivelModelo
+        """
+        tarefas = {tarefa: list(ordem) for tarefa, ordem in (tarefas or {}).items()}
+        desconhecidos = {nivel for ordem in tarefas.values() for nivel in ordem} - set(niveis)
+        if desconhecidos:
+            raise ValueError(f"Níveis de modelo não configurados: {', '.join(sorted(desconhecidos))}")
+        if NIVEL_PADRAO not in niveis:
+            raise ValueError(f"O nível '{NIVEL_PADRAO}' precisa ser configurado")
+
+        self.niveis = dict(niveis)
+        self.tarefas = tarefas
+        self.criar_llm = criar_llm
+        self._clientes = {}
+        self._estatisticas = {}
+        self._trava = threading.Lock()
+
+    @classmethod
+    def de_variaveis(cls, variaveis, llm_padrao=None, temperatura=0.0, api_key=None):
+        """
+        Cria o roteador a partir de variáveis MODELO_NIVEL_* e MODELO_TAREFA_*.
+
+        Args:
+            variaveis (dict): Variáveis de configuração (normalmente os.environ)
+            llm_padrao (opcional): Cliente do nível "padrao" (tem prioridade sobre
+                MODELO_NIVEL_PADRAO; sem nenhum dos dois, gpt-3.5-turbo)
+            temperatura (float): Temperatura dos níveis criados a partir das variáveis
+            api_key (str, opcional): Chave da OpenAI dos níveis sem endpoint próprio
+
+        Returns:
+            RoteadorModelos: Roteador configurado
+        """
+        niveis = {}
+        for variavel, valor in variaveis.items():
+            if variavel.startswith("MODELO_NIVEL_") and valor.strip():
+                nome = variavel[len("MODELO_NIVEL_"):].lower()
+                nivel = NivelModelo.de_texto(nome, valor, temperatura=temperatura)
+                if not nivel.local:
+                    nivel.api_key = api_key
+                niveis[nome] = nivel
+        if llm_padrao is not None:
+            niveis[NIVEL_PADRAO] = llm_padrao
+        elif NIVEL_PADRAO not in niveis:
+            niveis[NIVEL_PADRAO] = NivelModelo(NIVEL_PADRAO, MODELO_PADRAO, api_key=api_key,
+                                               temperatura=temperatura)
+
+        tarefas = {
+            variavel[len("MODELO_TAREFA_"):].lower(): [nivel.strip().lower() for nivel in valor.split(",") if nivel.strip()]
+            for variavel, valor in variaveis.items()
+            if variavel.startswith("MODELO_TAREFA_") and valor.strip()
+        }
+        return cls(niveis, tarefas)
+
+    def niveis_da_tarefa(self, tarefa):
+        """Níveis de uma tarefa, na ordem em que são tentados."""
+        return self.tarefas.get(tarefa) or [NIVEL_PADRAO]
+
+    def llm(self, nivel=NIVEL_PADRAO):
+        """
+        Cliente de um nível (criado na primeira vez que é pedido).
+
+        Args:
+            nivel (str): Nome do nível
+
+        Returns:
+            Cliente do LangChain
+        """
+        with self._trava:
+            if nivel not in self._clientes:
+                configuracao = self.niveis[nivel]
+                self._clientes[nivel] = self.criar_llm(configuracao) \
+                    if isinstance(configuracao, NivelModelo) else configuracao
+            return self._clientes[nivel]
+
+    def llm_da_tarefa(self, tarefa):
+        """Cliente do primeiro nível de uma tarefa (para quem não precisa subir de nível)."""
+        return self.llm(self.niveis_da_tarefa(tarefa)[0])
+
+    def nome_modelos(self, tarefa):
+        """Modelos de uma tarefa, na ordem (ex.: "llama3.1:8b>gpt-3.5-turbo"), para chaves de cache."""
+        nomes = []
+        for nivel in self.niveis_da_tarefa(tarefa):
+            configuracao = self.niveis[nivel]
+            nomes.append(configuracao.modelo if isinstance(configuracao, NivelModelo) else nome_do_modelo(configuracao))
+        return ">".join(nomes)
+
+    def _registrar(self, tarefa, nivel, duracao, resultado):
+        with self._trava:
+            estatisticas = self._estatisticas.setdefault((tarefa, nivel), _EstatisticasNivel())
+            estatisticas.chamadas += 1
+            estatisticas.latencia.registrar(duracao * 1000, erro=resultado == "erro")
+            if resultado == "aceita":
+                estatisticas.aceitas += 1
+            elif resultado == "invalida":
+                estatisticas.invalidas += 1
+            else:
+                estatisticas.erros += 1
+
+    def executar(self, tarefa, chamar, validar=None):
+        """
+        Executa uma tarefa, subindo de nível enquanto a resposta não for válida.
+
+        A resposta do último nível é retornada mesmo se não passar na validação
+        (quem chamou trata como antes); o erro do último nível é repassado.
+        OrcamentoExcedido é repassado na hora: um modelo maior só gastaria mais.
+
+        Args:
+            tarefa (str): Tipo da tarefa (ex.: "extracao")
+            chamar (function): Recebe o cliente do nível e retorna a resposta
+            validar (function, opcional): Recebe a resposta e retorna se ela serve
+
+        Returns:
+            Resposta do primeiro nível que passou na validação
+        """
+        niveis = self.niveis_da_tarefa(tarefa)
+        for posicao, nivel in enumerate(niveis):
+            ultimo = posicao == len(niveis) - 1
+            inicio = time.perf_counter()
+            try:
+                resposta = chamar(self.llm(nivel))
+            except OrcamentoExcedido:
+                raise
+            except Exception:
+                self._registrar(tarefa, nivel, time.perf_counter() - inicio, "erro")
+                if ultimo:
+                    raise
+                continue
+
+            valida = validar is None or validar(resposta)
+            self._registrar(tarefa, nivel, time.perf_counter() - inicio, "aceita" if valida else "invalida")
+            if valida or ultimo:
+                return resposta
+
+    def estatisticas(self):
+        """
+        Chamadas, taxa de respostas aceitas e latência de cada tarefa em cada nível.
+
+        Returns:
+            dict: Tarefa -> nível -> estatísticas
+        """
+        with self._trava:
+            resumo = {}
+            for (tarefa, nivel), estatisticas in sorted(self._estatisticas.items()):
+                resumo.setdefault(tarefa, {})[nivel] = estatisticas.como_dict()
+            return resumo
+
+    def relatorio(self):
+        """Texto com as estatísticas de cada tarefa e nível."""
+        linhas = ["Modelos por tarefa:"]
+        for tarefa, niveis in self.estatisticas().items():
+            for nivel, dados in niveis.items():
+                linhas.append(f"  {tarefa:<12} {nivel:<10} {dados['chamadas']:>5} chamadas | "
+                              f"{(dados['taxa_aceitas'] or 0):>6.1%} aceitas | {dados['erros']} erros | "
+                              f"p50 {dados['p50_ms']:.0f} ms | p95 {dados['p95_ms']:.0f} ms")
+        return "\n".join(linhas)
+
+    def limpar(self):
+        """Zera as estatísticas."""
+        with self._trava:
+            self._estatisticas.clear()
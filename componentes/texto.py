@@ -0,0 +1,138 @@
+"""
+Utilidades de processamento de texto em português.
+Normalização, remoção de acentos, radicalização e tokenização usadas pelos
+índices de busca.
+"""
+
+import functools
+import hashlib
+import re
+import unicodedata
+
+# Padrão para encontrar palavras (letras e números, incluindo códigos como "RH-042")
+PADRAO_TOKEN = re.compile(r"[a-z0-9]+(?:[-_][a-z0-9]+)*")
+
+# Acentos e outros sinais que a decomposição Unicode (NFKD) separa das letras
+PADRAO_DIACRITICOS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+# Palavras muito comuns que não ajudam a diferenciar documentos
+STOPWORDS = frozenset("""
+a ao aos as com como da das de do dos e ela ele em entre essa esse esta este eu
+foi ha isso isto ja la mais mas me mesmo muito na nas nao no nos o os ou para pela
+pelas pelo pelos por qual quais quando que quem se sem ser seu sua sao so tambem
+tem um uma umas uns voce
+""".split())
+
+
+def remover_acentos(texto):
+    """
+    Remove acentos e cedilhas de um texto ("férias" -> "ferias").
+
+    Args:
+        texto (str): Texto original
+
+    Returns:
+        str: Texto sem acentuação
+    """
+    if texto.isascii():
+        return texto
+    return PADRAO_DIACRITICOS.sub("", unicodedata.normalize("NFKD", texto))
+
+
+def normalizar(texto):
+    """
+    Coloca o texto em minúsculas e sem acentos.
+
+    Args:
+        texto (str): Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    return remover_acentos(texto.lower())
+
+
+# Plurais (em texto já sem acentos): sufixo -> substituição, testados em ordem
+SUFIXOS_PLURAL = [("ns", "m"), ("oes", "ao"), ("aes", "ao"), ("eis", "el"), ("ais", "al"), ("ois", "ol"),
+                  ("res", "r"), ("ses", "s"), ("zes", "z"), ("les", "l"), ("is", "il"), ("s", "")]
+
+# Femininos: sufixo -> forma masculina
+SUFIXOS_FEMININO = [("inha", "inho"), ("eira", "eiro"), ("osa", "oso"), ("ica", "ico"), ("ida", "ido"),
+                    ("ada", "ado"), ("iva", "ivo"), ("ona", "ao"), ("ora", "or"), ("esa", "es")]
+
+
+@functools.lru_cache(maxsize=100_000)
+def radical(termo):
+    """
+    Reduz um termo normalizado ao seu radical, para que variações da mesma
+    palavra se encontrem na busca ("projetos", "projeto" -> "projet").
+
+    Radicalizador leve para português (plural, feminino, "-mente" e vogal
+    final), no estilo do de Savoy. Termos curtos e códigos ficam como estão.
+
+    Args:
+        termo (str): Termo em minúsculas e sem acentos
+
+    Returns:
+        str: Radical do termo
+    """
+    if len(termo) < 4 or not termo.isalpha():
+        return termo
+
+    if len(termo) > 6 and termo.endswith("mente"):
+        termo = termo[:-5]
+    else:
+        for sufixo, substituto in SUFIXOS_PLURAL:
+            if termo.endswith(sufixo) and len(termo) > len(sufixo) + 2:
+                termo = termo[:-len(sufixo)] + substituto
+                break
+
+    if termo.endswith("a") and len(termo) > 6:
+        for sufixo, substituto in SUFIXOS_FEMININO:
+            if termo.endswith(sufixo):
+                termo = termo[:-len(sufixo)] + substituto
+                break
+
+    if len(termo) > 4 and termo[-1] in "aeo":
+        termo = termo[:-1]
+    return termo
+
+
+def tokenizar(texto, remover_stopwords=True, radicais=False):
+    """
+    Divide um texto em termos normalizados para indexação.
+
+    Args:
+        texto (str): Texto a ser dividido
+        remover_stopwords (bool): Se True, descarta palavras muito comuns
+        radicais (bool): Se True, reduz cada termo ao seu radical
+
+    Returns:
+        list: Lista de termos
+    """
+    termos = PADRAO_TOKEN.findall(normalizar(texto))
+    if remover_stopwords:
+        termos = [termo for termo in termos if termo not in STOPWORDS]
+    if radicais:
+        termos = [radical(termo) for termo in termos]
+    return termos
+
+
+def hash_conteudo(*partes):
+    """
+    Gera um identificador estável para um conteúdo (hash SHA-256).
+
+    Textos iguais sempre geram o mesmo hash, então ele serve para saber se um
+    trecho mudou ou para montar chaves de cache.
+
+    Args:
+        *partes: Textos (ou valores convertíveis em texto) que compõem o conteúdo
+
+    Returns:
+        str: Hash hexadecimal
+    """
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(str(parte).encode("utf-8"))
+        h.update(b"\x1f")  # Separador para que ("ab", "c") != ("a", "bc")
+    return h.hexdigest()
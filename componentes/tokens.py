@@ -0,0 +1,57 @@
+"""
+Contagem de tokens com tiktoken.
+Se o tiktoken não estiver disponível (ou não conseguir baixar o vocabulário,
+como em máquinas sem internet), usamos uma estimativa pelo número de caracteres.
+"""
+
+import functools
+
+# Em média, um token em português tem cerca de 4 caracteres
+CARACTERES_POR_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def obter_codificador(modelo="gpt-3.5-turbo"):
+    """
+    Obtém o codificador de tokens de um modelo (carregado uma única vez).
+
+    Args:
+        modelo (str): Nome do modelo da OpenAI
+
+    Returns:
+        Encoding ou None: Codificador do tiktoken, ou None se indisponível
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(modelo)
+    except KeyError:
+        # Modelo desconhecido (ex.: um modelo local): usar o vocabulário mais comum
+        pass
+    except Exception:
+        return None
+
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def contar_tokens(texto, modelo="gpt-3.5-turbo"):
+    """
+    Conta quantos tokens um texto ocupa.
+
+    Args:
+        texto (str): Texto a ser medido
+        modelo (str): Nome do modelo (define o vocabulário usado)
+
+    Returns:
+        int: Número de tokens (exato com tiktoken, estimado sem ele)
+    """
+    codificador = obter_codificador(modelo)
+    if codificador is None:
+        return max(1, len(texto) // CARACTERES_POR_TOKEN) if texto else 0
+    return len(codificador.encode(texto, disallowed_special=()))
@@ -0,0 +1,279 @@
+"""
+Wikipedia sem ida à rede a cada pesquisa.
+WikipediaComCache guarda em disco as respostas da Wikipedia, com prazo de
+validade, usando como chave a consulta normalizada ("Inteligência
+Artificial?" e "inteligencia artificial" são a mesma consulta).
+WikipediaOffline responde a partir de um recorte local de um dump da
+Wikipedia: os artigos ficam compactados um a um em um único arquivo, e um
+índice de títulos e termos (BM25) aponta onde cada um começa.
+"""
+
+import bz2
+import gzip
+import json
+import lzma
+import os
+import time
+import zlib
+
+from componentes.bm25 import IndiceBM25
+from componentes.busca_documentos import tokenizar_busca
+from componentes.texto import hash_conteudo, tokenizar
+
+# Mudar este número invalida o cache e os índices salvos
+VERSAO_WIKIPEDIA = 1
+
+# Resposta do WikipediaQueryRun quando nada é encontrado (mantida no modo offline)
+SEM_RESULTADOS = "No good Wikipedia Search Result was found"
+
+# Descompressão de acordo com a extensão do dump
+ABRIR_COMPACTADO = {".bz2": bz2.open, ".gz": gzip.open, ".xz": lzma.open}
+
+
+def normalizar_consulta(consulta):
+    """
+    Normaliza uma consulta para uso como chave: minúsculas, sem acentos e sem pontuação.
+
+    Args:
+        consulta (str): Texto da consulta
+
+    Returns:
+        str: Termos da consulta separados por um espaço
+    """
+    return " ".join(tokenizar(consulta, remover_stopwords=False))
+
+
+class WikipediaComCache:
+    """Busca na Wikipedia com as respostas guardadas em disco por um prazo."""
+
+    def __init__(self, buscar, cache, ttl_segundos=7 * 24 * 3600, idioma="pt"):
+        """
+        Args:
+            buscar (callable): Busca original (ex.: WikipediaQueryRun.run)
+            cache (CacheDisco): Cache onde as respostas são guardadas
+            ttl_segundos (float): Por quanto tempo uma resposta é reaproveitada
+            idioma (str): Idioma da Wikipedia (faz parte da chave)
+        """
+        self.buscar = buscar
+        self.cache = cache
+        self.ttl_segundos = ttl_segundos
+        self.idioma = idioma
+        self.acertos = 0
+        self.falhas = 0
+
+    def chave(self, consulta):
+        """Chave de cache da consulta (normalizada)."""
+        return hash_conteudo("wikipedia", VERSAO_WIKIPEDIA, self.idioma, normalizar_consulta(consulta))
+
+    def run(self, consulta):
+        """
+        Busca na Wikipedia, usando a resposta guardada se ainda estiver no prazo.
+
+        Se a Wikipedia falhar (ex.: sem rede), uma resposta vencida é usada
+        no lugar do erro.
+
+        Args:
+            consulta (str): Texto da consulta
+
+        Returns:
+            str: Resposta da Wikipedia
+        """
+        chave = self.chave(consulta)
+        entrada = self.cache.obter(chave)
+        if entrada is not None and time.time() - entrada["salvo_em"] < self.ttl_segundos:
+            self.acertos += 1
+            return entrada["resposta"]
+
+        self.falhas += 1
+        try:
+            resposta = self.buscar(consulta)
+        except Exception:
+            if entrada is not None:
+                return entrada["resposta"]
+            raise
+
+        self.cache.guardar(chave, {"consulta": consulta, "resposta": resposta, "salvo_em": time.time()})
+        return resposta
+
+
+def ler_dump(caminho_dump):
+    """
+    Lê os artigos de um dump no formato JSON por linha do WikiExtractor (--json).
+
+    Cada linha tem ao menos as chaves "title" e "text". O arquivo pode estar
+    compactado (.bz2, .gz ou .xz).
+
+    Args:
+        caminho_dump (str): Arquivo do dump
+
+    Yields:
+        tuple: (título, texto) de cada artigo não vazio
+    """
+    abrir = ABRIR_COMPACTADO.get(os.path.splitext(caminho_dump)[1].lower(), open)
+    with abrir(caminho_dump, "rt", encoding="utf-8") as f:
+        for linha in f:
+            if not linha.strip():
+                continue
+            artigo = json.loads(linha)
+            texto = artigo.get("text", "").strip()
+            if texto:
+                yield artigo["title"], texto
+
+
+class WikipediaOffline:
+    """Busca em um recorte local da Wikipedia, com os artigos compactados em disco."""
+
+    ARQUIVO_ARTIGOS = "artigos.bin"
+    ARQUIVO_INDICE = "indice.json.gz"
+
+    def __init__(self, diretorio, top_k_results=3, doc_content_chars_max=3000):
+        """
+        Args:
+            diretorio (str): Pasta com os artigos e o índice
+            top_k_results (int): Número máximo de artigos por resposta
+            doc_content_chars_max (int): Tamanho máximo da resposta, em caracteres
+        """
+        self.diretorio = diretorio
+        self.top_k_results = top_k_results
+        self.doc_content_chars_max = doc_content_chars_max
+        self.indice = IndiceBM25(tokenizador=tokenizar_busca)
+        self.artigos = []  # [título, início, tamanho] de cada artigo em ARQUIVO_ARTIGOS
+        self.titulos = {}  # título normalizado -> id do artigo
+
+    def __len__(self):
+        return len(self.artigos)
+
+    @classmethod
+    def construir(cls, caminho_dump, diretorio, max_artigos=None, **opcoes):
+        """
+        Indexa os artigos de um dump e salva os artigos e o índice na pasta.
+
+        Args:
+            caminho_dump (str): Dump no formato do WikiExtractor (ver ler_dump)
+            diretorio (str): Pasta de destino
+            max_artigos (int, opcional): Indexar só os primeiros artigos
+            **opcoes: top_k_results e doc_content_chars_max
+
+        Returns:
+            WikipediaOffline: Índice pronto para buscas
+        """
+        os.makedirs(diretorio, exist_ok=True)
+        wikipedia = cls(diretorio, **opcoes)
+        caminho_artigos = os.path.join(diretorio, cls.ARQUIVO_ARTIGOS)
+
+        # Gravar em arquivos temporários e trocar: um índice pela metade nunca é lido
+        with open(caminho_artigos + ".tmp", "wb") as saida:
+            for titulo, texto in ler_dump(caminho_dump):
+                if max_artigos is not None and len(wikipedia) >= max_artigos:
+                    break
+                compactado = zlib.compress(texto.encode("utf-8"), 6)
+                id_artigo = wikipedia.indice.adicionar(f"{titulo}\n{texto}")
+                wikipedia.artigos.append([titulo, saida.tell(), len(compactado)])
+                wikipedia.titulos.setdefault(normalizar_consulta(titulo), id_artigo)
+                saida.write(compactado)
+
+        estado = {
+            "versao": VERSAO_WIKIPEDIA,
+            "artigos": wikipedia.artigos,
+            "titulos": wikipedia.titulos,
+            "indice": wikipedia.indice.para_dict()
+        }
+        caminho_indice = os.path.join(diretorio, cls.ARQUIVO_INDICE)
+        with gzip.open(caminho_indice + ".tmp", "wb", compresslevel=6) as f:
+            f.write(json.dumps(estado, ensure_ascii=False).encode("utf-8"))
+        os.replace(caminho_artigos + ".tmp", caminho_artigos)
+        os.replace(caminho_indice + ".tmp", caminho_indice)
+        return wikipedia
+
+    @classmethod
+    def carregar(cls, diretorio, **opcoes):
+        """
+        Carrega um índice salvo com construir.
+
+        Args:
+            diretorio (str): Pasta com os artigos e o índice
+            **opcoes: top_k_results e doc_content_chars_max
+
+        Returns:
+            WikipediaOffline: Índice carregado, ou None se não existir ou for de outra versão
+        """
+        caminho_indice = os.path.join(diretorio, cls.ARQUIVO_INDICE)
+        if not os.path.exists(caminho_indice):
+            return None
+        with gzip.open(caminho_indice, "rt", encoding="utf-8") as f:
+            estado = json.load(f)
+        if estado.get("versao") != VERSAO_WIKIPEDIA:
+            return None
+
+        wikipedia = cls(diretorio, **opcoes)
+        wikipedia.indice = IndiceBM25.de_dict(estado["indice"], tokenizar_busca)
+        wikipedia.artigos = estado["artigos"]
+        wikipedia.titulos = estado["titulos"]
+        return wikipedia
+
+    @classmethod
+    def abrir(cls, diretorio, caminho_dump=None, **opcoes):
+        """
+        Carrega o índice da pasta ou, se ainda não existir, constrói a partir do dump.
+
+        Args:
+            diretorio (str): Pasta com os artigos e o índice
+            caminho_dump (str, opcional): Dump usado quando o índice não existe
+            **opcoes: top_k_results e doc_content_chars_max
+
+        Returns:
+            WikipediaOffline: Índice pronto para buscas
+
+        Raises:
+            FileNotFoundError: Se não houver índice na pasta nem dump para construí-lo
+        """
+        wikipedia = cls.carregar(diretorio, **opcoes)
+        if wikipedia is not None:
+            return wikipedia
+        if not caminho_dump:
+            raise FileNotFoundError(f"Nenhum índice da Wikipedia em '{diretorio}' e nenhum dump para construí-lo")
+        return cls.construir(caminho_dump, diretorio, **opcoes)
+
+    def texto(self, id_artigo):
+        """Lê e descompacta um artigo do disco."""
+        _, inicio, tamanho = self.artigos[id_artigo]
+        with open(os.path.join(self.diretorio, self.ARQUIVO_ARTIGOS), "rb") as f:
+            f.seek(inicio)
+            return zlib.decompress(f.read(tamanho)).decode("utf-8")
+
+    def buscar(self, consulta, k=None):
+        """
+        Busca os artigos mais relevantes: primeiro o de título igual à consulta, depois por BM25.
+
+        Args:
+            consulta (str): Texto da consulta
+            k (int, opcional): Número máximo de artigos (padrão: top_k_results)
+
+        Returns:
+            list: Dicionários com titulo e texto, do mais relevante para o menos
+        """
+        k = k or self.top_k_results
+        ids = []
+        id_titulo = self.titulos.get(normalizar_consulta(consulta))
+        if id_titulo is not None:
+            ids.append(id_titulo)
+        for id_artigo, _ in self.indice.buscar(consulta, k=k + 1):
+            if id_artigo not in ids:
+                ids.append(id_artigo)
+        return [{"titulo": self.artigos[id_artigo][0], "texto": self.texto(id_artigo)} for id_artigo in ids[:k]]
+
+    def run(self, consulta):
+        """
+        Busca no recorte local, com a resposta no mesmo formato do WikipediaQueryRun.
+
+        Args:
+            consulta (str): Texto da consulta
+
+        Returns:
+            str: Resumo dos artigos encontrados
+        """
+        artigos = self.buscar(consulta)
+        if not artigos:
+            return SEM_RESULTADOS
+        resposta = "\n\n".join(f"Page: {artigo['titulo']}\nSummary: {artigo['texto']}" for artigo in artigos)
+        return resposta[:self.doc_content_chars_max]
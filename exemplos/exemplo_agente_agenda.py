@@ -13,7 +13,7 @@ import datetime
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Optional
 from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import initialize_agent, Tool, AgentType
 
 # Adicionar o diretório raiz ao path para importar módulos personalizados
@@ -21,6 +21,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Importar a integração com o Google Calendar
 from integracao.google_calendar import GoogleCalendarIntegration
+from componentes.memoria_conversa import GerenciadorSessoes, MemoriaConversa, criar_resumidor
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -28,6 +29,12 @@ load_dotenv()
 # Configuração do modelo de linguagem
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Memória da conversa: até MEMORIA_MAX_TOKENS no prompt (mensagens antigas viram
+# um resumo), uma sessão por usuário, descartada após MEMORIA_TTL_MINUTOS sem uso
+MEMORIA_MAX_TOKENS = int(os.getenv("MEMORIA_MAX_TOKENS", "1200"))
+MEMORIA_MAX_SESSOES = int(os.getenv("MEMORIA_MAX_SESSOES", "1000"))
+MEMORIA_TTL_MINUTOS = float(os.getenv("MEMORIA_TTL_MINUTOS", "60"))
+
 class AgenteAgenda:
     """
     Agente de IA para gerenciar a agenda usando o Google Calendar.
@@ -52,11 +59,20 @@ class AgenteAgenda:
         # Configurar as ferramentas (tools) disponíveis para o agente
         self.tools = self._configurar_ferramentas()
         
-        # Inicializar o agente
+        # Memória de cada usuário, com tamanho limitado no prompt
+        resumir = criar_resumidor(self.llm)
+        self.sessoes = GerenciadorSessoes(
+            lambda: MemoriaConversa(MEMORIA_MAX_TOKENS, resumir=resumir),
+            max_sessoes=MEMORIA_MAX_SESSOES,
+            ttl_segundos=MEMORIA_TTL_MINUTOS * 60
+        )
+        
+        # Inicializar o agente (o histórico entra no prompt antes da consulta)
         self.agente = initialize_agent(
             tools=self.tools,
             llm=self.llm,
             agent=AgentType.OPENAI_FUNCTIONS,
+            agent_kwargs={"extra_prompt_messages": [MessagesPlaceholder(variable_name="historico")]},
             verbose=True
         )
     
@@ -367,13 +383,23 @@ class AgenteAgenda:
         except Exception as e:
             return f"Erro ao analisar disponibilidade: {str(e)}"
     
-    def executar(self, consulta: str) -> str:
-        """Executa uma consulta no agente de agenda."""
+    def executar(self, consulta: str, id_usuario: str = "padrao") -> str:
+        """
+        Executa uma consulta no agente de agenda.
+        
+        Args:
+            consulta: Pedido do usuário
+            id_usuario: Identifica a sessão (cada usuário tem seu próprio histórico)
+        """
+        memoria = self.sessoes.obter(id_usuario)
         try:
-            resposta = self.agente.run(consulta)
-            return resposta
+            resultado = self.agente.invoke({"input": consulta, "historico": memoria.mensagens()})
+            resposta = resultado["output"]
         except Exception as e:
             return f"Erro ao processar sua solicitação: {str(e)}"
+        
+        memoria.adicionar_turno(consulta, resposta)
+        return resposta
 
 def interface_usuario():
     """Interface simples para interagir com o agente de agenda."""
@@ -7,16 +7,35 @@
 # ====================================================================
 
 # Importamos as bibliotecas necessárias
+import io
+import json
 import os
+import sys
+import numpy as np  # Para cálculos vetorizados
 import pandas as pd  # Para manipular dados em formato de tabela
-import matplotlib.pyplot as plt  # Para criar gráficos
-import seaborn as sns  # Para gráficos mais bonitos
 from dotenv import load_dotenv  # Para carregar as variáveis de ambiente
-from langchain_openai import ChatOpenAI  # Modelo de linguagem para análise
 from langchain.prompts import ChatPromptTemplate  # Para criar prompts estruturados
 
-# Configurar visual dos gráficos
-sns.set_theme(style="whitegrid")
+# pyarrow lê CSV, Parquet e Arrow muito mais rápido, em blocos (opcional para CSV)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pa_parquet
+except ImportError:
+    pa = None
+
+# Adicionar o diretório raiz ao path para importar módulos personalizados
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.cache_disco import CacheDisco
+from componentes.consumo_tokens import invocar_com_orcamento, pedido
+from componentes.estatisticas_incrementais import AgregadosPorCategoria, EstatisticasIncrementais
+from componentes.graficos import RenderizadorGraficos  # Gráficos em paralelo, sem janela e com cache
+from componentes.perfil_dados import PerfilDados
+from componentes.rastreamento import criar_callback_llm
+from componentes.roteamento_modelos import RoteadorModelos, validar_texto
+from componentes.texto import hash_conteudo
 
 # Carregar configurações do arquivo .env
 load_dotenv()
@@ -24,6 +43,34 @@ load_dotenv()
 # Chaves de API (nunca compartilhe estas chaves!)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Arquivos grandes são lidos em blocos de linhas, sem carregar tudo na memória.
+# Os tipos das colunas são deduzidos de uma amostra do início do arquivo.
+ANALISE_LINHAS_POR_BLOCO = int(os.getenv("ANALISE_LINHAS_POR_BLOCO", "100000"))
+ANALISE_LINHAS_AMOSTRA = int(os.getenv("ANALISE_LINHAS_AMOSTRA", "10000"))
+
+# Colunas de texto com poucos valores distintos (ex.: região) viram "category",
+# que guarda cada valor uma única vez e ocupa bem menos memória
+PROPORCAO_MAXIMA_CATEGORIAS = 0.5
+
+# Gráficos: no máximo ANALISE_MAX_GRAFICOS (os mais informativos primeiro),
+# desenhados em paralelo. Gráficos cujos dados não mudaram vêm do cache.
+# Defina ANALISE_CACHE_GRAFICOS vazio para desativar o cache.
+ANALISE_MAX_GRAFICOS = int(os.getenv("ANALISE_MAX_GRAFICOS", "12"))
+ANALISE_PROCESSOS_GRAFICOS = int(os.getenv("ANALISE_PROCESSOS_GRAFICOS", "0")) or None
+ANALISE_CACHE_GRAFICOS = os.getenv("ANALISE_CACHE_GRAFICOS", ".cache_graficos")
+ANALISE_CACHE_MAX_MB = int(os.getenv("ANALISE_CACHE_MAX_MB", "100"))
+cache_graficos = CacheDisco(ANALISE_CACHE_GRAFICOS, ANALISE_CACHE_MAX_MB * 1024 * 1024) if ANALISE_CACHE_GRAFICOS else None
+renderizador = RenderizadorGraficos(cache_graficos, ANALISE_PROCESSOS_GRAFICOS)
+
+# Modo incremental: para CSVs que só recebem linhas novas no final, o estado
+# da análise (perfil, somas por categoria e posição já lida) fica salvo em
+# ANALISE_ESTADO_DIRETORIO e cada execução lê apenas as linhas acrescentadas
+ANALISE_INCREMENTAL = os.getenv("ANALISE_INCREMENTAL", "false").lower() == "true"
+ANALISE_ESTADO_DIRETORIO = os.getenv("ANALISE_ESTADO_DIRETORIO", ".estado_analise")
+
+# Mudar este número descarta os estados salvos (ex.: quando o formato mudar)
+VERSAO_ESTADO = 3
+
 # ====================================================================
 # PARTE 1: DADOS DE EXEMPLO
 # ====================================================================
@@ -50,7 +97,251 @@ df_vendas.to_csv("vendas_temp.csv", index=False)
 print(f"📊 Dados de exemplo criados e salvos em vendas_temp.csv")
 
 # ====================================================================
-# PARTE 2: FUNÇÕES DE ANÁLISE BÁSICA
+# PARTE 2: CARREGAMENTO DOS DADOS EM BLOCOS
+# ====================================================================
+# Exportações de vendas podem ter vários GB. Em vez de ler o arquivo
+# inteiro de uma vez, lemos blocos de linhas com tipos já definidos:
+# números como float64 e textos repetitivos como "category".
+# Com pyarrow, os arquivos são mapeados em memória: o sistema operacional
+# carrega só as partes lidas, sem cópias intermediárias.
+# ====================================================================
+
+def inferir_tipos(amostra):
+    """
+    Define o tipo de cada coluna a partir de uma amostra das linhas.
+    
+    Args:
+        amostra (DataFrame): Primeiras linhas do arquivo
+        
+    Returns:
+        dict: Coluna -> tipo ('float64', 'category' ou 'object')
+    """
+    tipos = {}
+    for coluna in amostra.columns:
+        serie = amostra[coluna]
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            # float64 aceita valores ausentes em qualquer bloco (int64 não aceita)
+            tipos[coluna] = "float64"
+        elif serie.nunique() <= PROPORCAO_MAXIMA_CATEGORIAS * max(len(serie), 1):
+            tipos[coluna] = "category"
+        else:
+            tipos[coluna] = "object"
+    return tipos
+
+class _TrechoArquivo(io.RawIOBase):
+    """Arquivo aberto para leitura apenas dos bytes entre duas posições."""
+    
+    def __init__(self, caminho_arquivo, inicio, fim):
+        self._arquivo = open(caminho_arquivo, "rb")
+        self._arquivo.seek(inicio)
+        self._restante = fim - inicio
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        lidos = self._arquivo.readinto(memoryview(buffer)[:max(self._restante, 0)])
+        self._restante -= lidos
+        return lidos
+    
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+def _blocos_csv(caminho_arquivo, tipos, linhas_por_bloco, trecho=None):
+    """
+    Lê um CSV em blocos (com pyarrow, se disponível).
+    
+    Com trecho=(inicio, fim), lê só as linhas entre essas posições em bytes
+    (sem o cabeçalho, cujas colunas são as chaves de tipos).
+    """
+    fonte, colunas = caminho_arquivo, None
+    if trecho is None and pa is not None:
+        fonte = pa.memory_map(caminho_arquivo)
+    elif trecho is not None:
+        fonte, colunas = io.BufferedReader(_TrechoArquivo(caminho_arquivo, *trecho)), list(tipos)
+    
+    if pa is None:
+        with pd.read_csv(fonte, dtype=tipos, chunksize=linhas_por_bloco,
+                         header=None if colunas else "infer", names=colunas) as leitor:
+            yield from leitor
+        return
+    
+    # O pyarrow lê blocos por tamanho em bytes: estimamos os bytes por linha pela amostra
+    amostra = pd.read_csv(caminho_arquivo, nrows=1000)
+    bytes_por_linha = max(1, len(amostra.to_csv(index=False).encode("utf-8")) // max(len(amostra), 1))
+    
+    tipos_arrow = {
+        coluna: pa.float64() if tipo == "float64"
+        else pa.dictionary(pa.int32(), pa.string()) if tipo == "category"
+        else pa.string()
+        for coluna, tipo in tipos.items()
+    }
+    leitor = pa_csv.open_csv(
+        fonte,
+        read_options=pa_csv.ReadOptions(block_size=max(1 << 20, linhas_por_bloco * bytes_por_linha),
+                                        column_names=colunas),
+        convert_options=pa_csv.ConvertOptions(column_types=tipos_arrow)
+    )
+    for lote in leitor:
+        yield lote.to_pandas()
+
+def _categorizar(bloco):
+    """Converte os textos repetitivos de um bloco para "category", como na leitura de CSV."""
+    tipos = inferir_tipos(bloco)
+    return bloco.astype({coluna: tipo for coluna, tipo in tipos.items()
+                         if tipo == "category" and not isinstance(bloco[coluna].dtype, pd.CategoricalDtype)})
+
+def _blocos_parquet(caminho_arquivo, linhas_por_bloco):
+    """Lê um arquivo Parquet em blocos (requer pyarrow)."""
+    if pa is None:
+        raise ImportError("Para ler arquivos Parquet, instale o pyarrow: pip install pyarrow")
+    
+    for lote in pa_parquet.ParquetFile(caminho_arquivo, memory_map=True).iter_batches(batch_size=linhas_por_bloco):
+        yield _categorizar(lote.to_pandas())
+
+def _blocos_arrow(caminho_arquivo, linhas_por_bloco):
+    """Lê um arquivo Arrow/Feather em blocos, mapeado em memória (requer pyarrow)."""
+    if pa is None:
+        raise ImportError("Para ler arquivos Arrow/Feather, instale o pyarrow: pip install pyarrow")
+    
+    # Sem compressão, a tabela mapeada não ocupa memória: só cada bloco convertido para pandas
+    with pa.memory_map(caminho_arquivo) as mapa:
+        tabela = pa_ipc.open_file(mapa).read_all()
+        for lote in tabela.to_batches(max_chunksize=linhas_por_bloco):
+            yield _categorizar(lote.to_pandas())
+
+def carregar_em_blocos(caminho_arquivo, tipos=None, linhas_por_bloco=ANALISE_LINHAS_POR_BLOCO):
+    """
+    Lê um arquivo de dados em blocos de linhas.
+    
+    Args:
+        caminho_arquivo (str): Caminho para arquivo CSV, Parquet, Arrow/Feather ou Excel
+        tipos (dict, opcional): Tipos das colunas (padrão: deduzidos de uma amostra)
+        linhas_por_bloco (int): Quantidade aproximada de linhas por bloco
+        
+    Yields:
+        DataFrame: Blocos de linhas do arquivo, em ordem
+    """
+    extensao = os.path.splitext(caminho_arquivo)[1].lower()
+    
+    if extensao == '.csv':
+        if tipos is None:
+            tipos = inferir_tipos(pd.read_csv(caminho_arquivo, nrows=ANALISE_LINHAS_AMOSTRA))
+        yield from _blocos_csv(caminho_arquivo, tipos, linhas_por_bloco)
+    elif extensao == '.parquet':
+        yield from _blocos_parquet(caminho_arquivo, linhas_por_bloco)
+    elif extensao in ('.arrow', '.feather'):
+        yield from _blocos_arrow(caminho_arquivo, linhas_por_bloco)
+    elif extensao in ('.xls', '.xlsx'):
+        # Planilhas do Excel não podem ser lidas em partes: lemos de uma vez
+        dados = pd.read_excel(caminho_arquivo)
+        yield dados.astype(tipos or inferir_tipos(dados))
+    else:
+        raise ValueError("Formato de arquivo não suportado. Use CSV, Parquet, Arrow/Feather ou Excel.")
+
+def _fim_linhas_completas(caminho_arquivo):
+    """Posição logo após a última quebra de linha (ignora uma linha ainda sendo escrita)."""
+    with open(caminho_arquivo, "rb") as f:
+        fim = f.seek(0, os.SEEK_END)
+        while fim > 0:
+            inicio = max(0, fim - 65536)
+            f.seek(inicio)
+            quebra = f.read(fim - inicio).rfind(b"\n")
+            if quebra >= 0:
+                return inicio + quebra + 1
+            fim = inicio
+    return 0
+
+def _assinatura_arquivo(caminho_arquivo, posicao):
+    """Hash do início do arquivo e do fim do trecho já lido, para saber se ele foi reescrito."""
+    with open(caminho_arquivo, "rb") as f:
+        inicio = f.read(min(posicao, 65536))
+        f.seek(max(0, posicao - 4096))
+        fim = f.read(min(posicao, 4096))
+    return hash_conteudo(inicio.hex(), fim.hex())
+
+def _caminho_estado(caminho_arquivo):
+    """Arquivo onde fica o estado da análise incremental de um arquivo de dados."""
+    nome = hash_conteudo("estado", os.path.abspath(caminho_arquivo))[:32]
+    return os.path.join(ANALISE_ESTADO_DIRETORIO, f"{nome}.json")
+
+def carregar_estado(caminho_arquivo):
+    """
+    Carrega o estado salvo da análise de um CSV, se ainda valer para o arquivo atual.
+    
+    Args:
+        caminho_arquivo (str): Caminho do CSV analisado
+        
+    Returns:
+        dict: Estado salvo, ou None se não houver (ou se o arquivo foi reescrito)
+    """
+    caminho_estado = _caminho_estado(caminho_arquivo)
+    if not os.path.exists(caminho_estado):
+        return None
+    
+    with open(caminho_estado, encoding="utf-8") as f:
+        estado = json.load(f)
+    
+    # Só vale se o arquivo apenas cresceu: mesmo início e mesmo trecho já lido
+    if (estado.get("versao") != VERSAO_ESTADO
+            or os.path.getsize(caminho_arquivo) < estado["posicao"]
+            or _assinatura_arquivo(caminho_arquivo, estado["posicao"]) != estado["assinatura"]):
+        print("ℹ️ O arquivo foi alterado além do acréscimo de linhas: a análise será refeita do início")
+        return None
+    
+    estado["perfil"] = PerfilDados.de_dict(estado["perfil"])
+    estado["agregados"] = AgregadosPorCategoria.de_dict(estado["agregados"])
+    return estado
+
+def salvar_estado(caminho_arquivo, estado):
+    """
+    Salva o estado da análise incremental de um CSV.
+    
+    Args:
+        caminho_arquivo (str): Caminho do CSV analisado
+        estado (dict): Tipos, posição lida, perfil, agregados e insights
+    """
+    caminho_estado = _caminho_estado(caminho_arquivo)
+    os.makedirs(ANALISE_ESTADO_DIRETORIO, exist_ok=True)
+    
+    conteudo = dict(estado,
+                    versao=VERSAO_ESTADO,
+                    assinatura=_assinatura_arquivo(caminho_arquivo, estado["posicao"]),
+                    perfil=estado["perfil"].para_dict(),
+                    agregados=estado["agregados"].para_dict())
+    
+    # Gravar em um arquivo temporário e trocar: um estado pela metade nunca é lido
+    temporario = caminho_estado + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, ensure_ascii=False)
+    os.replace(temporario, caminho_estado)
+
+def carregar_linhas_novas(caminho_arquivo, estado=None, linhas_por_bloco=ANALISE_LINHAS_POR_BLOCO):
+    """
+    Lê, em blocos, só as linhas do CSV que ainda não foram analisadas.
+    
+    Args:
+        caminho_arquivo (str): Caminho do CSV
+        estado (dict, opcional): Estado salvo (sem ele, lê todas as linhas)
+        linhas_por_bloco (int): Quantidade aproximada de linhas por bloco
+        
+    Returns:
+        tuple: (tipos das colunas, posição final em bytes, gerador de blocos)
+    """
+    if estado is None:
+        tipos = inferir_tipos(pd.read_csv(caminho_arquivo, nrows=ANALISE_LINHAS_AMOSTRA))
+        with open(caminho_arquivo, "rb") as f:
+            inicio = len(f.readline())  # As linhas começam depois do cabeçalho
+    else:
+        tipos, inicio = estado["tipos"], estado["posicao"]
+    
+    fim = max(inicio, _fim_linhas_completas(caminho_arquivo))
+    blocos = _blocos_csv(caminho_arquivo, tipos, linhas_por_bloco, trecho=(inicio, fim)) if fim > inicio else iter(())
+    return tipos, fim, blocos
+
+# ====================================================================
+# PARTE 3: FUNÇÕES DE ANÁLISE BÁSICA
 # ====================================================================
 # Estas funções realizam análises básicas nos dados:
 # - Resumo estatístico
@@ -62,112 +353,226 @@ def resumo_estatistico(dados):
     """
     Gera um resumo estatístico básico dos dados.
     
+    As estatísticas são calculadas bloco a bloco (média e variância
+    acumuladas, quartis por um esboço de quantis), então funciona também
+    com arquivos que não cabem na memória.
+    
     Args:
-        dados (DataFrame): Dados a serem analisados
+        dados (DataFrame ou iterable): Dados a serem analisados, ou blocos de linhas
     
     Returns:
-        DataFrame: Resumo estatístico
+        DataFrame: Resumo estatístico (no formato do describe do pandas)
     """
-    # Selecionar apenas colunas numéricas
-    colunas_numericas = dados.select_dtypes(include=['int64', 'float64']).columns
+    if isinstance(dados, pd.DataFrame):
+        dados = [dados]
     
-    # Calcular estatísticas básicas
-    resumo = dados[colunas_numericas].describe()
+    estatisticas = EstatisticasIncrementais()
+    for bloco in dados:
+        estatisticas.atualizar(bloco)
     
-    return resumo
+    return estatisticas.resumo()
 
-def visualizar_tendencia(dados, coluna_x, coluna_y, titulo=None):
+def especificacao_tendencia(dados, coluna_x, coluna_y, titulo=None):
     """
-    Cria um gráfico de linha para visualizar tendências ao longo do tempo.
+    Descreve um gráfico de linha de tendência (média de Y para cada valor de X).
     
     Args:
-        dados (DataFrame): Dados a serem visualizados
+        dados (DataFrame ou AgregadosPorCategoria): Dados a serem visualizados, ou as somas por categoria
         coluna_x (str): Nome da coluna para o eixo X (geralmente tempo)
         coluna_y (str): Nome da coluna para o eixo Y (métrica de interesse)
         titulo (str, opcional): Título do gráfico
+        
+    Returns:
+        dict: Especificação do gráfico (com os valores já agregados)
     """
-    plt.figure(figsize=(10, 6))
-    sns.lineplot(data=dados, x=coluna_x, y=coluna_y, marker='o', linewidth=2)
-    
-    if not titulo:
-        titulo = f"{coluna_y} por {coluna_x}"
-    
-    plt.title(titulo, fontsize=16)
-    plt.xlabel(coluna_x, fontsize=12)
-    plt.ylabel(coluna_y, fontsize=12)
-    plt.tight_layout()
-    
-    # Salvar o gráfico
-    nome_arquivo = f"tendencia_{coluna_y}_por_{coluna_x}.png".replace(" ", "_").lower()
-    plt.savefig(nome_arquivo)
-    plt.close()
-    
-    print(f"📈 Gráfico de tendência salvo como {nome_arquivo}")
-    return nome_arquivo
+    # Os valores são agregados antes de desenhar: o gráfico recebe poucos pontos,
+    # não a tabela inteira, e X fica na ordem em que aparece nos dados
+    if isinstance(dados, AgregadosPorCategoria):
+        medias = dados.media(coluna_x, coluna_y)
+    else:
+        medias = dados.groupby(coluna_x, observed=True, sort=False)[coluna_y].mean()
+    return {
+        "tipo": "tendencia",
+        "x": coluna_x,
+        "y": coluna_y,
+        "titulo": titulo or f"{coluna_y} por {coluna_x}",
+        "categorias": [str(categoria) for categoria in medias.index],
+        "valores": medias.tolist(),
+        "nome_arquivo": f"tendencia_{coluna_y}_por_{coluna_x}.png".replace(" ", "_").lower()
+    }
 
-def comparar_categorias(dados, coluna_categoria, coluna_valor, tipo='barras', titulo=None):
+def especificacao_comparacao(dados, coluna_categoria, coluna_valor, tipo='barras', titulo=None):
     """
-    Cria um gráfico para comparar valores entre diferentes categorias.
+    Descreve um gráfico de comparação de valores entre categorias.
     
     Args:
-        dados (DataFrame): Dados a serem visualizados
+        dados (DataFrame ou AgregadosPorCategoria): Dados a serem visualizados, ou as somas por categoria
         coluna_categoria (str): Nome da coluna com as categorias
         coluna_valor (str): Nome da coluna com os valores a comparar
         tipo (str): Tipo de gráfico ('barras' ou 'pizza')
         titulo (str, opcional): Título do gráfico
+        
+    Returns:
+        dict: Especificação do gráfico (com os totais por categoria)
     """
-    plt.figure(figsize=(10, 6))
+    if isinstance(dados, AgregadosPorCategoria):
+        totais = dados.total(coluna_categoria, coluna_valor).sort_index(key=lambda indice: indice.astype(str))
+    else:
+        totais = dados.groupby(coluna_categoria, observed=True)[coluna_valor].sum()
     
-    if tipo == 'barras':
-        resumo = dados.groupby(coluna_categoria)[coluna_valor].sum().reset_index()
-        sns.barplot(data=resumo, x=coluna_categoria, y=coluna_valor)
+    if not titulo:
+        titulo = (f"{coluna_valor} por {coluna_categoria}" if tipo == 'barras'
+                  else f"Distribuição de {coluna_valor} por {coluna_categoria}")
+    
+    return {
+        "tipo": tipo,
+        "x": coluna_categoria,
+        "y": coluna_valor,
+        "titulo": titulo,
+        "categorias": [str(categoria) for categoria in totais.index],
+        "valores": totais.tolist(),
+        "nome_arquivo": f"comparacao_{coluna_valor}_por_{coluna_categoria}_{tipo}.png".replace(" ", "_").lower()
+    }
+
+def informatividade(especificacao):
+    """
+    Pontua o quanto um gráfico tem a mostrar: linhas retas ou barras
+    iguais dizem pouco, e gráficos com categorias demais ficam ilegíveis.
+    
+    Args:
+        especificacao (dict): Especificação do gráfico
         
-        if not titulo:
-            titulo = f"{coluna_valor} por {coluna_categoria}"
-            
-        plt.title(titulo, fontsize=16)
-        plt.xlabel(coluna_categoria, fontsize=12)
-        plt.ylabel(coluna_valor, fontsize=12)
+    Returns:
+        float: Pontuação (maior = mais informativo)
+    """
+    valores = np.asarray(especificacao["valores"], dtype=float)
+    valores = valores[~np.isnan(valores)]
+    if valores.size < 2:
+        return 0.0
+    
+    # Coeficiente de variação: o quanto os valores desenhados variam entre si
+    media = abs(valores.mean())
+    pontuacao = valores.std() / media if media else valores.std()
+    if valores.size > 30:
+        pontuacao *= 30 / valores.size
+    return float(pontuacao)
+
+def priorizar_graficos(especificacoes, max_graficos=ANALISE_MAX_GRAFICOS):
+    """
+    Mantém apenas os gráficos mais informativos (na ordem original).
+    
+    Args:
+        especificacoes (list): Especificações dos gráficos
+        max_graficos (int): Número máximo de gráficos
         
-    elif tipo == 'pizza':
-        resumo = dados.groupby(coluna_categoria)[coluna_valor].sum()
-        plt.pie(resumo, labels=resumo.index, autopct='%1.1f%%', startangle=90)
+    Returns:
+        list: Especificações escolhidas
+    """
+    if len(especificacoes) <= max_graficos:
+        return especificacoes
+    
+    ordem = sorted(range(len(especificacoes)), key=lambda i: -informatividade(especificacoes[i]))
+    escolhidas = sorted(ordem[:max_graficos])
+    return [especificacoes[i] for i in escolhidas]
+
+def renderizar_graficos(especificacoes):
+    """
+    Desenha e salva os gráficos (em paralelo, reaproveitando o cache).
+    
+    Args:
+        especificacoes (list): Especificações dos gráficos
         
-        if not titulo:
-            titulo = f"Distribuição de {coluna_valor} por {coluna_categoria}"
-            
-        plt.title(titulo, fontsize=16)
-        plt.axis('equal')  # Para garantir que o gráfico seja circular
+    Returns:
+        list: Nomes dos arquivos gerados
+    """
+    arquivos = []
+    for especificacao, (_, do_cache) in zip(especificacoes, renderizador.renderizar(especificacoes)):
+        icone, descricao = ("📈", "tendência") if especificacao["tipo"] == "tendencia" else ("📊", "comparação")
+        print(f"{icone} Gráfico de {descricao} salvo como {especificacao['nome_arquivo']}" + (" (cache)" if do_cache else ""))
+        arquivos.append(especificacao["nome_arquivo"])
+    return arquivos
+
+def graficos_da_analise(dados, colunas_numericas, colunas_categoricas, tendencias=True):
+    """
+    Descreve, prioriza e desenha os gráficos de tendência e de comparação.
+    
+    Args:
+        dados (DataFrame ou AgregadosPorCategoria): Dados analisados, ou as somas por categoria
+        colunas_numericas (list): Colunas com os valores
+        colunas_categoricas (list): Colunas com as categorias (a primeira é tratada como temporal)
+        tendencias (bool): Incluir os gráficos de tendência (exigem mais de uma linha)
+        
+    Returns:
+        list: Nomes dos arquivos gerados
+    """
+    # Descrever as visualizações de tendência
+    especificacoes = []
+    if tendencias and len(colunas_numericas) > 0 and len(colunas_categoricas) > 0:
+        for coluna_y in colunas_numericas:
+            coluna_x = colunas_categoricas[0]  # Assumimos a primeira coluna categórica como temporal
+            especificacoes.append(especificacao_tendencia(dados, coluna_x, coluna_y))
     
-    plt.tight_layout()
+    # Descrever as visualizações de comparação
+    if len(colunas_categoricas) > 0 and len(colunas_numericas) > 0:
+        for coluna_categoria in colunas_categoricas:
+            for coluna_valor in colunas_numericas:
+                especificacoes.append(especificacao_comparacao(dados, coluna_categoria, coluna_valor, 'barras'))
     
-    # Salvar o gráfico
-    nome_arquivo = f"comparacao_{coluna_valor}_por_{coluna_categoria}_{tipo}.png".replace(" ", "_").lower()
-    plt.savefig(nome_arquivo)
-    plt.close()
+    # Desenhar só os mais informativos, todos de uma vez (em paralelo)
+    escolhidas = priorizar_graficos(especificacoes)
+    if len(escolhidas) < len(especificacoes):
+        print(f"ℹ️ {len(especificacoes) - len(escolhidas)} gráfico(s) menos informativo(s) omitido(s) "
+              f"(limite: {ANALISE_MAX_GRAFICOS})")
+    return renderizar_graficos(escolhidas)
+
+def visualizar_tendencia(dados, coluna_x, coluna_y, titulo=None):
+    """
+    Cria um gráfico de linha para visualizar tendências ao longo do tempo.
+    
+    Args:
+        dados (DataFrame ou AgregadosPorCategoria): Dados a serem visualizados, ou as somas por categoria
+        coluna_x (str): Nome da coluna para o eixo X (geralmente tempo)
+        coluna_y (str): Nome da coluna para o eixo Y (métrica de interesse)
+        titulo (str, opcional): Título do gráfico
+    """
+    return renderizar_graficos([especificacao_tendencia(dados, coluna_x, coluna_y, titulo)])[0]
+
+def comparar_categorias(dados, coluna_categoria, coluna_valor, tipo='barras', titulo=None):
+    """
+    Cria um gráfico para comparar valores entre diferentes categorias.
     
-    print(f"📊 Gráfico de comparação salvo como {nome_arquivo}")
-    return nome_arquivo
+    Args:
+        dados (DataFrame ou AgregadosPorCategoria): Dados a serem visualizados, ou as somas por categoria
+        coluna_categoria (str): Nome da coluna com as categorias
+        coluna_valor (str): Nome da coluna com os valores a comparar
+        tipo (str): Tipo de gráfico ('barras' ou 'pizza')
+        titulo (str, opcional): Título do gráfico
+    """
+    return renderizar_graficos([especificacao_comparacao(dados, coluna_categoria, coluna_valor, tipo, titulo)])[0]
 
 # ====================================================================
-# PARTE 3: AGENTE DE ANÁLISE COM IA
+# PARTE 4: AGENTE DE ANÁLISE COM IA
 # ====================================================================
 # Este componente usa IA para interpretar dados e sugerir insights.
 # ====================================================================
 
-# Inicializar o modelo de linguagem
-modelo = ChatOpenAI(openai_api_key=OPENAI_API_KEY, model_name="gpt-3.5-turbo")
+# Modelo dos insights (MODELO_TAREFA_INSIGHTS no .env; padrão: gpt-3.5-turbo).
+# Se o primeiro nível falhar ou responder vazio, o próximo é tentado.
+roteador = RoteadorModelos.de_variaveis(os.environ, temperatura=0.7, api_key=OPENAI_API_KEY)
 
-# Template para o prompt de análise
+# Mede cada chamada ao LLM (latência e tokens)
+callback_llm = criar_callback_llm()
+
+# Template para o prompt de análise.
+# Em vez da tabela inteira, o modelo recebe um perfil compacto dos dados
+# (estatísticas, categorias mais frequentes, tendências, valores atípicos e
+# uma amostra de linhas): o prompt tem o mesmo tamanho com 10 ou 10 milhões de linhas.
 template_analise = """
 Você é um analista de dados especializado em extrair insights de métricas de negócios.
-Analise os seguintes dados e ofereça 3-5 insights relevantes e práticos.
-
-Dados:
-{dados}
+Analise o perfil dos dados abaixo e ofereça 3-5 insights relevantes e práticos.
 
-Estatísticas básicas:
-{estatisticas}
+Perfil dos dados (calculado sobre todas as linhas):
+{perfil}
 
 Forneça apenas os insights mais importantes, em linguagem simples e direta.
 Foque em tendências, anomalias e oportunidades que você identifica nos dados.
@@ -175,97 +580,158 @@ Foque em tendências, anomalias e oportunidades que você identifica nos dados.
 
 prompt_analise = ChatPromptTemplate.from_template(template_analise)
 
+def perfilar_dados(dados):
+    """
+    Calcula o perfil compacto dos dados.
+    
+    Args:
+        dados (DataFrame ou iterable): Dados a serem analisados, ou blocos de linhas
+        
+    Returns:
+        PerfilDados: Perfil com estatísticas, categorias, tendências, atípicos e amostra
+    """
+    if isinstance(dados, pd.DataFrame):
+        dados = [dados]
+    
+    perfil = PerfilDados()
+    for bloco in dados:
+        perfil.atualizar(bloco)
+    
+    return perfil
+
 def gerar_insights(dados):
     """
     Usa IA para gerar insights a partir dos dados.
     
     Args:
-        dados (DataFrame): Dados para análise
+        dados (DataFrame ou PerfilDados): Dados para análise, ou o perfil já calculado
         
     Returns:
         str: Insights gerados pela IA
     """
-    # Obter estatísticas básicas
-    estatisticas = resumo_estatistico(dados)
+    # Obter o perfil compacto dos dados
+    perfil = dados if isinstance(dados, PerfilDados) else perfilar_dados(dados)
     
-    # Preparar o prompt
-    mensagens = prompt_analise.format_messages(
-        dados=dados.to_string(),
-        estatisticas=estatisticas.to_string()
-    )
-    
-    # Gerar insights
-    resposta = modelo.invoke(mensagens)
+    # Gerar insights (o consumo de tokens é registrado em um pedido do agente de análise)
+    with pedido(agente="analise_dados"):
+        resposta = roteador.executar(
+            "insights",
+            lambda llm: invocar_com_orcamento(llm, prompt_analise, {"perfil": perfil.texto()}, campo_contexto="perfil",
+                                              config={"callbacks": [callback_llm]}),
+            validar=validar_texto()
+        )
     
     return resposta.content
 
 # ====================================================================
-# PARTE 4: FUNÇÃO PRINCIPAL DO AGENTE
+# PARTE 5: FUNÇÃO PRINCIPAL DO AGENTE
 # ====================================================================
 # Esta função orquestra todo o processo de análise.
 # ====================================================================
 
-def analisar_dados(caminho_arquivo=None, df=None):
+def analisar_dados(caminho_arquivo=None, df=None, incremental=ANALISE_INCREMENTAL):
     """
     Função principal que realiza a análise completa dos dados.
     
     Args:
-        caminho_arquivo (str, opcional): Caminho para arquivo CSV/Excel
+        caminho_arquivo (str, opcional): Caminho para arquivo CSV, Parquet, Arrow/Feather ou Excel
         df (DataFrame, opcional): DataFrame já carregado
+        incremental (bool): Para CSVs, reaproveitar a análise anterior e ler só as linhas novas
         
     Returns:
         dict: Resultados da análise, incluindo caminhos dos gráficos
     """
-    # Carregar dados se um caminho de arquivo for fornecido
-    if caminho_arquivo:
-        if caminho_arquivo.endswith('.csv'):
-            df = pd.read_csv(caminho_arquivo)
-        elif caminho_arquivo.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(caminho_arquivo)
-        else:
-            raise ValueError("Formato de arquivo não suportado. Use CSV ou Excel.")
-    
-    # Usar o DataFrame fornecido ou os dados de exemplo
-    if df is None:
+    # Usar os dados de exemplo se nada for fornecido
+    if caminho_arquivo is None and df is None:
         if os.path.exists("vendas_temp.csv"):
-            df = pd.read_csv("vendas_temp.csv")
+            caminho_arquivo = "vendas_temp.csv"
         else:
             raise ValueError("Nenhum dado fornecido para análise.")
     
-    print(f"📊 Analisando dados com {len(df)} linhas e {len(df.columns)} colunas.")
+    if incremental and caminho_arquivo:
+        if os.path.splitext(caminho_arquivo)[1].lower() == '.csv':
+            return analisar_incremental(caminho_arquivo)
+        print("ℹ️ O modo incremental só vale para CSV: o arquivo será analisado por inteiro.")
     
-    # Identificar colunas numéricas e categóricas
-    colunas_numericas = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-    colunas_categoricas = df.select_dtypes(include=['object']).columns.tolist()
+    # Uma única leitura do arquivo, em blocos: cada bloco atualiza o perfil (e o
+    # resumo estatístico) e as somas de todos os pares categoria x valor.
+    # A tabela inteira nunca fica em memória.
+    perfil, agregados = PerfilDados(), AgregadosPorCategoria()
+    for bloco in (carregar_em_blocos(caminho_arquivo) if caminho_arquivo else [df]):
+        perfil.atualizar(bloco)
+        agregados.atualizar(bloco)
+    
+    print(f"📊 Analisando dados com {perfil.linhas} linhas e {len(perfil.colunas)} colunas.")
     
     # Coletar resultados
     resultados = {
-        'resumo': resumo_estatistico(df),
+        'resumo': perfil.estatisticas.resumo(),
         'graficos': [],
         'insights': None
     }
     
-    # Gerar visualizações de tendência
-    if len(df) > 1 and len(colunas_numericas) > 0 and len(colunas_categoricas) > 0:
-        for coluna_y in colunas_numericas:
-            coluna_x = colunas_categoricas[0]  # Assumimos a primeira coluna categórica como temporal
-            nome_grafico = visualizar_tendencia(df, coluna_x, coluna_y)
-            resultados['graficos'].append(nome_grafico)
+    # Gerar os gráficos de tendência e de comparação a partir das somas por categoria
+    colunas_numericas, colunas_categoricas = list(perfil.estatisticas.colunas), agregados.colunas_categoricas
+    resultados['graficos'] = graficos_da_analise(agregados, colunas_numericas, colunas_categoricas, perfil.linhas > 1)
     
-    # Gerar visualizações de comparação
-    if len(colunas_categoricas) > 0 and len(colunas_numericas) > 0:
-        for coluna_categoria in colunas_categoricas:
-            for coluna_valor in colunas_numericas:
-                nome_grafico = comparar_categorias(df, coluna_categoria, coluna_valor, 'barras')
-                resultados['graficos'].append(nome_grafico)
+    # Gerar insights a partir do perfil (sem enviar a tabela inteira ao modelo)
+    resultados['insights'] = gerar_insights(perfil)
+    
+    return resultados
+
+def analisar_incremental(caminho_arquivo):
+    """
+    Analisa um CSV que só recebe linhas novas no final, sem reler o que já foi analisado.
+    
+    O perfil e as somas por categoria da execução anterior são carregados e
+    atualizados apenas com as linhas acrescentadas. Gráficos cujos dados não
+    mudaram vêm do cache, e os insights só são pedidos de novo ao modelo se o
+    perfil mudou.
+    
+    Args:
+        caminho_arquivo (str): Caminho para o arquivo CSV
+        
+    Returns:
+        dict: Resultados da análise, incluindo caminhos dos gráficos
+    """
+    estado = carregar_estado(caminho_arquivo) or {
+        "perfil": PerfilDados(), "agregados": AgregadosPorCategoria(), "insights": None}
+    perfil, agregados = estado["perfil"], estado["agregados"]
+    
+    linhas_anteriores = perfil.linhas
+    tipos, posicao, blocos = carregar_linhas_novas(caminho_arquivo, estado if "tipos" in estado else None)
+    for bloco in blocos:
+        perfil.atualizar(bloco)
+        agregados.atualizar(bloco)
+    estado.update(tipos=tipos, posicao=posicao)
+    
+    print(f"📊 Analisando dados com {perfil.linhas} linhas e {len(perfil.colunas)} colunas "
+          f"({perfil.linhas - linhas_anteriores} novas).")
+    
+    resultados = {
+        'resumo': perfil.estatisticas.resumo(),
+        'graficos': [],
+        'insights': None
+    }
+    
+    # As somas por categoria substituem a tabela inteira nos gráficos
+    colunas_numericas, colunas_categoricas = list(perfil.estatisticas.colunas), agregados.colunas_categoricas
+    resultados['graficos'] = graficos_da_analise(agregados, colunas_numericas, colunas_categoricas, perfil.linhas > 1)
     
-    # Gerar insights
-    resultados['insights'] = gerar_insights(df)
+    # Pedir novos insights só se o perfil mudou
+    texto_perfil = perfil.texto()
+    chave_insights = hash_conteudo("insights", template_analise, texto_perfil)
+    if estado["insights"] and estado["insights"]["chave"] == chave_insights:
+        print("💡 Perfil inalterado: insights da análise anterior reaproveitados")
+    else:
+        estado["insights"] = {"chave": chave_insights, "texto": gerar_insights(perfil)}
+    resultados['insights'] = estado["insights"]["texto"]
     
+    salvar_estado(caminho_arquivo, estado)
     return resultados
 
 # ====================================================================
-# PARTE 5: INTERFACE SIMPLES
+# PARTE 6: INTERFACE SIMPLES
 # ====================================================================
 # Interface de linha de comando para interagir com o agente.
 # ====================================================================
@@ -277,7 +743,7 @@ def interface_simples():
     print("="*70)
     print("Este agente analisa dados e gera visualizações e insights.")
     print("Por padrão, usará os dados de exemplo (vendas).")
-    print("Digite o caminho para um arquivo CSV/Excel ou pressione Enter para usar os dados de exemplo.")
+    print("Digite o caminho para um arquivo CSV/Parquet/Arrow/Excel ou pressione Enter para usar os dados de exemplo.")
     print("Digite 'sair' para encerrar.")
     print("="*70)
     
@@ -310,7 +776,7 @@ def interface_simples():
             print("Por favor, verifique se o arquivo existe e está em formato válido.")
 
 # ====================================================================
-# PARTE 6: EXECUTAR O AGENTE
+# PARTE 7: EXECUTAR O AGENTE
 # ====================================================================
 # Executamos a interface se este arquivo for executado diretamente.
 # ====================================================================
@@ -9,14 +9,23 @@
 # Importamos as bibliotecas necessárias
 # (estas precisam ser instaladas usando pip, conforme instruções em configuracao/README.md)
 import os
+import sys
 from dotenv import load_dotenv  # Para carregar as variáveis de ambiente
 from langchain_openai import ChatOpenAI  # Modelo de linguagem para conversa
 from langchain.prompts import ChatPromptTemplate  # Para criar prompts estruturados
 from langchain_community.vectorstores import FAISS  # Para armazenar e buscar informações
 from langchain_openai import OpenAIEmbeddings  # Para converter texto em números que o computador entende
-from langchain.text_splitter import RecursiveCharacterTextSplitter  # Para dividir documentos grandes
 from langchain_community.document_loaders import TextLoader  # Para carregar documentos de texto
 
+# Adicionar o diretório raiz ao path para importar módulos personalizados
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.busca_hibrida import BuscadorHibrido, carregar_reranker  # Busca por palavras + vetores
+from componentes.cache_semantico import CacheSemantico  # Reaproveitar respostas já geradas
+from componentes.embeddings_lote import EmbeddingsFalsos, PipelineEmbeddings  # Embeddings em lotes paralelos
+from componentes.fragmentacao import FragmentadorTokens  # Para dividir documentos grandes
+from componentes.texto import hash_conteudo
+
 # Carregar configurações do arquivo .env
 load_dotenv()
 
@@ -73,15 +82,79 @@ with open("conhecimento_temp.txt", "w", encoding="utf-8") as f:
 loader = TextLoader("conhecimento_temp.txt", encoding="utf-8")
 documentos = loader.load()
 
-# Dividir o documento em pedaços menores para facilitar a busca
-divisor_texto = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+# Dividir o documento em pedaços menores para facilitar a busca.
+# Os pedaços são medidos em tokens e uma seção (# Título) só é cortada ao meio quando não cabe inteira.
+divisor_texto = FragmentadorTokens(max_tokens=int(os.getenv("FAQ_TOKENS_TRECHO", "250")))
 textos = divisor_texto.split_documents(documentos)
 
-# Criar embeddings (representações numéricas do texto)
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+# Criar embeddings (representações numéricas do texto).
+# O pipeline envia os trechos em lotes limitados por tokens e em paralelo,
+# o que evita erros de requisição grande demais em bases maiores.
+# Com FAQ_EMBEDDINGS_FALSOS=true usamos embeddings locais, úteis para testes sem internet.
+if os.getenv("FAQ_EMBEDDINGS_FALSOS", "false").lower() == "true":
+    gerador_embeddings = EmbeddingsFalsos()
+else:
+    gerador_embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+
+chamadas_por_minuto = os.getenv("FAQ_EMBEDDINGS_CHAMADAS_MINUTO")
+embeddings = PipelineEmbeddings(
+    gerador_embeddings,
+    max_tokens_lote=int(os.getenv("FAQ_EMBEDDINGS_TOKENS_LOTE", "8000")),
+    concorrencia=int(os.getenv("FAQ_EMBEDDINGS_CONCORRENCIA", "4")),
+    chamadas_por_minuto=int(chamadas_por_minuto) if chamadas_por_minuto else None
+)
 
-# Criar a base de conhecimento vetorial
-base_conhecimento = FAISS.from_documents(textos, embeddings)
+# Combinar a busca vetorial com uma busca por palavras exatas (BM25).
+# Assim, perguntas com códigos ou nomes de formulários também encontram o trecho certo.
+# O reranker (opcional) reordena os candidatos e descarta os pouco relevantes,
+# deixando o prompt menor e a resposta mais rápida. Sem reranker, o corte usa a
+# pontuação da fusão (FAQ_LIMIAR_FUSAO; 0.02 exige o trecho nas duas buscas).
+FAQ_MAX_TRECHOS = int(os.getenv("FAQ_MAX_TRECHOS", "3"))
+FAQ_RERANKER_MODELO = os.getenv("FAQ_RERANKER_MODELO")
+FAQ_LIMIAR_RELEVANCIA = os.getenv("FAQ_LIMIAR_RELEVANCIA")
+FAQ_LIMIAR_FUSAO = os.getenv("FAQ_LIMIAR_FUSAO")
+reranker = carregar_reranker(FAQ_RERANKER_MODELO) if FAQ_RERANKER_MODELO else None
+
+# Cache de respostas: perguntas repetidas (ou muito parecidas) são respondidas
+# sem nova busca e sem chamar o modelo de linguagem.
+cache_respostas = CacheSemantico(
+    limiar_similaridade=float(os.getenv("FAQ_CACHE_LIMIAR", "0.95")),
+    max_entradas=int(os.getenv("FAQ_CACHE_MAX_ENTRADAS", "1000"))
+)
+
+def atualizar_base_conhecimento(novos_textos):
+    """
+    (Re)cria a base vetorial e o buscador a partir dos trechos informados.
+    
+    Respostas em cache que dependem de trechos alterados ou removidos são descartadas.
+    
+    Args:
+        novos_textos (list): Trechos (Document) da base de conhecimento
+    """
+    global textos, base_conhecimento, buscador
+    
+    textos = novos_textos
+    
+    # Criar a base de conhecimento vetorial
+    base_conhecimento = FAISS.from_documents(textos, embeddings)
+    
+    estatisticas = embeddings.ultimas_estatisticas
+    print(f"⚡ Embeddings: {estatisticas['trechos']} trechos em {estatisticas['segundos']:.2f}s "
+          f"({estatisticas['trechos_por_segundo']:.1f} trechos/s, "
+          f"{estatisticas['tokens_por_segundo']:.0f} tokens/s)")
+    
+    buscador = BuscadorHibrido(
+        textos,
+        base_conhecimento,
+        reranker=reranker,
+        limiar_relevancia=float(FAQ_LIMIAR_RELEVANCIA) if FAQ_LIMIAR_RELEVANCIA else None,
+        limiar_fusao=float(FAQ_LIMIAR_FUSAO) if FAQ_LIMIAR_FUSAO else None
+    )
+    
+    # Invalidar respostas cujos trechos de origem mudaram
+    cache_respostas.sincronizar(hash_conteudo(doc.page_content) for doc in textos)
+
+atualizar_base_conhecimento(textos)
 
 # ====================================================================
 # PARTE 3: CONFIGURAÇÃO DO AGENTE
@@ -125,18 +198,33 @@ def responder_pergunta(pergunta):
     Returns:
         str: A resposta gerada pelo agente
     """
-    # Passo 1: Buscar documentos relevantes para a pergunta
-    documentos_relevantes = base_conhecimento.similarity_search(pergunta, k=3)
+    # Passo 0: Verificar se a mesma pergunta já foi respondida (sem custo algum)
+    resposta_cache = cache_respostas.buscar_exata(pergunta)
+    if resposta_cache is not None:
+        return resposta_cache
+    
+    # Passo 1: Calcular o embedding uma única vez e procurar perguntas parecidas
+    vetor = embeddings.embed_query(pergunta)
+    resposta_cache = cache_respostas.buscar(vetor)
+    if resposta_cache is not None:
+        return resposta_cache
     
-    # Passo 2: Extrair o conteúdo dos documentos
+    # Passo 2: Buscar documentos relevantes para a pergunta (busca híbrida)
+    documentos_relevantes = buscador.buscar(pergunta, k=FAQ_MAX_TRECHOS, vetor=vetor)
+    
+    # Passo 3: Extrair o conteúdo dos documentos
     contexto = "\n\n".join([doc.page_content for doc in documentos_relevantes])
     
-    # Passo 3: Criar o prompt com o contexto e a pergunta
+    # Passo 4: Criar o prompt com o contexto e a pergunta
     mensagens = prompt.format_messages(contexto=contexto, pergunta=pergunta)
     
-    # Passo 4: Gerar a resposta usando o modelo de linguagem
+    # Passo 5: Gerar a resposta usando o modelo de linguagem
     resposta = modelo.invoke(mensagens)
     
+    # Passo 6: Guardar no cache, junto com os trechos usados (para invalidação)
+    fontes = [hash_conteudo(doc.page_content) for doc in documentos_relevantes]
+    cache_respostas.guardar(pergunta, vetor, resposta.content, fontes)
+    
     return resposta.content
 
 # ====================================================================
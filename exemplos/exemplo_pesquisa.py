@@ -7,20 +7,57 @@
 
 # Importamos as bibliotecas necessárias
 import os
+import sys
 import time
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain_community.tools import WikipediaQueryRun
 from langchain_community.utilities import WikipediaAPIWrapper
 from langchain.agents import initialize_agent, Tool, AgentType
 
+# Adicionar o diretório raiz ao path para importar módulos personalizados
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.busca_documentos import BuscaDocumentos  # Índice invertido com BM25 e trechos destacados
+from componentes.cache_disco import CacheDisco
+from componentes.consumo_tokens import criar_callback_consumo, invocar_com_orcamento, nome_do_modelo, pedido
+from componentes.rastreamento import criar_callback_llm
+from componentes.roteamento_modelos import RoteadorModelos, validar_texto
+from componentes.wikipedia_local import WikipediaComCache, WikipediaOffline
+from integracao.utils import executar_em_paralelo
+
 # Carregar configurações do arquivo .env
 load_dotenv()
 
 # Chaves de API
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Documentos internos: com PESQUISA_DIRETORIO_DOCUMENTOS definido, os arquivos
+# .txt e .md dessa pasta são indexados. O índice fica salvo em
+# PESQUISA_INDICE_DOCUMENTOS e só é refeito quando a pasta muda.
+# Sem a pasta, usamos os documentos de exemplo abaixo.
+PESQUISA_DIRETORIO_DOCUMENTOS = os.getenv("PESQUISA_DIRETORIO_DOCUMENTOS", "")
+PESQUISA_INDICE_DOCUMENTOS = os.getenv("PESQUISA_INDICE_DOCUMENTOS", ".cache_pesquisa/indice_documentos.json.gz")
+PESQUISA_MAX_RESULTADOS = int(os.getenv("PESQUISA_MAX_RESULTADOS", "5"))
+
+# Wikipedia: as respostas ficam guardadas em PESQUISA_CACHE_WIKIPEDIA (vazio
+# desativa) por PESQUISA_CACHE_WIKIPEDIA_HORAS. Com PESQUISA_WIKIPEDIA_OFFLINE
+# definido, a busca é feita só no recorte local indexado nessa pasta, sem
+# rede; se o índice ainda não existir, ele é construído a partir de
+# PESQUISA_WIKIPEDIA_DUMP (JSON por linha do WikiExtractor, pode estar compactado).
+PESQUISA_CACHE_WIKIPEDIA = os.getenv("PESQUISA_CACHE_WIKIPEDIA", ".cache_pesquisa/wikipedia")
+PESQUISA_CACHE_WIKIPEDIA_HORAS = float(os.getenv("PESQUISA_CACHE_WIKIPEDIA_HORAS", "168"))
+PESQUISA_CACHE_WIKIPEDIA_MAX_MB = int(os.getenv("PESQUISA_CACHE_WIKIPEDIA_MAX_MB", "50"))
+PESQUISA_WIKIPEDIA_OFFLINE = os.getenv("PESQUISA_WIKIPEDIA_OFFLINE", "")
+PESQUISA_WIKIPEDIA_DUMP = os.getenv("PESQUISA_WIKIPEDIA_DUMP", "")
+
+# Modo de pesquisa: "paralelo" consulta todas as fontes ao mesmo tempo e chama
+# o modelo uma única vez, na síntese; "agente" deixa o agente ReAct decidir,
+# passo a passo, quais ferramentas usar (uma chamada ao modelo por passo).
+PESQUISA_MODO = os.getenv("PESQUISA_MODO", "paralelo")
+PESQUISA_FONTES_PADRAO = [fonte.strip() for fonte in os.getenv("PESQUISA_FONTES_PADRAO", "wikipedia,docs-internos").split(",")
+                          if fonte.strip()]
+
 # ====================================================================
 # PARTE 1: CONFIGURAÇÃO DAS FERRAMENTAS DE PESQUISA
 # ====================================================================
@@ -35,38 +72,94 @@ wikipedia = WikipediaAPIWrapper(
 )
 wikipedia_tool = WikipediaQueryRun(api_wrapper=wikipedia)
 
-# Função para simular uma busca em documentos internos da empresa
-# Em um cenário real, isso se conectaria a uma base de documentos da empresa
-def buscar_documentos_internos(query):
+# Montada na primeira busca: cache em disco na frente da Wikipedia ou recorte offline
+_busca_wikipedia = None
+
+def obter_busca_wikipedia():
+    """
+    Retorna a função de busca na Wikipedia, criando-a na primeira chamada.
+    
+    Returns:
+        callable: Função que recebe a consulta e retorna o texto encontrado
+    """
+    global _busca_wikipedia
+    if _busca_wikipedia is None:
+        if PESQUISA_WIKIPEDIA_OFFLINE:
+            offline = WikipediaOffline.abrir(PESQUISA_WIKIPEDIA_OFFLINE, PESQUISA_WIKIPEDIA_DUMP,
+                                             top_k_results=wikipedia.top_k_results,
+                                             doc_content_chars_max=wikipedia.doc_content_chars_max)
+            print(f"📚 Wikipedia offline: {len(offline)} artigos indexados")
+            _busca_wikipedia = offline.run
+        elif PESQUISA_CACHE_WIKIPEDIA:
+            cache = CacheDisco(PESQUISA_CACHE_WIKIPEDIA, PESQUISA_CACHE_WIKIPEDIA_MAX_MB * 1024 * 1024)
+            _busca_wikipedia = WikipediaComCache(wikipedia_tool.run, cache, PESQUISA_CACHE_WIKIPEDIA_HORAS * 3600,
+                                                 idioma=wikipedia.lang).run
+        else:
+            _busca_wikipedia = wikipedia_tool.run
+    return _busca_wikipedia
+
+def buscar_wikipedia(query):
     """
-    Simula uma busca em documentos internos da SMN.
+    Busca na Wikipedia (com cache em disco ou no recorte offline, conforme a configuração).
     
     Args:
         query (str): Termo de busca
         
     Returns:
-        str: Resultados encontrados
+        str: Resumo dos artigos encontrados
     """
-    # Este é apenas um exemplo - numa implementação real, você conectaria
-    # a um sistema de gestão documental, SharePoint, etc.
+    return obter_busca_wikipedia()(query)
+
+# Banco de dados simulado de documentos internos da empresa.
+# Em um cenário real, os documentos viriam de uma pasta exportada do
+# sistema de gestão documental, SharePoint, etc. (PESQUISA_DIRETORIO_DOCUMENTOS)
+DOCUMENTOS_EXEMPLO = {
+    "projeto": "Projeto Alpha: Iniciativa estratégica para expansão da SMN no mercado latino-americano, com foco em sustentabilidade e inovação digital. Lançamento previsto para Q3 2025.",
+    "processo": "Processo de aprovação de novos fornecedores: 1) Solicitação via portal, 2) Análise financeira, 3) Verificação de compliance, 4) Aprovação final pelo comitê de compras.",
+    "cliente": "Principais clientes da SMN incluem: Grupo Nova Era (setor de energia), TechFuture (tecnologia), EcoSolutions (sustentabilidade) e Consórcio Mobilidade Urbana.",
+    "produto": "Linha de produtos 2025: SmartEco (eficiência energética), DataConnect (análise de dados integrada), GreenChain (rastreabilidade sustentável) e Urban Solutions (soluções para cidades inteligentes).",
+    "equipe": "Estrutura organizacional: Diretoria Executiva (CEO, CFO, COO, CTO), Gerências (Projetos, Produtos, Operações, RH, Finanças), Coordenações e Equipes Técnicas especializadas por verticais."
+}
+
+# O índice é montado (ou carregado do disco) na primeira busca e reaproveitado depois
+_busca_documentos = None
+
+def obter_busca_documentos():
+    """
+    Retorna o índice dos documentos internos, criando-o na primeira chamada.
     
-    # Banco de dados simulado de documentos
-    documentos = {
-        "projeto": "Projeto Alpha: Iniciativa estratégica para expansão da SMN no mercado latino-americano, com foco em sustentabilidade e inovação digital. Lançamento previsto para Q3 2025.",
-        "processo": "Processo de aprovação de novos fornecedores: 1) Solicitação via portal, 2) Análise financeira, 3) Verificação de compliance, 4) Aprovação final pelo comitê de compras.",
-        "cliente": "Principais clientes da SMN incluem: Grupo Nova Era (setor de energia), TechFuture (tecnologia), EcoSolutions (sustentabilidade) e Consórcio Mobilidade Urbana.",
-        "produto": "Linha de produtos 2025: SmartEco (eficiência energética), DataConnect (análise de dados integrada), GreenChain (rastreabilidade sustentável) e Urban Solutions (soluções para cidades inteligentes).",
-        "equipe": "Estrutura organizacional: Diretoria Executiva (CEO, CFO, COO, CTO), Gerências (Projetos, Produtos, Operações, RH, Finanças), Coordenações e Equipes Técnicas especializadas por verticais."
-    }
+    Returns:
+        BuscaDocumentos: Índice pronto para buscas
+    """
+    global _busca_documentos
+    if _busca_documentos is None:
+        if PESQUISA_DIRETORIO_DOCUMENTOS:
+            _busca_documentos = BuscaDocumentos.abrir(PESQUISA_DIRETORIO_DOCUMENTOS, PESQUISA_INDICE_DOCUMENTOS)
+            print(f"📚 {len(_busca_documentos)} trechos de documentos internos indexados")
+        else:
+            _busca_documentos = BuscaDocumentos()
+            for tipo, conteudo in DOCUMENTOS_EXEMPLO.items():
+                _busca_documentos.adicionar(tipo, conteudo)
+    return _busca_documentos
+
+def buscar_documentos_internos(query):
+    """
+    Busca nos documentos internos da SMN.
     
-    # Buscar em cada documento
-    resultados = []
-    for tipo, conteudo in documentos.items():
-        if query.lower() in tipo.lower() or any(termo in conteudo.lower() for termo in query.lower().split()):
-            resultados.append(f"[{tipo.upper()}]: {conteudo}")
+    A busca usa um índice invertido: palavras sem acentos e reduzidas ao
+    radical ("fornecedores" encontra "fornecedor"), ordenadas por BM25. Cada
+    resultado traz só o trecho mais relevante, com os termos destacados.
+    
+    Args:
+        query (str): Termo de busca
+        
+    Returns:
+        str: Resultados encontrados
+    """
+    resultados = obter_busca_documentos().buscar(query, k=PESQUISA_MAX_RESULTADOS)
     
     if resultados:
-        return "\n\n".join(resultados)
+        return "\n\n".join(f"[{resultado['titulo'].upper()}]: {resultado['trecho']}" for resultado in resultados)
     else:
         return "Nenhum documento interno encontrado para esta consulta."
 
@@ -77,14 +170,16 @@ def buscar_documentos_internos(query):
 # as ferramentas para realizar pesquisas.
 # ====================================================================
 
-# Inicializar o modelo de linguagem
-modelo = ChatOpenAI(openai_api_key=OPENAI_API_KEY, model_name="gpt-3.5-turbo", temperature=0)
+# Modelos de cada tarefa (MODELO_NIVEL_* e MODELO_TAREFA_* no .env). O agente
+# usa o modelo padrão; a síntese pode ir para outro nível (MODELO_TAREFA_SINTESE).
+roteador = RoteadorModelos.de_variaveis(os.environ, api_key=OPENAI_API_KEY)
+modelo = roteador.llm()
 
 # Definir as ferramentas disponíveis para o agente
 ferramentas = [
     Tool(
         name="Busca na Wikipedia",
-        func=wikipedia_tool.run,
+        func=buscar_wikipedia,
         description="Útil para obter informações gerais sobre conceitos, pessoas, lugares, eventos históricos, etc. Use para tópicos de conhecimento público e verificáveis."
     ),
     Tool(
@@ -94,6 +189,18 @@ ferramentas = [
     )
 ]
 
+# Fontes consultadas no modo paralelo: nome em PESQUISA_FONTES_PADRAO -> (título, função de busca)
+FONTES = {
+    "wikipedia": ("Wikipedia", buscar_wikipedia),
+    "docs-internos": ("Documentos Internos", buscar_documentos_internos)
+}
+
+# O agente ReAct chama o modelo por conta própria (uma vez por passo): os
+# callbacks registram o consumo de cada chamada no pedido em andamento e
+# medem a latência e os tokens de cada uma
+callback_consumo = criar_callback_consumo(modelo=nome_do_modelo(modelo))
+callback_llm = criar_callback_llm(modelo=nome_do_modelo(modelo))
+
 # Inicializar o agente
 agente = initialize_agent(
     tools=ferramentas,
@@ -142,33 +249,88 @@ def sintetizar_informacoes(topico, informacoes):
     Returns:
         str: Resumo sintetizado
     """
-    # Criar o prompt
-    mensagens = prompt_sintese.format_messages(
-        topico=topico, 
-        informacoes=informacoes
+    # Gerar o resumo (as informações coletadas são cortadas se passarem do orçamento do pedido)
+    resposta = roteador.executar(
+        "sintese",
+        lambda llm: invocar_com_orcamento(llm, prompt_sintese, {"topico": topico, "informacoes": informacoes},
+                                          campo_contexto="informacoes", config={"callbacks": [callback_llm]}),
+        validar=validar_texto()
     )
     
-    # Gerar o resumo
-    resposta = modelo.invoke(mensagens)
-    
     return resposta.content
 
 # ====================================================================
 # PARTE 4: FUNÇÃO PRINCIPAL DE PESQUISA
 # ====================================================================
-# Esta função coordena o processo de pesquisa e síntese.
+# Esta função coordena o processo de pesquisa e síntese. No modo
+# paralelo, as buscas são planejadas de antemão: como uma fonte não
+# depende da outra, todas são consultadas ao mesmo tempo e o modelo
+# só é chamado uma vez, para sintetizar o que foi coletado.
 # ====================================================================
 
-def pesquisar_e_sintetizar(topico):
+def planejar_buscas(topico, fontes=None):
+    """
+    Monta o plano de pesquisa: uma busca por fonte, sem chamar o modelo.
+    
+    Args:
+        topico (str): Tópico da pesquisa
+        fontes (list, opcional): Nomes das fontes (padrão: PESQUISA_FONTES_PADRAO)
+        
+    Returns:
+        list: Tuplas (fonte, consulta), na ordem das fontes
+    """
+    fontes = PESQUISA_FONTES_PADRAO if fontes is None else fontes
+    desconhecidas = [fonte for fonte in fontes if fonte not in FONTES]
+    if desconhecidas:
+        raise ValueError(f"Fontes de pesquisa desconhecidas: {', '.join(desconhecidas)}. "
+                         f"Disponíveis: {', '.join(FONTES)}")
+    return [(fonte, topico) for fonte in fontes]
+
+def executar_busca(passo):
+    """
+    Executa uma busca do plano. Uma fonte com erro não interrompe as demais.
+    
+    Args:
+        passo (tuple): Tupla (fonte, consulta)
+        
+    Returns:
+        str: Resultados da fonte, precedidos do seu título
+    """
+    fonte, consulta = passo
+    titulo, buscar = FONTES[fonte]
+    try:
+        resultado = buscar(consulta)
+    except Exception as e:
+        resultado = f"Erro ao consultar a fonte: {str(e)}"
+    return f"=== {titulo} ===\n{resultado}"
+
+def coletar_informacoes(topico, fontes=None):
+    """
+    Consulta todas as fontes do plano ao mesmo tempo e junta os resultados.
+    
+    Args:
+        topico (str): Tópico da pesquisa
+        fontes (list, opcional): Nomes das fontes (padrão: PESQUISA_FONTES_PADRAO)
+        
+    Returns:
+        str: Resultados de todas as fontes, na ordem do plano
+    """
+    plano = planejar_buscas(topico, fontes)
+    resultados = executar_em_paralelo(executar_busca, plano, max_workers=len(plano))
+    return "\n\n".join(resultados)
+
+def pesquisar_e_sintetizar(topico, modo=None):
     """
     Função principal que realiza pesquisa e síntese sobre um tópico.
     
     Args:
         topico (str): Tópico da pesquisa
+        modo (str, opcional): "paralelo" ou "agente" (padrão: PESQUISA_MODO)
         
     Returns:
         str: Resumo sintetizado
     """
+    modo = modo or PESQUISA_MODO
     print(f"🔍 Pesquisando sobre: {topico}")
     print("="*70)
     print("Fase 1: Coletando informações...")
@@ -177,14 +339,20 @@ def pesquisar_e_sintetizar(topico):
     consulta = f"Pesquise sobre '{topico}'. Busque tanto informações gerais quanto informações específicas da SMN, se relevantes. Seja meticuloso e abrangente."
     
     try:
-        # Executar o agente
-        resultados = agente.run(consulta)
-        
-        print("\nFase 2: Sintetizando informações...")
-        
-        # Sintetizar os resultados
-        resumo = sintetizar_informacoes(topico, resultados)
+        # As chamadas ao modelo das duas fases contam no mesmo pedido
+        with pedido(agente="pesquisa") as consumo:
+            if modo == "agente":
+                # Executar o agente (callbacks passados na execução valem também para as chamadas ao modelo)
+                resultados = agente.run(consulta, callbacks=[callback_consumo, callback_llm])
+            else:
+                resultados = coletar_informacoes(topico)
+            
+            print("\nFase 2: Sintetizando informações...")
+            
+            # Sintetizar os resultados
+            resumo = sintetizar_informacoes(topico, resultados)
         
+        print(f"💰 Consumo da pesquisa: {consumo.tokens} tokens (US$ {consumo.custo:.4f})")
         return resumo
     except Exception as e:
         return f"Erro durante a pesquisa: {str(e)}"
@@ -7,12 +7,26 @@
 
 # Importamos as bibliotecas necessárias
 import os
-import re
+import sys
+import json
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import PyPDFLoader
+
+# Adicionar o diretório raiz ao path para importar módulos personalizados
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.cache_disco import CacheDisco
+from componentes.consumo_tokens import Orcamento, invocar_com_orcamento, medidor, nome_do_modelo, pedido
+from componentes.consolidacao_json import extrair_json, mesclar_json, mesclar_varios
+from componentes.embeddings_lote import empacotar_por_tokens
+from componentes.extracao_local import extrair_campos_locais, pode_ter_nomes_ou_enderecos, remover_campos_locais
+from componentes.fragmentacao import FragmentadorTokens
+from componentes.rastreamento import criar_callback_llm, medir_iteracao, rastrear
+from componentes.roteamento_modelos import RoteadorModelos, validar_json
+from componentes.texto import hash_conteudo
+from integracao.utils import LimitadorTaxa, executar_em_paralelo
 
 # Carregar configurações do arquivo .env
 load_dotenv()
@@ -20,40 +34,92 @@ load_dotenv()
 # Chaves de API (nunca compartilhe estas chaves!)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Quantas chamadas ao modelo podem acontecer ao mesmo tempo e quantas por minuto.
+# Os segmentos são independentes, então processá-los em paralelo reduz muito o tempo total.
+DOCS_MAX_CONCORRENCIA = int(os.getenv("DOCS_MAX_CONCORRENCIA", "8"))
+DOCS_CHAMADAS_POR_MINUTO = os.getenv("DOCS_CHAMADAS_POR_MINUTO")
+limitador_llm = LimitadorTaxa(int(DOCS_CHAMADAS_POR_MINUTO)) if DOCS_CHAMADAS_POR_MINUTO else None
+
+# Cache das extrações em disco. A chave combina o hash do segmento, o hash do
+# template do prompt, o modelo e o tipo de extração: reprocessar um documento
+# igual não chama o modelo de novo, e um documento editado só paga pelos
+# segmentos que mudaram. Defina DOCS_CACHE_DIRETORIO vazio para desativar.
+DOCS_CACHE_DIRETORIO = os.getenv("DOCS_CACHE_DIRETORIO", ".cache_extracoes")
+DOCS_CACHE_MAX_MB = int(os.getenv("DOCS_CACHE_MAX_MB", "200"))
+cache_extracoes = CacheDisco(DOCS_CACHE_DIRETORIO, DOCS_CACHE_MAX_MB * 1024 * 1024) if DOCS_CACHE_DIRETORIO else None
+
+# Orçamento de tokens (e de custo, em dólares) de cada documento; 0 = sem limite.
+# Quando o orçamento aperta, as chamadas passam para DOCS_MODELO_ECONOMICO (se
+# definido); o que não couber é recusado antes de chamar o modelo.
+DOCS_ORCAMENTO_TOKENS_DOCUMENTO = int(os.getenv("DOCS_ORCAMENTO_TOKENS_DOCUMENTO", "0"))
+DOCS_ORCAMENTO_CUSTO_DOCUMENTO = float(os.getenv("DOCS_ORCAMENTO_CUSTO_DOCUMENTO", "0"))
+DOCS_MODELO_ECONOMICO = os.getenv("DOCS_MODELO_ECONOMICO")
+
+# ====================================================================
+# EVENTOS DE PROGRESSO
+# ====================================================================
+# As funções abaixo não imprimem nada diretamente: elas avisam o progresso
+# por meio de uma função "progresso" (opcional), que recebe um dicionário.
+# A interface de linha de comando usa imprimir_progresso para exibi-los.
+# ====================================================================
+
+def _notificar(progresso, etapa, mensagem, **dados):
+    """Envia um evento de progresso, se houver alguém ouvindo."""
+    if progresso:
+        progresso({"etapa": etapa, "mensagem": mensagem, **dados})
+
+def imprimir_progresso(evento):
+    """
+    Exibe um evento de progresso no terminal.
+    
+    Args:
+        evento (dict): Evento com as chaves 'etapa' e 'mensagem' (e dados extras)
+    """
+    print(evento["mensagem"])
+
 # ====================================================================
 # PARTE 1: CARREGAMENTO DE DOCUMENTOS
 # ====================================================================
 # Esta parte se encarrega de carregar diferentes tipos de documentos.
+# O carregamento é feito em fluxo: as páginas são lidas uma a uma e os
+# segmentos são entregues assim que ficam prontos, sem montar o documento
+# inteiro na memória. Assim a extração já começa nos primeiros segmentos
+# enquanto o restante do arquivo ainda está sendo lido.
 # ====================================================================
 
-def carregar_documento(caminho_arquivo):
+# Tamanho dos segmentos enviados ao modelo, medido em tokens (o que o modelo
+# realmente "enxerga"). Os segmentos respeitam os títulos das seções e a
+# sobreposição entre eles se ajusta ao ponto de corte.
+TOKENS_SEGMENTO = int(os.getenv("DOCS_TOKENS_SEGMENTO", "500"))
+
+# Tamanho dos blocos lidos de arquivos de texto (em caracteres)
+TAMANHO_BLOCO_TEXTO = 64 * 1024
+
+divisor_texto = FragmentadorTokens(max_tokens=TOKENS_SEGMENTO)
+
+def _ler_paginas(caminho_arquivo):
     """
-    Carrega um documento baseado em sua extensão.
+    Lê o documento página a página (ou bloco a bloco, para arquivos de texto).
     
     Args:
         caminho_arquivo (str): Caminho para o arquivo
         
-    Returns:
-        list: Lista de segmentos de texto do documento
+    Yields:
+        str: Texto de cada página/bloco (já com a separação entre páginas)
     """
-    print(f"📄 Carregando documento: {caminho_arquivo}")
-    
-    # Verificar se o arquivo existe
-    if not os.path.exists(caminho_arquivo):
-        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_arquivo}")
-    
     # Carregar baseado na extensão
     if caminho_arquivo.endswith('.pdf'):
-        loader = PyPDFLoader(caminho_arquivo)
-        paginas = loader.load()
-        
-        # Extrair o conteúdo de cada página
-        texto = "\n\n".join([pagina.page_content for pagina in paginas])
+        # lazy_load lê uma página por vez, em vez de todas de uma só vez
+        for pagina in PyPDFLoader(caminho_arquivo).lazy_load():
+            yield pagina.page_content + "\n\n"
         
     elif caminho_arquivo.endswith('.txt'):
-        loader = TextLoader(caminho_arquivo)
-        documentos = loader.load()
-        texto = documentos[0].page_content
+        with open(caminho_arquivo, encoding="utf-8") as f:
+            while True:
+                bloco = f.read(TAMANHO_BLOCO_TEXTO)
+                if not bloco:
+                    break
+                yield bloco
         
     elif caminho_arquivo.endswith(('.docx', '.doc')):
         # Nota: Para arquivos Word, você precisaria instalar pacotes adicionais
@@ -62,14 +128,55 @@ def carregar_documento(caminho_arquivo):
         
     else:
         raise ValueError(f"Formato de arquivo não suportado: {caminho_arquivo}")
+
+def carregar_documento_em_fluxo(caminho_arquivo, progresso=None):
+    """
+    Carrega um documento e entrega seus segmentos à medida que são lidos.
+    
+    Apenas um pequeno trecho do documento fica na memória de cada vez: o texto
+    acumulado é dividido sempre que passa de alguns segmentos, e o texto do último
+    segmento (possivelmente incompleto, com a quebra de página) fica guardado
+    para juntar-se à próxima página.
     
-    # Dividir o texto em segmentos menores para processamento
-    divisor_texto = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
-    segmentos = divisor_texto.split_text(texto)
+    Args:
+        caminho_arquivo (str): Caminho para o arquivo
+        progresso (callable, opcional): Função que recebe os eventos de progresso
+        
+    Yields:
+        str: Segmentos de texto do documento, em ordem
+    """
+    _notificar(progresso, "carregamento", f"📄 Carregando documento: {caminho_arquivo}",
+               arquivo=caminho_arquivo)
+    
+    # Verificar se o arquivo existe
+    if not os.path.exists(caminho_arquivo):
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_arquivo}")
     
-    print(f"✅ Documento carregado e dividido em {len(segmentos)} segmentos")
+    total_segmentos = 0
     
-    return segmentos
+    # Cada página lida vira um span "documento.ler_pagina" (etapa "documento")
+    paginas = medir_iteracao(_ler_paginas(caminho_arquivo), "documento.ler_pagina", "documento",
+                             arquivo=caminho_arquivo)
+    for segmento in divisor_texto.dividir_em_fluxo(paginas):
+        total_segmentos += 1
+        yield segmento
+    
+    _notificar(progresso, "documento_carregado",
+               f"✅ Documento carregado e dividido em {total_segmentos} segmentos",
+               arquivo=caminho_arquivo, segmentos=total_segmentos)
+
+def carregar_documento(caminho_arquivo, progresso=None):
+    """
+    Carrega um documento baseado em sua extensão.
+    
+    Args:
+        caminho_arquivo (str): Caminho para o arquivo
+        progresso (callable, opcional): Função que recebe os eventos de progresso
+        
+    Returns:
+        list: Lista de segmentos de texto do documento
+    """
+    return list(carregar_documento_em_fluxo(caminho_arquivo, progresso))
 
 # ====================================================================
 # PARTE 2: EXTRAÇÃO DE INFORMAÇÕES
@@ -77,8 +184,15 @@ def carregar_documento(caminho_arquivo):
 # Esta parte analisa o texto e extrai informações estruturadas.
 # ====================================================================
 
-# Inicializar o modelo de linguagem
-modelo = ChatOpenAI(openai_api_key=OPENAI_API_KEY, model_name="gpt-3.5-turbo")
+# Modelos de cada tarefa (MODELO_NIVEL_* e MODELO_TAREFA_* no .env). A extração
+# pode ir primeiro para um modelo menor ou local: respostas que não são JSON
+# são refeitas pelo próximo nível. Sem configuração, tudo usa o gpt-3.5-turbo.
+roteador = RoteadorModelos.de_variaveis(os.environ, api_key=OPENAI_API_KEY)
+modelo_economico = ChatOpenAI(openai_api_key=OPENAI_API_KEY, model_name=DOCS_MODELO_ECONOMICO) \
+    if DOCS_MODELO_ECONOMICO else None
+
+# Mede cada chamada ao LLM (latência e tokens)
+callback_llm = criar_callback_llm()
 
 # Template para extrair informações gerais
 template_extracao_geral = """
@@ -106,17 +220,16 @@ prompt_extracao_geral = ChatPromptTemplate.from_template(template_extracao_geral
 template_extracao_contatos = """
 Você é um especialista em extrair informações de contato de documentos.
 
-Analise o seguinte segmento de texto e extraia todas as informações de contato:
+Analise o seguinte segmento de texto e extraia as informações de contato:
 
 TEXTO:
 {texto}
 
-Extraia todas as seguintes informações no formato JSON:
-- Nomes de pessoas
-- Endereços de e-mail
-- Números de telefone
-- Empresas/Organizações
-- Endereços físicos
+E-mails e telefones já foram extraídos automaticamente; não os repita.
+Extraia apenas as seguintes informações no formato JSON:
+- "nomes": nomes de pessoas
+- "empresas": empresas/organizações
+- "enderecos": endereços físicos
 
 Para cada tipo de informação, retorne uma lista, mesmo que vazia.
 Não invente informações que não estejam no texto.
@@ -126,87 +239,341 @@ Formato JSON:
 
 prompt_extracao_contatos = ChatPromptTemplate.from_template(template_extracao_contatos)
 
-def extrair_informacoes(segmentos, tipo_extracao="geral"):
+# Campos com formato fixo (e-mails, telefones, CNPJ/CPF, valores, datas) são
+# encontrados com expressões regulares em microssegundos. Na extração de
+# contatos, o modelo só é chamado para o que sobra (nomes, empresas e
+# endereços), e nem isso quando o segmento não tem nenhum candidato.
+CAMPOS_LOCAIS_CONTATOS = ["emails", "telefones"]
+CAMPOS_MODELO_CONTATOS = ["nomes", "empresas", "enderecos"]
+
+def _campos_locais(segmento, tipo_extracao):
+    """Campos extraídos localmente de um segmento (sem chamar o modelo)."""
+    if tipo_extracao == "contatos":
+        return extrair_campos_locais(segmento, CAMPOS_LOCAIS_CONTATOS)
+    return {campo: valores for campo, valores in extrair_campos_locais(segmento).items() if valores}
+
+def _extrair_localmente(segmento, tipo_extracao):
     """
-    Extrai informações estruturadas de segmentos de texto.
+    Resolve um segmento sem o modelo, quando possível.
+    
+    Returns:
+        str ou None: Resultado (texto JSON) ou None se o modelo ainda for necessário
+    """
+    if tipo_extracao != "contatos":
+        return None
+    
+    restante = remover_campos_locais(segmento, CAMPOS_LOCAIS_CONTATOS)
+    if pode_ter_nomes_ou_enderecos(restante):
+        return None
+    
+    resultado = _campos_locais(segmento, tipo_extracao)
+    resultado.update({campo: [] for campo in CAMPOS_MODELO_CONTATOS})
+    return json.dumps(resultado, ensure_ascii=False)
+
+def _combinar_campos_locais(resposta, segmento, tipo_extracao):
+    """Junta à resposta do modelo os campos extraídos localmente."""
+    campos = _campos_locais(segmento, tipo_extracao)
+    if not campos:
+        return resposta
+    
+    dados = extrair_json(resposta)
+    if dados is None:
+        dados = {"texto_modelo": resposta}
+    elif not isinstance(dados, dict):
+        dados = {"resultado": dados}
+    
+    locais = campos if tipo_extracao == "contatos" else {"campos_detectados": campos}
+    return json.dumps(mesclar_json(dados, locais), ensure_ascii=False)
+
+def _selecionar_prompt(tipo_extracao):
+    """Retorna o prompt apropriado para o tipo de extração."""
+    if tipo_extracao == "contatos":
+        return prompt_extracao_contatos
+    return prompt_extracao_geral  # default para "geral"
+
+def _nome_modelo(tarefa="extracao"):
+    """Modelos em uso na tarefa (fazem parte das chaves de cache)."""
+    return roteador.nome_modelos(tarefa)
+
+def _chamar_modelo(tarefa, prompt, variaveis, campo_contexto, validar):
+    """
+    Chama o modelo da tarefa (subindo de nível se a resposta não servir).
+    
+    Returns:
+        tuple: (texto da resposta, se ela foi ajustada pelo orçamento: modelo
+        econômico ou contexto cortado)
+    """
+    def chamar(llm):
+        resposta = invocar_com_orcamento(llm, prompt, variaveis, campo_contexto=campo_contexto,
+                                         llm_economico=modelo_economico, config={"callbacks": [callback_llm]})
+        ajuste = resposta.response_metadata.get("orcamento")
+        ajustada = ajuste is not None and (ajuste["contexto_cortado"] or ajuste["modelo"] != nome_do_modelo(llm))
+        return resposta.content, ajustada
+    
+    return roteador.executar(tarefa, chamar, validar=lambda resposta: validar(resposta[0]))
+
+def _chave_extracao(segmento, tipo_extracao):
+    """Chave de cache de um segmento: conteúdo + template + modelo + tipo de extração."""
+    template = template_extracao_contatos if tipo_extracao == "contatos" else template_extracao_geral
+    return hash_conteudo("extracao", hash_conteudo(segmento), hash_conteudo(template),
+                         _nome_modelo(), tipo_extracao)
+
+def _extrair_segmento(segmento, tipo_extracao):
+    """Envia um único segmento ao modelo e retorna a resposta (texto JSON)."""
+    # Enviar para o modelo (dentro do orçamento do documento) e obter resposta.
+    # A resposta precisa ser JSON (com os campos pedidos, nos contatos).
+    campos = CAMPOS_MODELO_CONTATOS if tipo_extracao == "contatos" else ()
+    resposta, ajustada = _chamar_modelo("extracao", _selecionar_prompt(tipo_extracao), {"texto": segmento},
+                                        "texto", validar_json(campos))
+    resultado = _combinar_campos_locais(resposta, segmento, tipo_extracao)
+    
+    # Guardar no cache assim que pronto (se o processo cair, o trabalho não se perde).
+    # Respostas do modelo econômico ou de um segmento cortado não entram no cache.
+    if cache_extracoes and not ajustada:
+        cache_extracoes.guardar(_chave_extracao(segmento, tipo_extracao), resultado)
+    
+    return resultado
+
+def _resolver_sem_modelo(segmento, tipo_extracao):
+    """
+    Tenta obter a extração de um segmento sem chamar o modelo.
+    
+    Returns:
+        tuple: (resultado, origem), com origem 'local', 'cache' ou None (precisa do modelo)
+    """
+    local = _extrair_localmente(segmento, tipo_extracao)
+    if local is not None:
+        return local, "local"
+    
+    guardado = cache_extracoes.obter(_chave_extracao(segmento, tipo_extracao)) if cache_extracoes else None
+    if guardado is not None:
+        return guardado, "cache"
+    
+    return None, None
+
+def _extrair_em_paralelo(tarefas, progresso=None, descricao="extração"):
+    """
+    Extrai informações de vários pares (tipo_extracao, segmento) ao mesmo tempo.
+    
+    As tarefas podem vir de um gerador (ex.: do carregamento em fluxo): cada uma
+    é enviada ao modelo assim que chega, sem esperar o documento inteiro.
     
     Args:
-        segmentos (list): Lista de segmentos de texto
-        tipo_extracao (str): Tipo de extração a realizar ('geral' ou 'contatos')
+        tarefas (iterable): Tuplas (tipo_extracao, segmento)
+        progresso (callable, opcional): Função que recebe os eventos de progresso
+        descricao (str): Texto usado nas mensagens de progresso
         
     Returns:
-        list: Lista de resultados de extração
+        list: Tuplas (tipo_extracao, segmento, resultado) na mesma ordem das tarefas
     """
-    resultados = []
+    vistas = []
+    reaproveitados = 0
+    resolvidos_localmente = 0
+    
+    # Resolver localmente ou pelo cache o que for possível e enviar ao modelo só o restante
+    def pendentes():
+        nonlocal reaproveitados, resolvidos_localmente
+        for tipo, segmento in tarefas:
+            resultado, origem = _resolver_sem_modelo(segmento, tipo)
+            vistas.append((tipo, segmento, resultado))
+            if origem is None:
+                yield tipo, segmento
+            elif origem == "local":
+                resolvidos_localmente += 1
+            else:
+                reaproveitados += 1
+    
+    def ao_concluir(concluidos, enviados):
+        _notificar(progresso, "extracao", f"  Segmento {concluidos}/{enviados} processado ({descricao})",
+                   concluidos=concluidos, total=enviados)
+    
+    novos = executar_em_paralelo(
+        lambda tarefa: _extrair_segmento(tarefa[1], tarefa[0]),
+        pendentes(),
+        max_workers=DOCS_MAX_CONCORRENCIA,
+        limitador=limitador_llm,
+        ao_concluir=ao_concluir
+    )
     
-    # Selecionar o prompt apropriado
-    if tipo_extracao == "contatos":
-        prompt = prompt_extracao_contatos
-    else:  # default para "geral"
-        prompt = prompt_extracao_geral
+    if reaproveitados:
+        _notificar(progresso, "cache", f"  ♻️ {reaproveitados} segmento(s) reaproveitado(s) do cache",
+                   reaproveitados=reaproveitados, total=len(vistas))
+    if resolvidos_localmente:
+        _notificar(progresso, "extracao_local",
+                   f"  ⚡ {resolvidos_localmente} segmento(s) resolvido(s) sem chamar o modelo",
+                   resolvidos=resolvidos_localmente, total=len(vistas))
     
-    print(f"🔍 Extraindo informações ({tipo_extracao}) de {len(segmentos)} segmentos...")
+    # Juntar resultados do cache e novos, na ordem original
+    novos = iter(novos)
+    return [(tipo, segmento, guardado if guardado is not None else next(novos))
+            for tipo, segmento, guardado in vistas]
+
+def extrair_informacoes(segmentos, tipo_extracao="geral", progresso=None):
+    """
+    Extrai informações estruturadas de segmentos de texto.
     
-    # Processar cada segmento
-    for i, segmento in enumerate(segmentos):
-        print(f"  Processando segmento {i+1}/{len(segmentos)}...")
-        
-        # Preparar o prompt
-        mensagens = prompt.format_messages(texto=segmento)
-        
-        # Enviar para o modelo e obter resposta
-        resposta = modelo.invoke(mensagens)
+    Os segmentos são enviados ao modelo em paralelo (até DOCS_MAX_CONCORRENCIA
+    ao mesmo tempo), mas os resultados mantêm a ordem dos segmentos.
+    
+    Args:
+        segmentos (list): Lista de segmentos de texto
+        tipo_extracao (str): Tipo de extração a realizar ('geral' ou 'contatos')
+        progresso (callable, opcional): Função que recebe os eventos de progresso
         
-        # Adicionar aos resultados
-        resultados.append(resposta.content)
+    Returns:
+        list: Lista de resultados de extração
+    """
+    _notificar(progresso, "extracao_inicio",
+               f"🔍 Extraindo informações ({tipo_extracao}) de {len(segmentos)} segmentos...",
+               tipo=tipo_extracao, total=len(segmentos))
     
-    return resultados
+    tarefas = [(tipo_extracao, segmento) for segmento in segmentos]
+    return [resultado for _, _, resultado in _extrair_em_paralelo(tarefas, progresso, tipo_extracao)]
 
 # ====================================================================
 # PARTE 3: CONSOLIDAÇÃO DE RESULTADOS
 # ====================================================================
 # Esta parte combina resultados de múltiplos segmentos.
+# Resultados que já vieram em JSON válido são mesclados localmente, sem
+# chamar o modelo. Os demais são consolidados pelo modelo em grupos que
+# cabem em um orçamento de tokens, nível a nível (redução em árvore),
+# com os grupos de cada nível processados em paralelo.
 # ====================================================================
 
-def consolidar_resultados(resultados_extracao, metadados_documento):
+# Máximo de tokens de resultados enviados em cada chamada de consolidação
+DOCS_ORCAMENTO_CONSOLIDACAO = int(os.getenv("DOCS_ORCAMENTO_CONSOLIDACAO", "3000"))
+
+# Limite de níveis da árvore de consolidação (cada nível reduz o número de grupos)
+MAX_NIVEIS_CONSOLIDACAO = 5
+
+# Template para consolidação
+template_consolidacao = """
+Você é um especialista em consolidar informações de diferentes partes de um documento.
+
+Informações sobre o documento:
+- Nome do arquivo: {nome}
+- Tipo de arquivo: {tipo}
+- Data de processamento: {data_processamento}
+
+Abaixo estão os resultados da extração de informações de diferentes segmentos do documento.
+Consolide essas informações em um único JSON coerente, removendo duplicações e organizando
+as informações de forma lógica.
+
+Resultados da extração:
+{resultados_extracao}
+
+Resultado consolidado (em formato JSON):
+"""
+
+prompt_consolidacao = ChatPromptTemplate.from_template(template_consolidacao)
+
+def _consolidar_grupo(resultados, metadados_documento):
+    """
+    Pede ao modelo para consolidar um grupo de resultados em um único JSON.
+    
+    Returns:
+        tuple: (resposta, se ela foi ajustada pelo orçamento)
+    """
+    variaveis = {
+        "nome": metadados_documento.get('nome', 'Desconhecido'),
+        "tipo": metadados_documento.get('tipo', 'Desconhecido'),
+        "data_processamento": metadados_documento.get('data_processamento', 'Desconhecida'),
+        "resultados_extracao": "\n\n".join(resultados)
+    }
+    
+    return _chamar_modelo("sintese", prompt_consolidacao, variaveis, "resultados_extracao", validar_json())
+
+def consolidar_resultados(resultados_extracao, metadados_documento,
+                          orcamento_tokens=DOCS_ORCAMENTO_CONSOLIDACAO):
     """
     Consolida resultados de múltiplos segmentos em um único resumo.
     
     Args:
         resultados_extracao (list): Lista de resultados da extração
         metadados_documento (dict): Informações sobre o documento
+        orcamento_tokens (int): Máximo de tokens por chamada de consolidação ao modelo
         
     Returns:
         str: Resumo consolidado em formato JSON
     """
-    # Template para consolidação
-    template_consolidacao = f"""
-    Você é um especialista em consolidar informações de diferentes partes de um documento.
-    
-    Informações sobre o documento:
-    - Nome do arquivo: {metadados_documento.get('nome', 'Desconhecido')}
-    - Tipo de arquivo: {metadados_documento.get('tipo', 'Desconhecido')}
-    - Data de processamento: {metadados_documento.get('data_processamento', 'Desconhecida')}
-    
-    Abaixo estão os resultados da extração de informações de diferentes segmentos do documento.
-    Consolide essas informações em um único JSON coerente, removendo duplicações e organizando
-    as informações de forma lógica.
+    # Mesma ideia do cache de segmentos: resultados + template + modelo
+    chave = hash_conteudo("consolidacao", *[hash_conteudo(resultado) for resultado in resultados_extracao],
+                          hash_conteudo(template_consolidacao), _nome_modelo("sintese"), orcamento_tokens)
+    consolidado = cache_extracoes.obter(chave) if cache_extracoes else None
+    
+    if consolidado is None:
+        consolidado, ajustada = _consolidar_estrutura(resultados_extracao, metadados_documento, orcamento_tokens)
+        # Como nos segmentos: consolidações feitas pelo modelo econômico ou com
+        # contexto cortado (em qualquer grupo) não entram no cache
+        if cache_extracoes and not ajustada:
+            cache_extracoes.guardar(chave, consolidado)
+    
+    consolidado["metadados_documento"] = {
+        "nome": metadados_documento.get('nome', 'Desconhecido'),
+        "tipo": metadados_documento.get('tipo', 'Desconhecido'),
+        "data_processamento": metadados_documento.get('data_processamento', 'Desconhecida')
+    }
     
-    Resultados da extração:
-    {resultados_extracao}
+    return json.dumps(consolidado, ensure_ascii=False, indent=2)
+
+def _consolidar_estrutura(resultados_extracao, metadados_documento, orcamento_tokens):
+    """
+    Executa a consolidação (local + redução em árvore).
     
-    Resultado consolidado (em formato JSON):
+    Returns:
+        tuple: (dicionário consolidado, se alguma resposta do modelo foi ajustada pelo orçamento)
     """
+    # Passo 1: Ler localmente os resultados que já são JSON válido
+    estruturados = []
+    pendentes = []
+    for resultado in resultados_extracao:
+        dados = extrair_json(resultado)
+        if dados is None:
+            pendentes.append(resultado)
+        else:
+            estruturados.append(dados)
     
-    # Preparar o prompt
-    mensagens = ChatPromptTemplate.from_template(template_consolidacao).format_messages(
-        resultados_extracao="\n\n".join(resultados_extracao)
-    )
+    # Passo 2: Redução em árvore, com o modelo, dos resultados que não são JSON
+    ajustada = False
+    for _ in range(MAX_NIVEIS_CONSOLIDACAO):
+        if not pendentes:
+            break
+        
+        grupos = empacotar_por_tokens(pendentes, max_tokens_lote=orcamento_tokens,
+                                      max_itens_lote=len(pendentes), modelo="gpt-3.5-turbo")
+        respostas = executar_em_paralelo(
+            lambda grupo: _consolidar_grupo([texto for _, texto, _ in grupo], metadados_documento),
+            grupos,
+            max_workers=DOCS_MAX_CONCORRENCIA,
+            limitador=limitador_llm
+        )
+        
+        proximos = []
+        for resposta, ajuste in respostas:
+            ajustada = ajustada or ajuste
+            dados = extrair_json(resposta)
+            if dados is None:
+                proximos.append(resposta)
+            else:
+                estruturados.append(dados)
+        
+        # Se o nível não reduziu nada, não adianta continuar chamando o modelo
+        progresso_nivel = len(proximos) < len(pendentes)
+        pendentes = proximos
+        if not progresso_nivel:
+            break
+    
+    # Passo 3: Mesclar tudo localmente, de forma determinística
+    consolidado = mesclar_varios(estruturados)
+    if consolidado is None:
+        consolidado = {}
+    elif not isinstance(consolidado, dict):
+        consolidado = {"itens": consolidado}
     
-    # Enviar para o modelo e obter resposta
-    resposta = modelo.invoke(mensagens)
+    if pendentes:
+        consolidado["texto_nao_estruturado"] = pendentes
     
-    return resposta.content
+    return consolidado, ajustada
 
 # ====================================================================
 # PARTE 4: FUNÇÃO PRINCIPAL DE PROCESSAMENTO
@@ -214,49 +581,86 @@ def consolidar_resultados(resultados_extracao, metadados_documento):
 # Esta função coordena todo o processo de análise de documentos.
 # ====================================================================
 
-def processar_documento(caminho_arquivo, tipos_extracao=["geral"]):
+def criar_orcamento_documento():
+    """Orçamento de um documento com os limites do .env (None se não houver limites)."""
+    if not (DOCS_ORCAMENTO_TOKENS_DOCUMENTO or DOCS_ORCAMENTO_CUSTO_DOCUMENTO):
+        return None
+    return Orcamento(max_tokens=DOCS_ORCAMENTO_TOKENS_DOCUMENTO or None,
+                     max_custo=DOCS_ORCAMENTO_CUSTO_DOCUMENTO or None,
+                     modelo_economico=DOCS_MODELO_ECONOMICO)
+
+def obter_metadados(caminho_arquivo):
+    """Metadados básicos de um documento (usados na consolidação)."""
+    nome_arquivo = os.path.basename(caminho_arquivo)
+    return {
+        "nome": nome_arquivo,
+        "tipo": os.path.splitext(nome_arquivo)[1],
+        "caminho": caminho_arquivo,
+        "data_processamento": "2025-05-15"  # Em um sistema real, usaria a data atual
+    }
+
+@rastrear("documento.processar", etapa="processamento")
+def processar_documento(caminho_arquivo, tipos_extracao=["geral"], progresso=None):
     """
     Função principal que processa um documento do início ao fim.
     
+    O documento é lido em fluxo e cada segmento é enviado para extração (em todos
+    os tipos) assim que fica pronto, em paralelo; em seguida, as consolidações de
+    cada tipo também rodam em paralelo.
+    
     Args:
         caminho_arquivo (str): Caminho para o arquivo a ser processado
         tipos_extracao (list): Lista de tipos de extração a realizar
+        progresso (callable, opcional): Função que recebe os eventos de progresso
         
     Returns:
         dict: Resultados consolidados para cada tipo de extração
     """
     # Obter metadados básicos do documento
-    nome_arquivo = os.path.basename(caminho_arquivo)
-    tipo_arquivo = os.path.splitext(nome_arquivo)[1]
-    metadados = {
-        "nome": nome_arquivo,
-        "tipo": tipo_arquivo,
-        "caminho": caminho_arquivo,
-        "data_processamento": "2025-05-15"  # Em um sistema real, usaria a data atual
-    }
-    
-    print(f"🔄 Iniciando processamento do documento: {nome_arquivo}")
-    
-    # Carregar o documento
-    segmentos = carregar_documento(caminho_arquivo)
-    
-    # Armazenar resultados para cada tipo de extração
-    resultados_consolidados = {}
-    
-    # Processar cada tipo de extração solicitado
-    for tipo in tipos_extracao:
-        print(f"🔄 Realizando extração do tipo: {tipo}")
+    metadados = obter_metadados(caminho_arquivo)
+    nome_arquivo = metadados["nome"]
+    
+    _notificar(progresso, "inicio", f"🔄 Iniciando processamento do documento: {nome_arquivo}",
+               arquivo=nome_arquivo)
+    
+    # Carregar o documento em fluxo e já enviar cada segmento para extração,
+    # para todos os tipos, enquanto as próximas páginas ainda estão sendo lidas
+    _notificar(progresso, "extracao_inicio",
+               f"🔍 Extraindo informações ({', '.join(tipos_extracao)}) à medida que o documento é lido...",
+               tipos=list(tipos_extracao))
+    
+    # Todas as chamadas ao modelo deste documento contam no mesmo orçamento
+    with pedido(agente="processador_documentos", id_pedido=nome_arquivo,
+                orcamento=criar_orcamento_documento()) as consumo:
+        tarefas = (
+            (tipo, segmento)
+            for segmento in carregar_documento_em_fluxo(caminho_arquivo, progresso)
+            for tipo in tipos_extracao
+        )
+        resultados = _extrair_em_paralelo(tarefas, progresso, ", ".join(tipos_extracao))
         
-        # Extrair informações
-        resultados = extrair_informacoes(segmentos, tipo)
+        # Separar os resultados por tipo, mantendo a ordem dos segmentos
+        resultados_por_tipo = {tipo: [] for tipo in tipos_extracao}
+        for tipo, _, resultado in resultados:
+            resultados_por_tipo[tipo].append(resultado)
         
-        # Consolidar resultados
-        consolidado = consolidar_resultados(resultados, metadados)
+        # Consolidar os resultados de cada tipo (também em paralelo)
+        _notificar(progresso, "consolidacao", f"🔄 Consolidando resultados ({', '.join(tipos_extracao)})",
+                   tipos=list(tipos_extracao))
         
-        # Armazenar resultado consolidado
-        resultados_consolidados[tipo] = consolidado
-    
-    print(f"✅ Processamento concluído para: {nome_arquivo}")
+        # Sem limitador aqui: a mesclagem é local, e só as chamadas ao modelo da
+        # redução em árvore (que já passam por limitador_llm) contam no limite por minuto
+        consolidados = executar_em_paralelo(
+            lambda tipo: consolidar_resultados(resultados_por_tipo[tipo], metadados),
+            tipos_extracao,
+            max_workers=DOCS_MAX_CONCORRENCIA
+        )
+        resultados_consolidados = dict(zip(tipos_extracao, consolidados))
+    
+    _notificar(progresso, "concluido",
+               f"✅ Processamento concluído para: {nome_arquivo} "
+               f"({consumo.tokens} tokens, US$ {consumo.custo:.4f})",
+               arquivo=nome_arquivo, consumo=consumo.como_dict())
     
     return resultados_consolidados
 
@@ -382,6 +786,8 @@ def interface_simples():
         entrada = input("\n📄 Caminho do arquivo (ou 'exemplo' ou 'sair'): ")
         
         if entrada.lower() == "sair":
+            print(f"\n💰 Consumo de tokens nesta sessão:\n{medidor.relatorio()}")
+            print(f"\n🧭 {roteador.relatorio()}")
             print("\n👋 Até a próxima!")
             break
         
@@ -402,7 +808,7 @@ def interface_simples():
         
         try:
             # Processar o documento
-            resultados = processar_documento(caminho_arquivo, tipos_extracao)
+            resultados = processar_documento(caminho_arquivo, tipos_extracao, progresso=imprimir_progresso)
             
             # Exibir resultados
             for tipo, resultado in resultados.items():
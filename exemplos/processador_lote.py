@@ -0,0 +1,284 @@
+# ====================================================================
+# PROCESSAMENTO EM LOTE DE DOCUMENTOS
+# ====================================================================
+# Processa pastas inteiras de documentos (ex.: faturas durante a noite)
+# usando o agente processador de documentos.
+#
+# - Os arquivos entram em uma fila persistente (SQLite): se o processo
+#   for interrompido, basta rodar o mesmo comando de novo para continuar.
+# - A leitura e a divisão dos arquivos rodam em vários processos.
+# - As chamadas ao modelo rodam em paralelo (asyncio), limitadas por um
+#   semáforo para não passar de DOCS_MAX_CONCORRENCIA ao mesmo tempo.
+# - Cada documento concluído vira uma linha no arquivo JSONL de saída
+#   (uma só, mesmo que o lote seja retomado).
+#
+# Uso:
+#   python exemplos/processador_lote.py faturas/ --saida faturas.jsonl
+#   python exemplos/processador_lote.py "faturas/**/*.pdf" --tipos geral contatos
+# ====================================================================
+
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Adicionar o diretório raiz (componentes) e o desta pasta (agente) ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import exemplo_processador_documentos as processador
+from componentes.consumo_tokens import pedido
+from componentes.fila_trabalho import FilaTrabalho
+
+# Extensões de arquivo que o processador sabe ler
+EXTENSOES_SUPORTADAS = (".pdf", ".txt")
+
+# ====================================================================
+# PARTE 1: LISTAGEM DOS ARQUIVOS
+# ====================================================================
+
+def listar_arquivos(entrada):
+    """
+    Lista os documentos a processar.
+
+    Args:
+        entrada (str): Pasta (percorrida com subpastas) ou padrão glob (ex.: "faturas/*.pdf")
+
+    Returns:
+        list: Caminhos absolutos dos arquivos suportados, em ordem alfabética
+    """
+    if os.path.isdir(entrada):
+        caminhos = [os.path.join(pasta, nome)
+                    for pasta, _, nomes in os.walk(entrada)
+                    for nome in nomes]
+    else:
+        caminhos = glob.glob(entrada, recursive=True)
+
+    return sorted(os.path.abspath(caminho) for caminho in caminhos
+                  if os.path.isfile(caminho) and caminho.lower().endswith(EXTENSOES_SUPORTADAS))
+
+# ====================================================================
+# PARTE 2: ETAPAS DE CADA DOCUMENTO
+# ====================================================================
+
+def _carregar_segmentos(caminho_arquivo):
+    """Lê e divide um documento (roda em um processo separado)."""
+    return processador.carregar_documento(caminho_arquivo)
+
+def _com_limite(funcao, *args):
+    """Respeita o limite de chamadas por minuto antes de chamar o modelo."""
+    if processador.limitador_llm:
+        processador.limitador_llm.aguardar()
+    return funcao(*args)
+
+async def _processar_documento(caminho_arquivo, tipos_extracao, processos, semaforo):
+    """
+    Processa um documento: leitura em outro processo, extração e consolidação em paralelo.
+
+    Como em processador_documentos, todas as chamadas ao modelo do documento contam
+    no mesmo pedido (e orçamento): as tarefas criadas pelo gather e as threads do
+    asyncio.to_thread herdam uma cópia do contexto, com o pedido em andamento.
+
+    Returns:
+        dict: Registro do documento para o arquivo JSONL
+    """
+    loop = asyncio.get_running_loop()
+    inicio = time.perf_counter()
+
+    segmentos = await loop.run_in_executor(processos, _carregar_segmentos, caminho_arquivo)
+
+    async def chamar_modelo(funcao, *args):
+        async with semaforo:
+            return await asyncio.to_thread(_com_limite, funcao, *args)
+
+    async def extrair(tipo, segmento):
+        # Extração local e cache primeiro: só ocupa o semáforo quem precisa do modelo
+        resultado, origem = processador._resolver_sem_modelo(segmento, tipo)
+        if origem is None:
+            resultado = await chamar_modelo(processador._extrair_segmento, segmento, tipo)
+        return resultado
+
+    metadados = processador.obter_metadados(caminho_arquivo)
+    with pedido(agente="processador_documentos", id_pedido=metadados["nome"],
+                orcamento=processador.criar_orcamento_documento()) as consumo:
+        resultados = await asyncio.gather(*(extrair(tipo, segmento)
+                                            for segmento in segmentos
+                                            for tipo in tipos_extracao))
+
+        # Os resultados vêm intercalados por tipo (segmento 1: geral, contatos; segmento 2: ...).
+        # A consolidação não ocupa o semáforo nem o limite por minuto: a mesclagem é
+        # local, e as chamadas ao modelo da redução em árvore já passam pelo limitador
+        consolidados = await asyncio.gather(*(
+            asyncio.to_thread(processador.consolidar_resultados, resultados[i::len(tipos_extracao)], metadados)
+            for i in range(len(tipos_extracao))
+        ))
+
+    return {
+        "arquivo": caminho_arquivo,
+        "segmentos": len(segmentos),
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "consumo": consumo.como_dict(),
+        "resultados": {tipo: json.loads(consolidado) for tipo, consolidado in zip(tipos_extracao, consolidados)}
+    }
+
+# ====================================================================
+# PARTE 3: EXECUÇÃO DO LOTE
+# ====================================================================
+
+def _arquivos_gravados(caminho_saida):
+    """
+    Arquivos que já têm uma linha na saída.
+
+    O registro é gravado antes de o item ser concluído na fila: se o processo cair
+    entre as duas coisas, o documento volta para a fila ao retomar, mas não deve
+    ser gravado de novo.
+
+    Returns:
+        set: Caminhos (campo "arquivo") já gravados
+    """
+    gravados = set()
+    if not os.path.exists(caminho_saida):
+        return gravados
+    with open(caminho_saida, encoding="utf-8") as saida:
+        for linha in saida:
+            try:
+                gravados.add(json.loads(linha)["arquivo"])
+            except (ValueError, KeyError, TypeError):
+                continue  # Linha incompleta (ex.: gravação interrompida)
+    return gravados
+
+async def _executar_lote(fila, caminho_saida, tipos_extracao, num_processos, concorrencia,
+                         documentos_simultaneos, progresso):
+    """Trabalhadores assíncronos que consomem a fila até esvaziá-la."""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concorrencia))
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    estatisticas = {"concluidos": 0, "falhas": 0}
+    inicio = time.perf_counter()
+    gravados = _arquivos_gravados(caminho_saida)
+
+    # "spawn" cria processos limpos: copiar (fork) um processo com várias threads pode travar
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=num_processos, mp_context=contexto) as processos, \
+            open(caminho_saida, "a", encoding="utf-8") as saida:
+
+        async def trabalhador():
+            while True:
+                caminho = fila.reservar()
+                if caminho is None:
+                    return
+                if caminho in gravados:
+                    # Já gravado antes de uma interrupção: só falta concluir na fila
+                    fila.concluir(caminho)
+                    continue
+
+                try:
+                    registro = await _processar_documento(caminho, tipos_extracao, processos, semaforo)
+                except Exception as e:
+                    sera_repetido = fila.falhar(caminho, e)
+                    if not sera_repetido:
+                        estatisticas["falhas"] += 1
+                    processador._notificar(progresso, "lote_falha",
+                                           f"❌ {os.path.basename(caminho)}: {e}"
+                                           + (" (será tentado novamente)" if sera_repetido else ""),
+                                           arquivo=caminho, erro=str(e))
+                    continue
+
+                # Gravar o resultado antes de marcar como concluído (checkpoint)
+                saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                saida.flush()
+                fila.concluir(caminho)
+
+                estatisticas["concluidos"] += 1
+                minutos = (time.perf_counter() - inicio) / 60
+                processador._notificar(progresso, "lote_documento",
+                                       f"✅ {os.path.basename(caminho)} ({registro['segmentos']} segmentos, "
+                                       f"{registro['segundos']}s) - "
+                                       f"{estatisticas['concluidos'] / minutos:.1f} documentos/minuto",
+                                       arquivo=caminho, concluidos=estatisticas["concluidos"])
+
+        await asyncio.gather(*(trabalhador() for _ in range(documentos_simultaneos)))
+
+    estatisticas["segundos"] = round(time.perf_counter() - inicio, 2)
+    estatisticas["documentos_por_minuto"] = round(
+        estatisticas["concluidos"] / max(estatisticas["segundos"], 1e-9) * 60, 2)
+    return estatisticas
+
+def processar_lote(entrada, caminho_saida="resultados_lote.jsonl", tipos_extracao=["geral"],
+                   caminho_fila=None, num_processos=None, concorrencia=None,
+                   documentos_simultaneos=None, progresso=None):
+    """
+    Processa todos os documentos de uma pasta (ou padrão glob) e grava os resultados em JSONL.
+
+    Rodar de novo com a mesma saída retoma o lote: documentos já concluídos são
+    pulados, os que estavam em andamento voltam para a fila e arquivos novos são
+    adicionados. Os segmentos já extraídos também são reaproveitados do cache.
+
+    Args:
+        entrada (str): Pasta ou padrão glob com os documentos
+        caminho_saida (str): Arquivo JSONL de saída (uma linha por documento)
+        tipos_extracao (list): Tipos de extração a realizar ('geral' e/ou 'contatos')
+        caminho_fila (str, opcional): Arquivo SQLite da fila (padrão: saída + ".fila.sqlite")
+        num_processos (int, opcional): Processos para ler os arquivos (padrão: número de CPUs)
+        concorrencia (int, opcional): Chamadas simultâneas ao modelo (padrão: DOCS_MAX_CONCORRENCIA)
+        documentos_simultaneos (int, opcional): Documentos em andamento ao mesmo tempo
+        progresso (callable, opcional): Função que recebe os eventos de progresso
+
+    Returns:
+        dict: Estatísticas (concluidos, falhas, pendentes, segundos, documentos_por_minuto)
+    """
+    num_processos = num_processos or os.cpu_count() or 1
+    concorrencia = concorrencia or processador.DOCS_MAX_CONCORRENCIA
+    documentos_simultaneos = documentos_simultaneos or 2 * num_processos
+
+    fila = FilaTrabalho(caminho_fila or caminho_saida + ".fila.sqlite")
+    try:
+        novos = fila.adicionar(listar_arquivos(entrada))
+        retomados = fila.retomar()
+        contagem = fila.contagem()
+        processador._notificar(progresso, "lote_inicio",
+                               f"📦 Lote: {novos} arquivo(s) novo(s), {contagem['pendente']} pendente(s), "
+                               f"{contagem['concluido']} já concluído(s)"
+                               + (f", {retomados} retomado(s)" if retomados else ""),
+                               novos=novos, retomados=retomados, **contagem)
+
+        estatisticas = asyncio.run(_executar_lote(fila, caminho_saida, tipos_extracao, num_processos,
+                                                  concorrencia, documentos_simultaneos, progresso))
+        estatisticas["pendentes"] = fila.contagem()["pendente"]
+    finally:
+        fila.fechar()
+
+    processador._notificar(progresso, "lote_concluido",
+                           f"🏁 Lote concluído: {estatisticas['concluidos']} documento(s) em "
+                           f"{estatisticas['segundos']}s ({estatisticas['documentos_por_minuto']} documentos/minuto), "
+                           f"{estatisticas['falhas']} falha(s)",
+                           **estatisticas)
+    return estatisticas
+
+# ====================================================================
+# PARTE 4: LINHA DE COMANDO
+# ====================================================================
+
+def main():
+    """Lê os argumentos da linha de comando e processa o lote."""
+    parser = argparse.ArgumentParser(description="Processa em lote uma pasta de documentos.")
+    parser.add_argument("entrada", help="Pasta ou padrão glob (ex.: 'faturas/**/*.pdf')")
+    parser.add_argument("--saida", default="resultados_lote.jsonl", help="Arquivo JSONL de saída")
+    parser.add_argument("--tipos", nargs="+", default=["geral"], choices=["geral", "contatos"],
+                        help="Tipos de extração")
+    parser.add_argument("--fila", help="Arquivo SQLite da fila (padrão: <saida>.fila.sqlite)")
+    parser.add_argument("--processos", type=int, help="Processos para ler os arquivos")
+    parser.add_argument("--concorrencia", type=int, help="Chamadas simultâneas ao modelo")
+    argumentos = parser.parse_args()
+
+    processar_lote(argumentos.entrada, argumentos.saida, argumentos.tipos, argumentos.fila,
+                   argumentos.processos, argumentos.concorrencia, progresso=processador.imprimir_progresso)
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,18 @@ Este é um cliente genérico que pode ser adaptado para APIs específicas.
 """
 
 import os
+import json
 import requests
 from dotenv import load_dotenv
 
+from componentes.rastreamento import span
+from integracao.utils import ChamadaUnica
+
 load_dotenv()
 
+# GETs iguais feitos ao mesmo tempo (por qualquer instância do cliente) viram uma só requisição
+_chamadas_get = ChamadaUnica()
+
 class APIInterna:
     """Cliente para a API interna da empresa."""
     
@@ -38,20 +45,31 @@ class APIInterna:
         Returns:
             dict: Resposta da API
         """
+        if method.upper() == "GET":
+            # Em JSON, parâmetros com listas (ex.: {"ids": [1, 2]}) também viram uma chave
+            parametros = json.dumps(params or {}, sort_keys=True, default=str)
+            chave = (self.base_url, self.api_key, endpoint, parametros)
+            return _chamadas_get.executar(chave, self._enviar, method, endpoint, params, data)
+        return self._enviar(method, endpoint, params, data)
+    
+    def _enviar(self, method, endpoint, params=None, data=None):
+        """Envia a requisição HTTP (sem juntar chamadas iguais)."""
         url = f"{self.base_url}/{endpoint}"
         
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                params=params,
-                json=data
-            )
-            
-            response.raise_for_status()  # Lança exceção para códigos de erro
-            
-            return response.json()
+            with span(f"api_interna.{method.lower()}", "integracao", endpoint=endpoint) as trecho:
+                response = requests.request(
+                    method=method,
+                    url=url,
+                    headers=self.headers,
+                    params=params,
+                    json=data
+                )
+                trecho.definir(status=response.status_code)
+                
+                response.raise_for_status()  # Lança exceção para códigos de erro
+                
+                return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Erro na requisição: {str(e)}")
             raise
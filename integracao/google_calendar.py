@@ -11,6 +11,9 @@ from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
 
+from componentes.rastreamento import rastrear
+from integracao.utils import coalescer
+
 load_dotenv()
 
 class GoogleCalendarIntegration:
@@ -19,7 +22,11 @@ class GoogleCalendarIntegration:
     def __init__(self):
         """Inicializa a integração com o Google Calendar."""
         self.creds = self._obter_credenciais()
-        self.service = build('calendar', 'v3', credentials=self.creds)
+        
+        # GOOGLE_CALENDAR_URL troca o endereço da API (ex.: servidor simulado dos testes de carga)
+        endpoint = os.getenv("GOOGLE_CALENDAR_URL")
+        self.service = build('calendar', 'v3', credentials=self.creds,
+                             client_options={"api_endpoint": endpoint} if endpoint else None)
     
     def _obter_credenciais(self):
         """Obtém credenciais para a API do Google."""
@@ -34,12 +41,16 @@ class GoogleCalendarIntegration:
                 refresh_token=refresh_token,
                 client_id=client_id,
                 client_secret=client_secret,
-                token_uri="https://oauth2.googleapis.com/token"
+                token_uri=os.getenv("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
             )
             return creds
         else:
             raise ValueError("Credenciais do Google não configuradas")
     
+    # Consultas iguais ao mesmo tempo (ex.: a agenda da semana) viram uma só requisição
+    @coalescer(lambda self, max_results=10, time_min=None, time_max=None:
+               ("listar_eventos", self.creds.client_id, self.creds.refresh_token, max_results, time_min, time_max))
+    @rastrear("calendar.listar_eventos", etapa="integracao")
     def listar_eventos(self, max_results=10, time_min=None, time_max=None):
         """
         Lista eventos do calendário.
@@ -68,6 +79,7 @@ class GoogleCalendarIntegration:
         
         return eventos.get('items', [])
     
+    @rastrear("calendar.criar_evento", etapa="integracao")
     def criar_evento(self, titulo, inicio, fim, descricao=None, participantes=None):
         """
         Cria um novo evento no calendário.
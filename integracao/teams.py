@@ -5,12 +5,33 @@ Permite enviar mensagens, programar lembretes e listar canais.
 
 import os
 import datetime
+import requests
 from msgraph_core import GraphClientFactory
 from azure.identity import ClientSecretCredential
 from dotenv import load_dotenv
 
+from componentes.rastreamento import rastrear
+from integracao.utils import coalescer
+
 load_dotenv()
 
+class ClienteGraphHTTP:
+    """Cliente HTTP mínimo para um endpoint compatível com o Microsoft Graph (sem autenticação)."""
+    
+    def __init__(self, base_url):
+        """
+        Args:
+            base_url (str): Endereço do endpoint (ex.: http://127.0.0.1:8002/v1.0)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.sessao = requests.Session()
+    
+    def get(self, caminho, **kwargs):
+        return self.sessao.get(f"{self.base_url}{caminho}", **kwargs)
+    
+    def post(self, caminho, **kwargs):
+        return self.sessao.post(f"{self.base_url}{caminho}", **kwargs)
+
 class TeamsIntegration:
     """Classe para interagir com o Microsoft Teams via Microsoft Graph API."""
     
@@ -23,6 +44,9 @@ class TeamsIntegration:
         if not client_id or not client_secret or not tenant_id:
             raise ValueError("Credenciais do Microsoft Teams não configuradas corretamente")
         
+        # Identifica a conta: chamadas simultâneas iguais da mesma conta são feitas uma vez só
+        self.identidade = f"{tenant_id}/{client_id}"
+        
         # Configurar a autenticação OAuth2
         self.credential = ClientSecretCredential(
             tenant_id=tenant_id,
@@ -30,9 +54,16 @@ class TeamsIntegration:
             client_secret=client_secret
         )
         
-        # Criar cliente usando o GraphClientFactory
-        self.client = GraphClientFactory.create_with_credential(self.credential)
+        # TEAMS_GRAPH_URL troca o endereço do Microsoft Graph (ex.: servidor simulado dos
+        # testes de carga); as requisições vão sem token do Azure AD
+        graph_url = os.getenv("TEAMS_GRAPH_URL")
+        if graph_url:
+            self.client = ClienteGraphHTTP(graph_url)
+        else:
+            # Criar cliente usando o GraphClientFactory
+            self.client = GraphClientFactory.create_with_credential(self.credential)
     
+    @rastrear("teams.enviar_mensagem", etapa="integracao")
     def enviar_mensagem(self, canal, texto, blocos=None):
         """
         Envia uma mensagem para um canal ou chat do Microsoft Teams.
@@ -86,6 +117,7 @@ class TeamsIntegration:
             print(f"Erro ao enviar mensagem para o Teams: {str(e)}")
             raise
     
+    @rastrear("teams.enviar_lembrete", etapa="integracao")
     def enviar_lembrete(self, usuario, texto, timestamp):
         """
         Cria um lembrete usando mensagem agendada no MS Teams.
@@ -129,6 +161,7 @@ class TeamsIntegration:
             print(f"Erro ao programar lembrete no Teams: {str(e)}")
             raise
     
+    @rastrear("teams.listar_canais", etapa="integracao")
     def listar_canais(self, team_id=None):
         """
         Lista todos os canais de um time específico ou de todos os times.
@@ -172,6 +205,7 @@ class TeamsIntegration:
             print(f"Erro ao listar canais do Teams: {str(e)}")
             raise
     
+    @rastrear("teams.obter_id_canal", etapa="integracao")
     def obter_id_canal(self, team_id, nome_canal):
         """
         Obtém o ID de um canal pelo nome.
@@ -195,7 +229,10 @@ class TeamsIntegration:
         except Exception as e:
             print(f"Erro ao obter ID do canal: {str(e)}")
             raise
-            
+    
+    # Muitos usuários pedem a lista de times ao mesmo tempo: uma só requisição atende todos
+    @coalescer(lambda self: ("listar_times", self.identidade))
+    @rastrear("teams.listar_times", etapa="integracao")
     def listar_times(self):
         """
         Lista todos os times que o usuário autenticado participa.
@@ -5,7 +5,13 @@ Funções auxiliares para tratamento de erros, autenticação, etc.
 
 import time
 import random
+import threading
 import logging
+import asyncio
+import contextvars
+import copy
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -62,4 +68,220 @@ def sanitize_input(value, max_length=1000):
     for char in chars_to_remove:
         value = value.replace(char, '')
     
-    return value
\ No newline at end of file
+    return value
+
+class LimitadorTaxa:
+    """
+    Limita o número de chamadas por minuto a uma API (algoritmo "token bucket").
+    
+    Pode ser compartilhado entre várias threads: cada chamada a aguardar()
+    bloqueia até que haja uma vaga disponível.
+    """
+    
+    def __init__(self, chamadas_por_minuto):
+        """
+        Inicializa o limitador.
+        
+        Args:
+            chamadas_por_minuto (int): Número máximo de chamadas por minuto
+        """
+        self.capacidade = max(1, chamadas_por_minuto)
+        self.intervalo = 60.0 / self.capacidade
+        self.disponiveis = float(self.capacidade)
+        self.ultima_recarga = time.monotonic()
+        self._trava = threading.Lock()
+    
+    def aguardar(self):
+        """Bloqueia até que uma nova chamada seja permitida."""
+        while True:
+            with self._trava:
+                agora = time.monotonic()
+                self.disponiveis = min(
+                    self.capacidade,
+                    self.disponiveis + (agora - self.ultima_recarga) / self.intervalo
+                )
+                self.ultima_recarga = agora
+                
+                if self.disponiveis >= 1:
+                    self.disponiveis -= 1
+                    return
+                
+                espera = (1 - self.disponiveis) * self.intervalo
+            
+            time.sleep(espera)
+
+def executar_em_paralelo(funcao, itens, max_workers=4, limitador=None, ao_concluir=None):
+    """
+    Aplica uma função a vários itens em paralelo, mantendo a ordem dos resultados.
+    
+    Útil para chamadas independentes a APIs (ex.: um LLM por segmento de documento),
+    que passam a maior parte do tempo esperando a resposta da rede. Os itens podem
+    vir de um gerador: cada item é enviado para execução assim que é produzido.
+    
+    Args:
+        funcao (callable): Função aplicada a cada item
+        itens (iterable): Itens a processar (lista ou gerador)
+        max_workers (int): Número máximo de chamadas simultâneas
+        limitador (LimitadorTaxa, opcional): Limita as chamadas por minuto
+        ao_concluir (callable, opcional): Chamada como ao_concluir(concluidos, enviados) a cada item finalizado
+        
+    Returns:
+        list: Resultados na mesma ordem dos itens
+    """
+    concluidos = 0
+    enviados = 0
+    trava = threading.Lock()
+    
+    def executar(item):
+        nonlocal concluidos
+        if limitador:
+            limitador.aguardar()
+        resultado = funcao(item)
+        
+        if ao_concluir:
+            with trava:
+                concluidos += 1
+                ao_concluir(concluidos, enviados)
+        return resultado
+    
+    futuros = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for item in itens:
+            with trava:
+                enviados += 1
+            # Cada item roda com uma cópia do contexto de quem chamou (pedido, span em andamento...)
+            futuros.append(executor.submit(contextvars.copy_context().run, executar, item))
+        
+        return [futuro.result() for futuro in futuros]
+
+class _ChamadaEmAndamento:
+    """Resultado (ou erro) de uma chamada que outras threads estão esperando."""
+    
+    def __init__(self):
+        self.concluida = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+class ChamadaUnica:
+    """
+    Junta chamadas idênticas feitas ao mesmo tempo em uma só ("single-flight").
+    
+    Enquanto uma chamada com uma chave está em andamento, quem pedir a mesma
+    chave espera por ela e recebe o mesmo resultado (ou o mesmo erro), em vez
+    de repetir a requisição. Nada é guardado depois que a chamada termina: o
+    pedido seguinte vai ao serviço de novo, então os dados nunca ficam velhos.
+    
+    Funciona com threads (executar) e com asyncio (executar_async). Quem
+    esperou recebe uma cópia do resultado, para que alterações de um não
+    apareçam para os outros.
+    """
+    
+    def __init__(self):
+        """Inicializa o grupo sem chamadas em andamento."""
+        self._em_andamento = {}
+        self._em_andamento_async = {}
+        self._trava = threading.Lock()
+        self.chamadas = 0
+        self.compartilhadas = 0
+    
+    def executar(self, chave, funcao, *args, **kwargs):
+        """
+        Executa a função, ou espera a chamada igual que já está em andamento.
+        
+        Args:
+            chave (hashable): Identifica chamadas iguais (ex.: método e parâmetros)
+            funcao (callable): Função que faz a requisição
+            *args, **kwargs: Argumentos da função
+            
+        Returns:
+            O resultado da função
+        """
+        with self._trava:
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_andamento[chave] = _ChamadaEmAndamento()
+                self.chamadas += 1
+            else:
+                self.compartilhadas += 1
+        
+        if not lider:
+            chamada.concluida.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return copy.deepcopy(chamada.resultado)
+        
+        try:
+            chamada.resultado = funcao(*args, **kwargs)
+            return chamada.resultado
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._trava:
+                del self._em_andamento[chave]
+            chamada.concluida.set()
+    
+    async def executar_async(self, chave, funcao, *args, **kwargs):
+        """
+        Versão para asyncio de executar: funcao deve ser uma corrotina.
+        
+        Args:
+            chave (hashable): Identifica chamadas iguais
+            funcao (callable): Função assíncrona que faz a requisição
+            *args, **kwargs: Argumentos da função
+            
+        Returns:
+            O resultado da função
+        """
+        # Tarefas só podem ser esperadas no loop que as criou
+        loop = asyncio.get_running_loop()
+        chave_loop = (id(loop), chave)
+        tarefa = self._em_andamento_async.get(chave_loop)
+        if tarefa is not None:
+            self.compartilhadas += 1
+            # shield: se quem espera for cancelado, a chamada dos outros continua
+            return copy.deepcopy(await asyncio.shield(tarefa))
+        
+        # A chamada roda em uma tarefa própria, que todos esperam com shield:
+        # se quem a iniciou for cancelado, os outros ainda recebem o resultado
+        tarefa = asyncio.ensure_future(funcao(*args, **kwargs))
+        self._em_andamento_async[chave_loop] = tarefa
+        self.chamadas += 1
+        
+        def finalizar(tarefa):
+            del self._em_andamento_async[chave_loop]
+            if not tarefa.cancelled():
+                tarefa.exception()  # Marcar como lido, mesmo que ninguém esteja esperando
+        
+        tarefa.add_done_callback(finalizar)
+        return await asyncio.shield(tarefa)
+
+def coalescer(gerar_chave, grupo=None):
+    """
+    Decorador que aplica ChamadaUnica a uma função ou método (síncrono ou assíncrono).
+    
+    Args:
+        gerar_chave (callable): Recebe os mesmos argumentos da função e devolve a chave
+        grupo (ChamadaUnica, opcional): Grupo compartilhado (padrão: um por função)
+        
+    Returns:
+        callable: Decorador
+    """
+    grupo = grupo or ChamadaUnica()
+    
+    def decorador(funcao):
+        if asyncio.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def envolvida_async(*args, **kwargs):
+                return await grupo.executar_async(gerar_chave(*args, **kwargs), funcao, *args, **kwargs)
+            envolvida_async.chamada_unica = grupo
+            return envolvida_async
+        
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            return grupo.executar(gerar_chave(*args, **kwargs), funcao, *args, **kwargs)
+        envolvida.chamada_unica = grupo
+        return envolvida
+    
+    return decorador
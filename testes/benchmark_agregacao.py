@@ -0,0 +1,90 @@
+"""
+Script para comparar o groupby por par de colunas com a agregação em uma única leitura
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exemplos"))
+
+from componentes.estatisticas_incrementais import AgregadosPorCategoria
+
+def gerar_tabela(linhas, semente=42):
+    """Gera uma tabela com 3 colunas categóricas e 3 numéricas"""
+    aleatorio = np.random.default_rng(semente)
+    return pd.DataFrame({
+        "Mês": aleatorio.choice(["Jan", "Fev", "Mar", "Abr", "Mai", "Jun"], linhas),
+        "Região": aleatorio.choice(["Sul", "Norte", "Centro", "Nordeste"], linhas),
+        "Loja": np.char.add("L", aleatorio.integers(0, 500, linhas).astype(str)),
+        "Vendas": aleatorio.lognormal(10, 0.5, linhas),
+        "Custos": aleatorio.normal(30000, 2000, linhas),
+        "Itens": aleatorio.integers(1, 50, linhas).astype(float)
+    })
+
+def por_par(analise, caminho_arquivo):
+    """Como antes: junta todos os blocos e faz um groupby para cada par categoria x valor"""
+    dados = pd.concat(analise.carregar_em_blocos(caminho_arquivo), ignore_index=True)
+    numericas = dados.select_dtypes(include="number").columns
+    categoricas = dados.select_dtypes(include=["object", "category"]).columns
+    totais = {(categoria, valor): dados.groupby(categoria, observed=True)[valor].sum()
+              for categoria in categoricas for valor in numericas}
+    return totais, len(categoricas) * len(numericas)
+
+def uma_leitura(analise, caminho_arquivo):
+    """Agora: cada bloco atualiza todos os pares de uma vez, sem guardar a tabela"""
+    agregados = AgregadosPorCategoria()
+    for bloco in analise.carregar_em_blocos(caminho_arquivo):
+        agregados.atualizar(bloco)
+    totais = {(categoria, valor): agregados.total(categoria, valor)
+              for categoria in agregados.colunas_categoricas for valor in agregados.numericas}
+    return totais, 1
+
+def medir(nome, funcao, analise, caminho_arquivo):
+    """Executa uma estratégia e mostra o tempo, o pico de memória e o número de varreduras dos dados"""
+    inicio = time.perf_counter()
+    totais, varreduras = funcao(analise, caminho_arquivo)
+    segundos = time.perf_counter() - inicio
+
+    # A memória é medida em outra execução: o rastreamento deixa tudo mais lento
+    tracemalloc.start()
+    funcao(analise, caminho_arquivo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {nome:<32} {segundos:>6.2f} s | pico de memória: {pico / 1e6:>5.0f} MB | "
+          f"varreduras da tabela: {varreduras:>2} | pares: {len(totais)}")
+    return totais
+
+def benchmark_agregacao(linhas=2_000_000):
+    """Função para comparar as duas estratégias em um CSV grande"""
+    print("=" * 70)
+    print("BENCHMARK DA AGREGAÇÃO POR CATEGORIA")
+    print("=" * 70)
+
+    import exemplo_analise_dados as analise
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_csv = os.path.join(diretorio, "vendas.csv")
+        gerar_tabela(linhas).to_csv(caminho_csv, index=False)
+        print(f"\n📄 CSV com {linhas} linhas ({os.path.getsize(caminho_csv) / 1e6:.0f} MB)")
+
+        antes = medir("groupby por par (tabela inteira)", por_par, analise, caminho_csv)
+        depois = medir("uma leitura (em blocos)", uma_leitura, analise, caminho_csv)
+
+        iguais = all(np.allclose(antes[par].to_numpy(), depois[par].reindex(antes[par].index.astype(object)))
+                     for par in antes)
+        print(f"\n{'✅' if iguais else '❌'} Totais idênticos nas duas estratégias")
+
+    print("=" * 70)
+    print("BENCHMARK CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    benchmark_agregacao()
@@ -0,0 +1,83 @@
+"""
+Script para comparar a busca por substring com o índice invertido nos documentos internos
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.busca_documentos import BuscaDocumentos
+
+PALAVRAS = ("projeto processo cliente produto equipe fornecedores aprovação expansão mercado sustentabilidade "
+            "inovação digital energia financeiro compliance comitê compras política férias reembolso despesas "
+            "contrato relatório meta vendas região orçamento auditoria segurança treinamento").split()
+
+CONSULTAS = ["aprovação de fornecedor", "política de férias", "reembolso de despesas de viagem",
+             "auditoria financeira", "metas de vendas por região"]
+
+def gerar_documentos(quantidade, semente=42):
+    """Gera documentos sintéticos com vocabulário de negócios e termos raros"""
+    aleatorio = random.Random(semente)
+    vocabulario = PALAVRAS + [f"termo{i}" for i in range(5000)]
+    return {f"doc{i}": " ".join(aleatorio.choice(vocabulario) for _ in range(aleatorio.randint(40, 200)))
+            for i in range(quantidade)}
+
+def busca_por_substring(documentos, query):
+    """Como antes: percorre todos os documentos procurando cada termo da consulta"""
+    resultados = []
+    for tipo, conteudo in documentos.items():
+        if query.lower() in tipo.lower() or any(termo in conteudo.lower() for termo in query.lower().split()):
+            resultados.append(f"[{tipo.upper()}]: {conteudo}")
+    return resultados
+
+def medir_consultas(nome, funcao):
+    """Executa as consultas algumas vezes e mostra a latência"""
+    tempos = []
+    for _ in range(3):
+        for consulta in CONSULTAS:
+            inicio = time.perf_counter()
+            resultados = funcao(consulta)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"  {nome:<22} mediana {statistics.median(tempos):>8.1f} ms | máx {max(tempos):>8.1f} ms | "
+          f"resultados na última consulta: {len(resultados)}")
+
+def benchmark_busca_documentos(quantidade=20_000):
+    """Função para comparar as duas buscas em uma coleção grande"""
+    print("=" * 70)
+    print("BENCHMARK DA BUSCA EM DOCUMENTOS INTERNOS")
+    print("=" * 70)
+
+    documentos = gerar_documentos(quantidade)
+    print(f"\n📄 {quantidade} documentos sintéticos")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        inicio = time.perf_counter()
+        busca = BuscaDocumentos()
+        for titulo, texto in documentos.items():
+            busca.adicionar(titulo, texto)
+        print(f"  Indexação: {time.perf_counter() - inicio:.1f} s")
+
+        caminho_indice = os.path.join(diretorio, "indice.json.gz")
+        inicio = time.perf_counter()
+        busca.salvar(caminho_indice)
+        salvar = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        busca = BuscaDocumentos.carregar(caminho_indice)
+        print(f"  Índice em disco: {os.path.getsize(caminho_indice) / 1e6:.1f} MB "
+              f"(salvo em {salvar:.1f} s, carregado em {time.perf_counter() - inicio:.1f} s)\n")
+
+        medir_consultas("substring (antes)", lambda consulta: busca_por_substring(documentos, consulta))
+        medir_consultas("índice BM25 (agora)", lambda consulta: busca.buscar(consulta))
+
+    print("=" * 70)
+    print("BENCHMARK CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    benchmark_busca_documentos()
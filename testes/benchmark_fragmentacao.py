@@ -0,0 +1,70 @@
+"""
+Script para comparar o fragmentador por tokens com o divisor por caracteres do LangChain
+"""
+
+import os
+import re
+import statistics
+import sys
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from componentes.fragmentacao import FragmentadorTokens, eh_titulo
+from componentes.tokens import contar_tokens, obter_codificador
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def carregar_texto_exemplo(nome_variavel, arquivo):
+    """Lê um texto de exemplo (entre aspas triplas) de um dos agentes"""
+    with open(os.path.join(RAIZ, "exemplos", arquivo), encoding="utf-8") as f:
+        codigo = f.read()
+    return re.search(nome_variavel + r'\s*=\s*"""(.*?)"""', codigo, re.DOTALL).group(1)
+
+def medir(nome, divisor, texto, repeticoes=3):
+    """Divide o texto algumas vezes e resume os trechos gerados"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        trechos = divisor.split_text(texto)
+    segundos = (time.perf_counter() - inicio) / repeticoes
+
+    tokens = [contar_tokens(trecho) for trecho in trechos]
+    # Trechos que começam no meio de uma seção, sem o título dela
+    sem_titulo = sum(1 for trecho in trechos if not eh_titulo(trecho.lstrip().split("\n", 1)[0]))
+
+    print(f"  {nome:<28} {len(trechos):>6} trechos | tokens/trecho: média {statistics.mean(tokens):>6.0f}, "
+          f"mín {min(tokens):>4}, máx {max(tokens):>5}, desvio {statistics.pstdev(tokens):>5.0f} | "
+          f"sem título: {sem_titulo:>5} | {len(texto) / segundos / 1e6:>5.1f} MB/s")
+
+def comparar(titulo, texto, tamanho_caracteres, sobreposicao_caracteres, max_tokens):
+    """Compara os dois divisores na configuração de um agente"""
+    print(f"\n📄 {titulo} ({len(texto) / 1e6:.1f} MB)")
+    medir(f"caracteres ({tamanho_caracteres}/{sobreposicao_caracteres})",
+          RecursiveCharacterTextSplitter(chunk_size=tamanho_caracteres, chunk_overlap=sobreposicao_caracteres), texto)
+    medir(f"tokens ({max_tokens})", FragmentadorTokens(max_tokens=max_tokens), texto)
+
+def benchmark_fragmentacao():
+    """Função para comparar os divisores nos textos de exemplo do processador e do FAQ"""
+    print("=" * 70)
+    print("BENCHMARK DA FRAGMENTAÇÃO DE TEXTOS")
+    print("=" * 70)
+
+    if obter_codificador() is None:
+        print("⚠️ tiktoken indisponível: os tokens serão estimados pelo número de caracteres")
+
+    relatorio = carregar_texto_exemplo("conteudo_exemplo", "exemplo_processador_documentos.py")
+    conhecimento = carregar_texto_exemplo("conhecimento", "exemplo_faq.py")
+
+    # Mesmas configurações usadas pelos agentes antes e depois da troca
+    comparar("Relatório (processador de documentos)", relatorio * 200, 2000, 200, 500)
+    comparar("Base de conhecimento (FAQ)", conhecimento * 200, 1000, 200, 250)
+
+    print("=" * 70)
+    print("BENCHMARK CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    benchmark_fragmentacao()
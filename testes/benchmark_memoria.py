@@ -0,0 +1,79 @@
+"""
+Script para comparar o tamanho do prompt com o histórico completo e com a memória limitada
+"""
+
+import os
+import random
+import sys
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.memoria_conversa import MemoriaConversa, formatar_mensagens
+from componentes.tokens import contar_tokens
+
+# Latência simulada do LLM ao gerar um resumo (segundos)
+LATENCIA_RESUMO = 0.3
+
+PEDIDOS = ["Quais são meus compromissos de {dia}?", "Agende uma reunião com {pessoa} {dia} às {hora}",
+           "Mostre minha disponibilidade {dia}", "Mova a reunião com {pessoa} para as {hora}",
+           "Avise {pessoa} que vou atrasar"]
+RESPOSTAS = ["Você tem 3 compromissos {dia}: reunião de equipe às 9h, almoço com {pessoa} às 12h e "
+             "revisão do projeto às {hora}.",
+             "Compromisso 'Reunião com {pessoa}' criado com sucesso para {dia} às {hora}.",
+             "Disponibilidade para {dia}: livre das 8h às 10h, das 13h às {hora} e depois das 16h30.",
+             "Reunião com {pessoa} movida para {dia} às {hora}. Os participantes foram avisados.",
+             "Mensagem enviada para {pessoa}: 'Vou atrasar uns 15 minutos.'"]
+
+def gerar_turno(aleatorio):
+    """Gera um pedido e uma resposta típicos do agente de agenda"""
+    valores = {"dia": aleatorio.choice(["hoje", "amanhã", "na terça", "na sexta"]),
+               "pessoa": aleatorio.choice(["Ana", "Bruno", "a equipe de vendas", "o cliente TechFuture"]),
+               "hora": aleatorio.choice(["10h", "14h", "15h30", "17h"])}
+    posicao = aleatorio.randrange(len(PEDIDOS))
+    return PEDIDOS[posicao].format(**valores), RESPOSTAS[posicao].format(**valores)
+
+def resumir_simulado(resumo, mensagens):
+    """Simula o LLM: espera LATENCIA_RESUMO e devolve um resumo de tamanho limitado"""
+    time.sleep(LATENCIA_RESUMO)
+    pedidos = [texto for papel, texto in mensagens if papel == "human"]
+    return (resumo + " Pedidos anteriores: " + "; ".join(pedidos))[-900:]
+
+def benchmark_memoria(turnos=200, max_tokens=1200):
+    """Função para medir o tamanho do prompt ao longo de uma conversa longa"""
+    print("=" * 70)
+    print("BENCHMARK DA MEMÓRIA DE CONVERSA")
+    print("=" * 70)
+
+    aleatorio = random.Random(42)
+    completo = []
+    memoria = MemoriaConversa(max_tokens=max_tokens, resumir=resumir_simulado)
+    marcos = {10, 25, 50, 100, 200, turnos}
+    tempo_adicionar = 0.0
+
+    print(f"\n💬 {turnos} turnos, orçamento da memória: {max_tokens} tokens, "
+          f"resumo simulado com {LATENCIA_RESUMO} s de latência\n")
+    print(f"  {'turnos':>6} | {'histórico completo':>18} | {'memória limitada':>16}")
+    for turno in range(1, turnos + 1):
+        pedido, resposta = gerar_turno(aleatorio)
+        completo.extend([("human", pedido), ("ai", resposta)])
+        inicio = time.perf_counter()
+        memoria.adicionar_turno(pedido, resposta)
+        tempo_adicionar += time.perf_counter() - inicio
+
+        if turno in marcos:
+            memoria.aguardar()
+            print(f"  {turno:>6} | {contar_tokens(formatar_mensagens(completo)):>11} tokens | "
+                  f"{contar_tokens(memoria.texto()):>9} tokens")
+
+    print(f"\n  Tempo médio para registrar um turno: {tempo_adicionar / turnos * 1000:.2f} ms "
+          f"(o resumo roda em segundo plano)")
+    print(f"  Mensagens incorporadas ao resumo: {memoria.mensagens_resumidas}")
+
+    print("=" * 70)
+    print("BENCHMARK CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    benchmark_memoria()
@@ -0,0 +1,109 @@
+"""
+Script para comparar o agente ReAct com a pesquisa em paralelo (latência e chamadas ao modelo)
+"""
+
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+from langchain.agents import AgentType, Tool, initialize_agent
+from langchain_core.language_models import FakeListChatModel
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exemplos"))
+
+# O modelo é simulado: a chave só precisa existir para o exemplo ser importado
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from componentes.roteamento_modelos import NIVEL_PADRAO, RoteadorModelos
+
+# Latências simuladas (segundos), próximas das observadas com a API e a Wikipedia
+LATENCIA_MODELO = 0.8
+LATENCIA_WIKIPEDIA = 0.6
+
+TOPICOS = ["Projeto Alpha", "aprovação de fornecedores", "produtos da SMN"]
+
+
+class ModeloSimulado(FakeListChatModel):
+    """Modelo com respostas fixas, que espera LATENCIA_MODELO e conta as chamadas"""
+
+    chamadas: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.chamadas += 1
+        time.sleep(LATENCIA_MODELO)
+        return super()._call(*args, **kwargs)
+
+
+def wikipedia_simulada(consulta):
+    """Busca na Wikipedia com a latência de uma chamada de rede"""
+    time.sleep(LATENCIA_WIKIPEDIA)
+    return f"Page: {consulta}\nSummary: Texto da enciclopédia sobre {consulta}."
+
+
+def respostas_react(topico):
+    """Passos típicos do agente: uma ferramenta por vez e depois a resposta final"""
+    return [
+        f"Thought: Preciso de informações gerais.\nAction: Busca na Wikipedia\nAction Input: {topico}",
+        f"Thought: Agora as informações da SMN.\nAction: Busca em Documentos Internos\nAction Input: {topico}",
+        f"Thought: Já tenho informações suficientes.\nFinal Answer: Informações sobre {topico}.",
+        f"Resumo sobre {topico}."
+    ]
+
+
+def medir(nome, pesquisa, modo, criar_modelo):
+    """Executa a pesquisa dos tópicos e mostra a latência e as chamadas ao modelo"""
+    tempos, chamadas = [], []
+    for topico in TOPICOS:
+        modelo = criar_modelo(topico)
+        pesquisa.modelo = modelo
+        pesquisa.roteador = RoteadorModelos({NIVEL_PADRAO: modelo})
+        pesquisa.agente = initialize_agent(
+            tools=[Tool(name="Busca na Wikipedia", func=wikipedia_simulada, description="Informações gerais."),
+                   Tool(name="Busca em Documentos Internos", func=pesquisa.buscar_documentos_internos,
+                        description="Informações internas da SMN.")],
+            llm=modelo,
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            verbose=False,
+            handle_parsing_errors=True
+        )
+
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resumo = pesquisa.pesquisar_e_sintetizar(topico, modo=modo)
+        tempos.append(time.perf_counter() - inicio)
+        chamadas.append(modelo.chamadas)
+        assert resumo == f"Resumo sobre {topico}.", resumo
+
+    print(f"  {nome:<26} mediana {statistics.median(tempos):>5.2f} s | máx {max(tempos):>5.2f} s | "
+          f"chamadas ao modelo por pesquisa: {statistics.mean(chamadas):.0f}")
+
+
+def benchmark_pesquisa():
+    """Função para comparar os dois modos de pesquisa"""
+    print("=" * 70)
+    print("BENCHMARK DO AGENTE DE PESQUISA")
+    print("=" * 70)
+
+    import exemplo_pesquisa as pesquisa
+
+    pesquisa.FONTES["wikipedia"] = ("Wikipedia", wikipedia_simulada)
+    pesquisa.obter_busca_documentos()  # Indexar antes de medir
+
+    print(f"\n⏱️ Latência simulada: modelo {LATENCIA_MODELO} s, Wikipedia {LATENCIA_WIKIPEDIA} s\n")
+    medir("agente ReAct (antes)", pesquisa, "agente",
+          lambda topico: ModeloSimulado(responses=respostas_react(topico)))
+    medir("buscas em paralelo (agora)", pesquisa, "paralelo",
+          lambda topico: ModeloSimulado(responses=[f"Resumo sobre {topico}."]))
+
+    print("=" * 70)
+    print("BENCHMARK CONCLUÍDO")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    benchmark_pesquisa()
@@ -0,0 +1,99 @@
+"""
+Script para comparar os níveis de modelo: latência e qualidade (respostas válidas) de cada um,
+sozinho e em cascata (modelo local primeiro, subindo de nível só quando a resposta não serve)
+"""
+
+import os
+import statistics
+import sys
+import time
+
+from langchain_core.language_models import FakeListChatModel
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O modelo é simulado: a chave só precisa existir para os clientes serem criados
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from componentes.consumo_tokens import calcular_custo
+from componentes.roteamento_modelos import NIVEL_PADRAO, RoteadorModelos, validar_json
+
+SOLICITACOES = 40
+TOKENS_ENTRADA, TOKENS_SAIDA = 400, 80
+
+# Nível -> (modelo, latência simulada em segundos, uma resposta inválida a cada N)
+NIVEIS = {
+    "local": ("llama3.1:8b", 0.03, 4),
+    "pequeno": ("gpt-4o-mini", 0.08, 10),
+    NIVEL_PADRAO: ("gpt-4o", 0.25, None)
+}
+
+VALIDA = '{"servico": "calendar", "acao": "listar_eventos", "parametros": {}, "confianca": 0.9}'
+INVALIDA = "Claro! Vou listar os próximos eventos do seu calendário."
+
+
+class ModeloSimulado(FakeListChatModel):
+    """Modelo com latência fixa que erra o formato a cada N respostas"""
+
+    model_name: str = "simulado"
+    latencia: float = 0.0
+
+    def _call(self, *args, **kwargs):
+        time.sleep(self.latencia)
+        return super()._call(*args, **kwargs)
+
+
+def criar_modelo(nivel):
+    modelo, latencia, erra_a_cada = NIVEIS[nivel]
+    respostas = [INVALIDA if erra_a_cada and (i + 1) % erra_a_cada == 0 else VALIDA for i in range(SOLICITACOES)]
+    return ModeloSimulado(responses=respostas, model_name=modelo, latencia=latencia)
+
+
+def medir(nome, ordem):
+    """Roteia as solicitações pelos níveis e mostra latência, qualidade e custo"""
+    roteador = RoteadorModelos({nivel: criar_modelo(nivel) for nivel in NIVEIS}, {"roteamento": ordem})
+    validar = validar_json(("servico", "acao"))
+    tempos, validas = [], 0
+    for _ in range(SOLICITACOES):
+        inicio = time.perf_counter()
+        resposta = roteador.executar("roteamento", lambda llm: llm.invoke("Quais são meus próximos eventos?").content,
+                                     validar=validar)
+        tempos.append(time.perf_counter() - inicio)
+        validas += validar(resposta)
+
+    estatisticas = roteador.estatisticas()["roteamento"]
+    custo = sum(calcular_custo(NIVEIS[nivel][0], TOKENS_ENTRADA, TOKENS_SAIDA) * dados["chamadas"]
+                for nivel, dados in estatisticas.items())
+    atendidas = ", ".join(f"{nivel} {dados['aceitas']}" for nivel, dados in estatisticas.items())
+    tempos.sort()
+    print(f"  {nome:<28} p50 {statistics.median(tempos) * 1000:>5.0f} ms | "
+          f"p95 {tempos[int(0.95 * (len(tempos) - 1))] * 1000:>5.0f} ms | "
+          f"válidas {validas / SOLICITACOES:>6.1%} | US$ {custo / SOLICITACOES * 1000:.3f} por mil | "
+          f"resolvidas: {atendidas}")
+
+
+def benchmark_roteamento_modelos():
+    """Função para comparar cada nível sozinho com a cascata de níveis"""
+    print("=" * 70)
+    print("BENCHMARK DO ROTEAMENTO DE MODELOS")
+    print("=" * 70)
+
+    print(f"\n⏱️ {SOLICITACOES} solicitações; latência simulada: " +
+          ", ".join(f"{nivel} ({modelo}) {latencia * 1000:.0f} ms" for nivel, (modelo, latencia, _) in NIVEIS.items()))
+    print("\nCada nível sozinho:")
+    for nivel in NIVEIS:
+        medir(nivel, [nivel])
+
+    print("\nEm cascata (sobe de nível quando a resposta não é o JSON esperado):")
+    medir("local > padrao", ["local", NIVEL_PADRAO])
+    medir("local > pequeno > padrao", ["local", "pequeno", NIVEL_PADRAO])
+    medir("pequeno > padrao", ["pequeno", NIVEL_PADRAO])
+
+    print("=" * 70)
+    print("BENCHMARK CONCLUÍDO")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    benchmark_roteamento_modelos()
@@ -0,0 +1,140 @@
+"""
+Script para medir o servidor de agentes: pedidos por segundo, latência e memória por sessão
+"""
+
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+import uvicorn
+from langchain_core.language_models import FakeListChatModel
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O modelo é simulado: a chave só precisa existir para os clientes serem criados
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from agentes.agente_integrado import AgenteIntegrado, criar_sessoes
+from agentes.servidor import ServidorAgentes
+from componentes.memoria_conversa import GerenciadorSessoes, MemoriaConversa
+
+# Latência simulada do modelo (segundos)
+LATENCIA_MODELO = 0.2
+
+class ModeloSimulado(FakeListChatModel):
+    """Modelo que sempre pede a lista de times do Teams, depois de LATENCIA_MODELO"""
+
+    def _call(self, *args, **kwargs):
+        time.sleep(LATENCIA_MODELO)
+        return super()._call(*args, **kwargs)
+
+class TeamsSimulado:
+    """Cliente do Teams que devolve uma lista fixa de times"""
+
+    def listar_times(self):
+        return [{"id": "1", "displayName": "Marketing"}, {"id": "2", "displayName": "Vendas"}]
+
+def criar_agentes_simulados(quantidade):
+    """Agentes reais (prompt, memória e roteamento) com modelo e integrações simulados"""
+    llm = ModeloSimulado(responses=['{"servico": "teams", "acao": "listar_times", "parametros": {}}'])
+    sessoes = criar_sessoes(llm)
+    return [AgenteIntegrado(llm=llm, calendar=object(), teams=TeamsSimulado(), api=object(), sessoes=sessoes)
+            for _ in range(quantidade)]
+
+def porta_livre():
+    """Escolhe uma porta TCP livre na máquina"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def enviar_pedido(porta, corpo):
+    """
+    Cliente HTTP mínimo (uma conexão por pedido).
+    O httpx assíncrono não passa de ~60 pedidos/s nesta máquina e viraria o gargalo.
+    """
+    leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+    dados = json.dumps(corpo).encode("utf-8")
+    escritor.write(b"POST /solicitacoes HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                   b"Connection: close\r\nContent-Length: " + str(len(dados)).encode() + b"\r\n\r\n" + dados)
+    await escritor.drain()
+    resposta = await leitor.read()
+    escritor.close()
+    return int(resposta.split(b" ", 2)[1])
+
+async def disparar(porta, pedidos, usuarios, concorrencia):
+    """Envia os pedidos com até `concorrencia` conexões simultâneas"""
+    latencias, status = [], []
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def um_pedido(i):
+        async with semaforo:
+            inicio = time.perf_counter()
+            codigo = await enviar_pedido(porta, {"solicitacao": "Liste os times", "id_usuario": f"usuario{i % usuarios}"})
+            status.append(codigo)
+            if codigo == 200:
+                latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[um_pedido(i) for i in range(pedidos)])
+    return time.perf_counter() - inicio, latencias, status
+
+def medir_vazao(tamanho_pool, max_fila, pedidos=400, usuarios=200, concorrencia=64):
+    """Sobe o servidor com uvicorn e mede pedidos por segundo e latência"""
+    servidor = ServidorAgentes(criar_agentes_simulados, tamanho_pool=tamanho_pool, max_fila=max_fila)
+    porta = porta_livre()
+    uvicorn_servidor = uvicorn.Server(uvicorn.Config(servidor, host="127.0.0.1", port=porta, log_level="error"))
+    thread = threading.Thread(target=uvicorn_servidor.run, daemon=True)
+    thread.start()
+    while not uvicorn_servidor.started:
+        time.sleep(0.05)
+
+    segundos, latencias, status = asyncio.run(disparar(porta, pedidos, usuarios, concorrencia))
+    uvicorn_servidor.should_exit = True
+    thread.join()
+
+    latencias.sort()
+    print(f"  {tamanho_pool:>3} agentes, fila {max_fila:>3} | {status.count(200) / segundos:>6.1f} pedidos/s | "
+          f"p50 {statistics.median(latencias) * 1000:>5.0f} ms | p95 {latencias[int(0.95 * (len(latencias) - 1))] * 1000:>5.0f} ms | "
+          f"503: {status.count(503)}")
+
+def medir_memoria_sessoes(sessoes=2000, turnos=5):
+    """Memória ocupada por sessão de conversa"""
+    tracemalloc.start()
+    antes, _ = tracemalloc.get_traced_memory()
+    gerenciador = GerenciadorSessoes(lambda: MemoriaConversa(1200), max_sessoes=sessoes)
+    for i in range(sessoes):
+        memoria = gerenciador.obter(f"usuario{i}")
+        for turno in range(turnos):
+            memoria.adicionar_turno(f"Agende uma reunião com a equipe {turno} amanhã às 14h",
+                                    '{"servico": "calendar", "acao": "criar_evento", "parametros": {}}')
+    depois, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  Memória por sessão ({turnos} turnos): {(depois - antes) / sessoes / 1024:.1f} KB")
+
+def benchmark_servidor():
+    """Função para medir o servidor com agentes simulados"""
+    print("=" * 70)
+    print("BENCHMARK DO SERVIDOR DE AGENTES")
+    print("=" * 70)
+    print(f"\n⏱️ Modelo simulado com {LATENCIA_MODELO} s de latência, 64 clientes simultâneos\n")
+
+    medir_memoria_sessoes()
+    print()
+    medir_vazao(tamanho_pool=1, max_fila=100)
+    medir_vazao(tamanho_pool=8, max_fila=100)
+    medir_vazao(tamanho_pool=32, max_fila=100)
+    medir_vazao(tamanho_pool=8, max_fila=16)
+
+    print("=" * 70)
+    print("BENCHMARK CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    benchmark_servidor()
@@ -0,0 +1,397 @@
+"""
+Servidores simulados (locais e determinísticos) para testar os agentes sem credenciais nem rede:
+um modelo compatível com a API da OpenAI, o Google Calendar, o Microsoft Graph e a API interna.
+
+Cada servidor roda em uma thread, em uma porta livre de 127.0.0.1, com latência
+configurável. Os clientes reais (ChatOpenAI, googleapiclient, TeamsIntegration e
+APIInterna) são apontados para eles pelas variáveis de ambiente (ver variaveis_ambiente).
+
+Para subir todos e usar com o servidor de agentes (ou outro processo):
+    python testes/servidores_simulados.py
+"""
+
+import datetime
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.tokens import contar_tokens
+
+# Respostas do modelo simulado para o agente integrado: (padrão procurado na
+# solicitação, resposta). A resposta pode usar os grupos do padrão (\g<nome>).
+RESPOSTAS_AGENTE = [
+    (r"Solicitação:[^\n]*\b(times|equipes)\b",
+     '{"servico": "teams", "acao": "listar_times", "parametros": {}, "confianca": 0.95}'),
+    (r"Solicitação:[^\n]*\bcanais\b",
+     '{"servico": "teams", "acao": "listar_canais", "parametros": {}, "confianca": 0.9}'),
+    (r"Solicitação:[^\n]*\bcanal (?P<canal>[\w/-]+)[^\n]*: (?P<texto>[^\n\"]+)",
+     r'{"servico": "teams", "acao": "enviar_mensagem", '
+     r'"parametros": {"canal": "\g<canal>", "texto": "\g<texto>"}, "confianca": 0.9}'),
+    (r"Solicitação:[^\n]*\b(agenda|eventos|reuniões)\b",
+     '{"servico": "calendar", "acao": "listar_eventos", "parametros": {"max_results": 5}, "confianca": 0.9}'),
+    (r"Solicitação:[^\n]*\bprojetos (?P<status>\w+)",
+     r'{"servico": "api_interna", "acao": "buscar_projetos", "parametros": {"status": "\g<status>"}, '
+     r'"confianca": 0.9}'),
+    (r"Solicitação:[^\n]*\bfuncionário (?P<email>[^\s\"]+@[^\s\"]+)",
+     r'{"servico": "api_interna", "acao": "buscar_funcionario", "parametros": {"email": "\g<email>"}, '
+     r'"confianca": 0.9}')
+]
+
+# Resposta quando nenhum padrão combina (ex.: os resumos da memória de conversa)
+RESPOSTA_PADRAO = "Resumo: o usuário consultou times, agenda e projetos."
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    """Uma thread por conexão, com fila grande o bastante para muitos usuários ao mesmo tempo."""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class ServidorSimulado:
+    """
+    Servidor HTTP de JSON com rotas, latência e contagem de requisições.
+
+    As rotas são (método, expressão do caminho) -> função(corpo, parametros, **grupos),
+    que retorna o JSON da resposta ou (status, JSON).
+    """
+
+    def __init__(self, rotas, latencia=0.0, porta=0):
+        """
+        Args:
+            rotas (dict): (método, expressão regular do caminho) -> função
+            latencia (float): Segundos de espera antes de cada resposta
+            porta (int): Porta (0 = uma livre)
+        """
+        self.rotas = [(metodo, re.compile(padrao + "$"), funcao) for (metodo, padrao), funcao in rotas.items()]
+        self.latencia = latencia
+        self.requisicoes = 0
+        self._trava = threading.Lock()
+        self._http = _ServidorHTTP(("127.0.0.1", porta), self._criar_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        """Endereço do servidor (ex.: http://127.0.0.1:54321)."""
+        return f"http://127.0.0.1:{self._http.server_address[1]}"
+
+    def iniciar(self):
+        """Começa a atender em segundo plano."""
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        """Para de atender e libera a porta."""
+        self._http.shutdown()
+        self._http.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *erro):
+        self.parar()
+
+    def atender(self, metodo, caminho, corpo):
+        """Escolhe a rota e monta a resposta: (status, JSON)."""
+        partes = urlsplit(caminho)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(partes.query).items()}
+        for metodo_rota, padrao, funcao in self.rotas:
+            encontrado = padrao.match(partes.path)
+            if metodo_rota == metodo and encontrado:
+                with self._trava:
+                    self.requisicoes += 1
+                resposta = funcao(corpo, parametros, **encontrado.groupdict())
+                return resposta if isinstance(resposta, tuple) else (200, resposta)
+        return 404, {"error": {"message": f"Rota não simulada: {metodo} {partes.path}"}}
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _responder(self):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                bruto = self.rfile.read(tamanho) if tamanho else b""
+                tipo = self.headers.get("Content-Type", "")
+                if not bruto:
+                    corpo = {}
+                elif "json" in tipo:
+                    corpo = json.loads(bruto)
+                else:
+                    corpo = {nome: valores[-1] for nome, valores in parse_qs(bruto.decode()).items()}
+
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                try:
+                    status, resposta = servidor.atender(self.command, self.path, corpo)
+                except Exception as e:
+                    status, resposta = 500, {"error": {"message": f"{type(e).__name__}: {e}"}}
+
+                dados = json.dumps(resposta, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _responder
+
+            def log_message(self, *args):
+                pass  # Sem uma linha no terminal por requisição
+
+        return Handler
+
+
+class OpenAISimulada(ServidorSimulado):
+    """
+    Modelo compatível com a API da OpenAI (/v1/chat/completions) e respostas determinísticas.
+
+    A resposta é a do primeiro padrão que aparece na última mensagem (os grupos
+    do padrão podem ser usados na resposta); sem nenhum, a resposta padrão.
+    Também serve como nível local do roteador de modelos (MODELO_NIVEL_*).
+    """
+
+    def __init__(self, respostas=None, resposta_padrao=RESPOSTA_PADRAO, latencia=0.0, latencia_por_token=0.0,
+                 porta=0):
+        """
+        Args:
+            respostas (list): Pares (expressão regular, resposta); a resposta pode usar
+                os grupos do padrão (\\g<nome>) ou ser uma função que recebe o re.Match
+            resposta_padrao (str): Resposta quando nenhum padrão combina
+            latencia (float): Segundos até a primeira resposta
+            latencia_por_token (float): Segundos a mais por token gerado
+            porta (int): Porta (0 = uma livre)
+        """
+        super().__init__({
+            ("POST", r"/v1/chat/completions"): self._completar,
+            ("GET", r"/v1/models"): lambda corpo, parametros: {"object": "list", "data": []}
+        }, latencia, porta)
+        self.respostas = [(re.compile(padrao), resposta) for padrao, resposta in (respostas or [])]
+        self.resposta_padrao = resposta_padrao
+        self.latencia_por_token = latencia_por_token
+        self._ids = itertools.count(1)
+
+    def responder(self, texto):
+        """Resposta para o texto da última mensagem."""
+        for padrao, resposta in self.respostas:
+            encontrado = padrao.search(texto)
+            if encontrado:
+                return resposta(encontrado) if callable(resposta) else encontrado.expand(resposta)
+        return self.resposta_padrao
+
+    def _completar(self, corpo, parametros):
+        mensagens = corpo.get("messages", [])
+        texto = str(mensagens[-1].get("content", "")) if mensagens else ""
+        conteudo = self.responder(texto)
+        modelo = corpo.get("model", "simulado")
+        tokens_entrada = sum(contar_tokens(str(m.get("content", "")), modelo) for m in mensagens)
+        tokens_saida = contar_tokens(conteudo, modelo)
+        if self.latencia_por_token:
+            time.sleep(self.latencia_por_token * tokens_saida)
+        return {
+            "id": f"chatcmpl-simulado-{next(self._ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": modelo,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": conteudo},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": tokens_entrada, "completion_tokens": tokens_saida,
+                      "total_tokens": tokens_entrada + tokens_saida}
+        }
+
+
+class CalendarSimulado(ServidorSimulado):
+    """Google Calendar (v3) com uma agenda fixa e o endpoint de token do OAuth."""
+
+    def __init__(self, eventos=None, latencia=0.0, porta=0):
+        """
+        Args:
+            eventos (list, opcional): Eventos da agenda (padrão: três reuniões fixas)
+            latencia (float): Segundos de espera antes de cada resposta
+            porta (int): Porta (0 = uma livre)
+        """
+        super().__init__({
+            ("POST", r"/token"): lambda corpo, parametros: {"access_token": "simulado", "expires_in": 3600,
+                                                           "token_type": "Bearer"},
+            ("GET", r"/calendar/v3/calendars/(?P<calendario>[^/]+)/events"): self._listar,
+            ("POST", r"/calendar/v3/calendars/(?P<calendario>[^/]+)/events"): self._criar
+        }, latencia, porta)
+        inicio = datetime.datetime(2025, 1, 6, 9)
+        self.eventos = eventos or [
+            {"id": f"evento{i}", "summary": titulo,
+             "start": {"dateTime": (inicio + datetime.timedelta(days=i)).isoformat() + "Z"},
+             "end": {"dateTime": (inicio + datetime.timedelta(days=i, hours=1)).isoformat() + "Z"}}
+            for i, titulo in enumerate(["Reunião de planejamento", "Revisão do Projeto Alpha", "1:1 com a gestão"])
+        ]
+        self._ids = itertools.count(len(self.eventos))
+
+    def _listar(self, corpo, parametros, calendario):
+        return {"kind": "calendar#events", "items": self.eventos[:int(parametros.get("maxResults", 250))]}
+
+    def _criar(self, corpo, parametros, calendario):
+        return {**corpo, "id": f"evento{next(self._ids)}", "status": "confirmed"}
+
+
+class GraphSimulado(ServidorSimulado):
+    """Microsoft Graph (v1.0) com times, canais e envio de mensagens."""
+
+    def __init__(self, times=None, latencia=0.0, porta=0):
+        """
+        Args:
+            times (dict, opcional): Nome do time -> nomes dos canais
+            latencia (float): Segundos de espera antes de cada resposta
+            porta (int): Porta (0 = uma livre)
+        """
+        super().__init__({
+            ("GET", r"/v1.0/me/joinedTeams"): self._listar_times,
+            ("GET", r"/v1.0/teams/(?P<time>[^/]+)/channels"): self._listar_canais,
+            ("POST", r"/v1.0/teams/(?P<time>[^/]+)/channels/(?P<canal>[^/]+)/messages"): self._enviar,
+            ("POST", r"/v1.0/chats/(?P<chat>[^/]+)/messages"): self._enviar
+        }, latencia, porta)
+        times = times or {"Marketing": ["Geral", "Campanhas"], "Vendas": ["Geral", "Propostas"]}
+        self.times = [{"id": f"time{i}", "displayName": nome, "canais": canais}
+                      for i, (nome, canais) in enumerate(times.items(), 1)]
+        self._ids = itertools.count(1)
+
+    def _listar_times(self, corpo, parametros):
+        return {"value": [{"id": t["id"], "displayName": t["displayName"]} for t in self.times]}
+
+    def _listar_canais(self, corpo, parametros, time):
+        for t in self.times:
+            if t["id"] == time:
+                return {"value": [{"id": f"{time}-canal{i}", "displayName": nome}
+                                  for i, nome in enumerate(t["canais"], 1)]}
+        return 404, {"error": {"code": "NotFound", "message": f"Time {time} não encontrado"}}
+
+    def _enviar(self, corpo, parametros, **destino):
+        return 201, {"id": f"mensagem{next(self._ids)}", **destino, "body": corpo.get("body")}
+
+
+class APIInternaSimulada(ServidorSimulado):
+    """API interna com projetos, funcionários e tarefas fixos."""
+
+    def __init__(self, latencia=0.0, porta=0):
+        """
+        Args:
+            latencia (float): Segundos de espera antes de cada resposta
+            porta (int): Porta (0 = uma livre)
+        """
+        super().__init__({
+            ("GET", r"/projetos"): self._projetos,
+            ("GET", r"/funcionarios"): self._funcionarios,
+            ("POST", r"/tarefas"): self._tarefa
+        }, latencia, porta)
+        self.projetos = [
+            {"id": 1, "nome": "Projeto Alpha", "status": "em_andamento", "departamento": "TI"},
+            {"id": 2, "nome": "Migração para a nuvem", "status": "em_andamento", "departamento": "Infra"},
+            {"id": 3, "nome": "Portal do cliente", "status": "concluido", "departamento": "TI"}
+        ]
+        self.funcionarios = [{"id": 1, "nome": "Ana Souza", "email": "ana@smn.com.br"},
+                             {"id": 2, "nome": "Bruno Lima", "email": "bruno@smn.com.br"}]
+        self._ids = itertools.count(1)
+
+    def _projetos(self, corpo, parametros):
+        return [p for p in self.projetos
+                if all(p.get(campo) == valor for campo, valor in parametros.items())]
+
+    def _funcionarios(self, corpo, parametros):
+        for funcionario in self.funcionarios:
+            if str(funcionario["id"]) == parametros.get("id") or funcionario["email"] == parametros.get("email"):
+                return funcionario
+        return 404, {"erro": "Funcionário não encontrado"}
+
+    def _tarefa(self, corpo, parametros):
+        return 201, {**corpo, "id": next(self._ids), "status": "aberta"}
+
+
+class ServidoresSimulados:
+    """Os quatro servidores simulados juntos, com as variáveis que apontam os clientes para eles."""
+
+    def __init__(self, latencia_llm=0.0, latencia_integracoes=0.0, respostas=None, latencia_por_token=0.0,
+                 porta_inicial=0):
+        """
+        Args:
+            latencia_llm (float): Segundos de cada chamada ao modelo
+            latencia_integracoes (float): Segundos de cada chamada ao Calendar, Graph e API interna
+            respostas (list, opcional): Respostas do modelo (padrão: RESPOSTAS_AGENTE)
+            latencia_por_token (float): Segundos a mais por token gerado pelo modelo
+            porta_inicial (int): Porta do modelo; as integrações usam as seguintes
+                (0 = portas livres quaisquer)
+        """
+        portas = [porta_inicial + i if porta_inicial else 0 for i in range(4)]
+        self.openai = OpenAISimulada(RESPOSTAS_AGENTE if respostas is None else respostas,
+                                     latencia=latencia_llm, latencia_por_token=latencia_por_token, porta=portas[0])
+        self.calendar = CalendarSimulado(latencia=latencia_integracoes, porta=portas[1])
+        self.graph = GraphSimulado(latencia=latencia_integracoes, porta=portas[2])
+        self.api = APIInternaSimulada(latencia=latencia_integracoes, porta=portas[3])
+        self.servidores = [self.openai, self.calendar, self.graph, self.api]
+
+    def variaveis_ambiente(self):
+        """
+        Variáveis que apontam os clientes reais para os servidores simulados.
+
+        Returns:
+            dict: Nome -> valor (para os.environ ou para o .env)
+        """
+        return {
+            "OPENAI_API_KEY": "simulada",
+            "OPENAI_API_BASE": f"{self.openai.url}/v1",
+            "GOOGLE_CLIENT_ID": "simulado",
+            "GOOGLE_CLIENT_SECRET": "simulado",
+            "GOOGLE_REFRESH_TOKEN": "simulado",
+            "GOOGLE_TOKEN_URI": f"{self.calendar.url}/token",
+            "GOOGLE_CALENDAR_URL": f"{self.calendar.url}/calendar/v3/",
+            "TEAMS_CLIENT_ID": "simulado",
+            "TEAMS_CLIENT_SECRET": "simulado",
+            "TEAMS_TENANT_ID": "simulado",
+            "TEAMS_GRAPH_URL": f"{self.graph.url}/v1.0",
+            "INTERNAL_API_URL": self.api.url,
+            "INTERNAL_API_KEY": "simulada"
+        }
+
+    def requisicoes(self):
+        """Requisições atendidas por cada servidor."""
+        return {nome: servidor.requisicoes for nome, servidor in
+                zip(("openai", "calendar", "graph", "api_interna"), self.servidores)}
+
+    def iniciar(self):
+        for servidor in self.servidores:
+            servidor.iniciar()
+        return self
+
+    def parar(self):
+        for servidor in self.servidores:
+            servidor.parar()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *erro):
+        self.parar()
+
+
+if __name__ == "__main__":
+    latencia_llm = float(os.getenv("SIMULACAO_LATENCIA_LLM", "0.5"))
+    latencia_integracoes = float(os.getenv("SIMULACAO_LATENCIA_INTEGRACOES", "0.05"))
+    porta_inicial = int(os.getenv("SIMULACAO_PORTA", "8001"))
+    with ServidoresSimulados(latencia_llm, latencia_integracoes, porta_inicial=porta_inicial) as simulados:
+        print("Servidores simulados no ar. Use estas variáveis no processo dos agentes:\n")
+        for nome, valor in simulados.variaveis_ambiente().items():
+            print(f"{nome}={valor}")
+        print("\nCtrl+C para encerrar.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"\nRequisições atendidas: {simulados.requisicoes()}")
@@ -0,0 +1,93 @@
+"""
+Script para testar a busca em documentos internos sem acesso à internet
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.busca_documentos import BuscaDocumentos, trecho_destacado
+from componentes.texto import radical, remover_acentos, tokenizar
+
+DOCUMENTOS = {
+    "politica_ferias.md": "# Política de Férias\n\nOs funcionários têm direito a 30 dias de férias por ano. "
+                          "As férias devem ser solicitadas com 30 dias de antecedência.",
+    "reembolso.txt": "O formulário RH-042 deve ser usado para solicitar reembolso de despesas de viagem.",
+    "fornecedores.txt": "Processo de aprovação de novos fornecedores: solicitação via portal, análise financeira "
+                        "e verificação de compliance pelo comitê de compras.",
+    "ignorado.pdf": "Arquivos de outros tipos não são indexados."
+}
+
+def testar_tokenizacao():
+    """Testa a remoção de acentos e a redução ao radical"""
+    print("\n🔄 Testando tokenização em português...")
+    assert remover_acentos("Férias, aprovação, ﬁm") == "Ferias, aprovacao, fim"
+    assert radical("fornecedores") == radical("fornecedor")
+    assert radical("politicas") == radical("politica")
+    assert tokenizar("Formulário RH-042", radicais=True) == ["formulari", "rh-042"]
+    print("✅ Acentos removidos, plurais e femininos reduzidos e códigos preservados")
+
+def testar_busca_diretorio():
+    """Testa a indexação de uma pasta, a persistência do índice e os trechos destacados"""
+    print("\n🔄 Testando busca em uma pasta de documentos...")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for nome, conteudo in DOCUMENTOS.items():
+            with open(os.path.join(diretorio, nome), "w", encoding="utf-8") as f:
+                f.write(conteudo)
+        caminho_indice = os.path.join(diretorio, "indice", "documentos.json.gz")
+
+        busca = BuscaDocumentos.abrir(diretorio, caminho_indice)
+        assert len(busca) == 3 and os.path.exists(caminho_indice), len(busca)
+        print("✅ Pasta indexada (só .txt e .md) e índice salvo em disco")
+
+        resultados = busca.buscar("politicas de ferias")
+        assert resultados[0]["titulo"] == "politica_ferias", resultados
+        assert "**Férias**" in resultados[0]["trecho"], resultados[0]["trecho"]
+        print(f"✅ Consulta sem acentos encontrou: {resultados[0]['trecho'][:60]}...")
+
+        resultados = busca.buscar("fornecedor")
+        assert resultados[0]["titulo"] == "fornecedores" and "**fornecedores**" in resultados[0]["trecho"]
+        print("✅ Singular na consulta encontrou o plural no documento")
+
+        recarregada = BuscaDocumentos.abrir(diretorio, caminho_indice)
+        assert recarregada.buscar("RH-042")[0]["titulo"] == "reembolso"
+        print("✅ Índice recarregado do disco com os mesmos resultados")
+
+        time.sleep(0.01)
+        with open(os.path.join(diretorio, "novo.txt"), "w", encoding="utf-8") as f:
+            f.write("Novo manual de segurança da informação.")
+        atualizada = BuscaDocumentos.abrir(diretorio, caminho_indice)
+        assert atualizada.buscar("segurança")[0]["titulo"] == "novo"
+        print("✅ Pasta alterada: o índice foi refeito")
+
+def testar_trecho_destacado():
+    """Testa a escolha do trecho com mais termos da consulta"""
+    print("\n🔄 Testando trechos destacados...")
+    texto = "Introdução sem relação. " * 30 + "O reembolso de despesas usa o formulário RH-042. " + "Fim. " * 30
+    trecho = trecho_destacado(texto, "reembolso formulario", tamanho=80)
+    assert trecho.startswith("...") and trecho.endswith("...") and len(trecho) < 140, trecho
+    assert "**reembolso**" in trecho and "**formulário**" in trecho, trecho
+    print(f"✅ {trecho}")
+
+def testar_busca_documentos():
+    """Função para testar a busca em documentos internos"""
+    print("=" * 70)
+    print("TESTE DA BUSCA EM DOCUMENTOS INTERNOS")
+    print("=" * 70)
+
+    for teste in [testar_tokenizacao, testar_busca_diretorio, testar_trecho_destacado]:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Resultado inesperado em {teste.__name__}: {e}")
+
+    print("=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_busca_documentos()
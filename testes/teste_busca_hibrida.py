@@ -0,0 +1,67 @@
+"""
+Script para testar a busca híbrida (BM25 + vetores) sem acesso à internet
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.bm25 import IndiceBM25
+from componentes.busca_hibrida import BuscadorHibrido, fusao_rrf
+
+class BaseVetorialFalsa:
+    """Base vetorial de teste que sempre devolve os documentos na mesma ordem"""
+
+    def __init__(self, documentos):
+        self.documentos = documentos
+
+    def similarity_search(self, pergunta, k=4):
+        return self.documentos[:k]
+
+def testar_busca_hibrida():
+    """Função para testar o índice BM25, a fusão RRF e o buscador híbrido"""
+    print("=" * 70)
+    print("TESTE DA BUSCA HÍBRIDA")
+    print("=" * 70)
+
+    textos = [
+        "Os funcionários têm direito a 30 dias de férias por ano.",
+        "O formulário RH-042 deve ser usado para solicitar reembolso de despesas.",
+        "Reuniões importantes sempre ocorrem às terças-feiras."
+    ]
+
+    try:
+        indice = IndiceBM25()
+        indice.adicionar_varios(textos)
+        resultados = indice.buscar("formulario rh-042")
+        assert resultados[0][0] == 1, resultados
+        print("✅ BM25 encontrou o documento pelo código do formulário")
+
+        fusao = fusao_rrf([[0, 1, 2], [1, 2]])
+        assert fusao[0][0] == 1, fusao
+        print("✅ RRF priorizou o documento presente nas duas buscas")
+
+        documentos = [SimpleNamespace(page_content=texto) for texto in textos]
+        buscador = BuscadorHibrido(documentos, BaseVetorialFalsa(documentos))
+        encontrados = buscador.buscar("Onde está o formulário RH-042?", k=1)
+        assert encontrados[0].page_content == textos[1], encontrados
+        print("✅ Busca híbrida retornou o trecho com correspondência exata")
+
+        filtrado = BuscadorHibrido(documentos, BaseVetorialFalsa(documentos), limiar_fusao=0.02)
+        encontrados = filtrado.buscar("Onde está o formulário RH-042?", k=3)
+        assert [documento.page_content for documento in encontrados] == [textos[1]], encontrados
+        assert filtrado.buscar("Qual é a previsão do tempo?", k=3) == []
+        assert len(buscador.buscar("Qual é a previsão do tempo?", k=3)) == 3
+        print("✅ Sem reranker, o limiar da fusão descarta trechos achados por uma só busca")
+    except AssertionError as e:
+        print(f"❌ Resultado inesperado: {e}")
+
+    print("=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_busca_hibrida()
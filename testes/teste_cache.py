@@ -0,0 +1,71 @@
+"""
+Script para testar os caches dos agentes sem acesso à internet
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.cache_disco import CacheDisco
+from componentes.cache_semantico import CacheSemantico
+from componentes.texto import hash_conteudo
+
+def testar_cache_semantico():
+    """Testa acertos exatos, por similaridade e a invalidação por fontes"""
+    print("\n🔄 Testando cache semântico de respostas...")
+    cache = CacheSemantico(limiar_similaridade=0.9)
+    cache.sincronizar(["trecho-ferias", "trecho-home-office"])
+
+    cache.guardar("Como solicitar férias?", [1.0, 0.0, 0.1], "Pelo Portal RH.", ["trecho-ferias"])
+
+    assert cache.buscar_exata("como solicitar ferias") == "Pelo Portal RH."
+    print("✅ Pergunta igual (após normalização) respondida pelo cache")
+
+    assert cache.buscar([0.98, 0.05, 0.1]) == "Pelo Portal RH."
+    assert cache.buscar([0.0, 1.0, 0.0]) is None
+    print("✅ Pergunta parecida reaproveitada; pergunta diferente ignorada")
+
+    invalidadas = cache.sincronizar(["trecho-ferias-v2", "trecho-home-office"])
+    assert invalidadas == 1 and cache.buscar_exata("Como solicitar férias?") is None
+    print("✅ Resposta invalidada quando o trecho de origem mudou")
+
+def testar_cache_disco():
+    """Testa o cache em disco endereçado por conteúdo e a remoção por tamanho"""
+    print("\n🔄 Testando cache em disco...")
+    with tempfile.TemporaryDirectory() as diretorio:
+        cache = CacheDisco(diretorio, max_bytes=2500)
+
+        chave = hash_conteudo("extracao", "segmento 1", "template", "gpt-3.5-turbo", "geral")
+        cache.guardar(chave, {"titulo": "Relatório"})
+        assert CacheDisco(diretorio).obter(chave) == {"titulo": "Relatório"}
+        print("✅ Valor persistido e lido novamente por outra instância")
+
+        for i in range(5):
+            cache.guardar(hash_conteudo("item", i), "x" * 500)
+            time.sleep(0.01)
+        assert cache._tamanho_total <= 2500
+        assert cache.obter(chave) is None and cache.obter(hash_conteudo("item", 4)) is not None
+        print("✅ Itens menos usados removidos ao atingir o tamanho máximo")
+
+def testar_caches():
+    """Função para testar os caches"""
+    print("=" * 70)
+    print("TESTE DOS CACHES")
+    print("=" * 70)
+
+    for teste in [testar_cache_semantico, testar_cache_disco]:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Resultado inesperado em {teste.__name__}: {e}")
+
+    print("=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_caches()
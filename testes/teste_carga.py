@@ -0,0 +1,157 @@
+"""
+Script para testar a carga do agente integrado sem credenciais nem rede: os clientes reais
+(ChatOpenAI, Google Calendar, Microsoft Graph e API interna) falam com servidores simulados
+locais, e N usuários simultâneos mandam solicitações. Mostra p50/p95/p99 de cada nível de carga.
+
+Configuração (variáveis de ambiente):
+    CARGA_USUARIOS=1,10,25              Usuários simultâneos de cada rodada
+    CARGA_PEDIDOS_POR_USUARIO=6         Solicitações de cada usuário por rodada
+    SIMULACAO_LATENCIA_LLM=0.2          Segundos de cada chamada ao modelo simulado
+    SIMULACAO_LATENCIA_INTEGRACOES=0.02 Segundos de cada chamada às integrações simuladas
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from testes.servidores_simulados import ServidoresSimulados
+
+USUARIOS = [int(n) for n in os.getenv("CARGA_USUARIOS", "1,10,25").split(",")]
+PEDIDOS_POR_USUARIO = int(os.getenv("CARGA_PEDIDOS_POR_USUARIO", "6"))
+LATENCIA_LLM = float(os.getenv("SIMULACAO_LATENCIA_LLM", "0.2"))
+LATENCIA_INTEGRACOES = float(os.getenv("SIMULACAO_LATENCIA_INTEGRACOES", "0.02"))
+
+# Solicitações de cada usuário (em ciclo) e o tipo de resultado esperado
+SOLICITACOES = [
+    ("Quais times do Teams eu participo?", "times_teams"),
+    ("Mostre minha agenda da semana", "eventos_calendar"),
+    ("Liste os projetos em_andamento", "projetos"),
+    ("Envie no canal time1/time1-canal1 a mensagem: Reunião adiada para amanhã", "mensagem_enviada"),
+    ("Busque o funcionário ana@smn.com.br", "funcionario"),
+    ("Quais canais existem?", "canais_teams")
+]
+
+# Servidores simulados do teste: sobem antes dos agentes serem importados, para
+# que os clientes leiam as variáveis que apontam para eles
+simulados = ServidoresSimulados(LATENCIA_LLM, LATENCIA_INTEGRACOES).iniciar()
+os.environ.update(simulados.variaveis_ambiente())
+
+from agentes.servidor import criar_agentes_integrados
+from componentes.rastreamento import rastreador
+
+def percentil(valores_ordenados, p):
+    """Percentil p (0-100) de uma lista ordenada, pelo valor mais próximo."""
+    return valores_ordenados[min(len(valores_ordenados) - 1, round(p / 100 * (len(valores_ordenados) - 1)))]
+
+def testar_servidores_simulados():
+    """Testa os clientes reais das integrações contra os servidores simulados"""
+    print("\n🔄 Testando servidores simulados...")
+    from integracao.api_interna import APIInterna
+    from integracao.google_calendar import GoogleCalendarIntegration
+    from integracao.teams import TeamsIntegration
+
+    assert len(GoogleCalendarIntegration().listar_eventos(2)) == 2
+    print("✅ Google Calendar: token do OAuth e listagem de eventos simulados")
+    assert [t["displayName"] for t in TeamsIntegration().listar_times()] == ["Marketing", "Vendas"]
+    print("✅ Microsoft Graph: times do usuário simulados")
+    assert [p["id"] for p in APIInterna().buscar_projetos("concluido")] == [3]
+    print("✅ API interna: projetos filtrados por status")
+
+    from langchain_openai import ChatOpenAI
+    resposta = ChatOpenAI(model_name="gpt-3.5-turbo").invoke("Solicitação: quais times eu tenho?")
+    assert json.loads(resposta.content)["acao"] == "listar_times"
+    assert resposta.response_metadata["token_usage"]["completion_tokens"] > 0
+    print("✅ Modelo compatível com a OpenAI: resposta determinística e uso de tokens")
+
+def testar_agente_offline():
+    """Testa cada tipo de solicitação de ponta a ponta, duas vezes, com o mesmo resultado"""
+    print("\n🔄 Testando o agente integrado sem rede...")
+    agente = criar_agentes_integrados(1)[0]
+    for solicitacao, tipo in SOLICITACOES:
+        primeiro = agente.processar_solicitacao(solicitacao, id_usuario="ana")
+        segundo = agente.processar_solicitacao(solicitacao, id_usuario="bruno")
+        assert primeiro["sucesso"] and primeiro["tipo"] == tipo, (solicitacao, primeiro)
+        if tipo != "mensagem_enviada":  # Cada mensagem enviada recebe um id novo
+            assert primeiro == segundo, "as respostas simuladas deveriam ser determinísticas"
+    print(f"✅ {len(SOLICITACOES)} tipos de solicitação atendidos (Teams, Calendar e API interna), "
+          "com o mesmo resultado a cada vez")
+
+def rodar_carga(usuarios):
+    """
+    Executa uma rodada: cada usuário (com seu próprio agente) manda suas solicitações em sequência.
+
+    Returns:
+        dict: Latências (s) ordenadas, falhas, duração total (s) e requisições aos servidores
+    """
+    agentes = criar_agentes_integrados(usuarios)
+    antes = simulados.requisicoes()
+    rastreador.limpar()
+
+    def usuario(numero):
+        latencias, falhas = [], 0
+        for i in range(PEDIDOS_POR_USUARIO):
+            solicitacao, tipo = SOLICITACOES[(numero + i) % len(SOLICITACOES)]
+            inicio = time.perf_counter()
+            resultado = agentes[numero].processar_solicitacao(solicitacao, id_usuario=f"usuario{numero}")
+            latencias.append(time.perf_counter() - inicio)
+            falhas += not (resultado["sucesso"] and resultado["tipo"] == tipo)
+        return latencias, falhas
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=usuarios) as executor:
+        resultados = list(executor.map(usuario, range(usuarios)))
+    duracao = time.perf_counter() - inicio
+
+    depois = simulados.requisicoes()
+    return {
+        "latencias": sorted(latencia for latencias, _ in resultados for latencia in latencias),
+        "falhas": sum(falhas for _, falhas in resultados),
+        "duracao": duracao,
+        "requisicoes": {nome: depois[nome] - antes[nome] for nome in depois}
+    }
+
+def testar_carga():
+    """Testa o agente com N usuários simultâneos e mostra p50/p95/p99"""
+    print(f"\n🔄 Testando carga ({PEDIDOS_POR_USUARIO} solicitações por usuário; latência simulada: "
+          f"modelo {LATENCIA_LLM * 1000:.0f} ms, integrações {LATENCIA_INTEGRACOES * 1000:.0f} ms)...")
+    for usuarios in USUARIOS:
+        rodada = rodar_carga(usuarios)
+        latencias, total = rodada["latencias"], len(rodada["latencias"])
+        assert rodada["falhas"] == 0, f"{rodada['falhas']} de {total} solicitações falharam com {usuarios} usuários"
+        assert latencias[0] >= LATENCIA_LLM, "toda solicitação passa pelo modelo simulado"
+
+        etapas = rastreador.resumo()["etapas"]
+        print(f"✅ {usuarios:>3} usuários | {total:>4} solicitações | {total / rodada['duracao']:>6.1f}/s | "
+              f"p50 {percentil(latencias, 50) * 1000:>6.0f} ms | p95 {percentil(latencias, 95) * 1000:>6.0f} ms | "
+              f"p99 {percentil(latencias, 99) * 1000:>6.0f} ms")
+        print("       p95 por etapa: " + ", ".join(f"{etapa} {dados['p95_ms']:.0f} ms"
+                                                 for etapa, dados in sorted(etapas.items())) +
+              " | requisições: " + ", ".join(f"{nome} {n}" for nome, n in rodada["requisicoes"].items()))
+
+def testar_carga_agente():
+    """Função para executar todos os testes"""
+    print("=" * 70)
+    print("TESTE DE CARGA DO AGENTE INTEGRADO (SERVIDORES SIMULADOS)")
+    print("=" * 70)
+
+    testes = [testar_servidores_simulados, testar_agente_offline, testar_carga]
+    try:
+        for teste in testes:
+            try:
+                teste()
+            except AssertionError as e:
+                print(f"❌ Falha em {teste.__name__}: {e}")
+    finally:
+        simulados.parar()
+
+    print("\n" + "=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_carga_agente()
@@ -0,0 +1,184 @@
+"""
+Script para testar a junção de chamadas idênticas em andamento (ChamadaUnica e coalescer)
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from integracao.utils import ChamadaUnica, coalescer
+
+class ServicoSimulado:
+    """Serviço lento que conta quantas requisições recebeu"""
+
+    def __init__(self, pausa=0.1):
+        self.pausa = pausa
+        self.requisicoes = 0
+        self._trava = threading.Lock()
+
+    def buscar(self, status):
+        with self._trava:
+            self.requisicoes += 1
+        time.sleep(self.pausa)
+        if status == "erro":
+            raise ConnectionError("serviço fora do ar")
+        return [{"nome": "Projeto A", "status": status}]
+
+    async def buscar_async(self, status):
+        self.requisicoes += 1
+        await asyncio.sleep(self.pausa)
+        if status == "erro":
+            raise ConnectionError("serviço fora do ar")
+        return [{"nome": "Projeto A", "status": status}]
+
+def chamar_em_paralelo(funcao, argumentos):
+    """Chama a função ao mesmo tempo em várias threads e devolve resultados ou erros"""
+    def chamar(argumento):
+        try:
+            return funcao(argumento)
+        except Exception as e:
+            return e
+    with ThreadPoolExecutor(max_workers=len(argumentos)) as executor:
+        return list(executor.map(chamar, argumentos))
+
+def testar_threads():
+    """Testa chamadas simultâneas em threads"""
+    print("\n🔄 Testando chamadas em threads...")
+    servico, grupo = ServicoSimulado(), ChamadaUnica()
+    resultados = chamar_em_paralelo(lambda s: grupo.executar(("projetos", s), servico.buscar, s), ["em_andamento"] * 20)
+    assert servico.requisicoes == 1 and grupo.compartilhadas == 19, (servico.requisicoes, grupo.compartilhadas)
+    assert all(r == [{"nome": "Projeto A", "status": "em_andamento"}] for r in resultados)
+    print("✅ 20 chamadas iguais ao mesmo tempo, 1 requisição")
+
+    resultados[0][0]["nome"] = "alterado"
+    assert all(r[0]["nome"] == "Projeto A" for r in resultados[1:])
+    print("✅ Cada chamada recebe sua própria cópia do resultado")
+
+    servico.requisicoes = 0
+    chamar_em_paralelo(lambda s: grupo.executar(("projetos", s), servico.buscar, s), ["em_andamento", "concluido"] * 5)
+    assert servico.requisicoes == 2
+    print("✅ Chaves diferentes não se juntam")
+
+    servico.requisicoes = 0
+    for _ in range(3):
+        grupo.executar(("projetos", "em_andamento"), servico.buscar, "em_andamento")
+    assert servico.requisicoes == 3
+    print("✅ Chamadas em sequência vão ao serviço (nada fica guardado)")
+
+def testar_erros():
+    """Testa que o erro da chamada chega a todos que esperavam"""
+    print("\n🔄 Testando erros...")
+    servico, grupo = ServicoSimulado(), ChamadaUnica()
+    resultados = chamar_em_paralelo(lambda s: grupo.executar(("projetos", s), servico.buscar, s), ["erro"] * 10)
+    assert servico.requisicoes == 1
+    assert all(isinstance(r, ConnectionError) for r in resultados)
+    print("✅ Todos recebem o erro da única requisição")
+
+    assert grupo.executar(("projetos", "erro"), lambda: "ok") == "ok"
+    print("✅ Depois do erro, a chave fica livre para uma nova tentativa")
+
+async def chamadas_async():
+    """Chamadas simultâneas em corrotinas"""
+    print("\n🔄 Testando chamadas com asyncio...")
+    servico, grupo = ServicoSimulado(), ChamadaUnica()
+    resultados = await asyncio.gather(*[
+        grupo.executar_async(("projetos", "em_andamento"), servico.buscar_async, "em_andamento") for _ in range(20)])
+    assert servico.requisicoes == 1 and all(r[0]["nome"] == "Projeto A" for r in resultados)
+    print("✅ 20 corrotinas, 1 requisição")
+
+    resultados = await asyncio.gather(*[
+        grupo.executar_async(("projetos", "erro"), servico.buscar_async, "erro") for _ in range(5)],
+        return_exceptions=True)
+    assert all(isinstance(r, ConnectionError) for r in resultados)
+    print("✅ Todos recebem o erro")
+
+    # Quem espera e é cancelado não derruba a chamada dos outros
+    servico.requisicoes = 0
+    lider = asyncio.create_task(grupo.executar_async("x", servico.buscar_async, "em_andamento"))
+    await asyncio.sleep(0)
+    impaciente = asyncio.create_task(grupo.executar_async("x", servico.buscar_async, "em_andamento"))
+    await asyncio.sleep(0.01)
+    impaciente.cancel()
+    assert (await lider)[0]["status"] == "em_andamento" and servico.requisicoes == 1
+    print("✅ Cancelar quem espera não cancela a requisição")
+
+    lider = asyncio.create_task(grupo.executar_async("y", servico.buscar_async, "em_andamento"))
+    await asyncio.sleep(0)
+    seguidor = asyncio.create_task(grupo.executar_async("y", servico.buscar_async, "em_andamento"))
+    await asyncio.sleep(0.01)
+    lider.cancel()
+    resultados = await asyncio.gather(lider, seguidor, return_exceptions=True)
+    assert isinstance(resultados[0], asyncio.CancelledError), resultados
+    assert resultados[1][0]["status"] == "em_andamento" and servico.requisicoes == 2, resultados
+    print("✅ Cancelar quem iniciou a requisição não cancela quem espera")
+
+    assert (await grupo.executar_async("y", servico.buscar_async, "concluido"))[0]["status"] == "concluido"
+    assert servico.requisicoes == 3
+    print("✅ Depois da requisição, a chave fica livre")
+
+def testar_asyncio():
+    """Testa chamadas simultâneas em corrotinas"""
+    asyncio.run(chamadas_async())
+
+def testar_decorador():
+    """Testa o decorador em métodos de clientes, como em listar_times e listar_eventos"""
+    print("\n🔄 Testando o decorador coalescer...")
+
+    class ClienteSimulado:
+        def __init__(self, conta):
+            self.conta = conta
+            self.requisicoes = 0
+
+        @coalescer(lambda self, max_results=10: ("listar_eventos", self.conta, max_results))
+        def listar_eventos(self, max_results=10):
+            self.requisicoes += 1
+            time.sleep(0.1)
+            return [f"evento {i}" for i in range(max_results)]
+
+        @coalescer(lambda self: ("listar_times", self.conta))
+        async def listar_times(self):
+            self.requisicoes += 1
+            await asyncio.sleep(0.1)
+            return ["Marketing", "Vendas"]
+
+    ana, bruno = ClienteSimulado("ana"), ClienteSimulado("bruno")
+    resultados = chamar_em_paralelo(lambda cliente: cliente.listar_eventos(), [ana] * 10 + [bruno] * 10)
+    assert ana.requisicoes == 1 and bruno.requisicoes == 1 and len(resultados[0]) == 10
+    print("✅ Uma requisição por conta; contas diferentes não compartilham resultados")
+
+    chamar_em_paralelo(lambda n: ana.listar_eventos(max_results=n), [5, 5, 7])
+    assert ana.requisicoes == 3
+    assert ClienteSimulado.listar_eventos.__name__ == "listar_eventos"
+    print("✅ Parâmetros diferentes viram requisições diferentes")
+
+    async def listar_juntos():
+        return await asyncio.gather(*[ana.listar_times() for _ in range(10)])
+    assert asyncio.run(listar_juntos())[0] == ["Marketing", "Vendas"] and ana.requisicoes == 4
+    assert ClienteSimulado.listar_times.chamada_unica.compartilhadas == 9
+    print("✅ Métodos assíncronos também são juntados")
+
+def testar_chamada_unica():
+    """Função para executar todos os testes"""
+    print("=" * 70)
+    print("TESTE DA JUNÇÃO DE CHAMADAS IDÊNTICAS")
+    print("=" * 70)
+
+    testes = [testar_threads, testar_erros, testar_asyncio, testar_decorador]
+    for teste in testes:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Falha em {teste.__name__}: {e}")
+
+    print("\n" + "=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_chamada_unica()
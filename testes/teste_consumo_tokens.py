@@ -0,0 +1,228 @@
+"""
+Script para testar a medição de tokens e os orçamentos por pedido (modelos simulados)
+"""
+
+import os
+import sys
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O modelo é simulado: a chave só precisa existir para os clientes serem criados
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+
+from componentes.consumo_tokens import (MedidorConsumo, Orcamento, OrcamentoExcedido, calcular_custo,
+                                        criar_callback_consumo, invocar_com_orcamento, medidor, pedido)
+from componentes.memoria_conversa import MemoriaConversa, criar_resumidor
+from componentes.tokens import contar_tokens
+from integracao.utils import executar_em_paralelo
+
+PROMPT = ChatPromptTemplate.from_template("Resuma o documento abaixo em uma frase.\n\n{texto}")
+TEXTO_LONGO = "O projeto de migração para a nuvem avançou conforme o planejado neste trimestre. " * 200
+
+class ModeloSimulado(FakeListChatModel):
+    """Modelo simulado com nome (para o preço) que guarda os prompts recebidos"""
+
+    model_name: str = "gpt-4"
+    prompts: list = []
+
+    def _call(self, messages, *args, **kwargs):
+        self.prompts.append("\n".join(str(mensagem.content) for mensagem in messages))
+        return super()._call(messages, *args, **kwargs)
+
+def criar_modelo(nome="gpt-4"):
+    return ModeloSimulado(responses=["Resumo: a migração avançou."], model_name=nome, prompts=[])
+
+def testar_medicao():
+    """Testa a soma por usuário, agente, pedido e modelo"""
+    print("\n🔄 Testando medição...")
+    medidor, modelo = MedidorConsumo(), criar_modelo()
+    for usuario, repeticoes in [("ana", 3), ("bruno", 1)]:
+        for _ in range(repeticoes):
+            with medidor.pedido(usuario=usuario, agente="integrado") as pedido:
+                invocar_com_orcamento(modelo, PROMPT, {"texto": "Reunião às 14h."}, medidor_consumo=medidor)
+            assert pedido.chamadas == 1 and pedido.tokens_entrada > 0 and pedido.tokens_saida > 0
+
+    usuarios = medidor.maiores_consumidores("usuario")
+    assert [nome for nome, _ in usuarios] == ["ana", "bruno"] and usuarios[0][1]["chamadas"] == 3
+    assert medidor.maiores_consumidores("agente")[0][1]["chamadas"] == 4
+    assert len(medidor.maiores_consumidores("pedido", top=10)) == 4
+    total = medidor.maiores_consumidores("modelo")[0][1]
+    assert abs(total["custo"] - calcular_custo("gpt-4", total["tokens_entrada"], total["tokens_saida"])) < 1e-9
+    assert "ana" in medidor.relatorio()
+    print("✅ Consumo somado por usuário, agente, pedido e modelo, com custo")
+
+    medidor.limpar()
+    invocar_com_orcamento(modelo, PROMPT, {"texto": "Sem pedido."}, medidor_consumo=medidor)
+    assert medidor.maiores_consumidores("usuario")[0][0] == "(sem identificação)"
+    print("✅ Chamadas fora de um pedido também são contadas")
+
+def testar_corte_de_contexto():
+    """Testa o corte do contexto quando o prompt passa do limite"""
+    print("\n🔄 Testando corte do contexto...")
+    medidor, modelo = MedidorConsumo(), criar_modelo()
+    with medidor.pedido(orcamento=Orcamento(max_tokens_entrada=300)) as pedido:
+        invocar_com_orcamento(modelo, PROMPT, {"texto": TEXTO_LONGO}, campo_contexto="texto",
+                              medidor_consumo=medidor)
+    tokens_enviados = contar_tokens(modelo.prompts[0])
+    assert pedido.cortadas == 1 and tokens_enviados <= 300 < contar_tokens(TEXTO_LONGO), tokens_enviados
+    print(f"✅ Documento de {contar_tokens(TEXTO_LONGO)} tokens cortado para caber em 300 ({tokens_enviados})")
+
+    modelo = criar_modelo()
+    with medidor.pedido(orcamento=Orcamento(max_tokens_entrada=300)) as pedido:
+        try:
+            invocar_com_orcamento(modelo, PROMPT, {"texto": TEXTO_LONGO}, medidor_consumo=medidor)
+            assert False, "a chamada deveria ter sido recusada"
+        except OrcamentoExcedido:
+            pass
+    assert modelo.prompts == [] and pedido.recusadas == 1
+    print("✅ Sem campo que possa ser cortado, a chamada é recusada sem chamar o modelo")
+
+    # Histórico de conversa: cortado do começo, para manter os turnos mais recentes
+    from agentes.agente_integrado import AgenteIntegrado
+    from componentes.memoria_conversa import GerenciadorSessoes
+
+    modelo = ModeloSimulado(responses=['{"servico": "teams", "acao": "listar_times", "parametros": {}}'],
+                            prompts=[])
+    agente = AgenteIntegrado(llm=modelo, calendar=object(), teams=object(), api=object(),
+                             orcamento=Orcamento(max_tokens_entrada=300),
+                             sessoes=GerenciadorSessoes(lambda: MemoriaConversa(max_tokens=2000)))
+    memoria = agente.sessoes.obter("ana")
+    for i in range(30):
+        memoria.adicionar_turno(f"Pergunta {i} sobre a reunião de planejamento do trimestre",
+                                f"Resposta {i}: marcada para as 14h na sala {i}")
+    memoria.adicionar_turno("Marque a reunião de revisão na sexta", "Reunião de revisão marcada: sexta às 10h")
+    agente.processar_solicitacao("Envie essa reunião no mesmo canal", id_usuario="ana")
+    prompt_enviado = modelo.prompts[0]
+    assert contar_tokens(prompt_enviado) <= 300 and "Pergunta 0 " not in prompt_enviado
+    assert "Reunião de revisão marcada: sexta às 10h" in prompt_enviado, prompt_enviado
+    print("✅ Histórico cortado pelo começo: o último turno da conversa continua no prompt")
+
+def testar_rebaixamento():
+    """Testa a troca pelo modelo econômico e a recusa por custo"""
+    print("\n🔄 Testando troca de modelo...")
+    medidor = MedidorConsumo()
+    principal, economico = criar_modelo("gpt-4"), criar_modelo("gpt-4o-mini")
+    texto = TEXTO_LONGO[:4000]
+    custo_gpt4 = calcular_custo("gpt-4", contar_tokens(texto), 256)
+
+    orcamento = Orcamento(max_custo=custo_gpt4 / 2, modelo_economico="gpt-4o-mini")
+    with medidor.pedido(orcamento=orcamento) as pedido:
+        resposta = invocar_com_orcamento(principal, PROMPT, {"texto": texto}, llm_economico=economico,
+                                         medidor_consumo=medidor)
+    assert principal.prompts == [] and len(economico.prompts) == 1 and pedido.rebaixadas == 1
+    assert resposta.response_metadata["orcamento"]["modelo"] == "gpt-4o-mini"
+    print(f"✅ Chamada de US$ {custo_gpt4:.4f} no gpt-4 feita no gpt-4o-mini (US$ {pedido.custo:.4f})")
+
+    with medidor.pedido(orcamento=Orcamento(max_custo=custo_gpt4 / 2)):
+        try:
+            invocar_com_orcamento(principal, PROMPT, {"texto": texto}, medidor_consumo=medidor)
+            assert False, "a chamada deveria ter sido recusada"
+        except OrcamentoExcedido as e:
+            print(f"✅ Sem modelo econômico, recusada: {e}")
+
+    # Depois de gastar metade do orçamento de tokens, as chamadas vão para o modelo econômico
+    principal, economico = criar_modelo("gpt-4"), criar_modelo("gpt-4o-mini")
+    with medidor.pedido(orcamento=Orcamento(max_tokens=2000, reserva_saida=50, fracao_rebaixar=0.5)) as pedido:
+        for _ in range(10):
+            try:
+                invocar_com_orcamento(principal, PROMPT, {"texto": TEXTO_LONGO[:1000]}, llm_economico=economico,
+                                      medidor_consumo=medidor)
+            except OrcamentoExcedido:
+                break
+    assert principal.prompts and economico.prompts and pedido.tokens <= 2000, pedido.como_dict()
+    print(f"✅ {len(principal.prompts)} chamadas no modelo principal, {len(economico.prompts)} no econômico, "
+          f"{pedido.tokens} de 2000 tokens gastos")
+
+def testar_paralelo():
+    """Testa que chamadas em paralelo não passam juntas do orçamento"""
+    print("\n🔄 Testando chamadas em paralelo...")
+    medidor, modelo = MedidorConsumo(), criar_modelo()
+    por_chamada = contar_tokens(PROMPT.format_messages(texto=TEXTO_LONGO[:800])[0].content) + 100
+
+    def chamar(_):
+        try:
+            invocar_com_orcamento(modelo, PROMPT, {"texto": TEXTO_LONGO[:800]}, medidor_consumo=medidor)
+            return "ok"
+        except OrcamentoExcedido:
+            return "recusada"
+
+    with medidor.pedido(agente="lote", orcamento=Orcamento(max_tokens=por_chamada * 3, reserva_saida=100)) as pedido:
+        resultados = executar_em_paralelo(chamar, range(10), max_workers=10)
+    assert resultados.count("ok") == 3 and pedido.chamadas == 3 and pedido.tokens <= por_chamada * 3
+    assert medidor.maiores_consumidores("agente")[0][0] == "lote"
+    print("✅ 10 chamadas simultâneas, 3 cabem no orçamento; o pedido chega às threads")
+
+def testar_callback():
+    """Testa o callback para chains que chamam o modelo por conta própria"""
+    print("\n🔄 Testando callback...")
+    medidor, modelo = MedidorConsumo(), criar_modelo("gpt-3.5-turbo")
+    callback = criar_callback_consumo(medidor)
+    with medidor.pedido(usuario="carla", agente="agenda") as pedido:
+        (PROMPT | modelo).invoke({"texto": "Reunião às 14h."}, config={"callbacks": [callback]})
+    assert pedido.chamadas == 1 and medidor.maiores_consumidores("modelo")[0][0] == "gpt-3.5-turbo"
+    print("✅ Chamadas feitas por chains registradas no pedido e no modelo certo")
+
+    from langchain.agents import AgentType, Tool, initialize_agent
+    modelo = ModeloSimulado(responses=["Thought: preciso da agenda\nAction: agenda\nAction Input: hoje",
+                                       "Thought: já sei\nFinal Answer: Reunião às 14h."],
+                            model_name="gpt-3.5-turbo", prompts=[])
+    ferramentas = [Tool(name="agenda", func=lambda consulta: "Reunião às 14h.", description="Agenda do dia")]
+    agente = initialize_agent(tools=ferramentas, llm=modelo, agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION)
+    with medidor.pedido(agente="pesquisa") as pedido_agente:
+        agente.run("O que tenho hoje?", callbacks=[callback])
+    assert pedido_agente.chamadas == 2 and pedido_agente.tokens > 0
+    print("✅ Cada passo de um agente ReAct registrado, com o callback passado na execução")
+
+def testar_resumo_conversa():
+    """Testa que os resumos da memória de conversa são medidos para o usuário da solicitação"""
+    print("\n🔄 Testando resumo da conversa...")
+    medidor.limpar()
+    memoria = MemoriaConversa(max_tokens=60, resumir=criar_resumidor(criar_modelo("gpt-3.5-turbo")))
+    with pedido(usuario="ana", agente="integrado"):
+        for i in range(6):
+            memoria.adicionar_turno(f"Pergunta {i} sobre a reunião", f"Resposta {i}: às 14h na sala 3")
+    memoria.aguardar(timeout=5)
+    assert memoria.resumo == "Resumo: a migração avançou."
+    agentes = dict(medidor.maiores_consumidores("agente"))
+    assert agentes["resumo_conversa"]["chamadas"] >= 1 and "integrado" not in agentes
+    assert [nome for nome, _ in medidor.maiores_consumidores("usuario")] == ["ana"]
+    print("✅ Resumos em segundo plano medidos no agente resumo_conversa, para o mesmo usuário")
+
+def testar_agente_integrado():
+    """Testa a recusa pelo orçamento no agente integrado"""
+    print("\n🔄 Testando o agente integrado...")
+    from agentes.agente_integrado import AgenteIntegrado
+
+    modelo = ModeloSimulado(responses=['{"servico": "teams", "acao": "listar_times", "parametros": {}}'],
+                            prompts=[])
+    agente = AgenteIntegrado(llm=modelo, calendar=object(), teams=object(), api=object(),
+                             orcamento=Orcamento(max_tokens=100))
+    resultado = agente.processar_solicitacao("Liste os times", id_usuario="ana")
+    assert resultado["sucesso"] is False and "orçamento" in resultado["mensagem"] and modelo.prompts == []
+    assert len(agente.sessoes.obter("ana")) == 0
+    print("✅ Solicitação recusada antes de chamar o modelo, sem entrar no histórico")
+
+def testar_consumo_tokens():
+    """Função para executar todos os testes"""
+    print("=" * 70)
+    print("TESTE DO CONSUMO DE TOKENS")
+    print("=" * 70)
+
+    testes = [testar_medicao, testar_corte_de_contexto, testar_rebaixamento, testar_paralelo, testar_callback,
+              testar_resumo_conversa, testar_agente_integrado]
+    for teste in testes:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Falha em {teste.__name__}: {e}")
+
+    print("\n" + "=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_consumo_tokens()
@@ -0,0 +1,60 @@
+"""
+Script para testar o pipeline de embeddings em lotes sem acesso à internet
+"""
+
+import os
+import sys
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.embeddings_lote import EmbeddingsFalsos, PipelineEmbeddings, empacotar_por_tokens
+
+class EmbeddingsInstaveis(EmbeddingsFalsos):
+    """Gerador falso que falha na primeira chamada, para testar as novas tentativas"""
+
+    def __init__(self):
+        super().__init__(dimensao=32)
+        self.chamadas = 0
+
+    def embed_documents(self, texts):
+        self.chamadas += 1
+        if self.chamadas == 1:
+            raise ConnectionError("falha simulada")
+        return super().embed_documents(texts)
+
+def testar_embeddings():
+    """Função para testar o empacotamento, a ordem dos resultados e as novas tentativas"""
+    print("=" * 70)
+    print("TESTE DO PIPELINE DE EMBEDDINGS")
+    print("=" * 70)
+
+    textos = [f"Trecho número {i} sobre a política de férias da SMN" for i in range(50)]
+
+    try:
+        lotes = empacotar_por_tokens(textos, max_tokens_lote=60)
+        assert len(lotes) > 1 and sum(len(lote) for lote in lotes) == len(textos)
+        assert all(sum(tokens for _, _, tokens in lote) <= 60 for lote in lotes)
+        print(f"✅ {len(textos)} trechos empacotados em {len(lotes)} lotes de até 60 tokens")
+
+        falsos = EmbeddingsFalsos()
+        assert falsos.embed_query("férias") == falsos.embed_query("férias")
+        print("✅ Embeddings falsos são determinísticos")
+
+        pipeline = PipelineEmbeddings(EmbeddingsInstaveis(), max_tokens_lote=60, concorrencia=4)
+        vetores = pipeline.embed_documents(textos)
+        assert vetores == EmbeddingsFalsos(dimensao=32).embed_documents(textos)
+        print("✅ Vetores retornados na ordem original, mesmo com um lote repetido")
+
+        estatisticas = pipeline.ultimas_estatisticas
+        print(f"   {estatisticas['trechos_por_segundo']:.0f} trechos/s, "
+              f"{estatisticas['tokens_por_segundo']:.0f} tokens/s")
+    except AssertionError as e:
+        print(f"❌ Resultado inesperado: {e}")
+
+    print("=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_embeddings()
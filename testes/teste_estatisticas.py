@@ -0,0 +1,281 @@
+"""
+Script para testar as estatísticas incrementais e a leitura em blocos do agente de análise
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exemplos"))
+
+from componentes.cache_disco import CacheDisco
+from componentes.estatisticas_incrementais import AgregadosPorCategoria, EsbocoQuantis, EstatisticasIncrementais
+from componentes.graficos import RenderizadorGraficos
+from componentes.perfil_dados import PerfilDados
+
+def gerar_vendas(linhas, semente=42):
+    """Gera uma tabela de vendas sintética"""
+    aleatorio = np.random.default_rng(semente)
+    return pd.DataFrame({
+        "Região": aleatorio.choice(["Sul", "Norte", "Centro", "Nordeste"], linhas),
+        "Vendas": aleatorio.lognormal(10, 0.5, linhas),
+        "Custos": aleatorio.normal(30000, 2000, linhas)
+    })
+
+def testar_estatisticas_incrementais():
+    """Compara as estatísticas por blocos com o describe do pandas"""
+    print("\n🔄 Testando estatísticas incrementais...")
+    dados = gerar_vendas(200_000)
+
+    estatisticas = EstatisticasIncrementais()
+    for inicio in range(0, len(dados), 30_000):
+        estatisticas.atualizar(dados.iloc[inicio:inicio + 30_000])
+    resumo, esperado = estatisticas.resumo(), dados.describe()
+
+    for linha in ["count", "mean", "std", "min", "max"]:
+        assert np.allclose(resumo.loc[linha], esperado.loc[linha]), linha
+    erro_quartis = (abs(resumo.loc[["25%", "50%", "75%"]] - esperado.loc[["25%", "50%", "75%"]])
+                    / esperado.loc[["25%", "50%", "75%"]]).max().max()
+    assert erro_quartis < 0.01, erro_quartis
+    print(f"✅ Média, desvio e extremos exatos; quartis com erro de {erro_quartis:.3%}")
+
+    pequeno = dados.head(6)
+    incremental = EstatisticasIncrementais()
+    incremental.atualizar(pequeno)
+    assert np.allclose(incremental.resumo(), pequeno.describe())
+    print("✅ Em tabelas pequenas, o resumo é idêntico ao describe")
+
+def testar_esboco_mesclavel():
+    """Testa a mesclagem e a serialização do esboço de quantis"""
+    print("\n🔄 Testando esboço de quantis...")
+    aleatorio = np.random.default_rng(7)
+    parte_a, parte_b = aleatorio.normal(0, 1, 50_000), aleatorio.normal(5, 1, 50_000)
+
+    esboco_a, esboco_b = EsbocoQuantis(), EsbocoQuantis()
+    esboco_a.adicionar(parte_a)
+    esboco_b.adicionar(parte_b)
+    esboco_a.mesclar(esboco_b)
+    esboco_a = EsbocoQuantis.de_dict(json.loads(json.dumps(esboco_a.para_dict())))
+
+    todos = np.concatenate([parte_a, parte_b])
+    for q in [0.01, 0.5, 0.99]:
+        assert abs(esboco_a.quantil(q) - np.quantile(todos, q)) < 0.05, q
+    assert len(esboco_a.medias) <= 5 * esboco_a.compressao
+    print(f"✅ Quantis corretos após mesclar e salvar ({len(esboco_a.medias)} centróides para {len(todos)} valores)")
+
+def testar_leitura_em_blocos():
+    """Testa a leitura de CSV e Parquet em blocos com tipos reduzidos"""
+    print("\n🔄 Testando leitura em blocos...")
+    import exemplo_analise_dados as analise
+
+    dados = gerar_vendas(50_000)
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_csv = os.path.join(diretorio, "vendas.csv")
+        dados.to_csv(caminho_csv, index=False)
+
+        blocos = list(analise.carregar_em_blocos(caminho_csv, linhas_por_bloco=10_000))
+        assert len(blocos) > 1 and sum(len(bloco) for bloco in blocos) == len(dados)
+        assert isinstance(blocos[0]["Região"].dtype, pd.CategoricalDtype)
+        print(f"✅ CSV lido em {len(blocos)} blocos, com 'Região' como category")
+
+        resumo = analise.resumo_estatistico(analise.carregar_em_blocos(caminho_csv, linhas_por_bloco=10_000))
+        assert np.allclose(resumo.loc["mean"], dados.describe().loc["mean"])
+        print("✅ Resumo estatístico calculado direto dos blocos")
+
+        if analise.pa is not None:
+            caminho_parquet = os.path.join(diretorio, "vendas.parquet")
+            dados.to_parquet(caminho_parquet)
+            total = sum(len(bloco) for bloco in analise.carregar_em_blocos(caminho_parquet, linhas_por_bloco=10_000))
+            assert total == len(dados)
+            print("✅ Arquivo Parquet lido em blocos")
+
+            caminho_arrow = os.path.join(diretorio, "vendas.arrow")
+            dados.to_feather(caminho_arrow, compression="uncompressed")
+            blocos = list(analise.carregar_em_blocos(caminho_arrow, linhas_por_bloco=10_000))
+            assert sum(len(bloco) for bloco in blocos) == len(dados)
+            assert isinstance(blocos[0]["Região"].dtype, pd.CategoricalDtype)
+            print("✅ Arquivo Arrow mapeado em memória e lido em blocos")
+
+def testar_perfil_dados():
+    """Testa se o perfil enviado ao modelo tem tamanho constante e mostra o essencial"""
+    print("\n🔄 Testando perfil compacto dos dados...")
+    tamanhos = {}
+    for linhas in [1_000, 300_000]:
+        dados = gerar_vendas(linhas)
+        dados.loc[10, "Vendas"] = 5e7  # Valor atípico proposital
+        perfil = PerfilDados()
+        for inicio in range(0, linhas, 100_000):
+            perfil.atualizar(dados.iloc[inicio:inicio + 100_000])
+        texto = perfil.texto()
+        tamanhos[linhas] = len(texto)
+
+    assert max(tamanhos.values()) < 1.2 * min(tamanhos.values()), tamanhos
+    print(f"✅ Tamanho do perfil: {tamanhos[1_000]} caracteres com 1 mil linhas, "
+          f"{tamanhos[300_000]} com 300 mil linhas")
+
+    resumo = perfil.resumo()
+    assert resumo["numericas"]["Vendas"]["exemplos_outliers"][0] == 5e7
+    assert {valor for valor, _, _ in resumo["categoricas"]["Região"]["mais_frequentes"]} == {
+        "Sul", "Norte", "Centro", "Nordeste"}
+    assert resumo["coluna_estratos"] == "Região" and len(resumo["amostra"]) == 12
+    assert "50.000.000" in texto and "Nordeste" in texto
+    print("✅ Atípicos, categorias mais frequentes e amostra estratificada presentes")
+
+    # Mais grupos do que cabem com amostra_por_grupo linhas cada (10 lojas × 3 > 20 linhas)
+    perfil = PerfilDados(max_amostra=20)
+    perfil.atualizar(pd.DataFrame({"Loja": [f"Loja {i % 10}" for i in range(5_000)], "Vendas": np.arange(5_000.0)}))
+    amostra = perfil.resumo()["amostra"]
+    assert len(amostra) == 20 and amostra["Loja"].value_counts().tolist() == [2] * 10, amostra["Loja"].value_counts()
+    print("✅ Amostra cortada em max_amostra com todos os grupos representados")
+
+    # Colunas com muitos valores: identificador único e cidades com cauda longa
+    linhas = 200_000
+    dados = gerar_vendas(linhas)
+    aleatorio = np.random.default_rng(7)
+    dados["Pedido"] = [f"PED-{i:07d}" for i in range(linhas)]
+    dados["Cidade"] = np.where(aleatorio.random(linhas) < 0.3, "São Paulo",
+                               np.char.add("Cidade ", aleatorio.integers(0, 5_000, linhas).astype(str)))
+    perfil = PerfilDados()
+    for inicio in range(0, linhas, 50_000):
+        perfil.atualizar(dados.iloc[inicio:inicio + 50_000])
+    estado = json.dumps(perfil.para_dict())
+    perfil = PerfilDados.de_dict(json.loads(estado))
+    categoricas = perfil.resumo()["categoricas"]
+
+    assert len(estado) < 200_000, len(estado)
+    assert all(len(categorias.contagens) <= perfil.max_categorias for categorias in perfil.categorias.values())
+    print(f"✅ Estado salvo com {len(estado) / 1024:.0f} KB para {linhas} linhas, "
+          f"no máximo {perfil.max_categorias} contagens por coluna")
+
+    assert categoricas["Pedido"]["quase_unica"] and not categoricas["Pedido"]["mais_frequentes"]
+    assert abs(categoricas["Pedido"]["distintos"] / linhas - 1) < 0.15, categoricas["Pedido"]["distintos"]
+    assert "Pedido (~" in perfil.texto() and "PED-" not in perfil.texto().split("Amostra")[0]
+    print(f"✅ Identificador detectado (~{categoricas['Pedido']['distintos']} distintos) e não contado")
+
+    cidades = categoricas["Cidade"]
+    esperado_distintos = dados["Cidade"].nunique()
+    assert abs(cidades["distintos"] / esperado_distintos - 1) < 0.15, (cidades["distintos"], esperado_distintos)
+    valor, _, proporcao = cidades["mais_frequentes"][0]
+    assert valor == "São Paulo" and abs(proporcao - (dados["Cidade"] == "São Paulo").mean()) < 0.02
+    assert [n for _, n, _ in categoricas["Região"]["mais_frequentes"]] == \
+        dados["Região"].value_counts().head(5).tolist()
+    print(f"✅ Cidades: ~{cidades['distintos']} distintos (reais: {esperado_distintos}) e a mais frequente "
+          "com a proporção certa; contagens exatas com poucas categorias")
+
+def testar_agregados_por_categoria():
+    """Compara as somas por categoria de uma única leitura com o groupby do pandas"""
+    print("\n🔄 Testando agregados por categoria...")
+    dados = gerar_vendas(50_000)
+    dados["Loja"] = np.random.default_rng(3).integers(0, 40, len(dados)).astype(str)
+    dados.loc[5, "Vendas"] = np.nan
+
+    agregados = AgregadosPorCategoria()
+    for inicio in range(0, len(dados), 15_000):
+        agregados.atualizar(dados.iloc[inicio:inicio + 15_000])
+    agregados = AgregadosPorCategoria.de_dict(json.loads(json.dumps(agregados.para_dict())))
+
+    for categoria in ["Região", "Loja"]:
+        for valor in ["Vendas", "Custos"]:
+            esperado = dados.groupby(categoria, sort=False)[valor]
+            assert list(agregados.total(categoria, valor).index) == list(esperado.sum().index), (categoria, valor)
+            assert np.allclose(agregados.total(categoria, valor), esperado.sum())
+            assert np.allclose(agregados.media(categoria, valor), esperado.mean())
+    print("✅ Somas e médias de todos os pares iguais às do groupby, com uma única leitura")
+
+    limitado = AgregadosPorCategoria(max_categorias=10)
+    limitado.atualizar(dados)
+    assert limitado.colunas_categoricas == ["Região"] and limitado.descartadas == {"Loja"}
+    print("✅ Colunas com categorias demais deixam de ser agregadas")
+
+def testar_graficos():
+    """Testa o desenho em paralelo, o cache e o limite de gráficos"""
+    print("\n🔄 Testando gráficos...")
+    import exemplo_analise_dados as analise
+
+    dados = gerar_vendas(5_000)
+    dados["Mês"] = np.repeat(["Jan", "Fev", "Mar", "Abr", "Mai"], 1_000)
+    especificacoes = [analise.especificacao_tendencia(dados, "Mês", coluna) for coluna in ["Vendas", "Custos"]]
+    especificacoes += [analise.especificacao_comparacao(dados, "Região", coluna) for coluna in ["Vendas", "Custos"]]
+    assert especificacoes[0]["categorias"] == ["Jan", "Fev", "Mar", "Abr", "Mai"]
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        renderizador = RenderizadorGraficos(CacheDisco(os.path.join(diretorio, "cache")), max_workers=2)
+        primeira = renderizador.renderizar(especificacoes, diretorio)
+        segunda = renderizador.renderizar(especificacoes, diretorio)
+        assert not any(do_cache for _, do_cache in primeira) and all(do_cache for _, do_cache in segunda)
+        for caminho, _ in segunda:
+            with open(caminho, "rb") as f:
+                assert f.read(4) == b"\x89PNG", caminho
+        print(f"✅ {len(especificacoes)} gráficos desenhados em paralelo e reaproveitados do cache na segunda vez")
+
+    constante = dict(especificacoes[0], valores=[1.0] * 5, nome_arquivo="constante.png")
+    escolhidas = analise.priorizar_graficos(especificacoes + [constante], max_graficos=len(especificacoes))
+    assert constante not in escolhidas and len(escolhidas) == len(especificacoes)
+    print("✅ O gráfico sem variação foi o omitido pelo limite")
+
+def testar_leitura_incremental():
+    """Testa se o estado salvo permite ler só as linhas acrescentadas ao CSV"""
+    print("\n🔄 Testando análise incremental...")
+    import exemplo_analise_dados as analise
+
+    dados = gerar_vendas(30_000)
+    with tempfile.TemporaryDirectory() as diretorio:
+        analise.ANALISE_ESTADO_DIRETORIO = os.path.join(diretorio, "estado")
+        caminho_csv = os.path.join(diretorio, "vendas.csv")
+        dados.iloc[:20_000].to_csv(caminho_csv, index=False)
+
+        def atualizar():
+            estado = analise.carregar_estado(caminho_csv) or {
+                "perfil": PerfilDados(), "agregados": AgregadosPorCategoria(), "insights": None}
+            tipos, posicao, blocos = analise.carregar_linhas_novas(
+                caminho_csv, estado if "tipos" in estado else None, linhas_por_bloco=5_000)
+            lidas = 0
+            for bloco in blocos:
+                estado["perfil"].atualizar(bloco)
+                estado["agregados"].atualizar(bloco)
+                lidas += len(bloco)
+            estado.update(tipos=tipos, posicao=posicao)
+            analise.salvar_estado(caminho_csv, estado)
+            return estado, lidas
+
+        _, lidas_primeira = atualizar()
+        dados.iloc[20_000:].to_csv(caminho_csv, index=False, header=False, mode="a")
+        estado, lidas_segunda = atualizar()
+        assert (lidas_primeira, lidas_segunda) == (20_000, 10_000), (lidas_primeira, lidas_segunda)
+        print("✅ Na segunda execução, só as 10 mil linhas novas foram lidas")
+
+        assert np.allclose(estado["perfil"].estatisticas.resumo().loc["mean"], dados.describe().loc["mean"])
+        esperado = analise.especificacao_comparacao(dados, "Região", "Vendas")
+        obtido = analise.especificacao_comparacao(estado["agregados"], "Região", "Vendas")
+        assert obtido["categorias"] == esperado["categorias"] and np.allclose(obtido["valores"], esperado["valores"])
+        print("✅ Estatísticas e gráficos iguais aos calculados com a tabela inteira")
+
+        dados.iloc[:5_000].to_csv(caminho_csv, index=False)
+        assert analise.carregar_estado(caminho_csv) is None
+        print("✅ Arquivo reescrito: o estado antigo é descartado")
+
+def testar_estatisticas():
+    """Função para testar as estatísticas incrementais"""
+    print("=" * 70)
+    print("TESTE DAS ESTATÍSTICAS INCREMENTAIS")
+    print("=" * 70)
+
+    for teste in [testar_estatisticas_incrementais, testar_esboco_mesclavel, testar_leitura_em_blocos,
+                  testar_perfil_dados, testar_agregados_por_categoria, testar_graficos, testar_leitura_incremental]:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Resultado inesperado em {teste.__name__}: {e}")
+
+    print("=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_estatisticas()
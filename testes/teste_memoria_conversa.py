@@ -0,0 +1,123 @@
+"""
+Script para testar a memória de conversa e as sessões por usuário sem acesso à internet
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.memoria_conversa import GerenciadorSessoes, MemoriaConversa
+from componentes.tokens import contar_tokens
+
+def resumir_simples(resumo, mensagens):
+    """Resumo determinístico: acrescenta a primeira palavra de cada mensagem"""
+    return " ".join([resumo] + [texto.split()[0] for _, texto in mensagens]).strip()
+
+def testar_orcamento_tokens():
+    """Testa que a memória fica dentro do orçamento e mantém as mensagens recentes na íntegra"""
+    print("\n🔄 Testando orçamento de tokens...")
+    memoria = MemoriaConversa(max_tokens=200, resumir=resumir_simples)
+    for i in range(50):
+        memoria.adicionar_turno(f"Pergunta{i} sobre a reunião de planejamento do trimestre",
+                                f"Resposta{i}: a reunião está marcada para as 14h na sala 3")
+    memoria.aguardar()
+
+    assert memoria.tokens() <= 200, memoria.tokens()
+    mensagens = memoria.mensagens()
+    assert mensagens[-1] == ("ai", "Resposta49: a reunião está marcada para as 14h na sala 3")
+    assert mensagens[0][0] == "system" and "Pergunta0" in mensagens[0][1]
+    assert memoria.mensagens_resumidas + len(memoria) == 100
+    print(f"✅ 100 mensagens ocupam {memoria.tokens()} tokens; recentes na íntegra, antigas no resumo")
+
+def testar_resumo_em_segundo_plano():
+    """Testa que adicionar mensagens não espera o resumo, e que resumos lentos são feitos em lote"""
+    print("\n🔄 Testando resumo em segundo plano...")
+    liberar = threading.Event()
+    chamadas = []
+
+    def resumir_lento(resumo, mensagens):
+        liberar.wait()
+        chamadas.append(len(mensagens))
+        return resumir_simples(resumo, mensagens)
+
+    memoria = MemoriaConversa(max_tokens=60, resumir=resumir_lento)
+    inicio = time.perf_counter()
+    for i in range(20):
+        memoria.adicionar_turno(f"Pergunta{i} com algumas palavras", f"Resposta{i} com algumas palavras")
+    assert time.perf_counter() - inicio < 0.5
+    print("✅ Mensagens adicionadas sem esperar o LLM")
+
+    liberar.set()
+    memoria.aguardar(timeout=5)
+    assert len(chamadas) <= 2 and sum(chamadas) == memoria.mensagens_resumidas
+    assert memoria.resumo.startswith("Pergunta0 Resposta0")
+    print(f"✅ {memoria.mensagens_resumidas} mensagens resumidas em {len(chamadas)} chamada(s), na ordem")
+
+def testar_falhas_e_limites():
+    """Testa o resumo que falha, o resumo longo demais e a memória sem resumidor"""
+    print("\n🔄 Testando falhas e limites...")
+    def falhar(resumo, mensagens):
+        raise RuntimeError("LLM fora do ar")
+    memoria = MemoriaConversa(max_tokens=40, resumir=falhar)
+    for i in range(10):
+        memoria.adicionar("human", f"Mensagem número {i} da conversa")
+    memoria.aguardar()
+    assert memoria.resumo == "" and memoria.tokens() <= 40
+    print("✅ Falha no resumo não interrompe a conversa")
+
+    memoria = MemoriaConversa(max_tokens=100, max_tokens_resumo=20, resumir=lambda resumo, mensagens: "palavra " * 500)
+    for i in range(10):
+        memoria.adicionar("human", f"Mensagem número {i} da conversa com mais texto")
+    memoria.aguardar()
+    assert 0 < contar_tokens(memoria.resumo) <= 20
+    print("✅ Resumo longo demais é cortado")
+
+    janela = MemoriaConversa(max_tokens=40)
+    for i in range(10):
+        janela.adicionar("human", f"Mensagem número {i} da conversa")
+    assert janela.tokens() <= 40 and janela.resumo == "" and "Mensagem número 9" in janela.texto()
+    print("✅ Sem resumidor, a memória é uma janela das mensagens recentes")
+
+def testar_sessoes():
+    """Testa uma memória por usuário, o limite de sessões e a expiração por inatividade"""
+    print("\n🔄 Testando sessões por usuário...")
+    sessoes = GerenciadorSessoes(max_sessoes=2, ttl_segundos=60)
+    sessoes.obter("ana").adicionar("human", "Meu nome é Ana")
+    sessoes.obter("bruno").adicionar("human", "Meu nome é Bruno")
+    assert "Ana" in sessoes.obter("ana").texto() and "Ana" not in sessoes.obter("bruno").texto()
+    print("✅ Cada usuário tem seu próprio histórico")
+
+    sessoes.obter("ana")
+    sessoes.obter("carla")
+    assert "bruno" not in sessoes and "ana" in sessoes and len(sessoes) == 2
+    print("✅ Sessão usada há mais tempo descartada ao passar do limite")
+
+    sessoes = GerenciadorSessoes(ttl_segundos=0.05)
+    sessoes.obter("ana").adicionar("human", "Meu nome é Ana")
+    time.sleep(0.1)
+    assert sessoes.obter("ana").texto() == "" and sessoes.descartadas == 1
+    print("✅ Sessão inativa expira")
+
+def testar_memoria_conversa():
+    """Função para executar todos os testes"""
+    print("=" * 70)
+    print("TESTE DA MEMÓRIA DE CONVERSA")
+    print("=" * 70)
+
+    testes = [testar_orcamento_tokens, testar_resumo_em_segundo_plano, testar_falhas_e_limites, testar_sessoes]
+    for teste in testes:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Falha em {teste.__name__}: {e}")
+
+    print("\n" + "=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_memoria_conversa()
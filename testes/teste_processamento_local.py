@@ -0,0 +1,146 @@
+"""
+Script para testar as etapas locais (sem LLM) do processador de documentos
+"""
+
+import os
+import sys
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.consolidacao_json import extrair_json, mesclar_varios
+from componentes.extracao_local import extrair_campos_locais, pode_ter_nomes_ou_enderecos, remover_campos_locais
+from componentes.fila_trabalho import FilaTrabalho
+from componentes.fragmentacao import FragmentadorTokens
+from componentes.tokens import contar_tokens
+
+def testar_consolidacao_json():
+    """Testa a leitura de JSON nas respostas e a mesclagem determinística"""
+    print("\n🔄 Testando consolidação local de JSON...")
+
+    resposta = 'Segue o resultado:\n```json\n{"titulo": "Relatório Q1", "contatos": ["ana@smn.com.br"]}\n```'
+    assert extrair_json(resposta) == {"titulo": "Relatório Q1", "contatos": ["ana@smn.com.br"]}
+    assert extrair_json("Nenhuma informação encontrada.") is None
+    print("✅ JSON lido de respostas com texto e blocos de código")
+
+    consolidado = mesclar_varios([
+        {"titulo": "não encontrado", "contatos": ["ana@smn.com.br"], "valores": {"total": "R$ 10,00"}},
+        {"titulo": "Relatório Q1", "contatos": ["joao@smn.com.br", "ana@smn.com.br"]},
+        {"titulo": "Relatório Q1", "valores": {"prazo": "30 dias"}}
+    ])
+    assert consolidado == {
+        "titulo": "Relatório Q1",
+        "contatos": ["ana@smn.com.br", "joao@smn.com.br"],
+        "valores": {"total": "R$ 10,00", "prazo": "30 dias"}
+    }, consolidado
+    print("✅ Listas unidas sem duplicatas, vazios substituídos e dicionários mesclados")
+
+def testar_extracao_local():
+    """Testa a extração de campos de formato fixo com expressões regulares"""
+    print("\n🔄 Testando extração local de campos...")
+
+    texto = ("Fatura 123 emitida em 05/03/2024 para SMN Ltda, CNPJ 12.345.678/0001-90.\n"
+             "Total: R$ 1.250,00. Dúvidas: financeiro@smn.com.br, (11) 98765-4321 ou +55 21 3456-7890.\n"
+             "Responsável: CPF 123.456.789-09. Reenviar para financeiro@smn.com.br.")
+    campos = extrair_campos_locais(texto)
+    assert campos["emails"] == ["financeiro@smn.com.br"], campos["emails"]
+    assert campos["telefones"] == ["(11) 98765-4321", "+55 21 3456-7890"], campos["telefones"]
+    assert campos["cnpjs"] == ["12.345.678/0001-90"] and campos["cpfs"] == ["123.456.789-09"]
+    assert campos["valores"] == ["R$ 1.250,00"] and campos["datas"] == ["05/03/2024"]
+    print("✅ E-mails, telefones, CNPJ/CPF, valores e datas encontrados sem repetição")
+
+    valores = extrair_campos_locais("Entrada de R$ 1234,56 e saldo de R$1500 (antes R$ 1.250,00, depois R$ 99).",
+                                    ["valores"])["valores"]
+    assert valores == ["R$ 1234,56", "R$1500", "R$ 1.250,00", "R$ 99"], valores
+    print("✅ Valores sem separador de milhar lidos por inteiro")
+
+    lista = "contato: suporte@smn.com.br\ntel: (11) 4002-8922\nplantao: 11 99999-0000"
+    assert not pode_ter_nomes_ou_enderecos(remover_campos_locais(lista, ["emails", "telefones"]))
+    assert pode_ter_nomes_ou_enderecos("Falar com Maria Souza")
+    assert pode_ter_nomes_ou_enderecos("entregar na rua das flores, 10")
+    print("✅ Segmentos sem nomes nem endereços dispensam o modelo")
+
+def testar_fila_trabalho():
+    """Testa a fila persistente usada no processamento em lote"""
+    print("\n🔄 Testando fila de trabalho...")
+    fila = FilaTrabalho(":memory:", max_tentativas=2)
+
+    assert fila.adicionar(["a.pdf", "b.pdf", "c.pdf"]) == 3
+    assert fila.adicionar(["a.pdf", "d.pdf"]) == 1
+    print("✅ Itens repetidos ignorados ao adicionar")
+
+    assert fila.reservar() == "a.pdf"
+    fila.concluir("a.pdf")
+    assert fila.reservar() == "b.pdf"
+    assert fila.retomar() == 1  # Simula uma interrupção com "b.pdf" em andamento
+    assert fila.reservar() == "b.pdf"
+    print("✅ Itens em andamento voltam para a fila ao retomar")
+
+    assert fila.falhar("b.pdf", "erro 1") is False  # Segunda tentativa: falha definitiva
+    assert fila.reservar() == "c.pdf" and fila.falhar("c.pdf", "erro 2") is True
+    assert fila.contagem() == {"pendente": 2, "em_andamento": 0, "concluido": 1, "falhou": 1}
+    assert fila.falhas() == [("b.pdf", "erro 1")]
+    print("✅ Falhas tentadas novamente até o limite de tentativas")
+    fila.fechar()
+
+def testar_fragmentacao():
+    """Testa a divisão em trechos por tokens respeitando as seções"""
+    print("\n🔄 Testando fragmentação por tokens...")
+
+    frases = " ".join(f"O projeto {i} avançou conforme o planejado." for i in range(40))
+    texto = f"SUMÁRIO EXECUTIVO\n\nResumo curto do trimestre.\n\nPROJETOS EM ANDAMENTO\n\n{frases}\n\n# Contatos\n\nMaria Silva"
+    trechos = FragmentadorTokens(max_tokens=120).split_text(texto)
+
+    assert all(contar_tokens(trecho) <= 120 for trecho in trechos), [contar_tokens(t) for t in trechos]
+    assert trechos[0].startswith("SUMÁRIO EXECUTIVO") and "PROJETOS" not in trechos[0]
+    assert all(trecho.startswith("PROJETOS EM ANDAMENTO") for trecho in trechos[1:-1])
+    print(f"✅ {len(trechos)} trechos de até 120 tokens, sem misturar seções grandes")
+
+    assert all(f"projeto {i} " in texto for i in range(40))
+    assert all(any(f"projeto {i} " in trecho for trecho in trechos) for i in range(40))
+    assert sum(trecho.count("O projeto") for trecho in trechos) > 40
+    print("✅ Nenhuma frase perdida e sobreposição quando o corte cai no meio do parágrafo")
+
+def testar_fragmentacao_em_fluxo():
+    """Testa a divisão de páginas lidas aos poucos, com a quebra de página no fim de um trecho"""
+    print("\n🔄 Testando fragmentação em fluxo...")
+    divisor = FragmentadorTokens(max_tokens=60)
+    frases = " ".join(f"O item {i} foi entregue no prazo." for i in range(30))
+
+    # A primeira página termina exatamente no fim de um trecho: "FIM1" é o
+    # final do último trecho, e só a quebra de página o separa de "INICIO2"
+    paginas = [frases + " FIM1\n\n", "INICIO2 do relatório seguinte.\n\n"]
+    trechos = list(divisor.dividir_em_fluxo(paginas, caracteres_minimos=1))
+    assert divisor.split_text(paginas[0])[-1].endswith("FIM1")
+    assert not any("FIM1INICIO2" in trecho for trecho in trechos), trechos
+    assert any("FIM1" in trecho for trecho in trechos) and any("INICIO2" in trecho for trecho in trechos)
+    assert all(contar_tokens(trecho) <= 60 for trecho in trechos)
+    print("✅ A quebra de página entre dois trechos é mantida")
+
+    # Blocos de arquivo de texto cortados logo depois de um espaço
+    blocos = [frases + " palavra ", "seguinte " + frases]
+    trechos = list(divisor.dividir_em_fluxo(blocos, caracteres_minimos=1))
+    assert not any("palavraseguinte" in trecho for trecho in trechos), trechos
+    assert any("palavra seguinte" in trecho for trecho in trechos)
+    assert all(any(f"item {i} " in trecho for trecho in trechos) for i in range(30))
+    print("✅ O espaço no fim de um bloco também é mantido, sem perder frases")
+
+def testar_processamento_local():
+    """Função para testar as etapas locais do processador de documentos"""
+    print("=" * 70)
+    print("TESTE DO PROCESSAMENTO LOCAL DE DOCUMENTOS")
+    print("=" * 70)
+
+    for teste in [testar_consolidacao_json, testar_extracao_local, testar_fila_trabalho,
+                  testar_fragmentacao, testar_fragmentacao_em_fluxo]:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Resultado inesperado em {teste.__name__}: {e}")
+
+    print("=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_processamento_local()
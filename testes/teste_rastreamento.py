@@ -0,0 +1,207 @@
+"""
+Script para testar o rastreamento (spans, histogramas por etapa e exportadores)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from langchain_core.language_models import FakeListChatModel
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O modelo é simulado: a chave só precisa existir para os clientes serem criados
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+
+from componentes.rastreamento import (ExportadorJSON, Histograma, Rastreador, criar_callback_llm, medir_iteracao,
+                                      rastreador, span_atual)
+
+class ExportadorMemoria:
+    """Guarda os spans exportados para conferência"""
+
+    def __init__(self):
+        self.spans = []
+
+    def exportar(self, span):
+        self.spans.append(span)
+
+def testar_spans():
+    """Testa a ligação entre spans, atributos e erros"""
+    print("\n🔄 Testando spans...")
+    exportador = ExportadorMemoria()
+    teste = Rastreador([exportador])
+
+    with teste.span("agente.solicitacao", "solicitacao", usuario="ana") as raiz:
+        with teste.span("teams.listar_times", "integracao") as filho:
+            time.sleep(0.01)
+            filho.definir(times=2)
+        assert span_atual() is raiz
+    assert span_atual() is None
+
+    filho, raiz = exportador.spans
+    assert filho.id_pai == raiz.id_span and filho.id_rastreio == raiz.id_rastreio and raiz.id_pai is None
+    assert filho.atributos == {"times": 2} and raiz.atributos == {"usuario": "ana"}
+    assert raiz.duracao >= filho.duracao >= 0.01
+    print("✅ Span filho ligado ao pai, com atributos e duração")
+
+    try:
+        with teste.span("api_interna.get", "integracao"):
+            raise ConnectionError("fora do ar")
+    except ConnectionError:
+        pass
+    assert exportador.spans[-1].erro == "ConnectionError: fora do ar"
+    assert teste.resumo()["etapas"]["integracao"]["erros"] == 1
+    print("✅ Erro registrado no span e no histograma (e repassado a quem chamou)")
+
+    # Spans de threads diferentes não se misturam
+    pais = []
+    def em_thread():
+        with teste.span("thread", "geral"):
+            pais.append(span_atual().id_pai)
+    with teste.span("principal", "geral"):
+        thread = threading.Thread(target=em_thread)
+        thread.start()
+        thread.join()
+    assert pais == [None]
+    print("✅ Cada thread tem seu próprio span atual")
+
+def testar_histogramas():
+    """Testa os percentis estimados e o resumo por etapa"""
+    print("\n🔄 Testando histogramas...")
+    histograma = Histograma()
+    for duracao_ms in range(1, 101):
+        histograma.registrar(duracao_ms, momento=duracao_ms / 100)
+    resumo = histograma.resumo()
+    assert resumo["quantidade"] == 100 and resumo["max_ms"] == 100 and resumo["media_ms"] == 50.5
+    assert 45 <= resumo["p50_ms"] <= 55 and 90 <= resumo["p95_ms"] <= 100, resumo
+    assert resumo["por_segundo"] == 100.0
+    print(f"✅ p50 {resumo['p50_ms']} ms, p95 {resumo['p95_ms']} ms para medidas de 1 a 100 ms")
+
+    teste = Rastreador()
+    for nome, etapa in [("teams.listar_times", "integracao"), ("calendar.listar_eventos", "integracao"),
+                        ("llm.gpt", "llm")]:
+        with teste.span(nome, etapa):
+            pass
+    resumo = teste.resumo()
+    assert resumo["etapas"]["integracao"]["quantidade"] == 2 and resumo["etapas"]["llm"]["quantidade"] == 1
+    assert set(resumo["trechos"]) == {"integracao/teams.listar_times", "integracao/calendar.listar_eventos",
+                                      "llm/llm.gpt"}
+    assert "integracao" in teste.relatorio()
+    print("✅ Resumo por etapa e por trecho")
+
+def testar_exportador_json():
+    """Testa o arquivo JSON Lines"""
+    print("\n🔄 Testando exportador JSON...")
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "logs", "rastreamento.jsonl")
+        teste = Rastreador([ExportadorJSON(caminho)])
+        with teste.span("documento.ler_pagina", "documento", arquivo="a.pdf"):
+            pass
+        with open(caminho, encoding="utf-8") as f:
+            linhas = [json.loads(linha) for linha in f]
+    assert len(linhas) == 1 and linhas[0]["nome"] == "documento.ler_pagina"
+    assert linhas[0]["status"] == "ok" and linhas[0]["atributos"] == {"arquivo": "a.pdf"}
+    print("✅ Um span por linha, com atributos e status")
+
+def testar_decorador_e_iteracao():
+    """Testa o decorador (síncrono e assíncrono) e a medição de iteradores"""
+    print("\n🔄 Testando decorador e medir_iteracao...")
+    exportador = ExportadorMemoria()
+    teste = Rastreador([exportador])
+
+    @teste.rastrear("calendar.listar_eventos", etapa="integracao")
+    def listar_eventos(max_results=10):
+        return list(range(max_results))
+
+    @teste.rastrear(etapa="integracao")
+    async def listar_times():
+        await asyncio.sleep(0.01)
+        return ["Marketing"]
+
+    assert listar_eventos(3) == [0, 1, 2] and asyncio.run(listar_times()) == ["Marketing"]
+    assert [s.nome for s in exportador.spans] == ["calendar.listar_eventos",
+                                                  "testar_decorador_e_iteracao.<locals>.listar_times"]
+    print("✅ Funções síncronas e assíncronas medidas pelo decorador")
+
+    rastreador.limpar()
+    def paginas():
+        for numero in range(3):
+            time.sleep(0.01)
+            yield f"página {numero}"
+    lidas = []
+    for pagina in medir_iteracao(paginas(), "documento.ler_pagina", "documento"):
+        time.sleep(0.02)  # Tempo de quem consome: não entra na medida
+        lidas.append(pagina)
+    resumo = rastreador.resumo()["etapas"]["documento"]
+    assert len(lidas) == 3 and resumo["quantidade"] == 4  # 3 páginas + a chamada que encerra o iterador
+    assert resumo["total_ms"] < 50, resumo
+    print("✅ medir_iteracao mede só o tempo de produzir cada item")
+
+def testar_callback_llm():
+    """Testa o callback do LangChain com um modelo simulado"""
+    print("\n🔄 Testando callback do LLM...")
+    exportador = ExportadorMemoria()
+    teste = Rastreador([exportador])
+    llm = FakeListChatModel(responses=['{"servico": "teams", "acao": "listar_times", "parametros": {}}'])
+
+    with teste.span("agente.solicitacao", "solicitacao") as raiz:
+        llm.invoke("Liste os times do Teams", config={"callbacks": [criar_callback_llm(teste)]})
+    span_llm = exportador.spans[0]
+    assert span_llm.etapa == "llm" and span_llm.id_pai == raiz.id_span
+    assert span_llm.atributos["tokens_entrada"] > 0 and span_llm.atributos["tokens_saida"] > 0
+    assert teste.resumo()["tokens"]["llm"]["saida"] == span_llm.atributos["tokens_saida"]
+    print(f"✅ Chamada ao LLM medida: {span_llm.atributos['tokens_entrada']} tokens de entrada, "
+          f"{span_llm.atributos['tokens_saida']} de saída")
+
+def testar_agente_integrado():
+    """Testa os spans de um pedido completo do agente integrado (modelo e Teams simulados)"""
+    print("\n🔄 Testando o agente integrado...")
+    from agentes.agente_integrado import AgenteIntegrado
+
+    class TeamsSimulado:
+        def listar_times(self):
+            with rastreador.span("teams.listar_times", "integracao"):
+                return [{"id": "1", "displayName": "Marketing"}]
+
+    exportador = ExportadorMemoria()
+    rastreador.limpar()
+    rastreador.exportadores = [exportador]
+    try:
+        llm = FakeListChatModel(responses=['{"servico": "teams", "acao": "listar_times", "parametros": {}}'])
+        agente = AgenteIntegrado(llm=llm, calendar=object(), teams=TeamsSimulado(), api=object())
+        assert agente.processar_solicitacao("Liste os times")["sucesso"]
+    finally:
+        rastreador.exportadores = []
+
+    nomes = {span.nome: span for span in exportador.spans}
+    raiz = nomes["agente.processar_solicitacao"]
+    assert nomes["teams.listar_times"].id_pai == raiz.id_span
+    assert any(span.etapa == "llm" and span.id_rastreio == raiz.id_rastreio for span in exportador.spans)
+    print("✅ Pedido → LLM → integração no mesmo rastreio")
+    print(rastreador.relatorio())
+
+def testar_rastreamento():
+    """Função para executar todos os testes"""
+    print("=" * 70)
+    print("TESTE DO RASTREAMENTO")
+    print("=" * 70)
+
+    testes = [testar_spans, testar_histogramas, testar_exportador_json, testar_decorador_e_iteracao,
+              testar_callback_llm, testar_agente_integrado]
+    for teste in testes:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Falha em {teste.__name__}: {e}")
+
+    print("\n" + "=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_rastreamento()
@@ -0,0 +1,197 @@
+"""
+Script para testar o roteamento de tarefas entre níveis de modelo (modelos simulados)
+"""
+
+import os
+import sys
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O modelo é simulado: a chave só precisa existir para os clientes serem criados
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+
+from componentes.consumo_tokens import Orcamento, OrcamentoExcedido, invocar_com_orcamento, pedido
+from componentes.roteamento_modelos import (NIVEL_PADRAO, RoteadorModelos, criar_chat_openai, validar_json,
+                                            validar_texto)
+
+PROMPT = ChatPromptTemplate.from_template("Extraia os dados do texto em JSON.\n\n{texto}")
+
+class ModeloSimulado(FakeListChatModel):
+    """Modelo simulado com nome, que conta as chamadas e pode falhar"""
+
+    model_name: str = "simulado"
+    chamadas: int = 0
+    falhar: bool = False
+
+    def _call(self, *args, **kwargs):
+        self.chamadas += 1
+        if self.falhar:
+            raise ConnectionError("modelo local fora do ar")
+        return super()._call(*args, **kwargs)
+
+def testar_configuracao():
+    """Testa a leitura dos níveis e das tarefas a partir das variáveis"""
+    print("\n🔄 Testando configuração...")
+    roteador = RoteadorModelos.de_variaveis({})
+    assert roteador.niveis_da_tarefa("extracao") == [NIVEL_PADRAO]
+    assert roteador.nome_modelos("extracao") == "gpt-3.5-turbo"
+    print("✅ Sem configuração, todas as tarefas usam o modelo padrão")
+
+    roteador = RoteadorModelos.de_variaveis({
+        "MODELO_NIVEL_LOCAL": "llama3.1:8b@http://localhost:11434/v1",
+        "MODELO_NIVEL_PEQUENO": "gpt-4o-mini",
+        "MODELO_TAREFA_EXTRACAO": "local, pequeno, padrao",
+        "MODELO_TAREFA_ROTEAMENTO": "pequeno,padrao",
+        "OUTRA_VARIAVEL": "ignorada"
+    }, api_key="chave")
+    local = roteador.niveis["local"]
+    assert local.modelo == "llama3.1:8b" and local.base_url == "http://localhost:11434/v1" and local.local
+    assert not roteador.niveis["pequeno"].local and roteador.niveis["pequeno"].api_key == "chave"
+    assert roteador.niveis_da_tarefa("extracao") == ["local", "pequeno", "padrao"]
+    assert roteador.niveis_da_tarefa("sintese") == [NIVEL_PADRAO]
+    assert roteador.nome_modelos("roteamento") == "gpt-4o-mini>gpt-3.5-turbo"
+    print("✅ Níveis (inclusive o local, com endpoint) e ordem de cada tarefa lidos das variáveis")
+
+    cliente = criar_chat_openai(local)
+    assert cliente.model_name == "llama3.1:8b" and cliente.openai_api_base == "http://localhost:11434/v1"
+    assert roteador.llm("local") is roteador.llm("local")
+    print("✅ Modelo local acessado pelo cliente da OpenAI, com o endpoint configurado")
+
+    try:
+        RoteadorModelos.de_variaveis({"MODELO_TAREFA_EXTRACAO": "local,padrao"})
+        assert False, "um nível não configurado deveria ser recusado"
+    except ValueError as e:
+        print(f"✅ Nível não configurado recusado: {e}")
+
+    modelo = ModeloSimulado(responses=["ok"])
+    roteador = RoteadorModelos.de_variaveis({"MODELO_NIVEL_PADRAO": "gpt-4o"}, llm_padrao=modelo)
+    assert roteador.llm() is modelo
+    print("✅ Um modelo recebido pronto tem prioridade sobre MODELO_NIVEL_PADRAO")
+
+def testar_validadores():
+    """Testa os validadores de JSON e de texto"""
+    print("\n🔄 Testando validadores...")
+    validar = validar_json(("servico", "acao"), valores={"servico": {"teams", "calendar"}}, confianca_minima=0.6)
+    assert validar('{"servico": "teams", "acao": "listar_times"}')
+    assert validar('```json\n{"servico": "teams", "acao": "listar_times", "confianca": 0.9}\n```')
+    assert not validar('{"servico": "teams", "acao": "listar_times", "confianca": 0.3}')
+    assert not validar('{"servico": "email", "acao": "enviar"}')
+    assert not validar('{"servico": "teams"}')
+    assert not validar("Vou listar os times do Teams.")
+    print("✅ JSON fora do formato, serviço desconhecido e confiança baixa são recusados")
+
+    assert validar_texto()("Resumo.") and not validar_texto()("   ") and not validar_texto(20)("Curto.")
+    print("✅ Respostas em texto vazias ou curtas demais são recusadas")
+
+def testar_escalonamento():
+    """Testa a subida de nível por validação e por erro"""
+    print("\n🔄 Testando subida de nível...")
+    local = ModeloSimulado(responses=["Não sei responder em JSON."], model_name="llama3.1:8b")
+    pequeno = ModeloSimulado(responses=['{"nome": "Ana"}'], model_name="gpt-4o-mini")
+    padrao = ModeloSimulado(responses=['{"nome": "Ana Souza"}'], model_name="gpt-3.5-turbo")
+    roteador = RoteadorModelos({"local": local, "pequeno": pequeno, NIVEL_PADRAO: padrao},
+                               {"extracao": ["local", "pequeno", NIVEL_PADRAO]})
+
+    resposta = roteador.executar("extracao", lambda llm: llm.invoke("texto").content, validar=validar_json())
+    assert resposta == '{"nome": "Ana"}' and (local.chamadas, pequeno.chamadas, padrao.chamadas) == (1, 1, 0)
+    print("✅ Resposta fora do formato no modelo local: refeita no nível seguinte, que resolveu")
+
+    local.falhar = True
+    roteador.executar("extracao", lambda llm: llm.invoke("texto").content, validar=validar_json())
+    assert (local.chamadas, pequeno.chamadas) == (2, 2)
+    print("✅ Modelo local fora do ar: o próximo nível atende")
+
+    pequeno.falhar = padrao.falhar = True
+    try:
+        roteador.executar("extracao", lambda llm: llm.invoke("texto").content)
+        assert False, "o erro do último nível deveria ser repassado"
+    except ConnectionError:
+        pass
+    print("✅ Se todos os níveis falharem, o erro do último é repassado")
+
+    estatisticas = roteador.estatisticas()["extracao"]
+    assert estatisticas["local"] == {**estatisticas["local"], "chamadas": 3, "invalidas": 1, "erros": 2}
+    assert estatisticas["pequeno"]["aceitas"] == 2 and estatisticas["pequeno"]["erros"] == 1
+    assert "extracao" in roteador.relatorio()
+    print("✅ Chamadas, respostas aceitas e erros de cada nível nas estatísticas")
+
+    # O último nível responde mesmo fora do formato (quem chamou trata como antes)
+    roteador = RoteadorModelos({NIVEL_PADRAO: ModeloSimulado(responses=["texto livre"])})
+    assert roteador.executar("extracao", lambda llm: llm.invoke("x").content, validar=validar_json()) == "texto livre"
+    print("✅ Resposta inválida do último nível é devolvida a quem chamou")
+
+def testar_orcamento():
+    """Testa que a recusa pelo orçamento não sobe de nível"""
+    print("\n🔄 Testando orçamento...")
+    pequeno = ModeloSimulado(responses=["{}"], model_name="gpt-4o-mini")
+    padrao = ModeloSimulado(responses=["{}"], model_name="gpt-4")
+    roteador = RoteadorModelos({"pequeno": pequeno, NIVEL_PADRAO: padrao}, {"extracao": ["pequeno", NIVEL_PADRAO]})
+    with pedido(orcamento=Orcamento(max_tokens=10)):
+        try:
+            roteador.executar("extracao", lambda llm: invocar_com_orcamento(llm, PROMPT, {"texto": "Ana, SMN."}))
+            assert False, "a chamada deveria ter sido recusada"
+        except OrcamentoExcedido:
+            pass
+    assert pequeno.chamadas == padrao.chamadas == 0
+    print("✅ Chamada fora do orçamento recusada sem tentar um modelo maior")
+
+def testar_agente_integrado():
+    """Testa o roteamento de solicitações do agente integrado com dois níveis"""
+    print("\n🔄 Testando o agente integrado...")
+    from agentes.agente_integrado import AgenteIntegrado
+
+    class TeamsSimulado:
+        def listar_times(self):
+            return [{"id": "1", "displayName": "Marketing"}]
+
+    pequeno = ModeloSimulado(responses=['{"servico": "teams", "acao": "listar_times", "parametros": {}, '
+                                        '"confianca": 0.3}'], model_name="gpt-4o-mini")
+    padrao = ModeloSimulado(responses=['{"servico": "teams", "acao": "listar_times", "parametros": {}, '
+                                       '"confianca": 0.95}'])
+    roteador = RoteadorModelos({"pequeno": pequeno, NIVEL_PADRAO: padrao}, {"roteamento": ["pequeno", NIVEL_PADRAO]})
+    agente = AgenteIntegrado(calendar=object(), teams=TeamsSimulado(), api=object(), roteador=roteador)
+    assert agente.llm is padrao
+
+    resultado = agente.processar_solicitacao("Liste os times", id_usuario="ana")
+    assert resultado["sucesso"] and resultado["dados"][0]["displayName"] == "Marketing"
+    assert pequeno.chamadas == padrao.chamadas == 1
+    assert "0.95" in agente.sessoes.obter("ana").texto()
+    print("✅ Confiança baixa no modelo pequeno: solicitação interpretada pelo modelo padrão")
+
+    pequeno.responses = ['{"servico": "teams", "acao": "listar_times", "parametros": {}, "confianca": 0.9}']
+    pequeno.i = 0
+    assert agente.processar_solicitacao("Liste os times de novo", id_usuario="ana")["sucesso"]
+    assert pequeno.chamadas == 2 and padrao.chamadas == 1
+    print("✅ Com confiança alta, o modelo pequeno resolve sozinho")
+
+    pequeno.responses = ['```json\n{"servico": "teams", "acao": "listar_times", "parametros": {}, '
+                         '"confianca": 0.9}\n```']
+    pequeno.i = 0
+    assert agente.processar_solicitacao("Liste os times mais uma vez", id_usuario="ana")["sucesso"]
+    assert pequeno.chamadas == 3 and padrao.chamadas == 1
+    print("✅ Resposta em bloco ```json aceita pela validação e também interpretada pelo agente")
+
+def testar_roteamento_modelos():
+    """Função para executar todos os testes"""
+    print("=" * 70)
+    print("TESTE DO ROTEAMENTO DE MODELOS")
+    print("=" * 70)
+
+    testes = [testar_configuracao, testar_validadores, testar_escalonamento, testar_orcamento,
+              testar_agente_integrado]
+    for teste in testes:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Falha em {teste.__name__}: {e}")
+
+    print("\n" + "=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_roteamento_modelos()
@@ -0,0 +1,158 @@
+"""
+Script para testar o servidor de agentes sem acesso à internet (agentes simulados)
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agentes.servidor import ServidorAgentes
+from componentes.memoria_conversa import GerenciadorSessoes
+
+class AgenteSimulado:
+    """Agente que responde com o histórico do usuário, depois de uma pausa"""
+
+    def __init__(self, sessoes, pausa=0.0):
+        self.sessoes = sessoes
+        self.pausa = pausa
+
+    def processar_solicitacao(self, solicitacao, id_usuario="padrao"):
+        if solicitacao == "falhar":
+            raise RuntimeError("modelo fora do ar")
+        time.sleep(self.pausa)
+        memoria = self.sessoes.obter(id_usuario)
+        anteriores = [texto for papel, texto in memoria.mensagens() if papel == "human"]
+        memoria.adicionar_turno(solicitacao, "ok")
+        return {"sucesso": True, "tipo": "eco", "dados": {"anteriores": anteriores}}
+
+def criar_servidor(pausa=0.0, **opcoes):
+    """Servidor com agentes simulados que compartilham as mesmas sessões"""
+    sessoes = GerenciadorSessoes()
+    return ServidorAgentes(lambda quantidade: [AgenteSimulado(sessoes, pausa) for _ in range(quantidade)], **opcoes)
+
+def cliente(servidor):
+    """Cliente HTTP que fala direto com a aplicação ASGI"""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=servidor), base_url="http://teste")
+
+async def testar_rotas():
+    """Testa as solicitações, a sessão por usuário e as respostas de erro"""
+    print("\n🔄 Testando rotas...")
+    servidor = criar_servidor(tamanho_pool=2)
+    await servidor.iniciar()
+    async with cliente(servidor) as http:
+        assert (await http.get("/saude")).status_code == 200
+
+        await http.post("/solicitacoes", json={"solicitacao": "Liste os times", "id_usuario": "ana"})
+        resposta = await http.post("/solicitacoes", json={"solicitacao": "E os canais?", "id_usuario": "ana"})
+        assert resposta.status_code == 200 and resposta.json()["dados"]["anteriores"] == ["Liste os times"]
+        resposta = await http.post("/solicitacoes", json={"solicitacao": "Oi", "id_usuario": "bruno"})
+        assert resposta.json()["dados"]["anteriores"] == []
+        print("✅ Agentes compartilham as sessões; cada usuário tem seu histórico")
+
+        await http.delete("/sessoes/ana")
+        resposta = await http.post("/solicitacoes", json={"solicitacao": "De novo", "id_usuario": "ana"})
+        assert resposta.json()["dados"]["anteriores"] == []
+        print("✅ Sessão encerrada pelo DELETE /sessoes/{id}")
+
+        assert (await http.post("/solicitacoes", content=b"texto")).status_code == 400
+        assert (await http.post("/solicitacoes", json={"outro": 1})).status_code == 400
+        assert (await http.get("/nada")).status_code == 404
+        resposta = await http.post("/solicitacoes", json={"solicitacao": "falhar"})
+        assert resposta.status_code == 500 and resposta.json()["sucesso"] is False
+        print("✅ 400 para JSON inválido, 404 para rota desconhecida, 500 quando o agente falha")
+
+        metricas = (await http.get("/metricas")).json()
+        assert metricas["pedidos_por_status"] == {"200": 4, "400": 2, "500": 1}
+        assert metricas["agentes"] == 2 and metricas["agentes_livres"] == 2 and metricas["sessoes"] == 2
+        print("✅ Métricas por status, agentes livres e sessões")
+    await servidor.encerrar()
+
+async def testar_admissao():
+    """Testa o atendimento em paralelo, o 503 com a fila cheia e a ordem dos pedidos do mesmo usuário"""
+    print("\n🔄 Testando controle de admissão...")
+    servidor = criar_servidor(pausa=0.2, tamanho_pool=2, max_fila=2)
+    await servidor.iniciar()
+    async with cliente(servidor) as http:
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(*[
+            http.post("/solicitacoes", json={"solicitacao": f"pedido {i}", "id_usuario": f"u{i}"}) for i in range(2)])
+        assert all(r.status_code == 200 for r in respostas) and time.perf_counter() - inicio < 0.35
+        print("✅ Dois agentes atendem dois pedidos ao mesmo tempo")
+
+        respostas = await asyncio.gather(*[
+            http.post("/solicitacoes", json={"solicitacao": f"pedido {i}", "id_usuario": f"u{i}"}) for i in range(8)])
+        status = sorted(r.status_code for r in respostas)
+        assert status == [200] * 4 + [503] * 4, status
+        assert all(r.headers["retry-after"] == "1" for r in respostas if r.status_code == 503)
+        print("✅ Com os agentes ocupados e a fila cheia, os pedidos extras recebem 503")
+
+        respostas = await asyncio.gather(*[
+            http.post("/solicitacoes", json={"solicitacao": f"passo {i}", "id_usuario": "carla"}) for i in range(3)])
+        assert [len(r.json()["dados"]["anteriores"]) for r in respostas] == [0, 1, 2]
+        print("✅ Pedidos do mesmo usuário atendidos em ordem")
+    await servidor.encerrar()
+
+async def testar_encerramento():
+    """Testa que o desligamento espera os pedidos em andamento e recusa os novos"""
+    print("\n🔄 Testando desligamento...")
+    servidor = criar_servidor(pausa=0.3, tamanho_pool=1)
+    await servidor.iniciar()
+    async with cliente(servidor) as http:
+        em_andamento = asyncio.create_task(http.post("/solicitacoes", json={"solicitacao": "longo"}))
+        await asyncio.sleep(0.05)
+        encerramento = asyncio.create_task(servidor.encerrar())
+        await asyncio.sleep(0.05)
+        assert (await http.get("/saude")).status_code == 503
+        assert (await http.post("/solicitacoes", json={"solicitacao": "novo"})).status_code == 503
+        assert (await em_andamento).status_code == 200
+        await encerramento
+    print("✅ Pedido em andamento concluído; novos pedidos recusados durante o desligamento")
+
+async def testar_ciclo_de_vida():
+    """Testa as mensagens de lifespan do ASGI"""
+    print("\n🔄 Testando lifespan...")
+    servidor = criar_servidor(tamanho_pool=3)
+    mensagens = asyncio.Queue()
+    enviadas = []
+
+    async def enviar(mensagem):
+        enviadas.append(mensagem["type"])
+
+    for tipo in ["lifespan.startup", "lifespan.shutdown"]:
+        mensagens.put_nowait({"type": tipo})
+    await servidor({"type": "lifespan"}, mensagens.get, enviar)
+    assert enviadas == ["lifespan.startup.complete", "lifespan.shutdown.complete"] and len(servidor.agentes) == 3
+
+    def falhar(quantidade):
+        raise ValueError("sem credenciais")
+    servidor, enviadas[:] = ServidorAgentes(falhar), []
+    mensagens.put_nowait({"type": "lifespan.startup"})
+    await servidor({"type": "lifespan"}, mensagens.get, enviar)
+    assert enviadas == ["lifespan.startup.failed"]
+    print("✅ Agentes criados na inicialização; falha na criação informada ao servidor")
+
+def testar_servidor():
+    """Função para executar todos os testes"""
+    print("=" * 70)
+    print("TESTE DO SERVIDOR DE AGENTES")
+    print("=" * 70)
+
+    testes = [testar_rotas, testar_admissao, testar_encerramento, testar_ciclo_de_vida]
+    for teste in testes:
+        try:
+            asyncio.run(teste())
+        except AssertionError as e:
+            print(f"❌ Falha em {teste.__name__}: {e}")
+
+    print("\n" + "=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_servidor()
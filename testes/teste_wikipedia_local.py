@@ -0,0 +1,123 @@
+"""
+Script para testar o cache da Wikipedia e o recorte offline sem acesso à internet
+"""
+
+import bz2
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Adicionar o diretório raiz ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from componentes.cache_disco import CacheDisco
+from componentes.wikipedia_local import SEM_RESULTADOS, WikipediaComCache, WikipediaOffline, normalizar_consulta
+
+ARTIGOS = [
+    {"id": "1", "title": "Inteligência artificial",
+     "text": "Inteligência artificial é a inteligência demonstrada por máquinas. " * 20},
+    {"id": "2", "title": "Aprendizado de máquina",
+     "text": "Aprendizado de máquina é um subcampo da inteligência artificial que estuda algoritmos. " * 20},
+    {"id": "3", "title": "Energia solar",
+     "text": "Energia solar é a energia da luz e do calor do Sol, usada por painéis fotovoltaicos. " * 20},
+    {"id": "4", "title": "Página vazia", "text": ""}
+]
+
+class BuscaContada:
+    """Simula a Wikipedia contando as chamadas (e falhando quando pedido)"""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.sem_rede = False
+
+    def __call__(self, consulta):
+        if self.sem_rede:
+            raise ConnectionError("sem rede")
+        self.chamadas += 1
+        return f"Page: {consulta}\nSummary: resposta {self.chamadas}"
+
+def testar_cache_wikipedia():
+    """Testa a chave normalizada, o prazo de validade e a resposta vencida sem rede"""
+    print("\n🔄 Testando cache da Wikipedia...")
+    assert normalizar_consulta("  Inteligência   Artificial? ") == "inteligencia artificial"
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        busca = BuscaContada()
+        wikipedia = WikipediaComCache(busca, CacheDisco(diretorio), ttl_segundos=60)
+        primeira = wikipedia.run("Inteligência Artificial")
+        assert wikipedia.run("inteligencia artificial?") == primeira and busca.chamadas == 1
+        print("✅ Consultas iguais após normalização vão à Wikipedia uma vez só")
+
+        outra_instancia = WikipediaComCache(busca, CacheDisco(diretorio), ttl_segundos=60)
+        assert outra_instancia.run("INTELIGÊNCIA ARTIFICIAL") == primeira and busca.chamadas == 1
+        print("✅ Resposta persistida em disco entre execuções")
+
+        vencido = WikipediaComCache(busca, CacheDisco(diretorio), ttl_segundos=0.05)
+        time.sleep(0.1)
+        assert vencido.run("inteligencia artificial") != primeira and busca.chamadas == 2
+        print("✅ Resposta vencida buscada de novo")
+
+        time.sleep(0.1)
+        busca.sem_rede = True
+        assert vencido.run("inteligencia artificial").endswith("resposta 2")
+        try:
+            vencido.run("energia solar")
+            assert False, "uma consulta nova sem rede deveria falhar"
+        except ConnectionError:
+            pass
+        print("✅ Sem rede, a resposta vencida é usada; consultas novas falham")
+
+def testar_wikipedia_offline():
+    """Testa o índice offline: dump compactado, busca por título e por termos, formato da resposta"""
+    print("\n🔄 Testando Wikipedia offline...")
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_dump = os.path.join(diretorio, "recorte.jsonl.bz2")
+        with bz2.open(caminho_dump, "wt", encoding="utf-8") as f:
+            for artigo in ARTIGOS:
+                f.write(json.dumps(artigo, ensure_ascii=False) + "\n")
+
+        pasta_indice = os.path.join(diretorio, "indice")
+        wikipedia = WikipediaOffline.abrir(pasta_indice, caminho_dump, top_k_results=2)
+        assert len(wikipedia) == 3
+        tamanho_texto = sum(len(artigo["text"].encode("utf-8")) for artigo in ARTIGOS)
+        assert os.path.getsize(os.path.join(pasta_indice, WikipediaOffline.ARQUIVO_ARTIGOS)) < tamanho_texto / 5
+        print("✅ Dump .bz2 indexado, artigos vazios ignorados, textos compactados em disco")
+
+        wikipedia = WikipediaOffline.abrir(pasta_indice)
+        titulos = [artigo["titulo"] for artigo in wikipedia.buscar("inteligencia artificial")]
+        assert titulos == ["Inteligência artificial", "Aprendizado de máquina"]
+        assert wikipedia.buscar("painéis fotovoltaicos")[0]["titulo"] == "Energia solar"
+        print("✅ Índice recarregado do disco; busca por título e por termos do texto")
+
+        resposta = wikipedia.run("Energia Solar")
+        assert resposta.startswith("Page: Energia solar\nSummary: Energia solar é") and len(resposta) <= 3000
+        assert wikipedia.run("xyzabc") == SEM_RESULTADOS
+        print("✅ Resposta no formato do WikipediaQueryRun")
+
+        try:
+            WikipediaOffline.abrir(os.path.join(diretorio, "sem_indice"))
+            assert False, "sem índice nem dump deveria falhar"
+        except FileNotFoundError:
+            print("✅ Erro claro quando não há índice nem dump")
+
+def testar_wikipedia_local():
+    """Função para executar todos os testes"""
+    print("=" * 70)
+    print("TESTE DA WIKIPEDIA LOCAL")
+    print("=" * 70)
+
+    testes = [testar_cache_wikipedia, testar_wikipedia_offline]
+    for teste in testes:
+        try:
+            teste()
+        except AssertionError as e:
+            print(f"❌ Falha em {teste.__name__}: {e}")
+
+    print("\n" + "=" * 70)
+    print("TESTE CONCLUÍDO")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    testar_wikipedia_local()